@@ -9,18 +9,27 @@ import signal
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.exceptions import TelegramNetworkError, TelegramAPIError
 
-from config import BOT_TOKEN, LOG_LEVEL, GROUP_CHAT_ID
-from database.db import init_db
+from config import BOT_TOKEN, LOG_LEVEL, GROUP_CHAT_ID, BOT_MODE, TELEGRAM_API_URL, WEBHOOK_SECRET
+from database.db import init_db, close_db, AsyncSessionLocal
 from handlers import (
     user, admin, admin_category_manage, admin_contacts, admin_stats,
     admin_bestseller, user_bestseller, user_locations, user_about, admin_locations,
-    user_cart, user_favorites, user_navigation
+    user_cart, user_favorites, user_navigation, admin_catalog_io, user_search,
+    user_inline
 )
+from middlewares.album import AlbumMiddleware
+from middlewares.db import DbSessionMiddleware
+from middlewares.legacy_callbacks import LegacyCallbackMiddleware
+from states.storage import create_fsm_storage
 from services.ads_scheduler import CategoryBasedAdScheduler
 from services.bestseller_scheduler import BestsellerScheduler
+from services.webhook_server import WebhookServer
+from services.send_queue import SendQueueMiddleware
+from services.event_buffer import event_buffer
 
 # Configure logging
 logging.basicConfig(
@@ -39,6 +48,7 @@ bot_instance = None
 scheduler_instance = None
 bestseller_scheduler_instance = None
 dispatcher_instance = None
+webhook_server_instance = None
 
 
 def setup_signal_handlers():
@@ -56,6 +66,13 @@ async def shutdown():
     """Graceful shutdown procedure"""
     logger.info("Shutting down bot...")
     
+    # Stop webhook server (finishes queued updates first)
+    if webhook_server_instance:
+        try:
+            await webhook_server_instance.stop()
+        except Exception as e:
+            logger.error(f"Error stopping webhook server: {e}")
+    
     # Stop schedulers
     if scheduler_instance:
         try:
@@ -79,18 +96,44 @@ async def shutdown():
         except Exception as e:
             logger.error(f"Error closing bot session: {e}")
     
+    # Close FSM storage
+    if dispatcher_instance:
+        try:
+            await dispatcher_instance.storage.close()
+            logger.info("FSM storage closed")
+        except Exception as e:
+            logger.error(f"Error closing FSM storage: {e}")
+    
+    # Write buffered analytics events
+    try:
+        await event_buffer.stop()
+        logger.info("Event buffer flushed")
+    except Exception as e:
+        logger.error(f"Error flushing event buffer: {e}")
+    
+    # Release database connections
+    try:
+        await close_db()
+        logger.info("Database connections closed")
+    except Exception as e:
+        logger.error(f"Error closing database connections: {e}")
+    
     logger.info("Shutdown complete")
 
 
 async def main():
     """Main function to start the bot"""
     global bot_instance, scheduler_instance, bestseller_scheduler_instance, dispatcher_instance
+    global webhook_server_instance
     
     try:
         # Validate bot token
         if not BOT_TOKEN:
             logger.error("BOT_TOKEN not found in environment variables!")
             sys.exit(1)
+        if BOT_MODE == "webhook" and not WEBHOOK_SECRET:
+            logger.error("WEBHOOK_SECRET is required when BOT_MODE=webhook!")
+            sys.exit(1)
         
         # Initialize database
         logger.info("Initializing database...")
@@ -101,13 +144,31 @@ async def main():
             logger.error("Bot cannot start without database. Exiting...")
             sys.exit(1)
         
+        # Write sale leads spooled by a previous run, then start batched writes
+        await event_buffer.start()
+        
         # Initialize bot and dispatcher
         logger.info("Initializing bot...")
+        session = None
+        if TELEGRAM_API_URL:
+            logger.info(f"Using custom Bot API server: {TELEGRAM_API_URL}")
+            session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL))
         bot_instance = Bot(
             token=BOT_TOKEN,
+            session=session,
             default=DefaultBotProperties(parse_mode=ParseMode.HTML)
         )
-        dispatcher_instance = Dispatcher(storage=MemoryStorage())
+        # Pace all outgoing requests and retry on flood wait
+        bot_instance.session.middleware(SendQueueMiddleware())
+        dispatcher_instance = Dispatcher(storage=create_fsm_storage())
+        
+        # Album parts sent while adding toy media are handled once, as one update with `album`
+        # (before the session opens)
+        dispatcher_instance.update.outer_middleware(AlbumMiddleware(states=[admin.AddToyStates.waiting_media]))
+        # One database session (unit of work) per update, injected as `db`
+        dispatcher_instance.update.outer_middleware(DbSessionMiddleware(AsyncSessionLocal))
+        # Buttons from before typed callback data are rewritten to the new format
+        dispatcher_instance.callback_query.outer_middleware(LegacyCallbackMiddleware())
 
         # Register routers (admin first to handle admin-specific buttons)
         logger.info("Registering routers...")
@@ -117,12 +178,15 @@ async def main():
         dispatcher_instance.include_router(admin_stats.router)
         dispatcher_instance.include_router(admin_bestseller.router)
         dispatcher_instance.include_router(admin_locations.router)
+        dispatcher_instance.include_router(admin_catalog_io.router)
         dispatcher_instance.include_router(user.router)
         dispatcher_instance.include_router(user_bestseller.router)
         dispatcher_instance.include_router(user_locations.router)
         dispatcher_instance.include_router(user_about.router)
         dispatcher_instance.include_router(user_cart.router)
         dispatcher_instance.include_router(user_favorites.router)
+        dispatcher_instance.include_router(user_search.router)
+        dispatcher_instance.include_router(user_inline.router)
         dispatcher_instance.include_router(user_navigation.router)
         
         # Initialize and start category-based scheduler
@@ -162,9 +226,16 @@ async def main():
         # Setup signal handlers
         setup_signal_handlers()
         
-        # Start polling
-        logger.info("Starting long polling...")
-        await dispatcher_instance.start_polling(bot_instance)
+        if BOT_MODE == "webhook":
+            # Receive updates over HTTP
+            logger.info("Starting webhook server...")
+            webhook_server_instance = WebhookServer(bot_instance, dispatcher_instance)
+            await webhook_server_instance.run()
+        else:
+            # Start polling (drop any webhook left from a previous webhook run)
+            logger.info("Starting long polling...")
+            await bot_instance.delete_webhook()
+            await dispatcher_instance.start_polling(bot_instance)
         
     except KeyboardInterrupt:
         logger.info("Bot interrupted by user")
@@ -62,6 +62,14 @@ GROUP_CHAT_ID: int = get_int_env("GROUP_CHAT_ID", 0)
 # Database URL
 DATABASE_URL: str = get_optional_env("DATABASE_URL", "sqlite:///toymix.db")
 
+# SQLite tuning (file databases only): WAL with a pool of readers and one writer
+SQLITE_READ_POOL_SIZE: int = get_int_env("SQLITE_READ_POOL_SIZE", 4)
+# Wait this long for a lock held by another process before failing
+SQLITE_BUSY_TIMEOUT_MS: int = get_int_env("SQLITE_BUSY_TIMEOUT_MS", 5000)
+SQLITE_MMAP_SIZE_MB: int = get_int_env("SQLITE_MMAP_SIZE_MB", 256)
+# Page cache per connection
+SQLITE_CACHE_SIZE_MB: int = get_int_env("SQLITE_CACHE_SIZE_MB", 16)
+
 # Bot username (with @)
 BOT_USERNAME: str = get_optional_env("BOT_USERNAME", "@YaypanToymixBot")
 
@@ -90,5 +98,70 @@ AD_MAX_INTERVAL: int = get_int_env("AD_MAX_INTERVAL", 70)
 # Pagination
 ITEMS_PER_PAGE: int = get_int_env("ITEMS_PER_PAGE", 5)
 
+# Category browsing: "carousel" (one message, edited on each tap) or "list" (10 toys per page)
+CATALOG_VIEW: str = get_optional_env("CATALOG_VIEW", "carousel").lower()
+
+# In-memory catalog cache lifetime in seconds (0 disables the cache)
+# Admin edits invalidate it immediately; TTL only covers writes from other processes
+CATALOG_CACHE_TTL: int = get_int_env("CATALOG_CACHE_TTL", 300)
+
+# Toys written per transaction by the admin catalog import
+CATALOG_IMPORT_CHUNK_SIZE: int = get_int_env("CATALOG_IMPORT_CHUNK_SIZE", 500)
+
+# In-memory cart cache: users kept (least recently used dropped first) and lifetime in seconds
+# Cart writes update it on commit; TTL only covers writes from other processes (0 disables)
+CART_CACHE_SIZE: int = get_int_env("CART_CACHE_SIZE", 10000)
+CART_CACHE_TTL: int = get_int_env("CART_CACHE_TTL", 600)
+
+# Inline mode (@bot query): seconds Telegram may cache answers, and queries
+# whose ranked results are kept in memory (dropped whenever the catalog changes)
+INLINE_CACHE_TIME: int = get_int_env("INLINE_CACHE_TIME", 300)
+INLINE_CACHE_SIZE: int = get_int_env("INLINE_CACHE_SIZE", 1000)
+
+# FSM storage backend: "memory", "sqlite" or "redis"
+# sqlite/redis keep admin and order flows across restarts and between processes
+FSM_STORAGE: str = get_optional_env("FSM_STORAGE", "memory")
+# SQLite file path or redis:// URL (any Redis-protocol server)
+FSM_STORAGE_URL: str = get_optional_env("FSM_STORAGE_URL", "")
+# Abandoned FSM states expire after this many seconds of inactivity (0 = never)
+FSM_STATE_TTL: int = get_int_env("FSM_STATE_TTL", 86400)
+
+# Update delivery: "polling" (default) or "webhook"
+BOT_MODE: str = get_optional_env("BOT_MODE", "polling").lower()
+
+# Webhook settings (BOT_MODE=webhook)
+# Public HTTPS base URL Telegram posts to; leave empty to skip setWebhook (local testing)
+WEBHOOK_URL: str = get_optional_env("WEBHOOK_URL", "")
+WEBHOOK_PATH: str = get_optional_env("WEBHOOK_PATH", "/webhook")
+# Checked against X-Telegram-Bot-Api-Secret-Token; required in webhook mode
+# (Telegram accepts 1-256 chars of A-Z, a-z, 0-9, _ and -)
+WEBHOOK_SECRET: str = get_optional_env("WEBHOOK_SECRET", "")
+WEBHOOK_HOST: str = get_optional_env("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT: int = get_int_env("WEBHOOK_PORT", 8080)
+# Concurrent update workers and total queued updates before answering 503
+WEBHOOK_WORKERS: int = get_int_env("WEBHOOK_WORKERS", 8)
+WEBHOOK_QUEUE_SIZE: int = get_int_env("WEBHOOK_QUEUE_SIZE", 1000)
+
+# Outbound message pacing (Telegram limits: ~30 msg/s per bot, ~20 msg/min per group)
+SEND_GLOBAL_PER_SECOND: int = get_int_env("SEND_GLOBAL_PER_SECOND", 30)
+SEND_CHAT_PER_MINUTE: int = get_int_env("SEND_CHAT_PER_MINUTE", 60)
+SEND_GROUP_PER_MINUTE: int = get_int_env("SEND_GROUP_PER_MINUTE", 20)
+# Messages a private chat may receive back-to-back before pacing kicks in
+SEND_CHAT_BURST: int = get_int_env("SEND_CHAT_BURST", 10)
+# Retries after a TelegramRetryAfter (flood wait) before giving up
+SEND_MAX_RETRIES: int = get_int_env("SEND_MAX_RETRIES", 3)
+
+# Analytics events (sale leads) are spooled to this file and written in batches
+EVENT_SPOOL_PATH: str = get_optional_env("EVENT_SPOOL_PATH", "events.spool.jsonl")
+# Flush after this many events or this many milliseconds, whichever comes first
+EVENT_BATCH_SIZE: int = get_int_env("EVENT_BATCH_SIZE", 50)
+EVENT_FLUSH_INTERVAL_MS: int = get_int_env("EVENT_FLUSH_INTERVAL_MS", 1000)
+
+# Album parts are collected until none arrived for this many milliseconds
+ALBUM_DEBOUNCE_MS: int = get_int_env("ALBUM_DEBOUNCE_MS", 500)
+
+# Custom Bot API server base URL (local Bot API server or utils/fake_telegram.py)
+TELEGRAM_API_URL: str = get_optional_env("TELEGRAM_API_URL", "")
+
 # Logging level
 LOG_LEVEL: str = get_optional_env("LOG_LEVEL", "INFO").upper()
@@ -3,12 +3,15 @@ Database connection and session management
 Production-ready with async support
 """
 import logging
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, Select
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool, NullPool
-from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL, SQLITE_READ_POOL_SIZE, SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_MMAP_SIZE_MB, SQLITE_CACHE_SIZE_MB
+)
 from database.models import (
     Base, Toy, DailyAd, Category, DailyAdsLog, OrderContact, SalesLog,
     BestsellerCategory, StoreLocation, CartItem, Favorite, ToyMedia
@@ -17,42 +20,126 @@ from database.models import (
 logger = logging.getLogger(__name__)
 
 
+def get_sync_url(url: str) -> str:
+    """Strip async driver suffix so the URL can be used with a sync engine"""
+    return url.replace("+asyncpg", "").replace("+aiosqlite", "")
+
+
+def get_async_url(url: str) -> str:
+    """Convert database URL to its async driver variant (asyncpg / aiosqlite)"""
+    if url.startswith("sqlite") and "+aiosqlite" not in url:
+        return url.replace("sqlite", "sqlite+aiosqlite", 1)
+    if url.startswith("postgresql") and "+asyncpg" not in url:
+        # Drop explicit sync driver (e.g. postgresql+psycopg2://) before switching
+        scheme, rest = url.split("://", 1)
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+
+def is_sqlite_memory(url: str) -> bool:
+    """In-memory SQLite (one private database per connection)"""
+    return url.startswith("sqlite") and (":memory:" in url or url.split("://", 1)[-1] in ("", "/"))
+
+
+# Named shared-cache in-memory database: every connection of this process
+# (sync and async engines) opens the same database instead of a private one
+SQLITE_SHARED_MEMORY_URL = "sqlite:///file:toymix_memdb?mode=memory&cache=shared&uri=true"
+
+
+def sqlite_pragmas(read_only: bool = False):
+    """
+    Connect listener applying the production SQLite profile
+    
+    WAL lets readers run while the writer commits; synchronous=NORMAL is
+    durable across application crashes in WAL mode (only an OS crash can
+    lose the last commits).
+    """
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+        # Negative cache_size is in KiB
+        cursor.execute(f"PRAGMA cache_size={-SQLITE_CACHE_SIZE_MB * 1024}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+
 # Create engine based on database URL
-if DATABASE_URL.startswith("sqlite"):
-    # SQLite configuration for development
+# The sync engine is only used at startup (init_db, migrations) and by standalone scripts.
+# Handlers and schedulers use the async engine below so queries never block the event loop.
+# async_read_engine serves plain SELECTs; it is the same engine unless SQLite splits them.
+if is_sqlite_memory(DATABASE_URL):
+    # In-memory SQLite: one connection per engine (or every session sees an empty
+    # database), both on the same shared-cache database so the tables created by
+    # run_migrations(engine) are the ones the async sessions use. The sync
+    # engine's connection keeps the database alive until close_db().
     engine = create_engine(
-        DATABASE_URL,
+        SQLITE_SHARED_MEMORY_URL,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
+        echo=False
+    )
+    async_engine = create_async_engine(
+        get_async_url(SQLITE_SHARED_MEMORY_URL),
+        poolclass=StaticPool,
+        echo=False
+    )
+    async_read_engine = async_engine
+    logger.info("Using in-memory SQLite database")
+elif DATABASE_URL.startswith("sqlite"):
+    # SQLite file: WAL, a small pool of reader connections and a single writer.
+    # SQLite allows one writer at a time anyway; serializing writes in the pool
+    # queues them in-process instead of failing on SQLITE_BUSY.
+    engine = create_engine(
+        get_sync_url(DATABASE_URL),
+        connect_args={"check_same_thread": False},
         echo=False,
         pool_pre_ping=True  # Verify connections before using
     )
-    logger.info("Using SQLite database (development mode)")
+    event.listen(engine, "connect", sqlite_pragmas())
+    async_engine = create_async_engine(
+        get_async_url(DATABASE_URL),
+        pool_size=1,
+        max_overflow=0,
+        echo=False,
+        pool_pre_ping=True
+    )
+    event.listen(async_engine.sync_engine, "connect", sqlite_pragmas())
+    async_read_engine = create_async_engine(
+        get_async_url(DATABASE_URL),
+        pool_size=SQLITE_READ_POOL_SIZE,
+        max_overflow=SQLITE_READ_POOL_SIZE,
+        echo=False,
+        pool_pre_ping=True
+    )
+    event.listen(async_read_engine.sync_engine, "connect", sqlite_pragmas(read_only=True))
+    logger.info(f"Using SQLite database (WAL, {SQLITE_READ_POOL_SIZE} readers + 1 writer)")
 elif DATABASE_URL.startswith("postgresql"):
     # PostgreSQL configuration for production
     # Support both sync and async URLs
     if "+asyncpg" in DATABASE_URL:
-        # Async PostgreSQL - use asyncpg driver
         logger.info("Using PostgreSQL with asyncpg (async mode)")
-        # For sync operations, remove asyncpg from URL
-        sync_url = DATABASE_URL.replace("+asyncpg", "")
-        engine = create_engine(
-            sync_url,
-            pool_pre_ping=True,
-            pool_size=10,
-            max_overflow=20,
-            echo=False
-        )
     else:
-        # Sync PostgreSQL
-        logger.info("Using PostgreSQL (sync mode)")
-        engine = create_engine(
-            DATABASE_URL,
-            pool_pre_ping=True,
-            pool_size=10,
-            max_overflow=20,
-            echo=False
-        )
+        logger.info("Using PostgreSQL (asyncpg driver for async sessions)")
+    engine = create_engine(
+        get_sync_url(DATABASE_URL),
+        pool_pre_ping=True,
+        pool_size=2,
+        max_overflow=0,
+        echo=False
+    )
+    async_engine = create_async_engine(
+        get_async_url(DATABASE_URL),
+        pool_pre_ping=True,
+        pool_size=10,
+        max_overflow=20,
+        echo=False
+    )
+    async_read_engine = async_engine
 else:
     # Other databases (MySQL, etc.)
     logger.info(f"Using database: {DATABASE_URL.split('://')[0]}")
@@ -61,43 +148,60 @@ else:
         pool_pre_ping=True,
         echo=False
     )
+    async_engine = create_async_engine(
+        DATABASE_URL,
+        pool_pre_ping=True,
+        echo=False
+    )
+    async_read_engine = async_engine
+
+
+class RoutingSession(Session):
+    """
+    Session that sends plain SELECTs to async_read_engine, everything else to async_engine
+    
+    Once a transaction writes (flush, DML or raw SQL) it stays on the writer
+    until it ends, so it always reads its own uncommitted changes.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if async_read_engine is async_engine:
+            return async_engine.sync_engine
+        if self._flushing or self.info.get("use_writer") or not isinstance(clause, Select):
+            self.info["use_writer"] = True
+            return async_engine.sync_engine
+        return async_read_engine.sync_engine
 
-# Create session factory
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _release_writer(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("use_writer", None)
+
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: objects stay readable after commit without an implicit
+# (and in async mode, forbidden) lazy refresh
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 
 def init_db():
     """
     Initialize database tables
-    Production-ready: Creates all tables if they don't exist
+    Production-ready: Applies pending schema migrations (see database/migrate.py)
     """
     try:
         logger.info("Initializing database...")
         
-        # First, run migration to add category_id if needed (SQLite only)
-        if DATABASE_URL.startswith("sqlite"):
-            try:
-                from database.migrate import migrate_database
-                migrate_database()
-            except Exception as e:
-                logger.warning(f"Migration warning: {e}")
-                logger.info("Continuing with table creation...")
-            
-            # Check and fix any unique constraints on category_id
-            try:
-                from database.fix_category_constraint import check_and_fix_category_constraint
-                import os
-                # Extract db path from DATABASE_URL
-                if "///" in DATABASE_URL:
-                    db_path = DATABASE_URL.split("///")[-1]
-                    if os.path.exists(db_path):
-                        check_and_fix_category_constraint(db_path)
-            except Exception as e:
-                logger.warning(f"Category constraint check warning: {e}")
-                logger.info("Continuing with table creation...")
-        
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Apply pending versioned migrations (creates tables on a new database)
+        from database.migrate import run_migrations
+        run_migrations(engine)
         logger.info("✅ Database tables created/verified successfully")
         
         # Verify database connection
@@ -122,9 +226,19 @@ def init_db():
         raise
 
 
+async def close_db():
+    """
+    Dispose database engines (release pooled connections on shutdown)
+    """
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+    engine.dispose()
+
+
 def get_db() -> Session:
     """
-    Get database session (dependency injection pattern)
+    Get sync database session (dependency injection pattern, scripts only)
     """
     db = SessionLocal()
     try:
@@ -133,8 +247,19 @@ def get_db() -> Session:
         db.close()
 
 
-def get_db_session() -> Session:
+def get_db_session() -> AsyncSession:
     """
-    Get a database session (for direct use)
+    Get an async database session (for direct use outside of handlers)
+    
+    Handlers receive a per-update session as `db` from DbSessionMiddleware.
+    Services only flush, so direct callers (schedulers, scripts) must commit.
+
+    Usage:
+        db = get_db_session()
+        try:
+            ...
+            await db.commit()
+        finally:
+            await db.close()
     """
-    return SessionLocal()
+    return AsyncSessionLocal()
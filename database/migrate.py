@@ -1,256 +1,277 @@
 """
-Database migration script to add category_id column to toys table
+Versioned database migrations (SQLite and PostgreSQL)
+
+Each step runs once, in order, and is recorded in the schema_version table.
+Every step runs under a database-wide lock (BEGIN IMMEDIATE on SQLite,
+pg_advisory_xact_lock on PostgreSQL), so replicas starting together apply
+it once: the others wait, re-read the version and skip it. Steps must be idempotent: a database created by an older release (before
+versioning) may already have part of a step applied. When the database is
+current, startup costs two cheap statements and no schema introspection.
+
+To change the schema, update the models and append a new step to MIGRATIONS.
 """
-import sqlite3
-import os
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, List, Set, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+
+from config import SQLITE_BUSY_TIMEOUT_MS
+from database.models import Base
+from utils.prices import parse_price
+from utils.search_text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock key shared by every process migrating this database
+MIGRATION_LOCK_ID = 7411020
+# How long a starting process waits for another one's migration step (SQLite)
+MIGRATION_LOCK_TIMEOUT_MS = 10 * 60 * 1000
+
+
+def _has_table(conn: Connection, table_name: str) -> bool:
+    return inspect(conn).has_table(table_name)
 
-def migrate_database(db_path="toymix.db"):
-    """Add category_id column to toys table if it doesn't exist"""
-    if not os.path.exists(db_path):
-        print(f"Database file {db_path} not found. It will be created on first run.")
+
+def _column_names(conn: Connection, table_name: str) -> Set[str]:
+    return {column["name"] for column in inspect(conn).get_columns(table_name)}
+
+
+def _create_index(conn: Connection, index_name: str, table_name: str, columns: str) -> None:
+    """CREATE INDEX IF NOT EXISTS (supported by SQLite and PostgreSQL)"""
+    if _has_table(conn, table_name):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})"))
+
+
+def _legacy_toys_category(conn: Connection) -> None:
+    """Add toys.category_id to first-release databases and make sure it is not unique"""
+    if not _has_table(conn, "toys"):
         return
     
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Check if category_id column exists
-        cursor.execute("PRAGMA table_info(toys)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        if 'category_id' not in columns:
-            print("Adding category_id column to toys table...")
-            cursor.execute("ALTER TABLE toys ADD COLUMN category_id INTEGER")
-            conn.commit()
-            print("✅ category_id column added successfully!")
-        else:
-            print("✅ category_id column already exists.")
-        
-        # Check if categories table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='categories'")
-        if not cursor.fetchone():
-            print("Creating categories table...")
-            cursor.execute("""
-                CREATE TABLE categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name VARCHAR(100) NOT NULL UNIQUE,
-                    is_active BOOLEAN NOT NULL DEFAULT 1,
-                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            conn.commit()
-            print("✅ categories table created successfully!")
-        else:
-            print("✅ categories table already exists.")
-        
-        # Check if daily_ads_log table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='daily_ads_log'")
-        if not cursor.fetchone():
-            print("Creating daily_ads_log table...")
-            cursor.execute("""
-                CREATE TABLE daily_ads_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    toy_id INTEGER NOT NULL,
-                    category_id INTEGER,
-                    posted_date VARCHAR(10) NOT NULL,
-                    posted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (toy_id) REFERENCES toys(id),
-                    FOREIGN KEY (category_id) REFERENCES categories(id)
-                )
-            """)
-            conn.commit()
-            print("✅ daily_ads_log table created successfully!")
-        else:
-            print("✅ daily_ads_log table already exists.")
-        
-        # Check if order_contacts table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='order_contacts'")
-        if not cursor.fetchone():
-            print("Creating order_contacts table...")
-            cursor.execute("""
-                CREATE TABLE order_contacts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    contact_value VARCHAR(255) NOT NULL UNIQUE,
-                    is_active BOOLEAN NOT NULL DEFAULT 1,
-                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            conn.commit()
-            print("✅ order_contacts table created successfully!")
-        else:
-            print("✅ order_contacts table already exists.")
-        
-        # Check if sales_logs table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sales_logs'")
-        if not cursor.fetchone():
-            print("Creating sales_logs table...")
-            cursor.execute("""
-                CREATE TABLE sales_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    toy_id INTEGER NOT NULL,
-                    toy_name VARCHAR(255) NOT NULL,
-                    category_id INTEGER,
-                    category_name VARCHAR(100),
-                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (toy_id) REFERENCES toys(id),
-                    FOREIGN KEY (category_id) REFERENCES categories(id)
-                )
-            """)
-            # Create indexes for performance
-            cursor.execute("CREATE INDEX idx_sales_logs_user_id ON sales_logs(user_id)")
-            cursor.execute("CREATE INDEX idx_sales_logs_toy_id ON sales_logs(toy_id)")
-            cursor.execute("CREATE INDEX idx_sales_logs_category_id ON sales_logs(category_id)")
-            cursor.execute("CREATE INDEX idx_sales_logs_created_at ON sales_logs(created_at)")
-            conn.commit()
-            print("✅ sales_logs table created successfully!")
-        else:
-            print("✅ sales_logs table already exists.")
-        
-        # Check if bestseller_categories table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='bestseller_categories'")
-        if not cursor.fetchone():
-            print("Creating bestseller_categories table...")
-            cursor.execute("""
-                CREATE TABLE bestseller_categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    category_id INTEGER NOT NULL,
-                    category_name VARCHAR(100) NOT NULL,
-                    source VARCHAR(10) NOT NULL,
-                    period VARCHAR(10) NOT NULL,
-                    rank INTEGER NOT NULL,
-                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    is_active BOOLEAN NOT NULL DEFAULT 1,
-                    FOREIGN KEY (category_id) REFERENCES categories(id)
-                )
-            """)
-            # Create indexes
-            cursor.execute("CREATE INDEX idx_bestseller_category_id ON bestseller_categories(category_id)")
-            cursor.execute("CREATE INDEX idx_bestseller_is_active ON bestseller_categories(is_active)")
-            cursor.execute("CREATE INDEX idx_bestseller_period_rank ON bestseller_categories(period, rank)")
-            conn.commit()
-            print("✅ bestseller_categories table created successfully!")
-        else:
-            print("✅ bestseller_categories table already exists.")
-        
-        # Check if store_locations table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='store_locations'")
-        if not cursor.fetchone():
-            print("Creating store_locations table...")
-            cursor.execute("""
-                CREATE TABLE store_locations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name VARCHAR(255) NOT NULL,
-                    address_text TEXT NOT NULL,
-                    latitude VARCHAR(50) NOT NULL,
-                    longitude VARCHAR(50) NOT NULL,
-                    is_active BOOLEAN NOT NULL DEFAULT 1,
-                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            # Create indexes
-            cursor.execute("CREATE INDEX idx_store_locations_is_active ON store_locations(is_active)")
-            conn.commit()
-            print("✅ store_locations table created successfully!")
-        else:
-            print("✅ store_locations table already exists.")
-        
-        # Check if cart_items table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cart_items'")
-        if not cursor.fetchone():
-            print("Creating cart_items table...")
-            cursor.execute("""
-                CREATE TABLE cart_items (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    toy_id INTEGER NOT NULL,
-                    toy_name VARCHAR(255) NOT NULL,
-                    price VARCHAR(50) NOT NULL,
-                    quantity INTEGER NOT NULL DEFAULT 1,
-                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (toy_id) REFERENCES toys(id)
-                )
-            """)
-            # Create indexes
-            cursor.execute("CREATE INDEX idx_cart_items_user_id ON cart_items(user_id)")
-            cursor.execute("CREATE INDEX idx_cart_items_toy_id ON cart_items(toy_id)")
-            conn.commit()
-            print("✅ cart_items table created successfully!")
-        else:
-            print("✅ cart_items table already exists.")
-        
-        # Check if favorites table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='favorites'")
-        if not cursor.fetchone():
-            print("Creating favorites table...")
-            cursor.execute("""
-                CREATE TABLE favorites (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    toy_id INTEGER NOT NULL,
-                    toy_name VARCHAR(255) NOT NULL,
-                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (toy_id) REFERENCES toys(id),
-                    UNIQUE(user_id, toy_id)
-                )
-            """)
-            # Create indexes
-            cursor.execute("CREATE INDEX idx_favorites_user_id ON favorites(user_id)")
-            cursor.execute("CREATE INDEX idx_favorites_toy_id ON favorites(toy_id)")
-            conn.commit()
-            print("✅ favorites table created successfully!")
-        else:
-            print("✅ favorites table already exists.")
-        
-        # Check if toy_media table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='toy_media'")
-        if not cursor.fetchone():
-            print("Creating toy_media table...")
-            cursor.execute("""
-                CREATE TABLE toy_media (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    toy_id INTEGER NOT NULL,
-                    file_id VARCHAR(255) NOT NULL,
-                    media_type VARCHAR(10) NOT NULL,
-                    sort_order INTEGER NOT NULL DEFAULT 0,
-                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (toy_id) REFERENCES toys(id) ON DELETE CASCADE
-                )
-            """)
-            # Create indexes
-            cursor.execute("CREATE INDEX idx_toy_media_toy_id ON toy_media(toy_id)")
-            cursor.execute("CREATE INDEX idx_toy_media_sort_order ON toy_media(toy_id, sort_order)")
-            conn.commit()
-            print("✅ toy_media table created successfully!")
+    if "category_id" not in _column_names(conn, "toys"):
+        conn.execute(text("ALTER TABLE toys ADD COLUMN category_id INTEGER"))
+        logger.info("Added category_id column to toys")
+    
+    # Several toys share a category; drop any unique index/constraint on it
+    inspector = inspect(conn)
+    for index in inspector.get_indexes("toys"):
+        if index.get("unique") and index["column_names"] == ["category_id"] and not index.get("duplicates_constraint"):
+            conn.execute(text(f"DROP INDEX {index['name']}"))
+            logger.info(f"Dropped unique index {index['name']} on toys.category_id")
+    for constraint in inspector.get_unique_constraints("toys"):
+        if constraint["column_names"] != ["category_id"]:
+            continue
+        if conn.dialect.name == "sqlite" or not constraint.get("name"):
+            logger.warning("Found UNIQUE constraint on toys.category_id; the table must be recreated manually")
         else:
-            print("✅ toy_media table already exists.")
-        
-        conn.close()
-        print("✅ Database migration completed!")
-        
-    except Exception as e:
-        print(f"❌ Migration error: {e}")
-        raise
+            conn.execute(text(f"ALTER TABLE toys DROP CONSTRAINT {constraint['name']}"))
+            logger.info(f"Dropped unique constraint {constraint['name']} on toys.category_id")
 
-if __name__ == "__main__":
-    # Try to find database file
-    possible_paths = [
-        "toymix.db",
-        os.path.join(os.path.dirname(__file__), "..", "toymix.db"),
-        os.path.join(os.path.dirname(os.path.dirname(__file__)), "toymix.db")
+
+def _create_tables(conn: Connection) -> None:
+    """Create every table (and its indexes) missing from the database"""
+    Base.metadata.create_all(conn)
+
+
+def _analytics_indexes(conn: Connection) -> None:
+    """Composite indexes for period reports and posted-today lookups"""
+    _create_index(conn, "idx_sales_logs_created_category", "sales_logs", "created_at, category_name")
+    _create_index(conn, "idx_sales_logs_created_toy", "sales_logs", "created_at, toy_name")
+    _create_index(conn, "idx_daily_ads_log_posted_date_toy", "daily_ads_log", "posted_date, toy_id")
+    _create_index(conn, "idx_daily_ads_posted_date_toy", "daily_ads", "posted_date, toy_id")
+
+
+def _cart_items_unique(conn: Connection) -> None:
+    """Merge duplicate cart rows, then make (user_id, toy_id) unique"""
+    duplicates = conn.execute(text(
+        "SELECT user_id, toy_id, MIN(id), SUM(quantity) FROM cart_items "
+        "GROUP BY user_id, toy_id HAVING COUNT(*) > 1"
+    )).all()
+    for user_id, toy_id, keep_id, quantity in duplicates:
+        conn.execute(
+            text("UPDATE cart_items SET quantity = :quantity WHERE id = :keep_id"),
+            {"quantity": quantity, "keep_id": keep_id}
+        )
+        conn.execute(
+            text("DELETE FROM cart_items WHERE user_id = :user_id AND toy_id = :toy_id AND id <> :keep_id"),
+            {"user_id": user_id, "toy_id": toy_id, "keep_id": keep_id}
+        )
+    if duplicates:
+        logger.info(f"Merged {len(duplicates)} duplicate cart rows")
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_cart_items_user_toy ON cart_items (user_id, toy_id)"))
+
+
+def _price_amount(conn: Connection) -> None:
+    """Add integer price_amount to toys and cart_items and backfill it from the price text"""
+    for table_name in ("toys", "cart_items"):
+        if "price_amount" not in _column_names(conn, table_name):
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN price_amount INTEGER"))
+        rows = conn.execute(text(
+            f"SELECT id, price FROM {table_name} WHERE price_amount IS NULL AND price IS NOT NULL"
+        )).all()
+        updates = []
+        for row_id, price in rows:
+            amount = parse_price(price)
+            if amount is not None:
+                updates.append({"id": row_id, "amount": amount})
+        if updates:
+            conn.execute(text(f"UPDATE {table_name} SET price_amount = :amount WHERE id = :id"), updates)
+            logger.info(f"Backfilled price_amount for {len(updates)} of {len(rows)} {table_name} rows")
+    _create_index(conn, "ix_toys_price_amount", "toys", "price_amount")
+
+
+def _price_amount_reparse(conn: Connection) -> None:
+    """
+    Recompute price_amount with the current parse_price
+    
+    Fixes amounts stored by older parsers: "99.99" was 9999 and
+    "100 000, 120 000" was 100000120000.
+    """
+    for table_name in ("toys", "cart_items"):
+        rows = conn.execute(text(f"SELECT id, price, price_amount FROM {table_name} WHERE price IS NOT NULL")).all()
+        updates = []
+        for row_id, price, old_amount in rows:
+            amount = parse_price(price)
+            if amount != old_amount:
+                updates.append({"id": row_id, "amount": amount})
+        if updates:
+            conn.execute(text(f"UPDATE {table_name} SET price_amount = :amount WHERE id = :id"), updates)
+            logger.info(f"Recomputed price_amount for {len(updates)} {table_name} rows")
+
+
+def _favorites_unique(conn: Connection) -> None:
+    """Drop duplicate favorites (keeping the oldest), then make (user_id, toy_id) unique"""
+    result = conn.execute(text(
+        "DELETE FROM favorites WHERE id NOT IN ("
+        "SELECT MIN(id) FROM favorites GROUP BY user_id, toy_id)"
+    ))
+    if result.rowcount:
+        logger.info(f"Removed {result.rowcount} duplicate favorites")
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_favorites_user_toy ON favorites (user_id, toy_id)"))
+
+
+def _search_index(conn: Connection) -> None:
+    """SQLite FTS5 index over normalized toy titles and descriptions (skipped without FTS5)"""
+    if conn.dialect.name != "sqlite":
+        return
+    try:
+        conn.execute(text("CREATE VIRTUAL TABLE IF NOT EXISTS toys_fts USING fts5(title, description, prefix='2 3')"))
+    except OperationalError as e:
+        logger.warning(f"SQLite FTS5 is not available ({e}); search uses the in-process index")
+        return
+    
+    rows = [
+        {"id": toy_id, "title": normalize_text(title), "description": normalize_text(description or "")}
+        for toy_id, title, description in conn.execute(text("SELECT id, title, description FROM toys")).all()
     ]
+    conn.execute(text("DELETE FROM toys_fts"))
+    if rows:
+        conn.execute(text("INSERT INTO toys_fts (rowid, title, description) VALUES (:id, :title, :description)"), rows)
+        logger.info(f"Indexed {len(rows)} toys for search")
+
+
+# Ordered steps: (version, name, function). Never renumber or edit applied steps.
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "toys.category_id (legacy schema)", _legacy_toys_category),
+    (2, "create tables", _create_tables),
+    (3, "analytics composite indexes", _analytics_indexes),
+    (4, "cart_items unique (user_id, toy_id)", _cart_items_unique),
+    (5, "price_amount columns", _price_amount),
+    (6, "favorites unique (user_id, toy_id)", _favorites_unique),
+    (7, "toys_fts search index", _search_index),
+    (8, "price_amount decimal fractions", _price_amount_reparse),
+    (9, "price_amount first amount and Russian multipliers", _price_amount_reparse),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: Connection) -> int:
+    """Current schema version (0 for an unversioned database)"""
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, "
+        "name VARCHAR(100) NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL)"
+    ))
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+@contextmanager
+def _locked_transaction(engine: Engine) -> Iterator[Connection]:
+    """
+    Transaction that holds the migration lock until it ends
     
-    db_path = None
-    for path in possible_paths:
-        if os.path.exists(path):
-            db_path = path
-            break
+    Other databases (MySQL, etc.) get a plain transaction.
+    """
+    if engine.dialect.name != "sqlite":
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_ID})
+            yield conn
+        return
+    
+    # The driver must not open its own (deferred) transaction, so BEGIN IMMEDIATE
+    # takes the write lock up front and waits for other writers
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql(f"PRAGMA busy_timeout={MIGRATION_LOCK_TIMEOUT_MS}")
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            conn.exec_driver_sql("COMMIT")
+        finally:
+            conn.exec_driver_sql(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+
+
+def run_migrations(engine: Engine) -> int:
+    """
+    Apply pending migration steps
+    
+    Safe to call from several processes at once: each step runs in its own
+    locked transaction, recorded together with its version, after re-reading
+    the current version.
+    
+    Args:
+        engine: Sync SQLAlchemy engine
+    
+    Returns:
+        Schema version after migrating
+    """
+    applied = 0
+    while True:
+        with _locked_transaction(engine) as conn:
+            current = get_schema_version(conn)
+            pending = [migration for migration in MIGRATIONS if migration[0] > current]
+            if not pending:
+                break
+            
+            version, name, step = pending[0]
+            step(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {"version": version, "name": name, "applied_at": datetime.utcnow()}
+            )
+        applied += 1
+        logger.info(f"✅ Applied migration {version}: {name}")
+    
+    if not applied:
+        logger.info(f"Database schema is current (version {current})")
+    return current
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
     
-    if db_path:
-        migrate_database(db_path)
-    else:
-        print("⚠️  Database file not found. It will be created when bot starts.")
-        print("ℹ️  Migration will run automatically on next bot start.")
+    from database.db import engine
+    version = run_migrations(engine)
+    print(f"✅ Database schema version: {version}")
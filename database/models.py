@@ -3,11 +3,13 @@ Database models for Toymix Bot
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 
+from utils.prices import parse_price
+
 Base = declarative_base()
 
 
@@ -57,6 +59,7 @@ class Toy(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String(255), nullable=False)
     price = Column(String(50), nullable=False)  # Store as string to support currency symbols
+    price_amount = Column(Integer, nullable=True, index=True)  # Parsed price in so'm (None if unparseable)
     description = Column(Text, nullable=False)
     media_type = Column(String(10), nullable=True)  # 'image' or 'video' (deprecated, kept for backward compatibility)
     media_file_id = Column(String(255), nullable=True)  # Telegram file_id (deprecated, kept for backward compatibility)
@@ -66,11 +69,17 @@ class Toy(Base):
     created_at = Column(DateTime, default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
 
-    # Relationship with category
-    category = relationship("Category", back_populates="toys")
+    # Relationship with category (joined: toy.category is read after the async session query returns)
+    category = relationship("Category", back_populates="toys", lazy="joined")
     # Relationship with media
     media_items = relationship("ToyMedia", back_populates="toy", order_by="ToyMedia.sort_order", cascade="all, delete-orphan")
 
+    @validates("price")
+    def _sync_price_amount(self, key, value):
+        """Keep price_amount in step with the price text on every assignment"""
+        self.price_amount = parse_price(value)
+        return value
+
     def __repr__(self):
         return f"<Toy(id={self.id}, title='{self.title}', price='{self.price}', is_active={self.is_active})>"
 
@@ -80,6 +89,7 @@ class Toy(Base):
             "id": self.id,
             "title": self.title,
             "price": self.price,
+            "price_amount": self.price_amount,
             "description": self.description,
             "media_type": self.media_type,
             "media_file_id": self.media_file_id,
@@ -131,6 +141,10 @@ class DailyAd(Base):
     posted_date = Column(String(10), nullable=False)  # Format: YYYY-MM-DD
     posted_at = Column(DateTime, default=func.now(), nullable=False)
 
+    __table_args__ = (
+        Index("idx_daily_ads_posted_date_toy", "posted_date", "toy_id"),
+    )
+
     def __repr__(self):
         return f"<DailyAd(toy_id={self.toy_id}, posted_date='{self.posted_date}')>"
 
@@ -147,10 +161,42 @@ class DailyAdsLog(Base):
     posted_date = Column(String(10), nullable=False)  # Format: YYYY-MM-DD
     posted_at = Column(DateTime, default=func.now(), nullable=False)
 
+    __table_args__ = (
+        Index("idx_daily_ads_log_posted_date_toy", "posted_date", "toy_id"),
+    )
+
     def __repr__(self):
         return f"<DailyAdsLog(toy_id={self.toy_id}, category_id={self.category_id}, posted_date='{self.posted_date}')>"
 
 
+class DailyAdPlan(Base):
+    """
+    Precomputed advertisement slot for a day (built once at midnight)
+    
+    Caption and media are rendered when the plan is built, so posting a slot
+    is a pure send. `status` moves pending -> sending -> posted/failed and the
+    pending -> sending step is a conditional UPDATE, so a slot is never posted twice.
+    """
+    __tablename__ = "daily_ad_plan"
+    __table_args__ = (
+        UniqueConstraint("plan_date", "slot_time", name="uq_daily_ad_plan_slot"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    plan_date = Column(String(10), nullable=False, index=True)  # Format: YYYY-MM-DD (AD_TIMEZONE)
+    slot_time = Column(String(5), nullable=False)  # Format: HH:MM (AD_TIMEZONE)
+    toy_id = Column(Integer, ForeignKey("toys.id"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    caption = Column(Text, nullable=False)  # Rendered AdsFormatter.format_ad_message
+    media_json = Column(Text, nullable=False, default="[]")  # [{"type": "photo"|"video", "file_id": "..."}]
+    status = Column(String(10), nullable=False, default="pending")  # pending, sending, posted, failed, skipped
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    posted_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<DailyAdPlan(plan_date='{self.plan_date}', slot_time='{self.slot_time}', toy_id={self.toy_id}, status='{self.status}')>"
+
+
 class OrderContact(Base):
     """
     Order contact information (phone numbers or usernames)
@@ -191,6 +237,12 @@ class SalesLog(Base):
     category_name = Column(String(100), nullable=True)  # Denormalized for fast analytics
     created_at = Column(DateTime, default=func.now(), nullable=False, index=True)
 
+    # Period reports filter on a created_at range, then group by name
+    __table_args__ = (
+        Index("idx_sales_logs_created_category", "created_at", "category_name"),
+        Index("idx_sales_logs_created_toy", "created_at", "toy_name"),
+    )
+
     def __repr__(self):
         return f"<SalesLog(id={self.id}, user_id={self.user_id}, toy_id={self.toy_id}, created_at='{self.created_at}')>"
 
@@ -207,6 +259,51 @@ class SalesLog(Base):
         }
 
 
+class SalesDailyCategory(Base):
+    """
+    Daily sale lead counts per category (rollup of sales_logs)
+    
+    `day` is the local date in AD_TIMEZONE; category_id 0 means no category.
+    """
+    __tablename__ = "sales_daily_category"
+
+    day = Column(String(10), primary_key=True)  # Format: YYYY-MM-DD
+    category_id = Column(Integer, primary_key=True)
+    category_name = Column(String(100), nullable=True)  # Denormalized, as in sales_logs
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SalesDailyCategory(day='{self.day}', category_id={self.category_id}, count={self.count})>"
+
+
+class SalesDailyToy(Base):
+    """
+    Daily sale lead counts per toy (rollup of sales_logs)
+    
+    `day` is the local date in AD_TIMEZONE.
+    """
+    __tablename__ = "sales_daily_toy"
+
+    day = Column(String(10), primary_key=True)  # Format: YYYY-MM-DD
+    toy_id = Column(Integer, primary_key=True)
+    toy_name = Column(String(255), nullable=False)  # Denormalized, as in sales_logs
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SalesDailyToy(day='{self.day}', toy_id={self.toy_id}, count={self.count})>"
+
+
+class SalesRollupState(Base):
+    """
+    Catch-up watermark for the sales rollups (single row, id=1)
+    """
+    __tablename__ = "sales_rollup_state"
+
+    id = Column(Integer, primary_key=True)
+    last_sales_log_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+
+
 class BestsellerCategory(Base):
     """
     Bestseller categories - TOP-5 categories by period
@@ -280,10 +377,22 @@ class CartItem(Base):
     toy_id = Column(Integer, ForeignKey("toys.id"), nullable=False, index=True)
     toy_name = Column(String(255), nullable=False)  # Denormalized
     price = Column(String(50), nullable=False)  # Denormalized
+    price_amount = Column(Integer, nullable=True)  # Parsed price in so'm (denormalized)
     quantity = Column(Integer, default=1, nullable=False)
     created_at = Column(DateTime, default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
 
+    # One row per toy in a cart; adding again increases quantity (upsert target)
+    __table_args__ = (
+        Index("uq_cart_items_user_toy", "user_id", "toy_id", unique=True),
+    )
+
+    @validates("price")
+    def _sync_price_amount(self, key, value):
+        """Keep price_amount in step with the price text on every assignment"""
+        self.price_amount = parse_price(value)
+        return value
+
     def __repr__(self):
         return f"<CartItem(id={self.id}, user_id={self.user_id}, toy_id={self.toy_id}, quantity={self.quantity})>"
 
@@ -295,6 +404,7 @@ class CartItem(Base):
             "toy_id": self.toy_id,
             "toy_name": self.toy_name,
             "price": self.price,
+            "price_amount": self.price_amount,
             "quantity": self.quantity,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
@@ -313,6 +423,11 @@ class Favorite(Base):
     toy_name = Column(String(255), nullable=False)  # Denormalized
     created_at = Column(DateTime, default=func.now(), nullable=False)
 
+    # A toy is favorited at most once per user (insert-or-ignore target)
+    __table_args__ = (
+        Index("uq_favorites_user_toy", "user_id", "toy_id", unique=True),
+    )
+
     def __repr__(self):
         return f"<Favorite(id={self.id}, user_id={self.user_id}, toy_id={self.toy_id})>"
 
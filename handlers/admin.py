@@ -2,11 +2,13 @@
 Admin handlers for managing toys and catalog
 """
 import logging
+from typing import List, Optional, Tuple
 from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery, PhotoSize, Video
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from keyboards.admin_kb import (
     get_admin_menu_keyboard,
@@ -18,14 +20,23 @@ from keyboards.admin_kb import (
     get_media_done_keyboard
 )
 from keyboards.user_kb import get_main_menu_keyboard
+from keyboards.callbacks import (
+    AdminToyCallback,
+    AdminToyCategoryCallback,
+    AdminToyFieldCallback,
+    AdminToyPageCallback,
+    CallbackPrefixFilter
+)
 from services.catalog_service import CatalogService
 from services.category_service import CategoryService
 from services.ads_scheduler import CategoryBasedAdScheduler
-from database.db import get_db_session
 from config import ADMIN_IDS
 
 logger = logging.getLogger(__name__)
 router = Router()
+router.callback_query.filter(CallbackPrefixFilter(
+    AdminToyPageCallback, AdminToyCallback, AdminToyFieldCallback, AdminToyCategoryCallback
+))
 
 
 class AddToyStates(StatesGroup):
@@ -133,30 +144,26 @@ async def process_price(message: Message, state: FSMContext):
 
 
 @router.message(AddToyStates.waiting_description)
-async def process_description(message: Message, state: FSMContext):
+async def process_description(message: Message, state: FSMContext, db: AsyncSession):
     """Process toy description"""
     await state.update_data(description=message.text)
     await state.set_state(AddToyStates.waiting_category)
     
-    db = get_db_session()
-    try:
-        categories = CategoryService.get_active_categories(db)
-        if categories:
-            await message.answer(
-                "📂 Kategoriyani tanlang yoki 'Kategoriyasiz' yozing:",
-                reply_markup=get_admin_categories_keyboard(categories)
-            )
-        else:
-            await message.answer(
-                "📂 Kategoriya nomini yuboring yoki 'Kategoriyasiz' yozing:",
-                reply_markup=get_cancel_keyboard()
-            )
-    finally:
-        db.close()
+    categories = await CategoryService.get_active_categories(db)
+    if categories:
+        await message.answer(
+            "📂 Kategoriyani tanlang yoki 'Kategoriyasiz' yozing:",
+            reply_markup=get_admin_categories_keyboard(categories)
+        )
+    else:
+        await message.answer(
+            "📂 Kategoriya nomini yuboring yoki 'Kategoriyasiz' yozing:",
+            reply_markup=get_cancel_keyboard()
+        )
 
 
 @router.message(AddToyStates.waiting_category)
-async def process_category(message: Message, state: FSMContext):
+async def process_category(message: Message, state: FSMContext, db: AsyncSession):
     """Process toy category and save toy"""
     # Check for cancel
     if message.text == "❌ Bekor qilish":
@@ -168,19 +175,15 @@ async def process_category(message: Message, state: FSMContext):
     
     category_id = None
     if category_name.lower() != "kategoriyasiz":
-        db = get_db_session()
-        try:
-            category = CategoryService.get_category_by_name(db, category_name)
-            if category:
-                category_id = category.id
-            else:
-                await message.answer(
-                    "❌ Kategoriya topilmadi. 'Kategoriyasiz' yozing yoki mavjud kategoriyani tanlang:",
-                    reply_markup=get_cancel_keyboard()
-                )
-                return
-        finally:
-            db.close()
+        category = await CategoryService.get_category_by_name(db, category_name)
+        if category:
+            category_id = category.id
+        else:
+            await message.answer(
+                "❌ Kategoriya topilmadi. 'Kategoriyasiz' yozing yoki mavjud kategoriyani tanlang:",
+                reply_markup=get_cancel_keyboard()
+            )
+            return
     
     # Get all data from state
     data = await state.get_data()
@@ -200,12 +203,11 @@ async def process_category(message: Message, state: FSMContext):
         return
     
     # Create toy
-    db = get_db_session()
     try:
         from services.media_service import MediaService
         
         # Create toy (with backward compatibility fields)
-        toy = CatalogService.create_toy(
+        toy = await CatalogService.create_toy(
             db,
             title=title,
             price=price,
@@ -216,7 +218,9 @@ async def process_category(message: Message, state: FSMContext):
         )
         
         # Add all media
-        MediaService.add_multiple_media(db, toy.id, media_list)
+        await MediaService.add_multiple_media(db, toy.id, media_list)
+        # Commit before replying so the write transaction is not held during the send
+        await db.commit()
         
         await message.answer(
             f"✅ O'yinchoq muvaffaqiyatli qo'shildi!\n\n"
@@ -234,14 +238,49 @@ async def process_category(message: Message, state: FSMContext):
             reply_markup=get_admin_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
+
+
+def media_from_message(message: Message) -> Optional[Tuple[str, str]]:
+    """(file_id, "photo"/"video") of a photo, video or image/video document, else None"""
+    if message.photo:
+        return message.photo[-1].file_id, "photo"  # Highest resolution
+    if message.video:
+        return message.video.file_id, "video"
+    if message.document:
+        mime_type = message.document.mime_type or ""
+        if mime_type.startswith('image/'):
+            return message.document.file_id, "photo"
+        if mime_type.startswith('video/'):
+            return message.document.file_id, "video"
+    return None
+
+
+async def add_album_media(message: Message, state: FSMContext, album: List[Message]):
+    """Add every part of an album to the media list with one state update and one reply"""
+    items = [media for media in map(media_from_message, album) if media]
+    
+    data = await state.get_data()
+    media_list = data.get("media_list", []) + items
+    await state.update_data(media_list=media_list)
+    
+    skipped = len(album) - len(items)
+    await message.answer(
+        f"✅ {len(items)} ta media qo'shildi! ({len(media_list)} ta media)\n"
+        + (f"⚠️ {skipped} ta fayl rasm yoki video emas, o'tkazib yuborildi.\n" if skipped else "")
+        + "\nYana rasm/video yuborishingiz mumkin yoki <b>✅ Tugatish</b> tugmasini bosing.",
+        parse_mode="HTML",
+        reply_markup=get_media_done_keyboard()
+    )
 
 
 @router.message(AddToyStates.waiting_media, F.photo)
-async def process_photo(message: Message, state: FSMContext, bot: Bot):
+async def process_photo(message: Message, state: FSMContext, bot: Bot, album: Optional[List[Message]] = None):
     """Process photo media (including forwarded) - add to media list"""
     try:
+        if album:
+            await add_album_media(message, state, album)
+            return
+        
         # Handle both direct and forwarded photos
         if message.photo:
             photo: PhotoSize = message.photo[-1]  # Get highest resolution
@@ -281,9 +320,13 @@ async def process_photo(message: Message, state: FSMContext, bot: Bot):
 
 
 @router.message(AddToyStates.waiting_media, F.video)
-async def process_video(message: Message, state: FSMContext):
+async def process_video(message: Message, state: FSMContext, album: Optional[List[Message]] = None):
     """Process video media (including forwarded) - add to media list"""
     try:
+        if album:
+            await add_album_media(message, state, album)
+            return
+        
         # Handle both direct and forwarded videos
         if message.video:
             video: Video = message.video
@@ -323,9 +366,13 @@ async def process_video(message: Message, state: FSMContext):
 
 
 @router.message(AddToyStates.waiting_media, F.document)
-async def process_document_media(message: Message, state: FSMContext):
+async def process_document_media(message: Message, state: FSMContext, album: Optional[List[Message]] = None):
     """Process media sent as document (including forwarded) - add to media list"""
     try:
+        if album:
+            await add_album_media(message, state, album)
+            return
+        
         if not message.document:
             await message.answer(
                 "❌ Fayl topilmadi. Iltimos, rasm yoki video yuboring.",
@@ -450,7 +497,7 @@ async def start_add_category(message: Message, state: FSMContext):
 
 
 @router.message(AddCategoryStates.waiting_name)
-async def process_category_name(message: Message, state: FSMContext):
+async def process_category_name(message: Message, state: FSMContext, db: AsyncSession):
     """Process category name"""
     # Check for cancel
     if message.text == "❌ Bekor qilish":
@@ -481,10 +528,9 @@ async def process_category_name(message: Message, state: FSMContext):
         )
         return
     
-    db = get_db_session()
     try:
         # Check if category already exists
-        existing = CategoryService.get_category_by_name(db, category_name)
+        existing = await CategoryService.get_category_by_name(db, category_name)
         if existing:
             await message.answer(
                 f"❌ '{category_name}' kategoriyasi allaqachon mavjud.\n\n"
@@ -494,7 +540,7 @@ async def process_category_name(message: Message, state: FSMContext):
             return  # Don't clear state, let user try again
         
         # Create category
-        category = CategoryService.create_category(db, category_name)
+        category = await CategoryService.create_category(db, category_name)
         await message.answer(
             f"✅ Kategoriya muvaffaqiyatli qo'shildi!\n\n"
             f"📂 {category.name}",
@@ -509,20 +555,17 @@ async def process_category_name(message: Message, state: FSMContext):
             reply_markup=get_admin_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
 
 
 @router.message(F.text == "📦 Katalogni ko'rish")
-async def admin_view_catalog(message: Message):
+async def admin_view_catalog(message: Message, db: AsyncSession):
     """Show admin catalog view - categories"""
     if not is_admin(message.from_user.id):
         await message.answer("❌ Sizda admin huquqi yo'q.")
         return
     
-    db = get_db_session()
     try:
-        categories = CategoryService.get_all_categories(db)
+        categories = await CategoryService.get_all_categories(db)
         
         if not categories:
             await message.answer(
@@ -544,18 +587,15 @@ async def admin_view_catalog(message: Message):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 @router.message(F.text.startswith("✅ ") | F.text.startswith("❌ "))
-async def admin_view_category_toys(message: Message):
+async def admin_view_category_toys(message: Message, db: AsyncSession):
     """Show toys in selected category (admin)"""
     category_name = message.text.replace("✅ ", "").replace("❌ ", "").strip()
     
-    db = get_db_session()
     try:
-        category = CategoryService.get_category_by_name(db, category_name)
+        category = await CategoryService.get_category_by_name(db, category_name)
         
         if not category:
             await message.answer(
@@ -565,7 +605,7 @@ async def admin_view_category_toys(message: Message):
             return
         
         # Get toys for this category (page 1)
-        toys, total_pages = CatalogService.get_active_toys_by_category(
+        toys, total_pages = await CatalogService.get_active_toys_by_category(
             db, 
             category_id=category.id, 
             page=1
@@ -574,7 +614,7 @@ async def admin_view_category_toys(message: Message):
         if not toys:
             await message.answer(
                 f"😔 '{category.name}' kategoriyasida o'yinchoqlar yo'q.",
-                reply_markup=get_admin_categories_keyboard(CategoryService.get_all_categories(db))
+                reply_markup=get_admin_categories_keyboard(await CategoryService.get_all_categories(db))
             )
             return
         
@@ -588,8 +628,6 @@ async def admin_view_category_toys(message: Message):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 async def show_admin_toy(message_or_callback, toy, category_id: int, page: int, total_pages: int, cat_id: int = None):
@@ -644,380 +682,346 @@ async def show_admin_toy(message_or_callback, toy, category_id: int, page: int,
             )
 
 
-@router.callback_query(F.data.startswith("admin_toy_page_"))
-async def handle_admin_toy_pagination(callback: CallbackQuery):
+@router.callback_query(AdminToyPageCallback.filter())
+async def handle_admin_toy_pagination(callback: CallbackQuery, callback_data: AdminToyPageCallback, db: AsyncSession):
     """Handle admin toy pagination"""
     try:
-        # Format: admin_toy_page_{category_id}_{page} or admin_toy_page_all_{page}
-        parts = callback.data.split("_")
-        category_part = parts[3]
-        page = int(parts[4])
+        page = callback_data.page
+        category_id = callback_data.category_id
         
-        db = get_db_session()
-        try:
-            if category_part == "all":
-                # Show all toys
-                toys, total_pages = CatalogService.get_all_toys(db, page=page)
-                category_id = None
-            else:
-                category_id = int(category_part)
-                category = CategoryService.get_category_by_id(db, category_id)
-                if not category:
-                    await callback.answer("❌ Kategoriya topilmadi", show_alert=True)
-                    return
-                
-                toys, total_pages = CatalogService.get_active_toys_by_category(
-                    db, 
-                    category_id=category_id, 
-                    page=page
-                )
-            
-            if not toys:
-                await callback.answer("❌ O'yinchoqlar topilmadi", show_alert=True)
+        if category_id is None:
+            # Show all toys
+            toys, total_pages = await CatalogService.get_all_toys(db, page=page)
+        else:
+            category = await CategoryService.get_category_by_id(db, category_id)
+            if not category:
+                await callback.answer("❌ Kategoriya topilmadi", show_alert=True)
                 return
             
-            # Show toy at current page
-            toy = toys[0]
-            await show_admin_toy(callback, toy, category_id or 0, page, total_pages, category_id)
-            await callback.answer()
-            
-        finally:
-            db.close()
+            toys, total_pages = await CatalogService.get_active_toys_by_category(
+                db, 
+                category_id=category_id, 
+                page=page
+            )
+        
+        if not toys:
+            await callback.answer("❌ O'yinchoqlar topilmadi", show_alert=True)
+            return
+        
+        # Show toy at current page
+        toy = toys[0]
+        await show_admin_toy(callback, toy, category_id or 0, page, total_pages, category_id)
+        await callback.answer()
+        
             
     except (ValueError, IndexError) as e:
         logger.error(f"Error in admin pagination: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("admin_manage_"))
-async def manage_toy(callback: CallbackQuery):
+@router.callback_query(AdminToyCallback.filter(F.action == "manage"))
+async def manage_toy(callback: CallbackQuery, callback_data: AdminToyCallback, db: AsyncSession):
     """Show toy management options"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Sizda admin huquqi yo'q", show_alert=True)
         return
     
     try:
-        toy_id = int(callback.data.split("_")[2])
+        toy_id = callback_data.toy_id
+        
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
+        if not toy:
+            await callback.answer("❌ O'yinchoq topilmadi", show_alert=True)
+            return
+        
+        status_text = "Faol ✅" if toy.is_active else "Nofaol ❌"
+        message_text = (
+            f"⚙️ <b>O'yinchoqni boshqarish</b>\n\n"
+            f"📦 {toy.title}\n"
+            f"💰 {toy.price}\n"
+            f"📊 Holati: {status_text}\n"
+            f"🆔 ID: {toy.id}"
+        )
+        
+        await callback.message.edit_caption(
+            caption=message_text,
+            parse_mode="HTML",
+            reply_markup=get_admin_toy_manage_keyboard(toy.id, toy.is_active)
+        )
+        await callback.answer()
         
-        db = get_db_session()
-        try:
-            toy = CatalogService.get_toy_by_id(db, toy_id)
-            if not toy:
-                await callback.answer("❌ O'yinchoq topilmadi", show_alert=True)
-                return
-            
-            status_text = "Faol ✅" if toy.is_active else "Nofaol ❌"
-            message_text = (
-                f"⚙️ <b>O'yinchoqni boshqarish</b>\n\n"
-                f"📦 {toy.title}\n"
-                f"💰 {toy.price}\n"
-                f"📊 Holati: {status_text}\n"
-                f"🆔 ID: {toy.id}"
-            )
-            
-            await callback.message.edit_caption(
-                caption=message_text,
-                parse_mode="HTML",
-                reply_markup=get_admin_toy_manage_keyboard(toy.id, toy.is_active)
-            )
-            await callback.answer()
-            
-        finally:
-            db.close()
             
     except (ValueError, IndexError) as e:
         logger.error(f"Error in manage_toy: {e}")
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("admin_toggle_"))
-async def toggle_toy(callback: CallbackQuery):
+@router.callback_query(AdminToyCallback.filter(F.action == "toggle"))
+async def toggle_toy(callback: CallbackQuery, callback_data: AdminToyCallback, db: AsyncSession):
     """Toggle toy active status"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Sizda admin huquqi yo'q", show_alert=True)
         return
     
     try:
-        toy_id = int(callback.data.split("_")[2])
+        toy_id = callback_data.toy_id
+        
+        toy = await CatalogService.toggle_toy_active(db, toy_id)
+        if not toy:
+            await callback.answer("❌ O'yinchoq topilmadi", show_alert=True)
+            return
+        
+        status_text = "Faol ✅" if toy.is_active else "Nofaol ❌"
+        message_text = (
+            f"⚙️ <b>O'yinchoqni boshqarish</b>\n\n"
+            f"📦 {toy.title}\n"
+            f"💰 {toy.price}\n"
+            f"📊 Holati: {status_text}\n"
+            f"🆔 ID: {toy.id}"
+        )
+        
+        await callback.message.edit_caption(
+            caption=message_text,
+            parse_mode="HTML",
+            reply_markup=get_admin_toy_manage_keyboard(toy.id, toy.is_active)
+        )
+        await callback.answer(f"✅ Holat o'zgartirildi: {status_text}")
         
-        db = get_db_session()
-        try:
-            toy = CatalogService.toggle_toy_active(db, toy_id)
-            if not toy:
-                await callback.answer("❌ O'yinchoq topilmadi", show_alert=True)
-                return
-            
-            status_text = "Faol ✅" if toy.is_active else "Nofaol ❌"
-            message_text = (
-                f"⚙️ <b>O'yinchoqni boshqarish</b>\n\n"
-                f"📦 {toy.title}\n"
-                f"💰 {toy.price}\n"
-                f"📊 Holati: {status_text}\n"
-                f"🆔 ID: {toy.id}"
-            )
-            
-            await callback.message.edit_caption(
-                caption=message_text,
-                parse_mode="HTML",
-                reply_markup=get_admin_toy_manage_keyboard(toy.id, toy.is_active)
-            )
-            await callback.answer(f"✅ Holat o'zgartirildi: {status_text}")
-            
-        finally:
-            db.close()
             
     except Exception as e:
         logger.error(f"Error in toggle_toy: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("admin_delete_"))
-async def confirm_delete_toy(callback: CallbackQuery):
+@router.callback_query(AdminToyCallback.filter(F.action == "delete"))
+async def confirm_delete_toy(callback: CallbackQuery, callback_data: AdminToyCallback, db: AsyncSession):
     """Show delete confirmation"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Sizda admin huquqi yo'q", show_alert=True)
         return
     
     try:
-        toy_id = int(callback.data.split("_")[2])
+        toy_id = callback_data.toy_id
+        
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
+        if not toy:
+            await callback.answer("❌ O'yinchoq topilmadi", show_alert=True)
+            return
+        
+        message_text = (
+            f"⚠️ <b>O'yinchoqni o'chirish</b>\n\n"
+            f"📦 {toy.title}\n\n"
+            f"Rostdan ham o'chirmoqchimisiz?"
+        )
+        
+        await callback.message.edit_caption(
+            caption=message_text,
+            parse_mode="HTML",
+            reply_markup=get_confirm_delete_keyboard(toy_id)
+        )
+        await callback.answer()
         
-        db = get_db_session()
-        try:
-            toy = CatalogService.get_toy_by_id(db, toy_id)
-            if not toy:
-                await callback.answer("❌ O'yinchoq topilmadi", show_alert=True)
-                return
-            
-            message_text = (
-                f"⚠️ <b>O'yinchoqni o'chirish</b>\n\n"
-                f"📦 {toy.title}\n\n"
-                f"Rostdan ham o'chirmoqchimisiz?"
-            )
-            
-            await callback.message.edit_caption(
-                caption=message_text,
-                parse_mode="HTML",
-                reply_markup=get_confirm_delete_keyboard(toy_id)
-            )
-            await callback.answer()
-            
-        finally:
-            db.close()
             
     except Exception as e:
         logger.error(f"Error in confirm_delete_toy: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("admin_edit_"))
-async def start_edit_toy(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(AdminToyCallback.filter(F.action == "edit"))
+async def start_edit_toy(callback: CallbackQuery, callback_data: AdminToyCallback, state: FSMContext, db: AsyncSession):
     """Start editing a toy"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Sizda admin huquqi yo'q", show_alert=True)
         return
     
     try:
-        toy_id = int(callback.data.split("_")[2])
+        toy_id = callback_data.toy_id
+        
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
+        if not toy:
+            await callback.answer("❌ O'yinchoq topilmadi", show_alert=True)
+            return
+        
+        # Store toy_id in state
+        await state.update_data(toy_id=toy_id)
+        
+        # Show edit options
+        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+        from aiogram.utils.keyboard import InlineKeyboardBuilder
+        
+        builder = InlineKeyboardBuilder()
+        builder.add(InlineKeyboardButton(
+            text="📝 Nom",
+            callback_data=AdminToyFieldCallback(toy_id=toy_id, field="title").pack()
+        ))
+        builder.add(InlineKeyboardButton(
+            text="💰 Narx",
+            callback_data=AdminToyFieldCallback(toy_id=toy_id, field="price").pack()
+        ))
+        builder.add(InlineKeyboardButton(
+            text="📄 Tavsif",
+            callback_data=AdminToyFieldCallback(toy_id=toy_id, field="description").pack()
+        ))
+        builder.add(InlineKeyboardButton(
+            text="📂 Kategoriya",
+            callback_data=AdminToyFieldCallback(toy_id=toy_id, field="category").pack()
+        ))
+        builder.add(InlineKeyboardButton(
+            text="🖼️ Media",
+            callback_data=AdminToyFieldCallback(toy_id=toy_id, field="media").pack()
+        ))
+        builder.add(InlineKeyboardButton(
+            text="⬅️ Orqaga",
+            callback_data=AdminToyCallback(action="manage", toy_id=toy_id).pack()
+        ))
+        builder.adjust(2)
+        
+        message_text = (
+            f"✏️ <b>O'yinchoqni tahrirlash</b>\n\n"
+            f"📦 {toy.title}\n"
+            f"💰 {toy.price}\n\n"
+            f"Tahrirlash uchun maydonni tanlang:"
+        )
+        
+        await callback.message.edit_caption(
+            caption=message_text,
+            parse_mode="HTML",
+            reply_markup=builder.as_markup()
+        )
+        await callback.answer()
         
-        db = get_db_session()
-        try:
-            toy = CatalogService.get_toy_by_id(db, toy_id)
-            if not toy:
-                await callback.answer("❌ O'yinchoq topilmadi", show_alert=True)
-                return
-            
-            # Store toy_id in state
-            await state.update_data(toy_id=toy_id)
-            
-            # Show edit options
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            from aiogram.utils.keyboard import InlineKeyboardBuilder
-            
-            builder = InlineKeyboardBuilder()
-            builder.add(InlineKeyboardButton(
-                text="📝 Nom",
-                callback_data=f"edit_field_{toy_id}_title"
-            ))
-            builder.add(InlineKeyboardButton(
-                text="💰 Narx",
-                callback_data=f"edit_field_{toy_id}_price"
-            ))
-            builder.add(InlineKeyboardButton(
-                text="📄 Tavsif",
-                callback_data=f"edit_field_{toy_id}_description"
-            ))
-            builder.add(InlineKeyboardButton(
-                text="📂 Kategoriya",
-                callback_data=f"edit_field_{toy_id}_category"
-            ))
-            builder.add(InlineKeyboardButton(
-                text="🖼️ Media",
-                callback_data=f"edit_field_{toy_id}_media"
-            ))
-            builder.add(InlineKeyboardButton(
-                text="⬅️ Orqaga",
-                callback_data=f"admin_manage_{toy_id}"
-            ))
-            builder.adjust(2)
-            
-            message_text = (
-                f"✏️ <b>O'yinchoqni tahrirlash</b>\n\n"
-                f"📦 {toy.title}\n"
-                f"💰 {toy.price}\n\n"
-                f"Tahrirlash uchun maydonni tanlang:"
-            )
-            
-            await callback.message.edit_caption(
-                caption=message_text,
-                parse_mode="HTML",
-                reply_markup=builder.as_markup()
-            )
-            await callback.answer()
-            
-        finally:
-            db.close()
             
     except Exception as e:
         logger.error(f"Error in start_edit_toy: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("edit_field_"))
-async def select_edit_field(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(AdminToyFieldCallback.filter())
+async def select_edit_field(callback: CallbackQuery, callback_data: AdminToyFieldCallback, state: FSMContext, db: AsyncSession):
     """Select field to edit"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Sizda admin huquqi yo'q", show_alert=True)
         return
     
     try:
-        parts = callback.data.split("_")
-        toy_id = int(parts[2])
-        field = parts[3]
+        toy_id = callback_data.toy_id
+        field = callback_data.field
         
         await state.update_data(toy_id=toy_id, field=field)
         await state.set_state(EditToyStates.waiting_new_value)
         
-        db = get_db_session()
-        try:
-            toy = CatalogService.get_toy_by_id(db, toy_id)
-            if not toy:
-                await callback.answer("❌ O'yinchoq topilmadi", show_alert=True)
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
+        if not toy:
+            await callback.answer("❌ O'yinchoq topilmadi", show_alert=True)
+            return
+        
+        field_names = {
+            "title": "Nom",
+            "price": "Narx",
+            "description": "Tavsif",
+            "category": "Kategoriya",
+            "media": "Media (rasm/video)"
+        }
+        
+        if field == "category":
+            # Show category selection
+            categories = await CategoryService.get_active_categories(db)
+            if not categories:
+                await callback.answer("❌ Kategoriya mavjud emas", show_alert=True)
                 return
             
-            field_names = {
-                "title": "Nom",
-                "price": "Narx",
-                "description": "Tavsif",
-                "category": "Kategoriya",
-                "media": "Media (rasm/video)"
-            }
+            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+            from aiogram.utils.keyboard import InlineKeyboardBuilder
             
-            if field == "category":
-                # Show category selection
-                categories = CategoryService.get_active_categories(db)
-                if not categories:
-                    await callback.answer("❌ Kategoriya mavjud emas", show_alert=True)
-                    return
-                
-                from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-                from aiogram.utils.keyboard import InlineKeyboardBuilder
-                
-                builder = InlineKeyboardBuilder()
-                for category in categories:
-                    builder.add(InlineKeyboardButton(
-                        text=f"📂 {category.name}",
-                        callback_data=f"edit_category_{toy_id}_{category.id}"
-                    ))
-                builder.add(InlineKeyboardButton(
-                    text="⬅️ Orqaga",
-                    callback_data=f"admin_edit_{toy_id}"
-                ))
-                builder.adjust(1)
-                
-                await callback.message.edit_caption(
-                    caption=f"📂 Kategoriyani tanlang:",
-                    parse_mode="HTML",
-                    reply_markup=builder.as_markup()
-                )
-                await callback.answer()
-            elif field == "media":
-                from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-                from aiogram.utils.keyboard import InlineKeyboardBuilder
-                
-                builder = InlineKeyboardBuilder()
-                builder.add(InlineKeyboardButton(
-                    text="⬅️ Orqaga",
-                    callback_data=f"admin_edit_{toy_id}"
-                ))
-                
-                await callback.message.edit_caption(
-                    caption=f"🖼️ Yangi rasm yoki video yuboring:",
-                    parse_mode="HTML",
-                    reply_markup=builder.as_markup()
-                )
-                await callback.answer()
-            else:
-                from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-                from aiogram.utils.keyboard import InlineKeyboardBuilder
-                
-                builder = InlineKeyboardBuilder()
+            builder = InlineKeyboardBuilder()
+            for category in categories:
                 builder.add(InlineKeyboardButton(
-                    text="⬅️ Orqaga",
-                    callback_data=f"admin_edit_{toy_id}"
+                    text=f"📂 {category.name}",
+                    callback_data=AdminToyCategoryCallback(toy_id=toy_id, category_id=category.id).pack()
                 ))
-                
-                current_value = getattr(toy, field, "")
-                await callback.message.edit_caption(
-                    caption=f"✏️ Yangi {field_names.get(field, field)} kiriting:\n\n"
-                           f"Joriy qiymat: {current_value}",
-                    parse_mode="HTML",
-                    reply_markup=builder.as_markup()
-                )
-                await callback.answer()
-                
-        finally:
-            db.close()
+            builder.add(InlineKeyboardButton(
+                text="⬅️ Orqaga",
+                callback_data=AdminToyCallback(action="edit", toy_id=toy_id).pack()
+            ))
+            builder.adjust(1)
+            
+            await callback.message.edit_caption(
+                caption=f"📂 Kategoriyani tanlang:",
+                parse_mode="HTML",
+                reply_markup=builder.as_markup()
+            )
+            await callback.answer()
+        elif field == "media":
+            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+            from aiogram.utils.keyboard import InlineKeyboardBuilder
+            
+            builder = InlineKeyboardBuilder()
+            builder.add(InlineKeyboardButton(
+                text="⬅️ Orqaga",
+                callback_data=AdminToyCallback(action="edit", toy_id=toy_id).pack()
+            ))
+            
+            await callback.message.edit_caption(
+                caption=f"🖼️ Yangi rasm yoki video yuboring:",
+                parse_mode="HTML",
+                reply_markup=builder.as_markup()
+            )
+            await callback.answer()
+        else:
+            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+            from aiogram.utils.keyboard import InlineKeyboardBuilder
+            
+            builder = InlineKeyboardBuilder()
+            builder.add(InlineKeyboardButton(
+                text="⬅️ Orqaga",
+                callback_data=AdminToyCallback(action="edit", toy_id=toy_id).pack()
+            ))
+            
+            current_value = getattr(toy, field, "")
+            await callback.message.edit_caption(
+                caption=f"✏️ Yangi {field_names.get(field, field)} kiriting:\n\n"
+                       f"Joriy qiymat: {current_value}",
+                parse_mode="HTML",
+                reply_markup=builder.as_markup()
+            )
+            await callback.answer()
+            
             
     except Exception as e:
         logger.error(f"Error in select_edit_field: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("edit_category_"))
-async def edit_toy_category(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(AdminToyCategoryCallback.filter())
+async def edit_toy_category(callback: CallbackQuery, callback_data: AdminToyCategoryCallback, state: FSMContext, db: AsyncSession):
     """Edit toy category"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Sizda admin huquqi yo'q", show_alert=True)
         return
     
     try:
-        parts = callback.data.split("_")
-        toy_id = int(parts[2])
-        category_id = int(parts[3])
+        toy_id = callback_data.toy_id
+        category_id = callback_data.category_id
+        
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
+        category = await CategoryService.get_category_by_id(db, category_id)
+        
+        if not toy or not category:
+            await callback.answer("❌ Xatolik", show_alert=True)
+            return
+        
+        # Update category
+        toy.category_id = category_id
+        await db.flush()
+        
+        await callback.message.edit_caption(
+            caption=f"✅ Kategoriya yangilandi: {category.name}",
+            parse_mode="HTML",
+            reply_markup=get_admin_toy_manage_keyboard(toy.id, toy.is_active)
+        )
+        await callback.answer("✅ Yangilandi")
+        await state.clear()
         
-        db = get_db_session()
-        try:
-            toy = CatalogService.get_toy_by_id(db, toy_id)
-            category = CategoryService.get_category_by_id(db, category_id)
-            
-            if not toy or not category:
-                await callback.answer("❌ Xatolik", show_alert=True)
-                return
-            
-            # Update category
-            toy.category_id = category_id
-            db.commit()
-            
-            await callback.message.edit_caption(
-                caption=f"✅ Kategoriya yangilandi: {category.name}",
-                parse_mode="HTML",
-                reply_markup=get_admin_toy_manage_keyboard(toy.id, toy.is_active)
-            )
-            await callback.answer("✅ Yangilandi")
-            await state.clear()
-            
-        finally:
-            db.close()
             
     except Exception as e:
         logger.error(f"Error in edit_toy_category: {e}", exc_info=True)
@@ -1025,7 +1029,7 @@ async def edit_toy_category(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(EditToyStates.waiting_new_value)
-async def process_edit_value(message: Message, state: FSMContext):
+async def process_edit_value(message: Message, state: FSMContext, db: AsyncSession):
     """Process new value for toy field"""
     if not is_admin(message.from_user.id):
         await message.answer("❌ Sizda admin huquqi yo'q.")
@@ -1060,9 +1064,8 @@ async def process_edit_value(message: Message, state: FSMContext):
         await state.clear()
         return
     
-    db = get_db_session()
     try:
-        toy = CatalogService.get_toy_by_id(db, toy_id)
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
         if not toy:
             await message.answer("❌ O'yinchoq topilmadi", reply_markup=get_admin_menu_keyboard())
             await state.clear()
@@ -1106,7 +1109,7 @@ async def process_edit_value(message: Message, state: FSMContext):
                 await message.answer("❌ Rasm yoki video yuboring.")
                 return
         
-        db.commit()
+        await db.flush()
         
         await message.answer(
             f"✅ O'yinchoq yangilandi!",
@@ -1118,41 +1121,35 @@ async def process_edit_value(message: Message, state: FSMContext):
         logger.error(f"Error in process_edit_value: {e}", exc_info=True)
         await message.answer("❌ Xatolik yuz berdi", reply_markup=get_admin_menu_keyboard())
         await state.clear()
-    finally:
-        db.close()
 
 
-@router.callback_query(F.data.startswith("admin_confirm_delete_"))
-async def delete_toy(callback: CallbackQuery):
+@router.callback_query(AdminToyCallback.filter(F.action == "confirm_delete"))
+async def delete_toy(callback: CallbackQuery, callback_data: AdminToyCallback, db: AsyncSession):
     """Delete toy"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Sizda admin huquqi yo'q", show_alert=True)
         return
     
     try:
-        toy_id = int(callback.data.split("_")[3])
+        toy_id = callback_data.toy_id
+        
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
+        if not toy:
+            await callback.answer("❌ O'yinchoq topilmadi", show_alert=True)
+            return
+        
+        toy_title = toy.title
+        success = await CatalogService.delete_toy(db, toy_id)
+        
+        if success:
+            await callback.message.edit_text(
+                f"✅ O'yinchoq o'chirildi: {toy_title}",
+                reply_markup=get_admin_menu_keyboard()
+            )
+            await callback.answer("✅ O'chirildi")
+        else:
+            await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
         
-        db = get_db_session()
-        try:
-            toy = CatalogService.get_toy_by_id(db, toy_id)
-            if not toy:
-                await callback.answer("❌ O'yinchoq topilmadi", show_alert=True)
-                return
-            
-            toy_title = toy.title
-            success = CatalogService.delete_toy(db, toy_id)
-            
-            if success:
-                await callback.message.edit_text(
-                    f"✅ O'yinchoq o'chirildi: {toy_title}",
-                    reply_markup=get_admin_menu_keyboard()
-                )
-                await callback.answer("✅ O'chirildi")
-            else:
-                await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
-            
-        finally:
-            db.close()
             
     except Exception as e:
         logger.error(f"Error in delete_toy: {e}", exc_info=True)
@@ -1160,16 +1157,15 @@ async def delete_toy(callback: CallbackQuery):
 
 
 @router.message(F.text == "📊 Statistika")
-async def show_stats(message: Message):
+async def show_stats(message: Message, db: AsyncSession):
     """Show catalog statistics"""
     if not is_admin(message.from_user.id):
         await message.answer("❌ Sizda admin huquqi yo'q.")
         return
     
-    db = get_db_session()
     try:
-        toy_stats = CatalogService.get_stats(db)
-        category_stats = CategoryService.get_category_stats(db)
+        toy_stats = await CatalogService.get_stats(db)
+        category_stats = await CategoryService.get_category_stats(db)
         
         stats_text = (
             "📊 <b>Katalog statistikasi</b>\n\n"
@@ -1195,8 +1191,6 @@ async def show_stats(message: Message):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 @router.message(F.text == "📣 Reklama yuborish")
@@ -1234,9 +1228,9 @@ async def cancel_admin_action(message: Message, state: FSMContext):
 
 
 @router.message(F.text == "⬅️ Orqaga")
-async def admin_go_back(message: Message):
+async def admin_go_back(message: Message, db: AsyncSession):
     """Go back to admin catalog"""
-    await admin_view_catalog(message)
+    await admin_view_catalog(message, db)
 
 
 @router.message(F.text == "🏠 Bosh menyu")
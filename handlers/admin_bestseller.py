@@ -5,6 +5,7 @@ import logging
 from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from keyboards.admin_kb import get_admin_menu_keyboard
 from keyboards.bestseller_kb import (
@@ -16,7 +17,6 @@ from keyboards.bestseller_kb import (
 )
 from services.bestseller_generator import BestsellerGenerator
 from services.category_service import CategoryService
-from database.db import get_db_session
 from config import ADMIN_IDS
 from states.bestseller_states import AddBestsellerStates, DeleteBestsellerStates
 
@@ -61,7 +61,7 @@ async def start_add_bestseller(message: Message, state: FSMContext):
 
 
 @router.message(AddBestsellerStates.waiting_period, F.text.in_(["📅 Haftalik", "📅 Oylik", "📅 Yillik"]))
-async def select_period_for_bestseller(message: Message, state: FSMContext):
+async def select_period_for_bestseller(message: Message, state: FSMContext, db: AsyncSession):
     """Select period for bestseller"""
     # Check for cancel/back
     if message.text in ["⬅️ Orqaga", "🏠 Admin menyu"]:
@@ -87,29 +87,25 @@ async def select_period_for_bestseller(message: Message, state: FSMContext):
     await state.update_data(period=period)
     await state.set_state(AddBestsellerStates.waiting_category)
     
-    db = get_db_session()
-    try:
-        categories = CategoryService.get_active_categories(db)
-        
-        if not categories:
-            await message.answer(
-                "❌ Kategoriya mavjud emas.\n\n"
-                "Avval kategoriya qo'shing.",
-                reply_markup=get_admin_menu_keyboard()
-            )
-            await state.clear()
-            return
-        
+    categories = await CategoryService.get_active_categories(db)
+    
+    if not categories:
         await message.answer(
-            "🧸 Kategoriyani tanlang:",
-            reply_markup=get_category_list_keyboard(categories)
+            "❌ Kategoriya mavjud emas.\n\n"
+            "Avval kategoriya qo'shing.",
+            reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
+        await state.clear()
+        return
+    
+    await message.answer(
+        "🧸 Kategoriyani tanlang:",
+        reply_markup=get_category_list_keyboard(categories)
+    )
 
 
 @router.message(AddBestsellerStates.waiting_category, F.text.startswith("🧸 "))
-async def select_category_for_bestseller(message: Message, state: FSMContext):
+async def select_category_for_bestseller(message: Message, state: FSMContext, db: AsyncSession):
     """Select category for bestseller"""
     # Check for cancel/back
     if message.text in ["⬅️ Orqaga", "🏠 Admin menyu"]:
@@ -122,31 +118,27 @@ async def select_category_for_bestseller(message: Message, state: FSMContext):
     
     category_name = message.text.replace("🧸 ", "").strip()
     
-    db = get_db_session()
-    try:
-        category = CategoryService.get_category_by_name(db, category_name)
-        
-        if not category:
-            await message.answer(
-                "❌ Kategoriya topilmadi.",
-                reply_markup=get_admin_menu_keyboard()
-            )
-            await state.clear()
-            return
-        
-        await state.update_data(category_id=category.id, category_name=category.name)
-        await state.set_state(AddBestsellerStates.waiting_rank)
-        
+    category = await CategoryService.get_category_by_name(db, category_name)
+    
+    if not category:
         await message.answer(
-            "🏆 O'rinni tanlang (1-5):",
-            reply_markup=get_rank_keyboard()
+            "❌ Kategoriya topilmadi.",
+            reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
+        await state.clear()
+        return
+    
+    await state.update_data(category_id=category.id, category_name=category.name)
+    await state.set_state(AddBestsellerStates.waiting_rank)
+    
+    await message.answer(
+        "🏆 O'rinni tanlang (1-5):",
+        reply_markup=get_rank_keyboard()
+    )
 
 
 @router.message(AddBestsellerStates.waiting_rank)
-async def process_bestseller_rank(message: Message, state: FSMContext):
+async def process_bestseller_rank(message: Message, state: FSMContext, db: AsyncSession):
     """Process bestseller rank"""
     # Check for cancel/back
     if message.text in ["⬅️ Orqaga", "🏠 Admin menyu"]:
@@ -179,15 +171,18 @@ async def process_bestseller_rank(message: Message, state: FSMContext):
     category_id = data.get("category_id")
     period = data.get("period")
     
-    db = get_db_session()
     try:
+        from sqlalchemy import select
         from database.models import BestsellerCategory
-        existing_manual = db.query(BestsellerCategory).filter(
-            BestsellerCategory.period == period,
-            BestsellerCategory.rank == rank,
-            BestsellerCategory.source == "manual",
-            BestsellerCategory.is_active == True
-        ).first()
+        result = await db.execute(
+            select(BestsellerCategory).where(
+                BestsellerCategory.period == period,
+                BestsellerCategory.rank == rank,
+                BestsellerCategory.source == "manual",
+                BestsellerCategory.is_active == True
+            ).limit(1)
+        )
+        existing_manual = result.scalars().first()
         
         if existing_manual and existing_manual.category_id != category_id:
             await message.answer(
@@ -199,7 +194,7 @@ async def process_bestseller_rank(message: Message, state: FSMContext):
             return
         
         # Create manual bestseller
-        bestseller = BestsellerGenerator.create_manual_bestseller(
+        bestseller = await BestsellerGenerator.create_manual_bestseller(
             db,
             category_id=category_id,
             period=period,
@@ -229,8 +224,6 @@ async def process_bestseller_rank(message: Message, state: FSMContext):
             reply_markup=get_admin_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
 
 
 @router.message(F.text == "🗑 Bestseller o'chirish")
@@ -250,7 +243,7 @@ async def start_delete_bestseller(message: Message, state: FSMContext):
 
 
 @router.message(DeleteBestsellerStates.waiting_period, F.text.in_(["📅 Haftalik", "📅 Oylik", "📅 Yillik"]))
-async def select_period_for_delete(message: Message, state: FSMContext):
+async def select_period_for_delete(message: Message, state: FSMContext, db: AsyncSession):
     """Select period for deletion"""
     # Check for cancel/back
     if message.text in ["⬅️ Orqaga", "🏠 Admin menyu"]:
@@ -276,28 +269,24 @@ async def select_period_for_delete(message: Message, state: FSMContext):
     await state.update_data(period=period)
     await state.set_state(DeleteBestsellerStates.waiting_bestseller)
     
-    db = get_db_session()
-    try:
-        bestsellers = BestsellerGenerator.get_bestsellers(db, period)
-        
-        if not bestsellers:
-            await message.answer(
-                f"❌ {period} davrda bestseller mavjud emas.",
-                reply_markup=get_admin_menu_keyboard()
-            )
-            await state.clear()
-            return
-        
+    bestsellers = await BestsellerGenerator.get_bestsellers(db, period)
+    
+    if not bestsellers:
         await message.answer(
-            "🗑️ O'chirish uchun bestsellerni tanlang:",
-            reply_markup=get_bestseller_list_keyboard(bestsellers, period)
+            f"❌ {period} davrda bestseller mavjud emas.",
+            reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
+        await state.clear()
+        return
+    
+    await message.answer(
+        "🗑️ O'chirish uchun bestsellerni tanlang:",
+        reply_markup=get_bestseller_list_keyboard(bestsellers, period)
+    )
 
 
 @router.message(DeleteBestsellerStates.waiting_bestseller)
-async def process_delete_bestseller(message: Message, state: FSMContext):
+async def process_delete_bestseller(message: Message, state: FSMContext, db: AsyncSession):
     """Process bestseller deletion"""
     # Check for cancel/back
     if message.text in ["⬅️ Orqaga", "🏠 Admin menyu"]:
@@ -317,14 +306,17 @@ async def process_delete_bestseller(message: Message, state: FSMContext):
     data = await state.get_data()
     period = data.get("period")
     
-    db = get_db_session()
     try:
+        from sqlalchemy import select
         from database.models import BestsellerCategory
-        bestseller = db.query(BestsellerCategory).filter(
-            BestsellerCategory.period == period,
-            BestsellerCategory.category_name == category_name,
-            BestsellerCategory.is_active == True
-        ).first()
+        result = await db.execute(
+            select(BestsellerCategory).where(
+                BestsellerCategory.period == period,
+                BestsellerCategory.category_name == category_name,
+                BestsellerCategory.is_active == True
+            ).limit(1)
+        )
+        bestseller = result.scalars().first()
         
         if not bestseller:
             await message.answer(
@@ -335,7 +327,7 @@ async def process_delete_bestseller(message: Message, state: FSMContext):
             return
         
         # Deactivate bestseller
-        success = BestsellerGenerator.deactivate_bestseller(db, bestseller.id)
+        success = await BestsellerGenerator.deactivate_bestseller(db, bestseller.id)
         
         if success:
             await message.answer(
@@ -357,18 +349,15 @@ async def process_delete_bestseller(message: Message, state: FSMContext):
             reply_markup=get_admin_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
 
 
 @router.message(F.text == "📋 Bestseller ro'yxati")
-async def list_bestsellers(message: Message):
+async def list_bestsellers(message: Message, db: AsyncSession):
     """List all bestsellers"""
     if not is_admin(message.from_user.id):
         await message.answer("❌ Sizda admin huquqi yo'q.")
         return
     
-    db = get_db_session()
     try:
         periods = ["weekly", "monthly", "yearly"]
         period_names = {
@@ -380,7 +369,7 @@ async def list_bestsellers(message: Message):
         text = "📋 <b>Bestseller ro'yxati</b>\n\n"
         
         for period in periods:
-            bestsellers = BestsellerGenerator.get_bestsellers(db, period)
+            bestsellers = await BestsellerGenerator.get_bestsellers(db, period)
             if bestsellers:
                 text += f"📅 <b>{period_names[period]}</b>:\n"
                 medals = {1: "🥇", 2: "🥈", 3: "🥉"}
@@ -405,8 +394,6 @@ async def list_bestsellers(message: Message):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 @router.message(F.text == "⬅️ Orqaga")
@@ -0,0 +1,139 @@
+"""
+Admin handlers for bulk catalog import/export (CSV/JSONL files)
+"""
+import logging
+import os
+import tempfile
+from aiogram import Router, F, Bot
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message, FSInputFile
+
+from keyboards.admin_kb import get_admin_menu_keyboard, get_cancel_keyboard
+from services.catalog_io_service import CatalogIOService
+from states.catalog_io_states import CatalogImportStates
+from utils.periods import local_today
+from config import ADMIN_IDS
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+# Bot API limit for files downloaded by bots
+MAX_IMPORT_FILE_SIZE = 20 * 1024 * 1024
+
+
+def is_admin(user_id: int) -> bool:
+    """Check if user is admin"""
+    return user_id in ADMIN_IDS
+
+
+@router.message(F.text == "📥 Katalog importi")
+@router.message(Command("import"))
+async def start_catalog_import(message: Message, state: FSMContext):
+    """Ask admin for a CSV/JSONL catalog file"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Sizda admin huquqi yo'q.")
+        return
+    
+    await state.set_state(CatalogImportStates.waiting_file)
+    await message.answer(
+        "📥 <b>Katalog importi</b>\n\n"
+        "CSV yoki JSONL faylni yuboring. Ustunlar:\n"
+        "<code>title, price, description, category, media</code>\n\n"
+        "• <b>media</b> - file_id lar bo'sh joy bilan ajratilgan, "
+        "oldiga <code>photo:</code> yoki <code>video:</code> qo'yish mumkin\n"
+        "• Mavjud bo'lmagan kategoriyalar avtomatik yaratiladi\n"
+        "• <b>id</b> ustuni to'ldirilgan qator shu o'yinchoqni yangilaydi (rasmlari ham almashtiriladi), "
+        "bo'sh <b>id</b> - yangi o'yinchoq qo'shadi\n"
+        "• 📤 Katalog eksporti faylini tahrirlab qayta yuborish mumkin - o'yinchoqlar takrorlanmaydi",
+        parse_mode="HTML",
+        reply_markup=get_cancel_keyboard()
+    )
+
+
+@router.message(CatalogImportStates.waiting_file, F.document)
+async def process_catalog_file(message: Message, state: FSMContext, bot: Bot):
+    """Import toys from the uploaded file"""
+    document = message.document
+    fmt = CatalogIOService.detect_format(document.file_name)
+    if not fmt:
+        await message.answer(
+            "❌ Faqat .csv yoki .jsonl fayl qabul qilinadi.",
+            reply_markup=get_cancel_keyboard()
+        )
+        return
+    
+    if document.file_size and document.file_size > MAX_IMPORT_FILE_SIZE:
+        await message.answer(
+            "❌ Fayl juda katta (20 MB dan oshmasligi kerak). Faylni bo'lib yuboring.",
+            reply_markup=get_cancel_keyboard()
+        )
+        return
+    
+    await state.clear()
+    await message.answer("⏳ Import qilinmoqda...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "catalog_import")
+            await bot.download(document, destination=path)
+            with open(path, encoding="utf-8-sig", newline="") as stream:
+                report = await CatalogIOService.import_catalog(stream, fmt)
+        
+        await message.answer(
+            CatalogIOService.format_import_report(report),
+            parse_mode="HTML",
+            reply_markup=get_admin_menu_keyboard()
+        )
+    
+    except UnicodeDecodeError:
+        await message.answer(
+            "❌ Fayl UTF-8 kodlashda bo'lishi kerak.",
+            reply_markup=get_admin_menu_keyboard()
+        )
+    except Exception as e:
+        logger.error(f"Error importing catalog: {e}", exc_info=True)
+        await message.answer(
+            "❌ Import qilishda xatolik yuz berdi.",
+            reply_markup=get_admin_menu_keyboard()
+        )
+
+
+@router.message(CatalogImportStates.waiting_file)
+async def process_catalog_file_invalid(message: Message):
+    """Anything but a document while waiting for the import file"""
+    await message.answer(
+        "📎 CSV yoki JSONL faylni hujjat sifatida yuboring.",
+        reply_markup=get_cancel_keyboard()
+    )
+
+
+@router.message(F.text == "📤 Katalog eksporti")
+@router.message(Command("export"))
+async def export_catalog(message: Message, command: CommandObject = None):
+    """Send the whole catalog as a CSV (or JSONL with "/export jsonl") file"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Sizda admin huquqi yo'q.")
+        return
+    
+    fmt = "jsonl" if command and (command.args or "").strip().lower() == "jsonl" else "csv"
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = f"katalog_{local_today().isoformat()}.{fmt}"
+            path = os.path.join(tmp_dir, file_name)
+            with open(path, "w", encoding="utf-8-sig" if fmt == "csv" else "utf-8", newline="") as out:
+                count = await CatalogIOService.export_catalog(out, fmt)
+            
+            await message.answer_document(
+                FSInputFile(path, filename=file_name),
+                caption=f"📤 Katalog eksporti: {count} ta o'yinchoq",
+                reply_markup=get_admin_menu_keyboard()
+            )
+    
+    except Exception as e:
+        logger.error(f"Error exporting catalog: {e}", exc_info=True)
+        await message.answer(
+            "❌ Eksport qilishda xatolik yuz berdi.",
+            reply_markup=get_admin_menu_keyboard()
+        )
@@ -5,8 +5,10 @@ import logging
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from keyboards.admin_kb import get_admin_menu_keyboard
+from keyboards.callbacks import CallbackPrefixFilter, CategoryDeleteCallback
 from keyboards.category_manage_kb import (
     get_category_list_keyboard,
     get_confirm_delete_category_keyboard,
@@ -14,12 +16,12 @@ from keyboards.category_manage_kb import (
 )
 from services.category_service import CategoryService
 from services.catalog_service import CatalogService
-from database.db import get_db_session
 from config import ADMIN_IDS
 from states.category_manage_states import EditCategoryStates, DeleteCategoryStates
 
 logger = logging.getLogger(__name__)
 router = Router()
+router.callback_query.filter(CallbackPrefixFilter(CategoryDeleteCallback))
 
 
 def is_admin(user_id: int) -> bool:
@@ -28,15 +30,14 @@ def is_admin(user_id: int) -> bool:
 
 
 @router.message(F.text == "✏️ Kategoriyalarni tahrirlash")
-async def start_edit_categories(message: Message, state: FSMContext):
+async def start_edit_categories(message: Message, state: FSMContext, db: AsyncSession):
     """Start category editing flow"""
     if not is_admin(message.from_user.id):
         await message.answer("❌ Sizda admin huquqi yo'q.")
         return
     
-    db = get_db_session()
     try:
-        categories = CategoryService.get_active_categories(db)
+        categories = await CategoryService.get_active_categories(db)
         
         if not categories:
             await message.answer(
@@ -60,12 +61,10 @@ async def start_edit_categories(message: Message, state: FSMContext):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 @router.message(EditCategoryStates.waiting_category_selection, F.text.startswith("🧸 "))
-async def select_category_to_edit(message: Message, state: FSMContext):
+async def select_category_to_edit(message: Message, state: FSMContext, db: AsyncSession):
     """Select category to edit"""
     # Check for cancel/back
     if message.text == "❌ Bekor qilish" or message.text == "⬅️ Orqaga" or message.text == "🏠 Admin menyu":
@@ -84,15 +83,14 @@ async def select_category_to_edit(message: Message, state: FSMContext):
     
     category_name = message.text.replace("🧸 ", "").strip()
     
-    db = get_db_session()
     try:
-        category = CategoryService.get_category_by_name(db, category_name)
+        category = await CategoryService.get_category_by_name(db, category_name)
         
         if not category:
             await message.answer(
                 "❌ Kategoriya topilmadi.\n\n"
                 "Kategoriyani qayta tanlang:",
-                reply_markup=get_category_list_keyboard(CategoryService.get_active_categories(db))
+                reply_markup=get_category_list_keyboard(await CategoryService.get_active_categories(db))
             )
             return
         
@@ -115,12 +113,10 @@ async def select_category_to_edit(message: Message, state: FSMContext):
             reply_markup=get_admin_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
 
 
 @router.message(EditCategoryStates.waiting_new_name)
-async def process_new_category_name(message: Message, state: FSMContext):
+async def process_new_category_name(message: Message, state: FSMContext, db: AsyncSession):
     """Process new category name"""
     # Check for cancel
     if message.text == "❌ Bekor qilish":
@@ -155,10 +151,9 @@ async def process_new_category_name(message: Message, state: FSMContext):
     category_id = data.get("category_id")
     old_name = data.get("category_name")
     
-    db = get_db_session()
     try:
         # Check if new name already exists (excluding current category)
-        existing = CategoryService.get_category_by_name(db, new_name)
+        existing = await CategoryService.get_category_by_name(db, new_name)
         if existing and existing.id != category_id:
             await message.answer(
                 f"❌ Bu nomdagi kategoriya allaqachon mavjud.\n\n"
@@ -168,7 +163,7 @@ async def process_new_category_name(message: Message, state: FSMContext):
             return
         
         # Update category name
-        updated_category = CategoryService.update_category(
+        updated_category = await CategoryService.update_category(
             db,
             category_id=category_id,
             name=new_name
@@ -196,20 +191,17 @@ async def process_new_category_name(message: Message, state: FSMContext):
             reply_markup=get_admin_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
 
 
 @router.message(F.text == "🗑️ Kategoriyani o'chirish")
-async def start_delete_categories(message: Message, state: FSMContext):
+async def start_delete_categories(message: Message, state: FSMContext, db: AsyncSession):
     """Start category deletion flow"""
     if not is_admin(message.from_user.id):
         await message.answer("❌ Sizda admin huquqi yo'q.")
         return
     
-    db = get_db_session()
     try:
-        categories = CategoryService.get_active_categories(db)
+        categories = await CategoryService.get_active_categories(db)
         
         if not categories:
             await message.answer(
@@ -233,12 +225,10 @@ async def start_delete_categories(message: Message, state: FSMContext):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 @router.message(DeleteCategoryStates.waiting_category_selection, F.text.startswith("🧸 "))
-async def select_category_to_delete(message: Message, state: FSMContext):
+async def select_category_to_delete(message: Message, state: FSMContext, db: AsyncSession):
     """Select category to delete"""
     # Check for cancel/back
     if message.text == "❌ Bekor qilish" or message.text == "⬅️ Orqaga" or message.text == "🏠 Admin menyu":
@@ -257,24 +247,19 @@ async def select_category_to_delete(message: Message, state: FSMContext):
     
     category_name = message.text.replace("🧸 ", "").strip()
     
-    db = get_db_session()
     try:
-        category = CategoryService.get_category_by_name(db, category_name)
+        category = await CategoryService.get_category_by_name(db, category_name)
         
         if not category:
             await message.answer(
                 "❌ Kategoriya topilmadi.\n\n"
                 "Kategoriyani qayta tanlang:",
-                reply_markup=get_category_list_keyboard(CategoryService.get_active_categories(db))
+                reply_markup=get_category_list_keyboard(await CategoryService.get_active_categories(db))
             )
             return
         
         # Check if category has active toys
-        from database.models import Toy
-        active_toys_count = db.query(Toy).filter(
-            Toy.category_id == category.id,
-            Toy.is_active == True
-        ).count()
+        active_toys_count = await CategoryService.count_active_toys(db, category.id)
         
         if active_toys_count > 0:
             await message.answer(
@@ -305,67 +290,57 @@ async def select_category_to_delete(message: Message, state: FSMContext):
             reply_markup=get_admin_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
 
 
-@router.callback_query(F.data.startswith("confirm_delete_cat_"))
-async def confirm_delete_category(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(CategoryDeleteCallback.filter(F.action == "confirm"))
+async def confirm_delete_category(callback: CallbackQuery, callback_data: CategoryDeleteCallback, state: FSMContext, db: AsyncSession):
     """Confirm category deletion"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Sizda admin huquqi yo'q", show_alert=True)
         return
     
     try:
-        category_id = int(callback.data.split("_")[-1])
+        category_id = callback_data.category_id
         
-        db = get_db_session()
-        try:
-            category = CategoryService.get_category_by_id(db, category_id)
-            
-            if not category:
-                await callback.answer("❌ Kategoriya topilmadi", show_alert=True)
-                await callback.message.edit_text(
-                    "❌ Kategoriya topilmadi.",
-                    reply_markup=None
-                )
-                await state.clear()
-                return
-            
-            # Double check for active toys
-            from database.models import Toy
-            active_toys_count = db.query(Toy).filter(
-                Toy.category_id == category.id,
-                Toy.is_active == True
-            ).count()
-            
-            if active_toys_count > 0:
-                await callback.answer(
-                    f"❌ Bu kategoriyada {active_toys_count} ta o'yinchoq mavjud",
-                    show_alert=True
-                )
-                await callback.message.edit_text(
-                    f"❌ Bu kategoriyada {active_toys_count} ta faol o'yinchoq mavjud.\n\n"
-                    f"Avval o'yinchoqlarni boshqa kategoriyaga o'tkazing.",
-                    reply_markup=None
-                )
-                await state.clear()
-                return
-            
-            # Deactivate category (soft delete)
-            category.is_active = False
-            db.commit()
-            
+        category = await CategoryService.get_category_by_id(db, category_id)
+        
+        if not category:
+            await callback.answer("❌ Kategoriya topilmadi", show_alert=True)
             await callback.message.edit_text(
-                f"🗑️ Kategoriya o'chirildi: <b>{category.name}</b>",
-                parse_mode="HTML",
+                "❌ Kategoriya topilmadi.",
                 reply_markup=None
             )
-            await callback.answer("✅ Kategoriya o'chirildi")
             await state.clear()
-            
-        finally:
-            db.close()
+            return
+        
+        # Double check for active toys
+        active_toys_count = await CategoryService.count_active_toys(db, category.id)
+        
+        if active_toys_count > 0:
+            await callback.answer(
+                f"❌ Bu kategoriyada {active_toys_count} ta o'yinchoq mavjud",
+                show_alert=True
+            )
+            await callback.message.edit_text(
+                f"❌ Bu kategoriyada {active_toys_count} ta faol o'yinchoq mavjud.\n\n"
+                f"Avval o'yinchoqlarni boshqa kategoriyaga o'tkazing.",
+                reply_markup=None
+            )
+            await state.clear()
+            return
+        
+        # Deactivate category (soft delete)
+        category.is_active = False
+        await db.flush()
+        
+        await callback.message.edit_text(
+            f"🗑️ Kategoriya o'chirildi: <b>{category.name}</b>",
+            parse_mode="HTML",
+            reply_markup=None
+        )
+        await callback.answer("✅ Kategoriya o'chirildi")
+        await state.clear()
+        
             
     except Exception as e:
         logger.error(f"Error deleting category: {e}", exc_info=True)
@@ -373,7 +348,7 @@ async def confirm_delete_category(callback: CallbackQuery, state: FSMContext):
         await state.clear()
 
 
-@router.callback_query(F.data == "cancel_delete_cat")
+@router.callback_query(CategoryDeleteCallback.filter(F.action == "cancel"))
 async def cancel_delete_category(callback: CallbackQuery, state: FSMContext):
     """Cancel category deletion"""
     await state.clear()
@@ -6,11 +6,11 @@ from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from keyboards.admin_kb import get_admin_menu_keyboard
 from keyboards.category_manage_kb import get_cancel_keyboard
 from services.order_contact_service import OrderContactService
-from database.db import get_db_session
 from config import ADMIN_IDS
 
 logger = logging.getLogger(__name__)
@@ -82,7 +82,7 @@ async def start_add_contact(message: Message, state: FSMContext):
 
 
 @router.message(AddContactStates.waiting_contact_value)
-async def process_contact_value(message: Message, state: FSMContext):
+async def process_contact_value(message: Message, state: FSMContext, db: AsyncSession):
     """Process contact value"""
     # Check for cancel
     if message.text == "❌ Bekor qilish":
@@ -113,10 +113,9 @@ async def process_contact_value(message: Message, state: FSMContext):
         )
         return
     
-    db = get_db_session()
     try:
         # Check for duplicates
-        existing = OrderContactService.get_contact_by_value(db, contact_value)
+        existing = await OrderContactService.get_contact_by_value(db, contact_value)
         if existing:
             await message.answer(
                 f"❌ Bu kontakt allaqachon mavjud.\n\n"
@@ -126,7 +125,7 @@ async def process_contact_value(message: Message, state: FSMContext):
             return
         
         # Create contact
-        contact = OrderContactService.create_contact(db, contact_value)
+        contact = await OrderContactService.create_contact(db, contact_value)
         
         contact_type = "💬 Username" if contact_value.startswith("@") else "☎️ Telefon"
         await message.answer(
@@ -143,20 +142,17 @@ async def process_contact_value(message: Message, state: FSMContext):
             reply_markup=get_admin_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
 
 
 @router.message(F.text == "🗑 Kontakt o'chirish")
-async def start_delete_contact(message: Message, state: FSMContext):
+async def start_delete_contact(message: Message, state: FSMContext, db: AsyncSession):
     """Start deleting a contact"""
     if not is_admin(message.from_user.id):
         await message.answer("❌ Sizda admin huquqi yo'q.")
         return
     
-    db = get_db_session()
     try:
-        contacts = OrderContactService.get_active_contacts(db)
+        contacts = await OrderContactService.get_active_contacts(db)
         
         if not contacts:
             await message.answer(
@@ -192,12 +188,10 @@ async def start_delete_contact(message: Message, state: FSMContext):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 @router.message(DeleteContactStates.waiting_contact_selection, F.text.startswith("📞 "))
-async def process_delete_contact(message: Message, state: FSMContext):
+async def process_delete_contact(message: Message, state: FSMContext, db: AsyncSession):
     """Process contact deletion"""
     # Check for cancel/back
     if message.text == "⬅️ Orqaga" or message.text == "🏠 Admin menyu":
@@ -216,9 +210,8 @@ async def process_delete_contact(message: Message, state: FSMContext):
     
     contact_value = message.text.replace("📞 ", "").strip()
     
-    db = get_db_session()
     try:
-        contact = OrderContactService.get_contact_by_value(db, contact_value)
+        contact = await OrderContactService.get_contact_by_value(db, contact_value)
         
         if not contact:
             await message.answer(
@@ -229,7 +222,7 @@ async def process_delete_contact(message: Message, state: FSMContext):
             return
         
         # Deactivate contact (soft delete)
-        deactivated = OrderContactService.deactivate_contact(db, contact.id)
+        deactivated = await OrderContactService.deactivate_contact(db, contact.id)
         
         if deactivated:
             await message.answer(
@@ -251,20 +244,17 @@ async def process_delete_contact(message: Message, state: FSMContext):
             reply_markup=get_admin_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
 
 
 @router.message(F.text == "📋 Kontaktlar ro'yxati")
-async def list_contacts(message: Message):
+async def list_contacts(message: Message, db: AsyncSession):
     """List all active contacts"""
     if not is_admin(message.from_user.id):
         await message.answer("❌ Sizda admin huquqi yo'q.")
         return
     
-    db = get_db_session()
     try:
-        contacts = OrderContactService.get_active_contacts(db)
+        contacts = await OrderContactService.get_active_contacts(db)
         contacts_text = OrderContactService.format_contacts_for_display(contacts)
         
         await message.answer(
@@ -278,8 +268,6 @@ async def list_contacts(message: Message):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 @router.message(F.text == "⬅️ Orqaga")
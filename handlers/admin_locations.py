@@ -5,12 +5,12 @@ import logging
 from aiogram import Router, F, Bot
 from aiogram.types import Message, Location
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from keyboards.admin_kb import get_admin_menu_keyboard
 from keyboards.store_kb import get_admin_store_menu_keyboard, get_store_list_keyboard
 from keyboards.category_manage_kb import get_cancel_keyboard
 from services.store_location_service import StoreLocationService
-from database.db import get_db_session
 from config import ADMIN_IDS
 from states.store_states import AddStoreLocationStates, DeleteStoreLocationStates
 
@@ -124,7 +124,7 @@ async def process_store_address(message: Message, state: FSMContext):
 
 
 @router.message(AddStoreLocationStates.waiting_location, F.location)
-async def process_location(message: Message, state: FSMContext):
+async def process_location(message: Message, state: FSMContext, db: AsyncSession):
     """Process Telegram location and save store location"""
     location = message.location
     
@@ -152,9 +152,8 @@ async def process_location(message: Message, state: FSMContext):
         await state.clear()
         return
     
-    db = get_db_session()
     try:
-        store_location = StoreLocationService.create_location(
+        store_location = await StoreLocationService.create_location(
             db,
             name=name,
             address_text=address_text,
@@ -178,12 +177,10 @@ async def process_location(message: Message, state: FSMContext):
             reply_markup=get_admin_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
 
 
 @router.message(AddStoreLocationStates.waiting_location)
-async def process_location_text(message: Message, state: FSMContext):
+async def process_location_text(message: Message, state: FSMContext, db: AsyncSession):
     """Process location as text (coordinates) - fallback option"""
     # Check for cancel
     if message.text == "❌ Bekor qilish":
@@ -224,9 +221,8 @@ async def process_location_text(message: Message, state: FSMContext):
                     await state.clear()
                     return
                 
-                db = get_db_session()
                 try:
-                    store_location = StoreLocationService.create_location(
+                    store_location = await StoreLocationService.create_location(
                         db,
                         name=name,
                         address_text=address_text,
@@ -250,8 +246,6 @@ async def process_location_text(message: Message, state: FSMContext):
                         reply_markup=get_admin_menu_keyboard()
                     )
                     await state.clear()
-                finally:
-                    db.close()
                 return
             except ValueError as e:
                 await message.answer(
@@ -277,15 +271,14 @@ async def process_location_text(message: Message, state: FSMContext):
 
 
 @router.message(F.text == "🗑 Manzil o'chirish")
-async def start_delete_store_location(message: Message, state: FSMContext):
+async def start_delete_store_location(message: Message, state: FSMContext, db: AsyncSession):
     """Start deleting a store location"""
     if not is_admin(message.from_user.id):
         await message.answer("❌ Sizda admin huquqi yo'q.")
         return
     
-    db = get_db_session()
     try:
-        stores = StoreLocationService.get_active_locations(db)
+        stores = await StoreLocationService.get_active_locations(db)
         
         if not stores:
             await message.answer(
@@ -308,12 +301,10 @@ async def start_delete_store_location(message: Message, state: FSMContext):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 @router.message(DeleteStoreLocationStates.waiting_location_selection, F.text.startswith("🏬 "))
-async def process_delete_store_location(message: Message, state: FSMContext):
+async def process_delete_store_location(message: Message, state: FSMContext, db: AsyncSession):
     """Process store location deletion"""
     # Check for cancel/back
     if message.text in ["⬅️ Orqaga", "🏠 Admin menyu", "🏠 Bosh menyu"]:
@@ -332,9 +323,8 @@ async def process_delete_store_location(message: Message, state: FSMContext):
     
     store_name = message.text.replace("🏬 ", "").strip()
     
-    db = get_db_session()
     try:
-        store = StoreLocationService.get_location_by_name(db, store_name)
+        store = await StoreLocationService.get_location_by_name(db, store_name)
         
         if not store:
             await message.answer(
@@ -345,7 +335,7 @@ async def process_delete_store_location(message: Message, state: FSMContext):
             return
         
         # Deactivate store (soft delete)
-        deactivated = StoreLocationService.deactivate_location(db, store.id)
+        deactivated = await StoreLocationService.deactivate_location(db, store.id)
         
         if deactivated:
             await message.answer(
@@ -367,20 +357,17 @@ async def process_delete_store_location(message: Message, state: FSMContext):
             reply_markup=get_admin_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
 
 
 @router.message(F.text == "📋 Manzillar ro'yxati")
-async def list_store_locations(message: Message):
+async def list_store_locations(message: Message, db: AsyncSession):
     """List all store locations"""
     if not is_admin(message.from_user.id):
         await message.answer("❌ Sizda admin huquqi yo'q.")
         return
     
-    db = get_db_session()
     try:
-        stores = StoreLocationService.get_active_locations(db)
+        stores = await StoreLocationService.get_active_locations(db)
         
         if not stores:
             await message.answer(
@@ -407,8 +394,6 @@ async def list_store_locations(message: Message):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_admin_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 @router.message(F.text == "⬅️ Orqaga")
@@ -5,11 +5,11 @@ import logging
 from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from keyboards.admin_kb import get_admin_menu_keyboard
 from keyboards.stats_kb import get_stats_menu_keyboard, get_time_range_keyboard
 from services.stats_service import StatsService
-from database.db import get_db_session
 from config import ADMIN_IDS
 from states.stats_states import StatsStates
 
@@ -63,7 +63,7 @@ async def select_toy_stats(message: Message, state: FSMContext):
 
 
 @router.message(StatsStates.select_time_range, F.text.in_(["📅 Haftalik", "📅 Oylik", "📅 Yillik"]))
-async def show_statistics(message: Message, state: FSMContext):
+async def show_statistics(message: Message, state: FSMContext, db: AsyncSession):
     """Show statistics for selected time range"""
     # Map text to time range
     time_range_map = {
@@ -84,13 +84,12 @@ async def show_statistics(message: Message, state: FSMContext):
     data = await state.get_data()
     stats_type = data.get("stats_type")
     
-    db = get_db_session()
     try:
         if stats_type == "category":
-            stats = StatsService.get_category_stats_by_time_range(db, time_range)
+            stats = await StatsService.get_category_stats_by_time_range(db, time_range)
             stats_text = StatsService.format_category_stats(stats, time_range)
         elif stats_type == "toy":
-            stats = StatsService.get_toy_stats_by_time_range(db, time_range)
+            stats = await StatsService.get_toy_stats_by_time_range(db, time_range)
             stats_text = StatsService.format_toy_stats(stats, time_range)
         else:
             await message.answer(
@@ -113,8 +112,6 @@ async def show_statistics(message: Message, state: FSMContext):
             reply_markup=get_admin_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
 
 
 @router.message(StatsStates.select_stats_type, F.text.in_(["⬅️ Orqaga", "🏠 Admin menyu"]))
@@ -7,7 +7,20 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from keyboards.callbacks import (
+    BACK_TO_CATEGORIES,
+    AddToCartCallback,
+    BackToCategoryCallback,
+    CallbackPrefixFilter,
+    CategoryCarouselCallback,
+    CategoryPageCallback,
+    FavoriteCallback,
+    OrderCallback,
+    ToyMediaCallback,
+    ToyPageCallback
+)
 from keyboards.user_kb import (
     get_main_menu_keyboard,
     get_categories_keyboard,
@@ -15,15 +28,19 @@ from keyboards.user_kb import (
     get_order_confirmation_keyboard
 )
 from services.catalog_service import CatalogService
-from services.category_service import CategoryService
 from services.order_contact_service import OrderContactService
 from services.stats_service import StatsService
 from services.favorites_service import FavoritesService
-from database.db import get_db_session
-from config import ADMIN_IDS
+from services.catalog_cache import catalog_cache
+from utils.captions import fit_caption
+from config import ADMIN_IDS, CATALOG_VIEW
 
 logger = logging.getLogger(__name__)
 router = Router()
+router.callback_query.filter(CallbackPrefixFilter(
+    CategoryPageCallback, CategoryCarouselCallback, ToyMediaCallback, ToyPageCallback,
+    OrderCallback, BACK_TO_CATEGORIES
+))
 
 
 class OrderStates(StatesGroup):
@@ -32,7 +49,7 @@ class OrderStates(StatesGroup):
 
 
 @router.message(CommandStart())
-async def cmd_start(message: Message):
+async def cmd_start(message: Message, db: AsyncSession):
     """Handle /start command"""
     # Check if start command has parameters (e.g., /start order_123)
     command_args = message.text.split(' ', 1)
@@ -47,28 +64,23 @@ async def cmd_start(message: Message):
                 toy_id = int(param.split("_")[1])
                 
                 # Get contacts from database
-                db = get_db_session()
-                try:
-                    contacts = OrderContactService.get_active_contacts(db)
-                    contact_text = OrderContactService.format_contacts_for_display(contacts)
+                contacts = await OrderContactService.get_active_contacts(db)
+                contact_text = OrderContactService.format_contacts_for_display(contacts)
+                
+                # Get toy info for logging
+                toy = await CatalogService.get_toy_by_id(db, toy_id)
+                if toy:
+                    category_id = toy.category_id if toy.category else None
+                    category_name = toy.category.name if toy.category else None
                     
-                    # Get toy info for logging
-                    toy = CatalogService.get_toy_by_id(db, toy_id)
-                    if toy:
-                        category_id = toy.category_id if toy.category else None
-                        category_name = toy.category.name if toy.category else None
-                        
-                        # Log sale lead
-                        StatsService.log_sale_lead(
-                            db=db,
-                            user_id=message.from_user.id,
-                            toy_id=toy_id,
-                            toy_name=toy.title,
-                            category_id=category_id,
-                            category_name=category_name
-                        )
-                finally:
-                    db.close()
+                    # Log sale lead
+                    StatsService.queue_sale_lead(
+                        user_id=message.from_user.id,
+                        toy_id=toy_id,
+                        toy_name=toy.title,
+                        category_id=category_id,
+                        category_name=category_name
+                    )
                 
                 order_text = (
                     f"🛒 <b>Buyurtma berish</b>\n\n"
@@ -121,11 +133,10 @@ async def go_back_from_categories(message: Message):
 
 
 @router.message(F.text == "📦 Katalog")
-async def show_categories(message: Message):
+async def show_categories(message: Message, db: AsyncSession):
     """Show categories list"""
-    db = get_db_session()
     try:
-        categories = CategoryService.get_active_categories(db)
+        categories = await catalog_cache.get_active_categories(db)
         
         if not categories:
             await message.answer(
@@ -148,18 +159,15 @@ async def show_categories(message: Message):
             "❌ Xatolik yuz berdi. Qayta urinib ko'ring.",
             reply_markup=get_main_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 @router.message(F.text.startswith("📂 ") & ~F.text.in_(["📂 Kategoriya qo'shish"]))
-async def show_category_toys(message: Message):
+async def show_category_toys(message: Message, db: AsyncSession):
     """Show paginated toys in selected category (10 per page)"""
     category_name = message.text.replace("📂 ", "").strip()
     
-    db = get_db_session()
     try:
-        category = CategoryService.get_category_by_name(db, category_name)
+        category = await catalog_cache.get_category_by_name(db, category_name)
         
         if not category or not category.is_active:
             await message.answer(
@@ -168,13 +176,14 @@ async def show_category_toys(message: Message):
             )
             return
         
-        # Get paginated toys for this category (page 0, 10 items per page)
+        # Get paginated toys for this category (page 0, 10 items per page, 1 in carousel)
         # IMPORTANT: This uses the service method which properly queries the database
-        toys, total_count = CatalogService.get_active_toys_by_category(
+        toys, total_count, favorite_ids = await CatalogService.get_category_page(
             db, 
             category_id=category.id, 
             page=0,  # Start from page 0
-            page_size=10
+            page_size=1 if CATALOG_VIEW == "carousel" else 10,
+            user_id=message.from_user.id
         )
         
         # Debug logging to verify products are found
@@ -183,10 +192,19 @@ async def show_category_toys(message: Message):
         if not toys:
             await message.answer(
                 f"😔 '{category.name}' kategoriyasida hozircha o'yinchoqlar yo'q.",
-                reply_markup=get_categories_keyboard(CategoryService.get_active_categories(db))
+                reply_markup=get_categories_keyboard(await catalog_cache.get_active_categories(db))
             )
             return
         
+        if CATALOG_VIEW == "carousel":
+            # One message per category, navigated by editing it (CategoryCarouselCallback)
+            toy = toys[0]
+            caption, media, keyboard = build_carousel_view(
+                toy, category.id, 0, total_count, is_favorite=toy.id in favorite_ids
+            )
+            await send_carousel_view(message, caption, media, keyboard)
+            return
+        
         # Show category header
         await message.answer(
             f"📦 <b>{category.name}</b>\n\n"
@@ -195,17 +213,11 @@ async def show_category_toys(message: Message):
             parse_mode="HTML"
         )
         
-        # Show each toy on this page
-        import asyncio
-        for idx, toy in enumerate(toys):
+        # Show each toy on this page (sends are paced by SendQueueMiddleware)
+        for toy in toys:
             try:
                 # Show toy (without individual pagination buttons, we'll add category pagination at the end)
-                await show_toy_for_category_page(message, toy, category.id, db=db)
-                
-                # Small delay between messages to avoid flood limit
-                if idx < len(toys) - 1:  # Don't delay after last toy
-                    await asyncio.sleep(0.3)
-                    
+                await show_toy_for_category_page(message, toy, category.id, is_favorite=toy.id in favorite_ids)
             except Exception as e:
                 logger.error(f"Error showing toy {toy.id}: {e}", exc_info=True)
                 # Continue with next toy even if one fails
@@ -231,194 +243,370 @@ async def show_category_toys(message: Message):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_main_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
-@router.callback_query(F.data.startswith("catpage:"))
-async def handle_category_pagination(callback: CallbackQuery):
+@router.callback_query(CategoryPageCallback.filter())
+async def handle_category_pagination(callback: CallbackQuery, callback_data: CategoryPageCallback, db: AsyncSession):
     """Handle category pagination - navigate between pages of products in a category"""
     try:
-        # Format: catpage:{category_id}:{page}
-        parts = callback.data.split(":")
-        if len(parts) != 3:
-            await callback.answer("❌ Xatolik", show_alert=True)
+        category_id = callback_data.category_id
+        page = callback_data.page  # 0-indexed
+        
+        category = await catalog_cache.get_category_by_id(db, category_id)
+        if not category:
+            await callback.answer("❌ Kategoriya topilmadi", show_alert=True)
             return
         
-        category_id = int(parts[1])
-        page = int(parts[2])  # 0-indexed
+        # Get paginated toys for this category and page
+        # IMPORTANT: This uses the service method which properly queries the database
+        toys, total_count, favorite_ids = await CatalogService.get_category_page(
+            db,
+            category_id=category_id,
+            page=page,
+            page_size=10,
+            user_id=callback.from_user.id
+        )
+        
+        # Debug logging
+        logger.info(f"Category {category_id} page {page}: Found {total_count} total toys, showing {len(toys)} on this page")
+        
+        if not toys:
+            await callback.answer("❌ O'yinchoqlar topilmadi", show_alert=True)
+            return
         
-        db = get_db_session()
+        # Delete previous pagination message if it exists
         try:
-            category = CategoryService.get_category_by_id(db, category_id)
-            if not category:
-                await callback.answer("❌ Kategoriya topilmadi", show_alert=True)
-                return
-            
-            # Get paginated toys for this category and page
-            # IMPORTANT: This uses the service method which properly queries the database
-            toys, total_count = CatalogService.get_active_toys_by_category(
-                db,
-                category_id=category_id,
-                page=page,
-                page_size=10
-            )
-            
-            # Debug logging
-            logger.info(f"Category {category_id} page {page}: Found {total_count} total toys, showing {len(toys)} on this page")
-            
-            if not toys:
-                await callback.answer("❌ O'yinchoqlar topilmadi", show_alert=True)
-                return
+            await callback.message.delete()
+        except:
+            pass
+        
+        # Calculate total pages
+        total_pages = (total_count + 9) // 10 if total_count > 0 else 1
+        current_page_display = page + 1  # Display as 1-indexed
+        
+        # Show category header
+        await callback.message.answer(
+            f"📦 <b>{category.name}</b>\n\n"
+            f"📄 Sahifa {current_page_display} / {total_pages}\n"
+            f"📊 Jami: {total_count} ta o'yinchoq",
+            parse_mode="HTML"
+        )
+        
+        # Show each toy on this page (sends are paced by SendQueueMiddleware)
+        for toy in toys:
+            try:
+                await show_toy_for_category_page(callback.message, toy, category_id, is_favorite=toy.id in favorite_ids)
+            except Exception as e:
+                logger.error(f"Error showing toy {toy.id}: {e}", exc_info=True)
+                continue
+        
+        # Add pagination keyboard at the end
+        from keyboards.category_pagination_kb import get_category_pagination_keyboard
+        pagination_kb = get_category_pagination_keyboard(
+            category_id=category_id,
+            page=page,
+            total_count=total_count,
+            page_size=10
+        )
+        
+        await callback.message.answer(
+            f"📄 Sahifa {current_page_display} / {total_pages}",
+            reply_markup=pagination_kb
+        )
+        
+        await callback.answer()
+        
             
-            # Delete previous pagination message if it exists
+    except (ValueError, IndexError) as e:
+        logger.error(f"Error in category pagination: {e}", exc_info=True)
+        await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
+
+
+def _carousel_media(toy):
+    """Pick the media shown for a toy in the carousel (first item, or legacy single media)"""
+    from aiogram.types import InputMediaPhoto, InputMediaVideo
+    
+    if toy.media_items:
+        first = toy.media_items[0]
+        if first.media_type == "photo":
+            return InputMediaPhoto
+        if first.media_type == "video":
+            return InputMediaVideo
+    if toy.media_file_id:
+        if toy.media_type == "image":
+            return InputMediaPhoto
+        if toy.media_type == "video":
+            return InputMediaVideo
+    return None
+
+
+def build_carousel_view(
+    toy,
+    category_id: int,
+    index: int,
+    total_count: int,
+    is_favorite: bool = False,
+    page_callback=CategoryCarouselCallback
+):
+    """
+    Build caption, media and keyboard for one carousel position
+    
+    page_callback selects the navigation handler: CategoryCarouselCallback for
+    a category, FavoritesCarouselCallback for the user's favorites.
+    
+    Returns:
+        Tuple of (caption, InputMedia or None, InlineKeyboardMarkup)
+    """
+    from aiogram.utils.keyboard import InlineKeyboardBuilder
+    from aiogram.types import InlineKeyboardButton
+    from keyboards.category_pagination_kb import get_category_pagination_keyboard
+    
+    category_name = toy.category.name if toy.category else "Kategoriyasiz"
+    # The same text is a photo/video caption, so it must fit the caption limit
+    caption = fit_caption(
+        f"📦 <b>{toy.title}</b>\n"
+        f"🧸 Kategoriya: {category_name}\n\n"
+        f"💰 Narxi: {toy.price}\n\n"
+        f"📝 ",
+        toy.description or "",
+        f"\n\n📄 {index + 1} / {total_count}"
+    )
+    
+    media = None
+    media_class = _carousel_media(toy)
+    if media_class:
+        file_id = toy.media_items[0].file_id if toy.media_items else toy.media_file_id
+        media = media_class(media=file_id, caption=caption, parse_mode="HTML")
+    
+    builder = InlineKeyboardBuilder()
+    builder.add(InlineKeyboardButton(
+        text="➕ Savatchaga qo'shish",
+        callback_data=AddToCartCallback(toy_id=toy.id).pack()
+    ))
+    if is_favorite:
+        builder.add(InlineKeyboardButton(
+            text="❤️ Sevimlilarda",
+            callback_data=FavoriteCallback(action="remove", toy_id=toy.id).pack()
+        ))
+    else:
+        builder.add(InlineKeyboardButton(
+            text="❤️ Sevimlilarga qo'shish",
+            callback_data=FavoriteCallback(action="add", toy_id=toy.id).pack()
+        ))
+    builder.add(InlineKeyboardButton(
+        text="🛒 Buyurtma berish",
+        callback_data=OrderCallback(action="start", toy_id=toy.id).pack()
+    ))
+    builder.adjust(2, 1)
+    
+    if len(toy.media_items) > 1:
+        builder.row(InlineKeyboardButton(
+            text=f"🖼 Barcha rasmlar ({len(toy.media_items)})",
+            callback_data=ToyMediaCallback(category_id=toy.category_id, toy_id=toy.id).pack()
+        ))
+    
+    # Same navigation keyboard as list pages, one toy per "page"
+    pagination_kb = get_category_pagination_keyboard(
+        category_id=category_id,
+        page=index,
+        total_count=total_count,
+        page_size=1,
+        page_callback=page_callback
+    )
+    builder.attach(InlineKeyboardBuilder.from_markup(pagination_kb))
+    
+    return caption, media, builder.as_markup()
+
+
+async def send_carousel_view(message: Message, caption: str, media, keyboard):
+    """Send a new carousel message"""
+    from aiogram.types import InputMediaPhoto
+    
+    if media is None:
+        await message.answer(caption, parse_mode="HTML", reply_markup=keyboard)
+    elif isinstance(media, InputMediaPhoto):
+        await message.answer_photo(photo=media.media, caption=caption, parse_mode="HTML", reply_markup=keyboard)
+    else:
+        await message.answer_video(video=media.media, caption=caption, parse_mode="HTML", reply_markup=keyboard)
+
+
+async def edit_card_text(message: Message, text: str, reply_markup=None):
+    """Replace the text of a toy card: a text message for toys without media, else its caption"""
+    if message.text is not None:
+        await message.edit_text(text, parse_mode="HTML", reply_markup=reply_markup)
+    else:
+        await message.edit_caption(caption=text, parse_mode="HTML", reply_markup=reply_markup)
+
+
+async def edit_carousel_view(message: Message, caption: str, media, keyboard):
+    """Show another carousel position by editing the carousel message"""
+    from aiogram.exceptions import TelegramBadRequest
+    
+    try:
+        if media is not None and (message.photo or message.video):
+            await message.edit_media(media=media, reply_markup=keyboard)
+        elif media is None and message.text:
+            await message.edit_text(caption, parse_mode="HTML", reply_markup=keyboard)
+        else:
+            # Text <-> media can't be switched by editing
             try:
-                await callback.message.delete()
-            except:
+                await message.delete()
+            except Exception:
                 pass
-            
-            # Calculate total pages
-            total_pages = (total_count + 9) // 10 if total_count > 0 else 1
-            current_page_display = page + 1  # Display as 1-indexed
-            
-            # Show category header
-            await callback.message.answer(
-                f"📦 <b>{category.name}</b>\n\n"
-                f"📄 Sahifa {current_page_display} / {total_pages}\n"
-                f"📊 Jami: {total_count} ta o'yinchoq",
-                parse_mode="HTML"
-            )
-            
-            # Show each toy on this page
-            import asyncio
-            for idx, toy in enumerate(toys):
-                try:
-                    await show_toy_for_category_page(callback.message, toy, category_id, db=db)
-                    
-                    # Small delay between messages
-                    if idx < len(toys) - 1:
-                        await asyncio.sleep(0.3)
-                        
-                except Exception as e:
-                    logger.error(f"Error showing toy {toy.id}: {e}", exc_info=True)
-                    continue
-            
-            # Add pagination keyboard at the end
-            from keyboards.category_pagination_kb import get_category_pagination_keyboard
-            pagination_kb = get_category_pagination_keyboard(
+            await send_carousel_view(message, caption, media, keyboard)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+
+
+@router.callback_query(CategoryCarouselCallback.filter())
+async def handle_category_carousel(callback: CallbackQuery, callback_data: CategoryCarouselCallback, db: AsyncSession):
+    """Move the category carousel to another toy by editing the same message"""
+    try:
+        category_id = callback_data.category_id
+        index = max(0, callback_data.page)
+        
+        toys, total_count, favorite_ids = await CatalogService.get_category_page(
+            db,
+            category_id=category_id,
+            page=index,
+            page_size=1,
+            user_id=callback.from_user.id
+        )
+        if not toys and total_count > 0:
+            # Catalog shrank since the keyboard was built, show the last toy
+            index = total_count - 1
+            toys, total_count, favorite_ids = await CatalogService.get_category_page(
+                db,
                 category_id=category_id,
-                page=page,
-                total_count=total_count,
-                page_size=10
-            )
-            
-            await callback.message.answer(
-                f"📄 Sahifa {current_page_display} / {total_pages}",
-                reply_markup=pagination_kb
+                page=index,
+                page_size=1,
+                user_id=callback.from_user.id
             )
-            
-            await callback.answer()
-            
-        finally:
-            db.close()
-            
+        
+        if not toys:
+            await callback.answer("❌ O'yinchoqlar topilmadi", show_alert=True)
+            return
+        
+        toy = toys[0]
+        caption, media, keyboard = build_carousel_view(
+            toy, category_id, index, total_count, is_favorite=toy.id in favorite_ids
+        )
+        
+        await edit_carousel_view(callback.message, caption, media, keyboard)
+        await callback.answer()
+        
     except (ValueError, IndexError) as e:
-        logger.error(f"Error in category pagination: {e}", exc_info=True)
+        logger.error(f"Error in category carousel: {e}", exc_info=True)
+        await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
+    except Exception as e:
+        logger.error(f"Error showing carousel toy: {e}", exc_info=True)
+        await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
+
+
+@router.callback_query(ToyMediaCallback.filter())
+async def handle_carousel_all_media(callback: CallbackQuery, callback_data: ToyMediaCallback, db: AsyncSession):
+    """Send all photos/videos of a carousel toy as one album"""
+    from services.media_service import MediaService
+    
+    try:
+        toys = await catalog_cache.get_active_toys_by_category(db, callback_data.category_id)
+        toy = next((t for t in toys if t.id == callback_data.toy_id), None)
+        
+        if not toy or not toy.media_items:
+            await callback.answer("❌ Bu o'yinchoq topilmadi", show_alert=True)
+            return
+        
+        await callback.message.answer_media_group(
+            media=MediaService.get_media_for_media_group(toy.media_items[:10])
+        )
+        await callback.answer()
+        
+    except Exception as e:
+        logger.error(f"Error sending toy media: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data == "back_to_categories")
-async def back_to_categories(callback: CallbackQuery):
+@router.callback_query(F.data == BACK_TO_CATEGORIES)
+async def back_to_categories(callback: CallbackQuery, db: AsyncSession):
     """Go back to category list from pagination"""
     try:
-        db = get_db_session()
-        try:
-            categories = CategoryService.get_active_categories(db)
-            
-            if not categories:
-                await callback.message.answer(
-                    "❌ Hozircha kategoriyalar mavjud emas.",
-                    reply_markup=get_main_menu_keyboard()
-                )
-                await callback.answer()
-                return
-            
-            # Delete current message
-            try:
-                await callback.message.delete()
-            except:
-                pass
-            
+        categories = await catalog_cache.get_active_categories(db)
+        
+        if not categories:
             await callback.message.answer(
-                "📂 <b>Kategoriyalarni tanlang:</b>",
-                parse_mode="HTML",
-                reply_markup=get_categories_keyboard(categories)
+                "❌ Hozircha kategoriyalar mavjud emas.",
+                reply_markup=get_main_menu_keyboard()
             )
             await callback.answer()
-            
-        finally:
-            db.close()
+            return
+        
+        # Delete current message
+        try:
+            await callback.message.delete()
+        except:
+            pass
+        
+        await callback.message.answer(
+            "📂 <b>Kategoriyalarni tanlang:</b>",
+            parse_mode="HTML",
+            reply_markup=get_categories_keyboard(categories)
+        )
+        await callback.answer()
+        
             
     except Exception as e:
         logger.error(f"Error going back to categories: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("toy_page_"))
-async def handle_toy_pagination(callback: CallbackQuery):
+@router.callback_query(ToyPageCallback.filter())
+async def handle_toy_pagination(callback: CallbackQuery, callback_data: ToyPageCallback, db: AsyncSession):
     """Handle toy pagination - navigate between individual toys (legacy, kept for backward compatibility)"""
     try:
-        # Format: toy_page_{category_id}_{page}
-        parts = callback.data.split("_")
-        category_id = int(parts[2])
-        page = int(parts[3])
+        category_id = callback_data.category_id
+        page = callback_data.page
+        
+        category = await catalog_cache.get_category_by_id(db, category_id)
+        if not category:
+            await callback.answer("❌ Kategoriya topilmadi", show_alert=True)
+            return
+        
+        # Get ALL toys for this category (ordered)
+        all_toys = await catalog_cache.get_active_toys_by_category(db, category_id)
+        
+        if not all_toys:
+            await callback.answer("❌ O'yinchoqlar topilmadi", show_alert=True)
+            return
+        
+        total_pages = len(all_toys)
+        
+        # Validate page number
+        if page < 1:
+            page = 1
+        elif page > total_pages:
+            page = total_pages
+        
+        # Get toy at current page (1-indexed, so subtract 1)
+        toy = all_toys[page - 1]
+        
+        # Show toy with pagination
+        await show_toy(callback, toy, category_id, page, total_pages, category_id, db=db)
+        await callback.answer()
         
-        db = get_db_session()
-        try:
-            category = CategoryService.get_category_by_id(db, category_id)
-            if not category:
-                await callback.answer("❌ Kategoriya topilmadi", show_alert=True)
-                return
-            
-            # Get ALL toys for this category (ordered)
-            all_toys = db.query(Toy).filter(
-                Toy.is_active == True,
-                Toy.category_id == category_id
-            ).order_by(
-                Toy.created_at.desc()
-            ).all()
-            
-            if not all_toys:
-                await callback.answer("❌ O'yinchoqlar topilmadi", show_alert=True)
-                return
-            
-            total_pages = len(all_toys)
-            
-            # Validate page number
-            if page < 1:
-                page = 1
-            elif page > total_pages:
-                page = total_pages
-            
-            # Get toy at current page (1-indexed, so subtract 1)
-            toy = all_toys[page - 1]
-            
-            # Show toy with pagination
-            await show_toy(callback, toy, category_id, page, total_pages, category_id, db=db)
-            await callback.answer()
-            
-        finally:
-            db.close()
             
     except (ValueError, IndexError) as e:
         logger.error(f"Error in pagination: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-async def show_toy_for_category_page(message: Message, toy, category_id: int, db=None):
+async def show_toy_for_category_page(message: Message, toy, category_id: int, is_favorite: bool = False):
     """
     Display a toy for category page view (without individual toy pagination)
     Shows only cart/favorites/buy buttons, no toy-level pagination
+    
+    Expects toy.category and toy.media_items to be loaded already
+    (see CatalogService.get_category_page), so no queries are made here.
     """
     from services.media_service import MediaService
     
@@ -431,15 +619,8 @@ async def show_toy_for_category_page(message: Message, toy, category_id: int, db
         f"📝 {toy.description}"
     )
     
-    # Get user ID for favorites check
-    user_id = message.from_user.id if message.from_user else None
     bot = message.bot
     
-    if user_id and db:
-        is_favorite = FavoritesService.get_favorite(db, user_id, toy.id) is not None
-    else:
-        is_favorite = False
-    
     # Build keyboard (only cart/favorites/buy, no pagination)
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     from aiogram.types import InlineKeyboardButton
@@ -449,31 +630,31 @@ async def show_toy_for_category_page(message: Message, toy, category_id: int, db
     # Cart and favorites buttons
     builder.add(InlineKeyboardButton(
         text="➕ Savatchaga qo'shish",
-        callback_data=f"add_to_cart_{toy.id}"
+        callback_data=AddToCartCallback(toy_id=toy.id).pack()
     ))
     
     if is_favorite:
         builder.add(InlineKeyboardButton(
             text="❤️ Sevimlilarda",
-            callback_data=f"remove_from_favorites_{toy.id}"
+            callback_data=FavoriteCallback(action="remove", toy_id=toy.id).pack()
         ))
     else:
         builder.add(InlineKeyboardButton(
             text="❤️ Sevimlilarga qo'shish",
-            callback_data=f"add_to_favorites_{toy.id}"
+            callback_data=FavoriteCallback(action="add", toy_id=toy.id).pack()
         ))
     
     # Buy button
     builder.add(InlineKeyboardButton(
         text="🛒 Buyurtma berish",
-        callback_data=f"order_{toy.id}"
+        callback_data=OrderCallback(action="start", toy_id=toy.id).pack()
     ))
     
     toy_keyboard = builder.as_markup()
     
     # Check if toy has multiple media (new system)
-    if db and bot:
-        toy_media = MediaService.get_toy_media(db, toy.id)
+    if bot:
+        toy_media = toy.media_items
         
         if toy_media and len(toy_media) > 0:
             # Use media group with caption on first media
@@ -566,7 +747,7 @@ async def show_toy(message_or_callback, toy, category_id: int, page: int, total_
         message = message_or_callback
     
     if user_id and db:
-        is_favorite = FavoritesService.get_favorite(db, user_id, toy.id) is not None
+        is_favorite = toy.id in await FavoritesService.favorites_for(db, user_id, [toy.id])
     else:
         is_favorite = False
     
@@ -581,12 +762,12 @@ async def show_toy(message_or_callback, toy, category_id: int, page: int, total_
     if page > 1:
         nav_buttons.append(InlineKeyboardButton(
             text="⬅️ Oldingi",
-            callback_data=f"toy_page_{cat_id}_{page - 1}"
+            callback_data=ToyPageCallback(category_id=cat_id, page=page - 1).pack()
         ))
     if page < total_pages:
         nav_buttons.append(InlineKeyboardButton(
             text="Keyingi ➡️",
-            callback_data=f"toy_page_{cat_id}_{page + 1}"
+            callback_data=ToyPageCallback(category_id=cat_id, page=page + 1).pack()
         ))
     
     if nav_buttons:
@@ -595,37 +776,37 @@ async def show_toy(message_or_callback, toy, category_id: int, page: int, total_
     # Cart and favorites buttons
     builder.add(InlineKeyboardButton(
         text="➕ Savatchaga qo'shish",
-        callback_data=f"add_to_cart_{toy.id}"
+        callback_data=AddToCartCallback(toy_id=toy.id).pack()
     ))
     
     if is_favorite:
         builder.add(InlineKeyboardButton(
             text="❤️ Sevimlilarda",
-            callback_data=f"remove_from_favorites_{toy.id}"
+            callback_data=FavoriteCallback(action="remove", toy_id=toy.id).pack()
         ))
     else:
         builder.add(InlineKeyboardButton(
             text="❤️ Sevimlilarga qo'shish",
-            callback_data=f"add_to_favorites_{toy.id}"
+            callback_data=FavoriteCallback(action="add", toy_id=toy.id).pack()
         ))
     
     # Buy button
     builder.add(InlineKeyboardButton(
         text="🛒 Buyurtma berish",
-        callback_data=f"order_{toy.id}"
+        callback_data=OrderCallback(action="start", toy_id=toy.id).pack()
     ))
     
     # Back button
     builder.add(InlineKeyboardButton(
         text="⬅️ Orqaga",
-        callback_data=f"back_to_category_{cat_id}"
+        callback_data=BackToCategoryCallback(category_id=cat_id).pack()
     ))
     
     combined_keyboard = builder.as_markup()
     
     # Check if toy has multiple media (new system)
-    if db and bot:
-        toy_media = MediaService.get_toy_media(db, toy.id)
+    if bot:
+        toy_media = toy.media_items
         
         if toy_media and len(toy_media) > 0:
             # Use media group with caption on first media
@@ -726,78 +907,64 @@ async def show_toy(message_or_callback, toy, category_id: int, page: int, total_
 
 
 
-@router.callback_query(F.data.startswith("order_"))
-async def handle_order(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(OrderCallback.filter(F.action == "start"))
+async def handle_order(callback: CallbackQuery, callback_data: OrderCallback, state: FSMContext, db: AsyncSession):
     """Handle order request"""
     try:
-        toy_id = int(callback.data.split("_")[1])
+        toy_id = callback_data.toy_id
         
-        db = get_db_session()
-        try:
-            toy = CatalogService.get_toy_by_id(db, toy_id)
-            if not toy or not toy.is_active:
-                await callback.answer("❌ Bu o'yinchoq topilmadi", show_alert=True)
-                return
-            
-            # Store toy info in state
-            await state.update_data(toy_id=toy_id, toy_title=toy.title)
-            await state.set_state(OrderStates.waiting_confirmation)
-            
-            order_text = (
-                f"🛒 Buyurtma berish\n\n"
-                f"📦 O'yinchoq: <b>{toy.title}</b>\n"
-                f"💰 Narxi: {toy.price}\n\n"
-                f"Buyurtmani tasdiqlaysizmi?"
-            )
-            
-            await callback.message.edit_caption(
-                caption=order_text,
-                parse_mode="HTML",
-                reply_markup=get_order_confirmation_keyboard(toy_id)
-            )
-            await callback.answer()
-            
-        finally:
-            db.close()
-            
-    except (ValueError, IndexError) as e:
-        logger.error(f"Error in handle_order: {e}")
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
+        if not toy or not toy.is_active:
+            await callback.answer("❌ Bu o'yinchoq topilmadi", show_alert=True)
+            return
+        
+        # Store toy info in state
+        await state.update_data(toy_id=toy_id, toy_title=toy.title)
+        await state.set_state(OrderStates.waiting_confirmation)
+        
+        order_text = (
+            f"🛒 Buyurtma berish\n\n"
+            f"📦 O'yinchoq: <b>{toy.title}</b>\n"
+            f"💰 Narxi: {toy.price}\n\n"
+            f"Buyurtmani tasdiqlaysizmi?"
+        )
+        
+        await edit_card_text(callback.message, order_text, get_order_confirmation_keyboard(toy_id))
+        await callback.answer()
+        
+    except Exception as e:
+        logger.error(f"Error in handle_order: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("confirm_order_"))
-async def confirm_order(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(OrderCallback.filter(F.action == "confirm"))
+async def confirm_order(callback: CallbackQuery, callback_data: OrderCallback, state: FSMContext, db: AsyncSession):
     """Confirm order and provide contact information"""
     try:
-        toy_id = int(callback.data.split("_")[2])
+        toy_id = callback_data.toy_id
         user_id = callback.from_user.id
         
         data = await state.get_data()
         toy_title = data.get("toy_title", "O'yinchoq")
         
         # Get contacts from database
-        db = get_db_session()
-        try:
-            contacts = OrderContactService.get_active_contacts(db)
-            contact_text = OrderContactService.format_contacts_for_display(contacts)
+        contacts = await OrderContactService.get_active_contacts(db)
+        contact_text = OrderContactService.format_contacts_for_display(contacts)
+        
+        # Get toy info for logging
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
+        if toy:
+            category_id = toy.category_id if toy.category else None
+            category_name = toy.category.name if toy.category else None
             
-            # Get toy info for logging
-            toy = CatalogService.get_toy_by_id(db, toy_id)
-            if toy:
-                category_id = toy.category_id if toy.category else None
-                category_name = toy.category.name if toy.category else None
-                
-                # Log sale lead
-                StatsService.log_sale_lead(
-                    db=db,
-                    user_id=user_id,
-                    toy_id=toy_id,
-                    toy_name=toy.title,
-                    category_id=category_id,
-                    category_name=category_name
-                )
-        finally:
-            db.close()
+            # Log sale lead
+            StatsService.queue_sale_lead(
+                user_id=user_id,
+                toy_id=toy_id,
+                toy_name=toy.title,
+                category_id=category_id,
+                category_name=category_name
+            )
         
         # Check if contacts are available
         if not contacts or contact_text == "❌ Hozircha buyurtma uchun kontaktlar mavjud emas":
@@ -815,11 +982,7 @@ async def confirm_order(callback: CallbackQuery, state: FSMContext):
                 f"Tez orada siz bilan bog'lanamiz! 😊"
             )
         
-        await callback.message.edit_caption(
-            caption=confirmation_text,
-            parse_mode="HTML",
-            reply_markup=None
-        )
+        await edit_card_text(callback.message, confirmation_text)
         
         await state.clear()
         await callback.answer("✅ Buyurtma qabul qilindi!")
@@ -829,38 +992,31 @@ async def confirm_order(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("order_from_ad_"))
-async def handle_order_from_ad(callback: CallbackQuery):
+@router.callback_query(OrderCallback.filter(F.action == "ad"))
+async def handle_order_from_ad(callback: CallbackQuery, callback_data: OrderCallback, db: AsyncSession):
     """Handle order button from advertisement"""
     try:
         user_id = callback.from_user.id
-        
-        # Extract toy_id from callback data
-        toy_id = int(callback.data.split("_")[-1])
+        toy_id = callback_data.toy_id
         
         # Get contacts from database
-        db = get_db_session()
-        try:
-            contacts = OrderContactService.get_active_contacts(db)
-            contact_text = OrderContactService.format_contacts_for_display(contacts)
+        contacts = await OrderContactService.get_active_contacts(db)
+        contact_text = OrderContactService.format_contacts_for_display(contacts)
+        
+        # Get toy info for logging
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
+        if toy:
+            category_id = toy.category_id if toy.category else None
+            category_name = toy.category.name if toy.category else None
             
-            # Get toy info for logging
-            toy = CatalogService.get_toy_by_id(db, toy_id)
-            if toy:
-                category_id = toy.category_id if toy.category else None
-                category_name = toy.category.name if toy.category else None
-                
-                # Log sale lead
-                StatsService.log_sale_lead(
-                    db=db,
-                    user_id=user_id,
-                    toy_id=toy_id,
-                    toy_name=toy.title,
-                    category_id=category_id,
-                    category_name=category_name
-                )
-        finally:
-            db.close()
+            # Log sale lead
+            StatsService.queue_sale_lead(
+                user_id=user_id,
+                toy_id=toy_id,
+                toy_name=toy.title,
+                category_id=category_id,
+                category_name=category_name
+            )
         
         order_text = (
             f"🛒 <b>Buyurtma berish</b>\n\n"
@@ -874,15 +1030,12 @@ async def handle_order_from_ad(callback: CallbackQuery):
         )
         await callback.answer("📞 Kontaktlar yuborildi")
         
-    except (ValueError, IndexError) as e:
-        logger.error(f"Error parsing order_from_ad callback: {e}", exc_info=True)
-        await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
     except Exception as e:
         logger.error(f"Error in handle_order_from_ad: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data == "cancel_order")
+@router.callback_query(OrderCallback.filter(F.action == "cancel"))
 async def cancel_order(callback: CallbackQuery, state: FSMContext):
     """Cancel order"""
     await state.clear()
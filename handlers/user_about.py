@@ -4,6 +4,7 @@ User handlers for About Us section
 import logging
 from aiogram import Router, F
 from aiogram.types import Message
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from keyboards.user_kb import get_main_menu_keyboard
 
@@ -33,14 +34,12 @@ async def show_about_us(message: Message):
 
 
 @router.message(F.text == "📞 Bog'lanish")
-async def show_contact_info(message: Message):
+async def show_contact_info(message: Message, db: AsyncSession):
     """Show contact information"""
     from services.order_contact_service import OrderContactService
-    from database.db import get_db_session
-    
-    db = get_db_session()
+        
     try:
-        contacts = OrderContactService.get_active_contacts(db)
+        contacts = await OrderContactService.get_active_contacts(db)
         contact_text = OrderContactService.format_contacts_for_display(contacts)
         
         await message.answer(
@@ -55,5 +54,3 @@ async def show_contact_info(message: Message):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_main_menu_keyboard()
         )
-    finally:
-        db.close()
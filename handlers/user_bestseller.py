@@ -6,11 +6,11 @@ from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from keyboards.user_kb import get_main_menu_keyboard
 from keyboards.bestseller_kb import get_period_keyboard
 from services.bestseller_generator import BestsellerGenerator
-from database.db import get_db_session
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -34,7 +34,7 @@ async def show_bestseller_periods(message: Message, state: FSMContext):
 
 
 @router.message(BestsellerViewStates.waiting_period, F.text.in_(["📅 Haftalik", "📅 Oylik", "📅 Yillik"]))
-async def show_bestsellers(message: Message, state: FSMContext):
+async def show_bestsellers(message: Message, state: FSMContext, db: AsyncSession):
     """Show bestsellers for selected period"""
     # Check for cancel/back
     if message.text in ["⬅️ Orqaga", "🏠 Admin menyu", "🏠 Bosh menyu"]:
@@ -60,9 +60,8 @@ async def show_bestsellers(message: Message, state: FSMContext):
         await state.clear()
         return
     
-    db = get_db_session()
     try:
-        bestsellers = BestsellerGenerator.get_bestsellers(db, period)
+        bestsellers = await BestsellerGenerator.get_bestsellers(db, period)
         bestsellers_text = BestsellerGenerator.format_bestsellers_for_display(bestsellers, period)
         
         await message.answer(
@@ -78,8 +77,6 @@ async def show_bestsellers(message: Message, state: FSMContext):
             reply_markup=get_main_menu_keyboard()
         )
         await state.clear()
-    finally:
-        db.close()
 
 
 @router.message(BestsellerViewStates.waiting_period, F.text.in_(["⬅️ Orqaga", "🏠 Bosh menyu"]))
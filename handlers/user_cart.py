@@ -3,36 +3,39 @@ User handlers for shopping cart
 """
 import logging
 from aiogram import Router, F, Bot
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import Message, CallbackQuery
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from keyboards.callbacks import AddToCartCallback, CallbackPrefixFilter, CartCallback, CartPageCallback
 from keyboards.user_kb import get_main_menu_keyboard
-from keyboards.cart_kb import get_cart_actions_keyboard
+from keyboards.cart_kb import cart_page_of, get_cart_actions_keyboard
 from keyboards.toy_inline_kb import get_toy_actions_keyboard
+from services.cart_cache import apply_cart_changes
 from services.cart_service import CartService
 from services.catalog_service import CatalogService
 from services.favorites_service import FavoritesService
 from services.order_contact_service import OrderContactService
-from database.db import get_db_session
 
 logger = logging.getLogger(__name__)
 router = Router()
+router.callback_query.filter(CallbackPrefixFilter(AddToCartCallback, CartCallback, CartPageCallback))
 
 
 @router.message(F.text == "🛒 Savatcha")
-async def show_cart(message: Message):
+async def show_cart(message: Message, db: AsyncSession):
     """Show user's shopping cart"""
     user_id = message.from_user.id
     
-    db = get_db_session()
     try:
-        cart_items = CartService.get_user_cart(db, user_id)
+        cart_items = await CartService.get_user_cart(db, user_id)
         cart_text = CartService.format_cart_for_display(cart_items)
         
         if cart_items:
             await message.answer(
                 cart_text,
                 parse_mode="HTML",
-                reply_markup=get_cart_actions_keyboard()
+                reply_markup=get_cart_actions_keyboard(cart_items)
             )
         else:
             await message.answer(
@@ -46,166 +49,211 @@ async def show_cart(message: Message):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_main_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
-@router.callback_query(F.data.startswith("add_to_cart_"))
-async def add_to_cart(callback: CallbackQuery):
+@router.callback_query(AddToCartCallback.filter())
+async def add_to_cart(callback: CallbackQuery, callback_data: AddToCartCallback, db: AsyncSession):
     """Add toy to cart"""
     try:
-        toy_id = int(callback.data.split("_")[-1])
+        toy_id = callback_data.toy_id
         user_id = callback.from_user.id
         
-        db = get_db_session()
-        try:
-            toy = CatalogService.get_toy_by_id(db, toy_id)
-            if not toy or not toy.is_active:
-                await callback.answer("❌ Bu o'yinchoq topilmadi", show_alert=True)
-                return
-            
-            # Add to cart
-            cart_item = CartService.add_to_cart(
-                db,
-                user_id=user_id,
-                toy_id=toy_id,
-                toy_name=toy.title,
-                price=toy.price
-            )
-            
-            await callback.answer("✅ O'yinchoq savatchaga qo'shildi!")
-            
-        finally:
-            db.close()
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
+        if not toy or not toy.is_active:
+            await callback.answer("❌ Bu o'yinchoq topilmadi", show_alert=True)
+            return
+        
+        # Add to cart
+        cart_item = await CartService.add_to_cart(
+            db,
+            user_id=user_id,
+            toy_id=toy_id,
+            toy_name=toy.title,
+            price=toy.price
+        )
+        # Commit before replying so the write transaction is not held during the send
+        await db.commit()
+        
+        await callback.answer("✅ O'yinchoq savatchaga qo'shildi!")
+        
             
     except Exception as e:
         logger.error(f"Error adding to cart: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("remove_from_cart_"))
-async def remove_from_cart(callback: CallbackQuery):
+async def edit_cart_message(callback: CallbackQuery, cart_items, page: int = 0) -> None:
+    """Re-render the cart message in place (one edit_text call) on a keyboard page"""
+    cart_text = CartService.format_cart_for_display(cart_items)
+    try:
+        await callback.message.edit_text(
+            cart_text,
+            parse_mode="HTML",
+            reply_markup=get_cart_actions_keyboard(cart_items, page) if cart_items else None
+        )
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+
+
+@router.callback_query(CartCallback.filter(F.action.in_({"inc", "dec"})))
+async def change_cart_quantity(callback: CallbackQuery, callback_data: CartCallback, db: AsyncSession):
+    """Increase or decrease a cart line (➖ on quantity 1 removes the line)"""
+    try:
+        delta = 1 if callback_data.action == "inc" else -1
+        cart_item_id = callback_data.item_id
+        user_id = callback.from_user.id
+        
+        # Current cart comes from the cart cache; the tap costs one write
+        cart_items = await CartService.get_user_cart(db, user_id)
+        current = next((item for item in cart_items if item.id == cart_item_id), None)
+        page = cart_page_of(cart_items, cart_item_id)
+        
+        item = None
+        if not current or current.quantity + delta >= 1:
+            item = await CartService.change_quantity(db, cart_item_id, user_id, delta)
+        
+        if item:
+            cart_items = apply_cart_changes(cart_items, [("upsert", item)])
+        elif delta < 0 and await CartService.remove_from_cart(db, cart_item_id, user_id):
+            cart_items = apply_cart_changes(cart_items, [("remove", cart_item_id)])
+        else:
+            await callback.answer("❌ Bu o'yinchoq savatchada topilmadi", show_alert=True)
+            return
+        
+        await db.commit()
+        await edit_cart_message(callback, cart_items, page)
+        await callback.answer()
+        
+    except Exception as e:
+        logger.error(f"Error changing cart quantity: {e}", exc_info=True)
+        await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
+
+
+@router.callback_query(CartPageCallback.filter())
+async def show_cart_page(callback: CallbackQuery, callback_data: CartPageCallback, db: AsyncSession):
+    """Show another page of the cart keyboard"""
+    try:
+        cart_items = await CartService.get_user_cart(db, callback.from_user.id)
+        if not cart_items:
+            await callback.answer("❌ Savatcha bo'sh", show_alert=True)
+            return
+        
+        await edit_cart_message(callback, cart_items, callback_data.page)
+        await callback.answer()
+        
+    except Exception as e:
+        logger.error(f"Error showing cart page: {e}", exc_info=True)
+        await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
+
+
+@router.callback_query(CartCallback.filter(F.action == "noop"))
+async def cart_noop(callback: CallbackQuery):
+    """Quantity label button (does nothing)"""
+    await callback.answer()
+
+
+@router.callback_query(CartCallback.filter(F.action == "remove"))
+async def remove_from_cart(callback: CallbackQuery, callback_data: CartCallback, db: AsyncSession):
     """Remove item from cart"""
     try:
-        cart_item_id = int(callback.data.split("_")[-1])
+        cart_item_id = callback_data.item_id
         user_id = callback.from_user.id
         
-        db = get_db_session()
-        try:
-            success = CartService.remove_from_cart(db, cart_item_id, user_id)
+        cart_items = await CartService.get_user_cart(db, user_id)
+        page = cart_page_of(cart_items, cart_item_id)
+        success = await CartService.remove_from_cart(db, cart_item_id, user_id)
+        
+        if success:
+            await db.commit()
+            # Refresh cart view in place
+            cart_items = apply_cart_changes(cart_items, [("remove", cart_item_id)])
+            await edit_cart_message(callback, cart_items, page)
+            await callback.answer("✅ O'chirildi")
+        else:
+            await callback.answer("❌ Xatolik", show_alert=True)
             
-            if success:
-                # Refresh cart view
-                cart_items = CartService.get_user_cart(db, user_id)
-                cart_text = CartService.format_cart_for_display(cart_items)
-                
-                if cart_items:
-                    from keyboards.cart_kb import get_cart_actions_keyboard
-                    await callback.message.edit_text(
-                        cart_text,
-                        parse_mode="HTML",
-                        reply_markup=get_cart_actions_keyboard()
-                    )
-                else:
-                    await callback.message.edit_text(
-                        cart_text,
-                        parse_mode="HTML"
-                    )
-                
-                await callback.answer("✅ O'chirildi")
-            else:
-                await callback.answer("❌ Xatolik", show_alert=True)
-                
-        finally:
-            db.close()
             
     except Exception as e:
         logger.error(f"Error removing from cart: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data == "clear_cart")
-async def clear_cart(callback: CallbackQuery):
+@router.callback_query(CartCallback.filter(F.action == "clear"))
+async def clear_cart(callback: CallbackQuery, db: AsyncSession):
     """Clear entire cart"""
     try:
         user_id = callback.from_user.id
         
-        db = get_db_session()
-        try:
-            count = CartService.clear_cart(db, user_id)
+        count = await CartService.clear_cart(db, user_id)
+        await db.commit()
+        
+        if count > 0:
+            await callback.message.edit_text(
+                f"🗑️ Savatcha tozalandi!\n\n"
+                f"❌ Savatcha bo'sh",
+                parse_mode="HTML"
+            )
+            await callback.answer(f"✅ {count} ta o'yinchoq o'chirildi")
+        else:
+            await callback.answer("ℹ️ Savatcha allaqachon bo'sh", show_alert=True)
             
-            if count > 0:
-                await callback.message.edit_text(
-                    f"🗑️ Savatcha tozalandi!\n\n"
-                    f"❌ Savatcha bo'sh",
-                    parse_mode="HTML"
-                )
-                await callback.answer(f"✅ {count} ta o'yinchoq o'chirildi")
-            else:
-                await callback.answer("ℹ️ Savatcha allaqachon bo'sh", show_alert=True)
-                
-        finally:
-            db.close()
             
     except Exception as e:
         logger.error(f"Error clearing cart: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data == "order_from_cart")
-async def order_from_cart(callback: CallbackQuery):
+@router.callback_query(CartCallback.filter(F.action == "checkout"))
+async def order_from_cart(callback: CallbackQuery, db: AsyncSession):
     """Proceed to order from cart"""
     try:
         user_id = callback.from_user.id
         
-        db = get_db_session()
+        cart_items = await CartService.get_user_cart(db, user_id)
+        
+        if not cart_items:
+            await callback.answer("❌ Savatcha bo'sh", show_alert=True)
+            return
+        
+        # Get contacts
+        contacts = await OrderContactService.get_active_contacts(db)
+        contact_text = OrderContactService.format_contacts_for_display(contacts)
+        
+        # Format cart summary
+        cart_text = CartService.format_cart_for_display(cart_items)
+        
+        order_text = (
+            f"🛒 <b>Buyurtma berish</b>\n\n"
+            f"{cart_text}\n\n"
+            f"{contact_text}\n\n"
+            f"Tez orada siz bilan bog'lanamiz! 😊"
+        )
+        
+        # Try to edit message, if fails (media message), send new message
         try:
-            cart_items = CartService.get_user_cart(db, user_id)
-            
-            if not cart_items:
-                await callback.answer("❌ Savatcha bo'sh", show_alert=True)
-                return
-            
-            # Get contacts
-            contacts = OrderContactService.get_active_contacts(db)
-            contact_text = OrderContactService.format_contacts_for_display(contacts)
-            
-            # Format cart summary
-            cart_text = CartService.format_cart_for_display(cart_items)
-            
-            order_text = (
-                f"🛒 <b>Buyurtma berish</b>\n\n"
-                f"{cart_text}\n\n"
-                f"{contact_text}\n\n"
-                f"Tez orada siz bilan bog'lanamiz! 😊"
-            )
-            
-            # Try to edit message, if fails (media message), send new message
-            try:
-                if callback.message.photo or callback.message.video:
-                    # If message has media, send new text message
-                    await callback.message.answer(
-                        order_text,
-                        parse_mode="HTML"
-                    )
-                else:
-                    # If text message, edit it
-                    await callback.message.edit_text(
-                        order_text,
-                        parse_mode="HTML"
-                    )
-            except Exception as edit_error:
-                # If edit fails, send new message
-                logger.warning(f"Could not edit message, sending new: {edit_error}")
+            if callback.message.photo or callback.message.video:
+                # If message has media, send new text message
                 await callback.message.answer(
                     order_text,
                     parse_mode="HTML"
                 )
-            
-            await callback.answer("✅ Buyurtma qabul qilindi!")
-            
-        finally:
-            db.close()
+            else:
+                # If text message, edit it
+                await callback.message.edit_text(
+                    order_text,
+                    parse_mode="HTML"
+                )
+        except Exception as edit_error:
+            # If edit fails, send new message
+            logger.warning(f"Could not edit message, sending new: {edit_error}")
+            await callback.message.answer(
+                order_text,
+                parse_mode="HTML"
+            )
+        
+        await callback.answer("✅ Buyurtma qabul qilindi!")
+        
             
     except Exception as e:
         logger.error(f"Error ordering from cart: {e}", exc_info=True)
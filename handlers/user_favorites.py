@@ -4,27 +4,77 @@ User handlers for favorites
 import logging
 from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from config import CATALOG_VIEW
+from handlers.user import build_carousel_view, edit_carousel_view, send_carousel_view, show_toy_for_category_page
+from keyboards.callbacks import (
+    CallbackPrefixFilter,
+    FavoriteCallback,
+    FavoritesCarouselCallback,
+    FavoritesPageCallback
+)
 from keyboards.user_kb import get_main_menu_keyboard
-from keyboards.toy_inline_kb import get_favorite_toy_keyboard
+from keyboards.category_pagination_kb import get_category_pagination_keyboard
+from keyboards.toy_inline_kb import replace_favorite_button
 from services.favorites_service import FavoritesService
 from services.catalog_service import CatalogService
-from database.db import get_db_session
 
 logger = logging.getLogger(__name__)
 router = Router()
+router.callback_query.filter(CallbackPrefixFilter(FavoriteCallback, FavoritesCarouselCallback, FavoritesPageCallback))
+
+
+FAVORITES_PAGE_SIZE = 10
+
+
+async def send_favorites_page(message: Message, db: AsyncSession, user_id: int, page: int) -> bool:
+    """
+    Send one page of favorites (list view): the toys and a pagination message
+    
+    Returns:
+        False if the page is empty
+    """
+    toys, total_count = await FavoritesService.get_favorites_page(
+        db, user_id, page=page, page_size=FAVORITES_PAGE_SIZE
+    )
+    if not toys:
+        return False
+    
+    # Sends are paced by SendQueueMiddleware
+    for toy in toys:
+        try:
+            await show_toy_for_category_page(message, toy, toy.category_id, is_favorite=True)
+        except Exception as e:
+            logger.error(f"Error showing favorite toy {toy.id}: {e}", exc_info=True)
+            continue
+    
+    # Favorites have no category; "favpage:0:{page}"
+    total_pages = (total_count + FAVORITES_PAGE_SIZE - 1) // FAVORITES_PAGE_SIZE
+    await message.answer(
+        f"📄 Sahifa {page + 1} / {total_pages}",
+        reply_markup=get_category_pagination_keyboard(
+            category_id=0,
+            page=page,
+            total_count=total_count,
+            page_size=FAVORITES_PAGE_SIZE,
+            page_callback=FavoritesPageCallback
+        )
+    )
+    return True
 
 
 @router.message(F.text == "❤️ Sevimlilar")
-async def show_favorites(message: Message):
-    """Show user's favorites"""
+async def show_favorites(message: Message, db: AsyncSession):
+    """Show user's favorites (carousel or list pages, like the catalog)"""
     user_id = message.from_user.id
     
-    db = get_db_session()
     try:
-        favorites = FavoritesService.get_user_favorites(db, user_id)
+        toys, total_count = await FavoritesService.get_favorites_page(
+            db, user_id, page=0, page_size=1 if CATALOG_VIEW == "carousel" else FAVORITES_PAGE_SIZE
+        )
         
-        if not favorites:
+        if not toys:
             await message.answer(
                 "❌ Sevimlilar bo'sh\n\n"
                 "O'yinchoqlarni sevimlilarga qo'shish uchun ❤️ tugmasini bosing.",
@@ -34,37 +84,20 @@ async def show_favorites(message: Message):
         
         await message.answer(
             f"❤️ <b>Sizning sevimlilaringiz</b>\n\n"
-            f"📦 {len(favorites)} ta o'yinchoq saqlangan",
+            f"📦 {total_count} ta o'yinchoq saqlangan",
             parse_mode="HTML",
             reply_markup=get_main_menu_keyboard()
         )
         
-        # Show each favorite toy
-        for favorite in favorites:
-            toy = CatalogService.get_toy_by_id(db, favorite.toy_id)
-            if not toy or not toy.is_active:
-                continue
-            
-            message_text = (
-                f"📦 <b>{toy.title}</b>\n"
-                f"💰 Narxi: {toy.price}\n\n"
-                f"📝 {toy.description}"
+        if CATALOG_VIEW == "carousel":
+            # One message, navigated by editing it (FavoritesCarouselCallback)
+            caption, media, keyboard = build_carousel_view(
+                toys[0], 0, 0, total_count, is_favorite=True, page_callback=FavoritesCarouselCallback
             )
-            
-            if toy.media_type == "image":
-                await message.answer_photo(
-                    photo=toy.media_file_id,
-                    caption=message_text,
-                    parse_mode="HTML",
-                    reply_markup=get_favorite_toy_keyboard(toy.id)
-                )
-            elif toy.media_type == "video":
-                await message.answer_video(
-                    video=toy.media_file_id,
-                    caption=message_text,
-                    parse_mode="HTML",
-                    reply_markup=get_favorite_toy_keyboard(toy.id)
-                )
+            await send_carousel_view(message, caption, media, keyboard)
+            return
+        
+        await send_favorites_page(message, db, user_id, page=0)
         
     except Exception as e:
         logger.error(f"Error showing favorites: {e}", exc_info=True)
@@ -72,77 +105,123 @@ async def show_favorites(message: Message):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_main_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
-@router.callback_query(F.data.startswith("add_to_favorites_"))
-async def add_to_favorites(callback: CallbackQuery):
-    """Add toy to favorites"""
+@router.callback_query(FavoritesCarouselCallback.filter())
+async def handle_favorites_carousel(callback: CallbackQuery, callback_data: FavoritesCarouselCallback, db: AsyncSession):
+    """Move the favorites carousel to another toy by editing the same message"""
     try:
-        toy_id = int(callback.data.split("_")[-1])
+        index = max(0, callback_data.page)
         user_id = callback.from_user.id
         
-        db = get_db_session()
+        toys, total_count = await FavoritesService.get_favorites_page(db, user_id, page=index, page_size=1)
+        if not toys and total_count > 0:
+            # Favorites shrank since the keyboard was built, show the last toy
+            index = total_count - 1
+            toys, total_count = await FavoritesService.get_favorites_page(db, user_id, page=index, page_size=1)
+        
+        if not toys:
+            await callback.answer("❌ Sevimlilar bo'sh", show_alert=True)
+            return
+        
+        caption, media, keyboard = build_carousel_view(
+            toys[0], 0, index, total_count, is_favorite=True, page_callback=FavoritesCarouselCallback
+        )
+        await edit_carousel_view(callback.message, caption, media, keyboard)
+        await callback.answer()
+        
+    except Exception as e:
+        logger.error(f"Error in favorites carousel: {e}", exc_info=True)
+        await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
+
+
+@router.callback_query(FavoritesPageCallback.filter())
+async def handle_favorites_pagination(callback: CallbackQuery, callback_data: FavoritesPageCallback, db: AsyncSession):
+    """Send another page of favorites (list view)"""
+    try:
+        page = max(0, callback_data.page)
+        
+        # Delete previous pagination message
         try:
-            toy = CatalogService.get_toy_by_id(db, toy_id)
-            if not toy or not toy.is_active:
-                await callback.answer("❌ Bu o'yinchoq topilmadi", show_alert=True)
-                return
-            
-            # Add to favorites
-            favorite, is_new = FavoritesService.add_to_favorites(
-                db,
-                user_id=user_id,
-                toy_id=toy_id,
-                toy_name=toy.title
-            )
-            
-            if is_new:
-                await callback.answer("✅ Sevimlilarga qo'shildi!")
-            else:
-                await callback.answer("ℹ️ Bu o'yinchoq allaqachon sevimlilarda", show_alert=True)
-            
-            # Update button state - refresh the message with new keyboard
-            # Note: We need to rebuild the full keyboard with pagination
-            # For now, just show success message
-            pass  # Button state will update on next view
-            
-        finally:
-            db.close()
+            await callback.message.delete()
+        except Exception:
+            pass
+        
+        if not await send_favorites_page(callback.message, db, callback.from_user.id, page):
+            await callback.answer("❌ O'yinchoqlar topilmadi", show_alert=True)
+            return
+        
+        await callback.answer()
+        
+    except Exception as e:
+        logger.error(f"Error in favorites pagination: {e}", exc_info=True)
+        await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
+
+
+@router.callback_query(FavoriteCallback.filter(F.action == "add"))
+async def add_to_favorites(callback: CallbackQuery, callback_data: FavoriteCallback, db: AsyncSession):
+    """Add toy to favorites"""
+    try:
+        toy_id = callback_data.toy_id
+        user_id = callback.from_user.id
+        
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
+        if not toy or not toy.is_active:
+            await callback.answer("❌ Bu o'yinchoq topilmadi", show_alert=True)
+            return
+        
+        # Add to favorites
+        is_new = await FavoritesService.add_to_favorites(
+            db,
+            user_id=user_id,
+            toy_id=toy_id,
+            toy_name=toy.title
+        )
+        # Commit before replying so the write transaction is not held during the send
+        await db.commit()
+        
+        if is_new:
+            await callback.answer("✅ Sevimlilarga qo'shildi!")
+        else:
+            await callback.answer("ℹ️ Bu o'yinchoq allaqachon sevimlilarda", show_alert=True)
+        
+        # Update button state in place (keeps carousel/pagination buttons)
+        updated_markup = replace_favorite_button(callback.message.reply_markup, toy_id, is_favorite=True)
+        if updated_markup:
+            try:
+                await callback.message.edit_reply_markup(reply_markup=updated_markup)
+            except Exception:
+                pass  # Message might be deleted or not editable
+        
             
     except Exception as e:
         logger.error(f"Error adding to favorites: {e}", exc_info=True)
         await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("remove_from_favorites_"))
-async def remove_from_favorites(callback: CallbackQuery):
+@router.callback_query(FavoriteCallback.filter(F.action == "remove"))
+async def remove_from_favorites(callback: CallbackQuery, callback_data: FavoriteCallback, db: AsyncSession):
     """Remove toy from favorites"""
     try:
-        toy_id = int(callback.data.split("_")[-1])
+        toy_id = callback_data.toy_id
         user_id = callback.from_user.id
         
-        db = get_db_session()
-        try:
-            success = FavoritesService.remove_from_favorites(db, user_id, toy_id)
+        success = await FavoritesService.remove_from_favorites(db, user_id, toy_id)
+        await db.commit()
+        
+        if success:
+            await callback.answer("✅ Sevimlilardan o'chirildi")
             
-            if success:
-                await callback.answer("✅ Sevimlilardan o'chirildi")
-                
-                # Update button state if message still exists
+            # Update button state in place if message still exists
+            updated_markup = replace_favorite_button(callback.message.reply_markup, toy_id, is_favorite=False)
+            if updated_markup:
                 try:
-                    from keyboards.toy_inline_kb import get_toy_actions_keyboard
-                    await callback.message.edit_reply_markup(
-                        reply_markup=get_toy_actions_keyboard(toy_id, is_favorite=False)
-                    )
-                except:
+                    await callback.message.edit_reply_markup(reply_markup=updated_markup)
+                except Exception:
                     pass  # Message might be deleted or not editable
-            else:
-                await callback.answer("❌ Xatolik", show_alert=True)
-                
-        finally:
-            db.close()
+        else:
+            await callback.answer("❌ Xatolik", show_alert=True)
+            
             
     except Exception as e:
         logger.error(f"Error removing from favorites: {e}", exc_info=True)
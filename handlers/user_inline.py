@@ -0,0 +1,40 @@
+"""
+Inline mode handler (@bot query in any chat)
+"""
+import logging
+from aiogram import Router
+from aiogram.types import InlineQuery, InlineQueryResultsButton
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.inline_search_service import InlineSearchService
+from config import INLINE_CACHE_TIME
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+
+@router.inline_query()
+async def handle_inline_query(inline_query: InlineQuery, db: AsyncSession):
+    """Answer with matching toys, 50 per page (Telegram asks for more with next_offset)"""
+    try:
+        offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+        toys = await InlineSearchService.find(db, inline_query.query)
+        me = await inline_query.bot.me()
+        results, next_offset = InlineSearchService.build_page(toys, offset, me.username)
+        
+        # Nothing found: offer to open the bot instead
+        button = None
+        if not toys:
+            button = InlineQueryResultsButton(text="😔 Topilmadi — botni ochish", start_parameter="inline")
+        
+        # Same results for everyone, so Telegram may share its cache between users
+        await inline_query.answer(
+            results,
+            cache_time=INLINE_CACHE_TIME,
+            is_personal=False,
+            next_offset=next_offset,
+            button=button
+        )
+    
+    except Exception as e:
+        logger.error(f"Error answering inline query: {e}", exc_info=True)
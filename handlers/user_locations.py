@@ -4,22 +4,21 @@ User handlers for store locations
 import logging
 from aiogram import Router, F, Bot
 from aiogram.types import Message
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from keyboards.user_kb import get_main_menu_keyboard
 from keyboards.store_kb import get_store_list_keyboard
 from services.store_location_service import StoreLocationService
-from database.db import get_db_session
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 
 @router.message(F.text == "📍 Do'kon manzillari")
-async def show_store_locations(message: Message):
+async def show_store_locations(message: Message, db: AsyncSession):
     """Show store locations menu"""
-    db = get_db_session()
     try:
-        stores = StoreLocationService.get_active_locations(db)
+        stores = await StoreLocationService.get_active_locations(db)
         
         if not stores:
             await message.answer(
@@ -42,12 +41,10 @@ async def show_store_locations(message: Message):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_main_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 @router.message(F.text.startswith("🏬 "))
-async def show_store_location(message: Message, bot: Bot):
+async def show_store_location(message: Message, bot: Bot, db: AsyncSession):
     """Show specific store location with map"""
     store_name = message.text.replace("🏬 ", "").strip()
     
@@ -60,9 +57,8 @@ async def show_store_location(message: Message, bot: Bot):
             )
         return
     
-    db = get_db_session()
     try:
-        store = StoreLocationService.get_location_by_name(db, store_name)
+        store = await StoreLocationService.get_location_by_name(db, store_name)
         
         if not store:
             await message.answer(
@@ -118,8 +114,6 @@ async def show_store_location(message: Message, bot: Bot):
             "❌ Xatolik yuz berdi.",
             reply_markup=get_main_menu_keyboard()
         )
-    finally:
-        db.close()
 
 
 @router.message(F.text.in_(["⬅️ Orqaga", "🏠 Bosh menyu"]))
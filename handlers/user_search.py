@@ -0,0 +1,123 @@
+"""
+User handlers for product search
+"""
+import logging
+from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message, CallbackQuery
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from handlers.user import show_toy_for_category_page
+from keyboards.callbacks import CallbackPrefixFilter, SearchPageCallback, SearchResultCallback
+from keyboards.search_kb import get_search_results_keyboard, search_callback_query
+from keyboards.user_kb import get_main_menu_keyboard
+from services.catalog_cache import catalog_cache
+from services.favorites_service import FavoritesService
+from services.search_service import SearchService
+from states.search_states import SearchStates
+
+logger = logging.getLogger(__name__)
+router = Router()
+router.callback_query.filter(CallbackPrefixFilter(SearchPageCallback, SearchResultCallback))
+
+SEARCH_PAGE_SIZE = 10
+
+
+async def build_search_page(db: AsyncSession, query: str, page: int):
+    """Text and keyboard for one page of results of a normalized query"""
+    toys, total_count = await SearchService.search(db, query, page=page, page_size=SEARCH_PAGE_SIZE)
+    text = SearchService.format_results(query, toys, page, SEARCH_PAGE_SIZE, total_count)
+    keyboard = get_search_results_keyboard(toys, query, page, total_count, SEARCH_PAGE_SIZE) if toys else None
+    return text, keyboard
+
+
+async def send_search_results(message: Message, db: AsyncSession, query_text: str):
+    """Search and send the first page of results"""
+    query = search_callback_query(SearchService.query_tokens(query_text))
+    if not query:
+        await message.answer(
+            "❌ Qidirish uchun o'yinchoq nomini yozing.",
+            reply_markup=get_main_menu_keyboard()
+        )
+        return
+    
+    text, keyboard = await build_search_page(db, query, 0)
+    await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
+
+
+@router.message(F.text == "🔍 Qidirish")
+@router.message(Command("search"))
+async def start_search(message: Message, state: FSMContext, db: AsyncSession, command: CommandObject = None):
+    """Ask for a search query ("/search <text>" searches right away)"""
+    try:
+        if command and command.args:
+            await state.clear()
+            await send_search_results(message, db, command.args)
+            return
+        
+        await state.set_state(SearchStates.waiting_query)
+        await message.answer(
+            "🔍 <b>Qidirish</b>\n\n"
+            "O'yinchoq nomini yoki tavsifidagi so'zni yozing (lotin yoki kirill):",
+            parse_mode="HTML"
+        )
+    
+    except Exception as e:
+        logger.error(f"Error starting search: {e}", exc_info=True)
+        await message.answer(
+            "❌ Xatolik yuz berdi.",
+            reply_markup=get_main_menu_keyboard()
+        )
+
+
+@router.message(SearchStates.waiting_query, F.text)
+async def process_search_query(message: Message, state: FSMContext, db: AsyncSession):
+    """Search for the typed text"""
+    await state.clear()
+    try:
+        await send_search_results(message, db, message.text)
+    
+    except Exception as e:
+        logger.error(f"Error searching: {e}", exc_info=True)
+        await message.answer(
+            "❌ Xatolik yuz berdi.",
+            reply_markup=get_main_menu_keyboard()
+        )
+
+
+@router.callback_query(SearchPageCallback.filter())
+async def handle_search_pagination(callback: CallbackQuery, callback_data: SearchPageCallback, db: AsyncSession):
+    """Show another page of results by editing the results message"""
+    try:
+        text, keyboard = await build_search_page(db, callback_data.query, max(0, callback_data.page))
+        
+        try:
+            await callback.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                raise
+        await callback.answer()
+    
+    except Exception as e:
+        logger.error(f"Error in search pagination: {e}", exc_info=True)
+        await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
+
+
+@router.callback_query(SearchResultCallback.filter())
+async def show_search_result(callback: CallbackQuery, callback_data: SearchResultCallback, db: AsyncSession):
+    """Send the card of a toy picked from the results"""
+    try:
+        toy = (await catalog_cache.get(db)).toys_by_id.get(callback_data.toy_id)
+        if not toy:
+            await callback.answer("❌ Bu o'yinchoq topilmadi", show_alert=True)
+            return
+        
+        favorite_ids = await FavoritesService.favorites_for(db, callback.from_user.id, [toy.id])
+        await show_toy_for_category_page(callback.message, toy, toy.category_id, is_favorite=toy.id in favorite_ids)
+        await callback.answer()
+    
+    except Exception as e:
+        logger.error(f"Error showing search result: {e}", exc_info=True)
+        await callback.answer("❌ Xatolik yuz berdi", show_alert=True)
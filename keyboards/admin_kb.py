@@ -4,6 +4,8 @@ Admin keyboard layouts - Reply keyboards for better UX
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
 
+from keyboards.callbacks import AdminToyCallback, AdminToyPageCallback
+
 
 def get_admin_menu_keyboard() -> ReplyKeyboardMarkup:
     """Main admin menu keyboard - Reply keyboard"""
@@ -18,6 +20,8 @@ def get_admin_menu_keyboard() -> ReplyKeyboardMarkup:
     builder.add(KeyboardButton(text="🏆 Bestseller boshqaruvi"))
     builder.add(KeyboardButton(text="🏬 Do'kon manzillari"))
     builder.add(KeyboardButton(text="📦 Katalogni ko'rish"))
+    builder.add(KeyboardButton(text="📥 Katalog importi"))
+    builder.add(KeyboardButton(text="📤 Katalog eksporti"))
     builder.add(KeyboardButton(text="📊 Statistika"))
     builder.add(KeyboardButton(text="📊 Sotuv statistikasi"))
     builder.add(KeyboardButton(text="📣 Reklama yuborish"))
@@ -64,27 +68,15 @@ def get_admin_toy_pagination_keyboard(page: int, total_pages: int, toy_id: int,
     # Navigation buttons (max 2 per row)
     nav_buttons = []
     if page > 1:
-        if category_id:
-            nav_buttons.append(InlineKeyboardButton(
-                text="⬅️ Oldingi",
-                callback_data=f"admin_toy_page_{category_id}_{page - 1}"
-            ))
-        else:
-            nav_buttons.append(InlineKeyboardButton(
-                text="⬅️ Oldingi",
-                callback_data=f"admin_toy_page_all_{page - 1}"
-            ))
+        nav_buttons.append(InlineKeyboardButton(
+            text="⬅️ Oldingi",
+            callback_data=AdminToyPageCallback(page=page - 1, category_id=category_id or None).pack()
+        ))
     if page < total_pages:
-        if category_id:
-            nav_buttons.append(InlineKeyboardButton(
-                text="Keyingi ➡️",
-                callback_data=f"admin_toy_page_{category_id}_{page + 1}"
-            ))
-        else:
-            nav_buttons.append(InlineKeyboardButton(
-                text="Keyingi ➡️",
-                callback_data=f"admin_toy_page_all_{page + 1}"
-            ))
+        nav_buttons.append(InlineKeyboardButton(
+            text="Keyingi ➡️",
+            callback_data=AdminToyPageCallback(page=page + 1, category_id=category_id or None).pack()
+        ))
     
     if nav_buttons:
         builder.row(*nav_buttons)
@@ -92,7 +84,7 @@ def get_admin_toy_pagination_keyboard(page: int, total_pages: int, toy_id: int,
     # Manage toy button
     builder.add(InlineKeyboardButton(
         text="⚙️ Boshqarish",
-        callback_data=f"admin_manage_{toy_id}"
+        callback_data=AdminToyCallback(action="manage", toy_id=toy_id).pack()
     ))
     
     return builder.as_markup()
@@ -112,19 +104,19 @@ def get_admin_toy_manage_keyboard(toy_id: int, is_active: bool) -> InlineKeyboar
     status_text = "❌ O'chirish" if is_active else "✅ Yoqish"
     builder.add(InlineKeyboardButton(
         text=status_text,
-        callback_data=f"admin_toggle_{toy_id}"
+        callback_data=AdminToyCallback(action="toggle", toy_id=toy_id).pack()
     ))
     
     # Edit button
     builder.add(InlineKeyboardButton(
         text="✏️ Tahrirlash",
-        callback_data=f"admin_edit_{toy_id}"
+        callback_data=AdminToyCallback(action="edit", toy_id=toy_id).pack()
     ))
     
     # Delete button
     builder.add(InlineKeyboardButton(
         text="🗑️ O'chirish",
-        callback_data=f"admin_delete_{toy_id}"
+        callback_data=AdminToyCallback(action="delete", toy_id=toy_id).pack()
     ))
     
     # Back button
@@ -141,11 +133,11 @@ def get_confirm_delete_keyboard(toy_id: int) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.add(InlineKeyboardButton(
         text="✅ Ha, o'chirish",
-        callback_data=f"admin_confirm_delete_{toy_id}"
+        callback_data=AdminToyCallback(action="confirm_delete", toy_id=toy_id).pack()
     ))
     builder.add(InlineKeyboardButton(
         text="❌ Bekor qilish",
-        callback_data=f"admin_manage_{toy_id}"
+        callback_data=AdminToyCallback(action="manage", toy_id=toy_id).pack()
     ))
     return builder.as_markup()
 
@@ -0,0 +1,210 @@
+"""
+Typed callback data for inline buttons
+
+Buttons carry one of these CallbackData classes packed as "prefix:field:...";
+handlers match them with Class.filter(...) and receive the parsed instance as
+`callback_data`. Every router accepts only its own prefixes (CallbackPrefixFilter),
+so a callback is checked against one router's handlers instead of every
+startswith() filter in the bot.
+
+Buttons sent before this format ("add_to_cart_12" etc.) are rewritten by
+upgrade_legacy_callback (see middlewares/legacy_callbacks.py).
+"""
+import re
+from typing import Callable, Dict, List, Optional, Union
+
+from aiogram.filters import Filter
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery
+
+# Plain callback_data (no fields)
+BACK_TO_CATEGORIES = "back_to_categories"
+
+
+# --- Catalog (handlers/user.py, handlers/user_navigation.py) ---
+
+class CategoryPageCallback(CallbackData, prefix="catpage"):
+    """List page of a category"""
+    category_id: int
+    page: int
+
+
+class CategoryCarouselCallback(CallbackData, prefix="catcar"):
+    """Carousel position in a category (page = toy index)"""
+    category_id: int
+    page: int
+
+
+class ToyMediaCallback(CallbackData, prefix="toymedia"):
+    """All photos/videos of a toy"""
+    category_id: int
+    toy_id: int
+
+
+class ToyPageCallback(CallbackData, prefix="toypage"):
+    """One-toy-per-page view of a category (page is 1-indexed)"""
+    category_id: int
+    page: int
+
+
+class BackToCategoryCallback(CallbackData, prefix="backcat"):
+    """Back from a toy to its category"""
+    category_id: int
+
+
+class OrderCallback(CallbackData, prefix="ord"):
+    """Order of one toy (action: "start", "confirm", "cancel", or "ad" from an advertisement)"""
+    action: str
+    toy_id: int = 0
+
+
+# --- Cart (handlers/user_cart.py) ---
+
+class AddToCartCallback(CallbackData, prefix="tocart"):
+    """Add a toy to the cart"""
+    toy_id: int
+
+
+class CartCallback(CallbackData, prefix="cart"):
+    """
+    Cart action (action: "inc", "dec" or "remove" a cart line by item_id,
+    "clear", "checkout" or "noop")
+    """
+    action: str
+    item_id: int = 0
+
+
+class CartPageCallback(CallbackData, prefix="cartpage"):
+    """Page of the cart keyboard (0-indexed, see keyboards.cart_kb.CART_PAGE_SIZE)"""
+    page: int
+
+
+# --- Favorites (handlers/user_favorites.py) ---
+
+class FavoriteCallback(CallbackData, prefix="fav"):
+    """Add ("add") or remove ("remove") a toy from favorites"""
+    action: str
+    toy_id: int
+
+
+class FavoritesCarouselCallback(CallbackData, prefix="favcar"):
+    """Carousel position in favorites (category_id is always 0)"""
+    category_id: int
+    page: int
+
+
+class FavoritesPageCallback(CallbackData, prefix="favpage"):
+    """List page of favorites (category_id is always 0)"""
+    category_id: int
+    page: int
+
+
+# --- Search (handlers/user_search.py) ---
+
+class SearchPageCallback(CallbackData, prefix="srch"):
+    """Results page of a normalized query (see keyboards.search_kb.search_callback_query)"""
+    page: int
+    query: str
+
+
+class SearchResultCallback(CallbackData, prefix="srchtoy"):
+    """Toy picked from search results"""
+    toy_id: int
+
+
+# --- Admin (handlers/admin.py, handlers/admin_category_manage.py) ---
+
+class AdminToyPageCallback(CallbackData, prefix="atpage"):
+    """Admin toy list page (1-indexed), of one category or of all toys"""
+    page: int
+    category_id: Optional[int] = None
+
+
+class AdminToyCallback(CallbackData, prefix="atoy"):
+    """Admin toy action (action: "manage", "toggle", "edit", "delete" or "confirm_delete")"""
+    action: str
+    toy_id: int
+
+
+class AdminToyFieldCallback(CallbackData, prefix="afield"):
+    """Edit one field of a toy ("title", "price", "description", "category" or "media")"""
+    toy_id: int
+    field: str
+
+
+class AdminToyCategoryCallback(CallbackData, prefix="atcat"):
+    """Move a toy to another category"""
+    toy_id: int
+    category_id: int
+
+
+class CategoryDeleteCallback(CallbackData, prefix="delcat"):
+    """Category deletion (action: "confirm" or "cancel")"""
+    action: str
+    category_id: int = 0
+
+
+class CallbackPrefixFilter(Filter):
+    """
+    Router-level filter: accept only callbacks whose prefix belongs to the router
+    
+    Args:
+        owners: CallbackData classes and plain callback_data strings
+    """
+    
+    def __init__(self, *owners: Union[type, str]):
+        self.prefixes = frozenset(
+            owner if isinstance(owner, str) else owner.__prefix__ for owner in owners
+        )
+    
+    async def __call__(self, callback: CallbackQuery) -> bool:
+        return bool(callback.data) and callback.data.partition(":")[0] in self.prefixes
+
+
+# Old-style callback_data with numbers replaced by "#" -> builder from those numbers
+_LEGACY_CALLBACKS: Dict[str, Callable[[List[int]], CallbackData]] = {
+    "toy_page_#_#": lambda n: ToyPageCallback(category_id=n[0], page=n[1]),
+    "back_to_category_#": lambda n: BackToCategoryCallback(category_id=n[0]),
+    "order_#": lambda n: OrderCallback(action="start", toy_id=n[0]),
+    "confirm_order_#": lambda n: OrderCallback(action="confirm", toy_id=n[0]),
+    "order_from_ad_#": lambda n: OrderCallback(action="ad", toy_id=n[0]),
+    "cancel_order": lambda n: OrderCallback(action="cancel"),
+    "add_to_cart_#": lambda n: AddToCartCallback(toy_id=n[0]),
+    "cart_inc_#": lambda n: CartCallback(action="inc", item_id=n[0]),
+    "cart_dec_#": lambda n: CartCallback(action="dec", item_id=n[0]),
+    "remove_from_cart_#": lambda n: CartCallback(action="remove", item_id=n[0]),
+    "clear_cart": lambda n: CartCallback(action="clear"),
+    "order_from_cart": lambda n: CartCallback(action="checkout"),
+    "cart_noop": lambda n: CartCallback(action="noop"),
+    "add_to_favorites_#": lambda n: FavoriteCallback(action="add", toy_id=n[0]),
+    "remove_from_favorites_#": lambda n: FavoriteCallback(action="remove", toy_id=n[0]),
+    "admin_toy_page_#_#": lambda n: AdminToyPageCallback(category_id=n[0], page=n[1]),
+    "admin_toy_page_all_#": lambda n: AdminToyPageCallback(page=n[0]),
+    "admin_manage_#": lambda n: AdminToyCallback(action="manage", toy_id=n[0]),
+    "admin_toggle_#": lambda n: AdminToyCallback(action="toggle", toy_id=n[0]),
+    "admin_edit_#": lambda n: AdminToyCallback(action="edit", toy_id=n[0]),
+    "admin_delete_#": lambda n: AdminToyCallback(action="delete", toy_id=n[0]),
+    "admin_confirm_delete_#": lambda n: AdminToyCallback(action="confirm_delete", toy_id=n[0]),
+    "edit_category_#_#": lambda n: AdminToyCategoryCallback(toy_id=n[0], category_id=n[1]),
+    "confirm_delete_cat_#": lambda n: CategoryDeleteCallback(action="confirm", category_id=n[0]),
+    "cancel_delete_cat": lambda n: CategoryDeleteCallback(action="cancel"),
+    **{
+        f"edit_field_#_{field}": (lambda n, field=field: AdminToyFieldCallback(toy_id=n[0], field=field))
+        for field in ("title", "price", "description", "category", "media")
+    },
+}
+
+_NUMBER_RE = re.compile(r"\d+")
+
+
+def upgrade_legacy_callback(data: str) -> Optional[str]:
+    """
+    Packed callback_data for an old-style string such as "add_to_cart_12"
+    
+    Returns:
+        New callback_data, or None if `data` is not an old-style string
+    """
+    build = _LEGACY_CALLBACKS.get(_NUMBER_RE.sub("#", data))
+    if build is None:
+        return None
+    return build([int(number) for number in _NUMBER_RE.findall(data)]).pack()
@@ -1,22 +1,75 @@
 """
 Keyboard layouts for shopping cart
 """
+from typing import Optional, Sequence
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from keyboards.callbacks import CartCallback, CartPageCallback
 
-def get_cart_actions_keyboard() -> InlineKeyboardMarkup:
-    """Get inline keyboard for cart actions"""
+# Lines per keyboard page, each with its own ➖/➕/❌ row (Telegram allows 100 buttons per keyboard)
+CART_PAGE_SIZE = 20
+
+
+def cart_page_of(cart_items: Sequence, item_id: int) -> int:
+    """Keyboard page showing a cart line (0 if it isn't in the cart)"""
+    for idx, item in enumerate(cart_items):
+        if item.id == item_id:
+            return idx // CART_PAGE_SIZE
+    return 0
+
+
+def get_cart_actions_keyboard(cart_items: Optional[Sequence] = None, page: int = 0) -> InlineKeyboardMarkup:
+    """
+    Get inline keyboard for cart actions
+    
+    Args:
+        cart_items: Cart lines; each line of the page gets a ➖ / quantity / ➕ / ❌
+            row, numbered like the cart text
+        page: Keyboard page (0-indexed, clamped to the last page)
+    
+    Returns:
+        InlineKeyboardMarkup
+    """
     builder = InlineKeyboardBuilder()
+    cart_items = list(cart_items or [])
+    total_pages = max(1, -(-len(cart_items) // CART_PAGE_SIZE))
+    page = min(max(page, 0), total_pages - 1)
+    start = page * CART_PAGE_SIZE
+    
+    for idx, item in enumerate(cart_items[start:start + CART_PAGE_SIZE], start + 1):
+        builder.row(
+            InlineKeyboardButton(text="➖", callback_data=CartCallback(action="dec", item_id=item.id).pack()),
+            InlineKeyboardButton(text=f"{idx}️⃣ × {item.quantity}", callback_data=CartCallback(action="noop").pack()),
+            InlineKeyboardButton(text="➕", callback_data=CartCallback(action="inc", item_id=item.id).pack()),
+            InlineKeyboardButton(text="❌", callback_data=CartCallback(action="remove", item_id=item.id).pack())
+        )
+    
+    if total_pages > 1:
+        nav_buttons = []
+        if page > 0:
+            nav_buttons.append(InlineKeyboardButton(
+                text="⬅️ Oldingi",
+                callback_data=CartPageCallback(page=page - 1).pack()
+            ))
+        nav_buttons.append(InlineKeyboardButton(
+            text=f"{page + 1}/{total_pages}",
+            callback_data=CartCallback(action="noop").pack()
+        ))
+        if page < total_pages - 1:
+            nav_buttons.append(InlineKeyboardButton(
+                text="Keyingi ➡️",
+                callback_data=CartPageCallback(page=page + 1).pack()
+            ))
+        builder.row(*nav_buttons)
     
-    builder.add(InlineKeyboardButton(
+    builder.row(InlineKeyboardButton(
         text="🗑 Savatchani tozalash",
-        callback_data="clear_cart"
+        callback_data=CartCallback(action="clear").pack()
     ))
-    builder.add(InlineKeyboardButton(
+    builder.row(InlineKeyboardButton(
         text="🛒 Buyurtma berish",
-        callback_data="order_from_cart"
+        callback_data=CartCallback(action="checkout").pack()
     ))
     
-    builder.adjust(1)  # 1 button per row
     return builder.as_markup()
@@ -4,6 +4,8 @@ Keyboard layouts for category management
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
 
+from keyboards.callbacks import CategoryDeleteCallback
+
 
 def get_category_list_keyboard(categories: list, action_prefix: str = "cat_") -> ReplyKeyboardMarkup:
     """
@@ -32,11 +34,11 @@ def get_confirm_delete_category_keyboard(category_id: int) -> InlineKeyboardMark
     builder = InlineKeyboardBuilder()
     builder.add(InlineKeyboardButton(
         text="🗑 Ha, o'chirish",
-        callback_data=f"confirm_delete_cat_{category_id}"
+        callback_data=CategoryDeleteCallback(action="confirm", category_id=category_id).pack()
     ))
     builder.add(InlineKeyboardButton(
         text="❌ Bekor qilish",
-        callback_data="cancel_delete_cat"
+        callback_data=CategoryDeleteCallback(action="cancel").pack()
     ))
     return builder.as_markup()
 
@@ -1,11 +1,22 @@
 """
 Category pagination keyboard for catalog browsing
 """
+from typing import Type
+
+from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from keyboards.callbacks import BACK_TO_CATEGORIES, CategoryPageCallback
+
 
-def get_category_pagination_keyboard(category_id: int, page: int, total_count: int, page_size: int = 10) -> InlineKeyboardMarkup:
+def get_category_pagination_keyboard(
+    category_id: int,
+    page: int,
+    total_count: int,
+    page_size: int = 10,
+    page_callback: Type[CallbackData] = CategoryPageCallback
+) -> InlineKeyboardMarkup:
     """
     Get pagination keyboard for category products
     
@@ -14,6 +25,9 @@ def get_category_pagination_keyboard(category_id: int, page: int, total_count: i
         page: Current page (0-indexed)
         total_count: Total number of products in category
         page_size: Items per page (default: 10)
+        page_callback: Callback data class with category_id and page fields,
+            CategoryPageCallback for list pages or CategoryCarouselCallback
+            for the one-toy carousel (page_size=1)
         
     Returns:
         InlineKeyboardMarkup with Previous/Next buttons
@@ -30,14 +44,14 @@ def get_category_pagination_keyboard(category_id: int, page: int, total_count: i
     if page > 0:
         nav_buttons.append(InlineKeyboardButton(
             text="⬅️ Oldingi",
-            callback_data=f"catpage:{category_id}:{page - 1}"
+            callback_data=page_callback(category_id=category_id, page=page - 1).pack()
         ))
     
     # Show Next button only if more pages exist
     if (page + 1) * page_size < total_count:
         nav_buttons.append(InlineKeyboardButton(
             text="➡️ Keyingi",
-            callback_data=f"catpage:{category_id}:{page + 1}"
+            callback_data=page_callback(category_id=category_id, page=page + 1).pack()
         ))
     
     # Add navigation buttons in one row
@@ -47,7 +61,7 @@ def get_category_pagination_keyboard(category_id: int, page: int, total_count: i
     # Back to categories button
     builder.add(InlineKeyboardButton(
         text="⬅️ Kategoriyalarga qaytish",
-        callback_data="back_to_categories"
+        callback_data=BACK_TO_CATEGORIES
     ))
     
     return builder.as_markup()
@@ -0,0 +1,79 @@
+"""
+Search results keyboard
+"""
+from typing import List, Sequence
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from keyboards.callbacks import SearchPageCallback, SearchResultCallback
+
+# Telegram callback_data limit in bytes
+CALLBACK_DATA_LIMIT = 64
+
+
+def search_callback_query(tokens: Sequence[str]) -> str:
+    """
+    Normalized query carried in SearchPageCallback
+    
+    Tokens are ASCII, so characters are bytes; words that don't fit in the
+    callback are dropped, and a first word longer than the whole room is cut
+    to fit so the query is never empty (page 1 is searched with the same
+    shortened query).
+    """
+    room = CALLBACK_DATA_LIMIT - len(SearchPageCallback(page=999, query="").pack())
+    words: List[str] = []
+    for token in tokens:
+        if len(" ".join(words + [token])) > room:
+            if not words:
+                words.append(token[:room])
+            break
+        words.append(token)
+    return " ".join(words)
+
+
+def get_search_results_keyboard(
+    toys: list,
+    query: str,
+    page: int,
+    total_count: int,
+    page_size: int = 10
+) -> InlineKeyboardMarkup:
+    """
+    Get keyboard for a page of search results
+    
+    Args:
+        toys: Toys on this page
+        query: Query from search_callback_query
+        page: Current page (0-indexed)
+        total_count: Total number of results
+        page_size: Items per page (default: 10)
+    
+    Returns:
+        InlineKeyboardMarkup with numbered toy buttons and Previous/Next buttons
+    """
+    builder = InlineKeyboardBuilder()
+    
+    # One numbered button per result, 5 per row
+    for idx, toy in enumerate(toys, start=page * page_size + 1):
+        builder.add(InlineKeyboardButton(
+            text=str(idx),
+            callback_data=SearchResultCallback(toy_id=toy.id).pack()
+        ))
+    builder.adjust(5)
+    
+    nav_buttons = []
+    if page > 0:
+        nav_buttons.append(InlineKeyboardButton(
+            text="⬅️ Oldingi",
+            callback_data=SearchPageCallback(page=page - 1, query=query).pack()
+        ))
+    if (page + 1) * page_size < total_count:
+        nav_buttons.append(InlineKeyboardButton(
+            text="➡️ Keyingi",
+            callback_data=SearchPageCallback(page=page + 1, query=query).pack()
+        ))
+    if nav_buttons:
+        builder.row(*nav_buttons)
+    
+    return builder.as_markup()
@@ -1,9 +1,12 @@
 """
 Inline keyboards for toy viewing (cart and favorites)
 """
+from typing import Optional
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from keyboards.callbacks import AddToCartCallback, CartCallback, FavoriteCallback, upgrade_legacy_callback
+
 
 def get_toy_actions_keyboard(toy_id: int, is_favorite: bool = False) -> InlineKeyboardMarkup:
     """
@@ -21,16 +24,16 @@ def get_toy_actions_keyboard(toy_id: int, is_favorite: bool = False) -> InlineKe
     # Add to cart button
     builder.add(InlineKeyboardButton(
         text="➕ Savatchaga qo'shish",
-        callback_data=f"add_to_cart_{toy_id}"
+        callback_data=AddToCartCallback(toy_id=toy_id).pack()
     ))
     
     # Add to favorites button
     if is_favorite:
         favorite_text = "❤️ Sevimlilarda"
-        favorite_callback = f"remove_from_favorites_{toy_id}"
+        favorite_callback = FavoriteCallback(action="remove", toy_id=toy_id).pack()
     else:
         favorite_text = "❤️ Sevimlilarga qo'shish"
-        favorite_callback = f"add_to_favorites_{toy_id}"
+        favorite_callback = FavoriteCallback(action="add", toy_id=toy_id).pack()
     
     builder.add(InlineKeyboardButton(
         text=favorite_text,
@@ -41,6 +44,53 @@ def get_toy_actions_keyboard(toy_id: int, is_favorite: bool = False) -> InlineKe
     return builder.as_markup()
 
 
+def replace_favorite_button(
+    markup: Optional[InlineKeyboardMarkup],
+    toy_id: int,
+    is_favorite: bool
+) -> Optional[InlineKeyboardMarkup]:
+    """
+    Flip the favorites button of a toy inside an existing keyboard
+    
+    Keeps every other button (pagination, order, etc.) as it is.
+    
+    Args:
+        markup: Keyboard of the message that was tapped
+        toy_id: Toy ID
+        is_favorite: New favorite state
+        
+    Returns:
+        Updated InlineKeyboardMarkup, or None if there is nothing to change
+    """
+    if not markup:
+        return None
+    
+    callbacks = (
+        FavoriteCallback(action="add", toy_id=toy_id).pack(),
+        FavoriteCallback(action="remove", toy_id=toy_id).pack()
+    )
+    if is_favorite:
+        new_button = InlineKeyboardButton(text="❤️ Sevimlilarda", callback_data=callbacks[1])
+    else:
+        new_button = InlineKeyboardButton(text="❤️ Sevimlilarga qo'shish", callback_data=callbacks[0])
+    
+    changed = False
+    rows = []
+    for row in markup.inline_keyboard:
+        new_row = []
+        for button in row:
+            # Messages sent before typed callback data still carry the old strings
+            data = button.callback_data and (upgrade_legacy_callback(button.callback_data) or button.callback_data)
+            if data in callbacks and data != new_button.callback_data:
+                new_row.append(new_button)
+                changed = True
+            else:
+                new_row.append(button)
+        rows.append(new_row)
+    
+    return InlineKeyboardMarkup(inline_keyboard=rows) if changed else None
+
+
 def get_cart_item_keyboard(cart_item_id: int) -> InlineKeyboardMarkup:
     """
     Get inline keyboard for cart item actions
@@ -55,7 +105,7 @@ def get_cart_item_keyboard(cart_item_id: int) -> InlineKeyboardMarkup:
     
     builder.add(InlineKeyboardButton(
         text="➖ O'chirish",
-        callback_data=f"remove_from_cart_{cart_item_id}"
+        callback_data=CartCallback(action="remove", item_id=cart_item_id).pack()
     ))
     
     builder.adjust(1)
@@ -68,11 +118,11 @@ def get_cart_actions_keyboard() -> InlineKeyboardMarkup:
     
     builder.add(InlineKeyboardButton(
         text="🗑 Savatchani tozalash",
-        callback_data="clear_cart"
+        callback_data=CartCallback(action="clear").pack()
     ))
     builder.add(InlineKeyboardButton(
         text="🛒 Buyurtma berish",
-        callback_data="order_from_cart"
+        callback_data=CartCallback(action="checkout").pack()
     ))
     
     builder.adjust(1)  # 1 button per row
@@ -93,11 +143,11 @@ def get_favorite_toy_keyboard(toy_id: int) -> InlineKeyboardMarkup:
     
     builder.add(InlineKeyboardButton(
         text="➕ Savatchaga qo'shish",
-        callback_data=f"add_to_cart_{toy_id}"
+        callback_data=AddToCartCallback(toy_id=toy_id).pack()
     ))
     builder.add(InlineKeyboardButton(
         text="🗑 Sevimlilardan o'chirish",
-        callback_data=f"remove_from_favorites_{toy_id}"
+        callback_data=FavoriteCallback(action="remove", toy_id=toy_id).pack()
     ))
     
     builder.adjust(1)  # 1 button per row
@@ -4,11 +4,14 @@ User keyboard layouts - Reply keyboards for better UX
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
 
+from keyboards.callbacks import OrderCallback, ToyPageCallback
+
 
 def get_main_menu_keyboard() -> ReplyKeyboardMarkup:
     """Main menu keyboard for users - Reply keyboard"""
     builder = ReplyKeyboardBuilder()
     builder.add(KeyboardButton(text="📦 Katalog"))
+    builder.add(KeyboardButton(text="🔍 Qidirish"))
     builder.add(KeyboardButton(text="🏆 Bestseller TOP-5"))
     builder.add(KeyboardButton(text="🛒 Savatcha"))
     builder.add(KeyboardButton(text="❤️ Sevimlilar"))
@@ -58,12 +61,12 @@ def get_toy_pagination_keyboard(page: int, total_pages: int, toy_id: int, catego
     if page > 1:
         nav_buttons.append(InlineKeyboardButton(
             text="⬅️ Oldingi",
-            callback_data=f"toy_page_{category_id}_{page - 1}"
+            callback_data=ToyPageCallback(category_id=category_id, page=page - 1).pack()
         ))
     if page < total_pages:
         nav_buttons.append(InlineKeyboardButton(
             text="Keyingi ➡️",
-            callback_data=f"toy_page_{category_id}_{page + 1}"
+            callback_data=ToyPageCallback(category_id=category_id, page=page + 1).pack()
         ))
     
     if nav_buttons:
@@ -72,7 +75,7 @@ def get_toy_pagination_keyboard(page: int, total_pages: int, toy_id: int, catego
     # Buy button
     builder.add(InlineKeyboardButton(
         text="🛒 Buyurtma berish",
-        callback_data=f"order_{toy_id}"
+        callback_data=OrderCallback(action="start", toy_id=toy_id).pack()
     ))
     
     return builder.as_markup()
@@ -83,10 +86,10 @@ def get_order_confirmation_keyboard(toy_id: int) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.add(InlineKeyboardButton(
         text="✅ Ha, buyurtma berish",
-        callback_data=f"confirm_order_{toy_id}"
+        callback_data=OrderCallback(action="confirm", toy_id=toy_id).pack()
     ))
     builder.add(InlineKeyboardButton(
         text="❌ Bekor qilish",
-        callback_data="cancel_order"
+        callback_data=OrderCallback(action="cancel").pack()
     ))
     return builder.as_markup()
@@ -0,0 +1,88 @@
+"""
+Album (media group) aggregation middleware
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Set, Tuple, Union
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.state import State
+from aiogram.types import Message, TelegramObject, Update
+
+from config import ALBUM_DEBOUNCE_MS
+
+logger = logging.getLogger(__name__)
+
+# Telegram albums hold at most this many messages
+MAX_ALBUM_SIZE = 10
+
+
+class AlbumMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that turns an album into a single update
+    
+    Only albums sent in one of `states` (FSM states that accept media) are
+    collected; every other update, albums included, passes through unchanged.
+    Telegram delivers each photo/video of an album as its own message with a
+    shared media_group_id. The parts are held until no new part arrived for
+    ALBUM_DEBOUNCE_MS, then the rest of the chain runs once, for the first
+    message, with all parts (in order) injected as `album`; the other parts are
+    not handled at all.
+    
+    The parts return immediately and the album is dispatched from a background
+    task, so this also works when one user's updates are processed strictly in
+    order (webhook workers). Register it before DbSessionMiddleware so the
+    album gets its own session when it is finally handled. Errors of the
+    background task are logged and reported to the chat, since they never
+    reach the dispatcher.
+    """
+    
+    def __init__(self, states: Iterable[Union[State, str]], latency_ms: int = ALBUM_DEBOUNCE_MS):
+        self.states = frozenset(state.state if isinstance(state, State) else state for state in states)
+        self.latency = latency_ms / 1000
+        self._albums: Dict[Tuple[int, str], List[Message]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        message = event.message if isinstance(event, Update) else None
+        if message is None or not message.media_group_id or data.get("raw_state") not in self.states:
+            return await handler(event, data)
+        
+        key = (message.chat.id, message.media_group_id)
+        parts = self._albums.get(key)
+        if parts is not None:
+            parts.append(message)
+            return None
+        
+        self._albums[key] = [message]
+        task = asyncio.create_task(self._dispatch(key, handler, event, data))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return None
+    
+    async def _dispatch(self, key, handler, event, data) -> None:
+        """Wait until the album is complete, then handle it as one update"""
+        parts = self._albums[key]
+        try:
+            while len(parts) < MAX_ALBUM_SIZE:
+                seen = len(parts)
+                await asyncio.sleep(self.latency)
+                if len(parts) == seen:
+                    break
+        finally:
+            del self._albums[key]
+        
+        data["album"] = sorted(parts, key=lambda part: part.message_id)
+        try:
+            await handler(event, data)
+        except Exception as e:
+            logger.error(f"Error handling album {key[1]} ({len(parts)} parts): {e}", exc_info=True)
+            try:
+                await data["bot"].send_message(key[0], "❌ Albomni qabul qilishda xatolik yuz berdi. Qayta yuboring.")
+            except Exception as send_error:
+                logger.error(f"Error reporting album failure to chat {key[0]}: {send_error}", exc_info=True)
@@ -0,0 +1,53 @@
+"""
+Database session middleware (one session / unit of work per update)
+"""
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Outer middleware that opens one session per update and injects it as `db`
+    
+    Services only flush; the whole update is committed once after the handler
+    returns, or rolled back if the handler raised. A failed commit is re-raised
+    so the error reaches the error handler instead of being hidden behind the
+    reply the handler already sent. The connection is checked out
+    lazily on the first query, so updates that never touch the database cost nothing.
+    
+    Handlers that write and then send may commit earlier themselves, so the
+    writer connection is not held while the reply goes out.
+    """
+    
+    def __init__(self, session_pool: async_sessionmaker):
+        self.session_pool = session_pool
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        async with self.session_pool() as db:
+            data["db"] = db
+            try:
+                result = await handler(event, data)
+            except Exception:
+                await db.rollback()
+                raise
+            
+            try:
+                await db.commit()
+            except Exception as e:
+                logger.error(f"Failed to commit update transaction: {e}", exc_info=True)
+                await db.rollback()
+                raise
+            
+            return result
+
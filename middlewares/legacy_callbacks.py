@@ -0,0 +1,36 @@
+"""
+Callback middleware for buttons sent before typed callback data
+"""
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+
+from keyboards.callbacks import upgrade_legacy_callback
+
+logger = logging.getLogger(__name__)
+
+
+class LegacyCallbackMiddleware(BaseMiddleware):
+    """
+    Outer callback_query middleware that rewrites old-style callback_data
+    
+    Messages already in users' chats (carts, toy cards, admin lists) still carry
+    strings like "add_to_cart_12"; they are translated to the packed
+    keyboards.callbacks format (one dict lookup) before routing, so the
+    handlers only know the new format.
+    """
+    
+    async def __call__(
+        self,
+        handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any]
+    ) -> Any:
+        if event.data:
+            upgraded = upgrade_legacy_callback(event.data)
+            if upgraded:
+                logger.debug(f"Legacy callback {event.data!r} -> {upgraded!r}")
+                event = event.model_copy(update={"data": upgraded})
+        return await handler(event, data)
@@ -0,0 +1,212 @@
+"""
+In-memory index of toys eligible for advertisement, with O(1) random picks
+"""
+import asyncio
+import logging
+import random
+from typing import Dict, Generic, List, Optional, TypeVar
+
+from sqlalchemy import distinct, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Toy, Category, DailyAd, DailyAdsLog
+from services.catalog_cache import catalog_cache
+from utils.periods import local_today
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Pool key used when toys are not grouped by category
+ALL_TOYS = 0
+
+
+class RandomSet(Generic[T]):
+    """Set with O(1) add, remove and uniform random choice (swap-pop list)"""
+    
+    def __init__(self):
+        self._items: List[T] = []
+        self._positions: Dict[T, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __contains__(self, item: T) -> bool:
+        return item in self._positions
+    
+    def __iter__(self):
+        return iter(self._items)
+    
+    def add(self, item: T) -> None:
+        if item not in self._positions:
+            self._positions[item] = len(self._items)
+            self._items.append(item)
+    
+    def discard(self, item: T) -> None:
+        index = self._positions.pop(item, None)
+        if index is None:
+            return
+        last = self._items.pop()
+        if index < len(self._items):
+            self._items[index] = last
+            self._positions[last] = index
+    
+    def choice(self) -> Optional[T]:
+        return random.choice(self._items) if self._items else None
+    
+    def sample(self, count: int) -> List[T]:
+        return random.sample(self._items, min(count, len(self._items)))
+
+
+class AdEligibilityIndex:
+    """
+    Active toy IDs per category, split into "all" and "not posted today"
+    
+    Built with two queries on first use, then kept current by mark_posted()
+    (called when an ad is logged). It is rebuilt when the day changes or the
+    catalog cache version moves (a toy/category/media write was committed), so
+    picking an ad never scans or sorts the toys table.
+    
+    Toys posted by another process are not seen until the next rebuild; the
+    posted-today check is only as fresh as this process's own log.
+    """
+    
+    def __init__(self, log_model, per_category: bool = True):
+        self.log_model = log_model
+        self.per_category = per_category
+        self._active: Dict[int, RandomSet[int]] = {}
+        self._eligible: Dict[int, RandomSet[int]] = {}
+        self._active_keys: RandomSet[int] = RandomSet()
+        self._eligible_keys: RandomSet[int] = RandomSet()
+        self._toy_keys: Dict[int, int] = {}
+        self._day: Optional[str] = None
+        self._catalog_version: Optional[int] = None
+        self._lock = asyncio.Lock()
+    
+    def _is_fresh(self) -> bool:
+        return self._day == local_today().isoformat() and self._catalog_version == catalog_cache.version
+    
+    async def _ensure_fresh(self, db: AsyncSession) -> None:
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if not self._is_fresh():
+                await self._rebuild(db)
+    
+    async def _rebuild(self, db: AsyncSession) -> None:
+        """Load active toys and today's posted toys"""
+        today = local_today().isoformat()
+        version = catalog_cache.version
+        
+        if self.per_category:
+            result = await db.execute(
+                select(Toy.id, Toy.category_id)
+                .join(Category, Category.id == Toy.category_id)
+                .where(Toy.is_active == True, Category.is_active == True)
+            )
+        else:
+            result = await db.execute(select(Toy.id, Toy.category_id).where(Toy.is_active == True))
+        rows = result.all()
+        
+        result = await db.execute(
+            select(distinct(self.log_model.toy_id)).where(self.log_model.posted_date == today)
+        )
+        posted_today = set(result.scalars().all())
+        
+        self._active, self._eligible = {}, {}
+        self._active_keys, self._eligible_keys = RandomSet(), RandomSet()
+        self._toy_keys = {}
+        for toy_id, category_id in rows:
+            key = category_id if self.per_category else ALL_TOYS
+            self._toy_keys[toy_id] = key
+            self._add(self._active, self._active_keys, key, toy_id)
+            if toy_id not in posted_today:
+                self._add(self._eligible, self._eligible_keys, key, toy_id)
+        
+        self._day = today
+        self._catalog_version = version
+        logger.info(
+            f"Ad index for {self.log_model.__tablename__} built: {len(self._toy_keys)} active toys, "
+            f"{sum(len(p) for p in self._eligible.values())} not posted today"
+        )
+    
+    @staticmethod
+    def _add(pools: Dict[int, RandomSet[int]], keys: RandomSet[int], key: int, toy_id: int) -> None:
+        pools.setdefault(key, RandomSet()).add(toy_id)
+        keys.add(key)
+    
+    @staticmethod
+    def _remove(pools: Dict[int, RandomSet[int]], keys: RandomSet[int], key: int, toy_id: int) -> None:
+        pool = pools.get(key)
+        if pool is None:
+            return
+        pool.discard(toy_id)
+        if not pool:
+            del pools[key]
+            keys.discard(key)
+    
+    def _pools(self, exclude_today: bool):
+        if exclude_today:
+            return self._eligible, self._eligible_keys
+        return self._active, self._active_keys
+    
+    async def pick(
+        self,
+        db: AsyncSession,
+        category_id: Optional[int] = None,
+        exclude_today: bool = True
+    ) -> Optional[int]:
+        """
+        Pick a random toy ID
+        
+        With category_id, uniform over that category's toys; without it, a
+        random category with available toys first, then a toy inside it.
+        
+        Returns:
+            Toy ID or None if nothing is available
+        """
+        await self._ensure_fresh(db)
+        pools, keys = self._pools(exclude_today)
+        
+        if category_id is None or not self.per_category:
+            category_id = keys.choice()
+            if category_id is None:
+                return None
+        
+        pool = pools.get(category_id)
+        return pool.choice() if pool else None
+    
+    async def pick_many(self, db: AsyncSession, count: int, exclude_today: bool = True) -> List[int]:
+        """Pick up to `count` distinct toy IDs, uniform over all available toys"""
+        await self._ensure_fresh(db)
+        pools, _ = self._pools(exclude_today)
+        if not self.per_category:
+            pool = pools.get(ALL_TOYS)
+            return pool.sample(count) if pool else []
+        
+        candidates = [toy_id for pool in pools.values() for toy_id in pool]
+        return random.sample(candidates, min(count, len(candidates)))
+    
+    async def is_eligible(self, db: AsyncSession, toy_id: int) -> bool:
+        """Check that a toy is still active and was not posted today"""
+        await self._ensure_fresh(db)
+        pool = self._eligible.get(self._toy_keys.get(toy_id))
+        return pool is not None and toy_id in pool
+    
+    def mark_posted(self, toy_id: int) -> None:
+        """Exclude a toy from today's picks"""
+        key = self._toy_keys.get(toy_id)
+        if key is not None:
+            self._remove(self._eligible, self._eligible_keys, key, toy_id)
+    
+    def discard(self, toy_id: int) -> None:
+        """Forget a toy found inactive/missing when loaded (stale index)"""
+        key = self._toy_keys.pop(toy_id, None)
+        if key is not None:
+            self._remove(self._eligible, self._eligible_keys, key, toy_id)
+            self._remove(self._active, self._active_keys, key, toy_id)
+
+
+# Category-based ads (daily_ads_log) and legacy scheduler ads (daily_ads)
+category_ad_index = AdEligibilityIndex(DailyAdsLog, per_category=True)
+legacy_ad_index = AdEligibilityIndex(DailyAd, per_category=False)
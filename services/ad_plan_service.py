@@ -0,0 +1,197 @@
+"""
+Service for the precomputed daily advertisement plan
+"""
+import json
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from database.models import Toy, DailyAdPlan
+from services.ad_index import category_ad_index
+from services.ads_formatter import AdsFormatter
+
+logger = logging.getLogger(__name__)
+
+# Picks per slot before giving up on finding a toy not already in the plan
+MAX_PICK_ATTEMPTS = 10
+
+# Telegram albums hold at most 10 items
+MAX_MEDIA_ITEMS = 10
+
+
+class AdPlanService:
+    """Service for building, loading and claiming daily ad plan slots"""
+    
+    @staticmethod
+    async def get_plan(db: AsyncSession, plan_date: str) -> List[DailyAdPlan]:
+        """Get all slots planned for a day, ordered by time"""
+        result = await db.execute(
+            select(DailyAdPlan)
+            .where(DailyAdPlan.plan_date == plan_date)
+            .order_by(DailyAdPlan.slot_time)
+        )
+        return list(result.scalars().all())
+    
+    @staticmethod
+    def media_spec(toy: Toy) -> List[dict]:
+        """Describe toy media as JSON-serializable dicts (photo/video + file_id)"""
+        if toy.media_items:
+            return [
+                {"type": media.media_type, "file_id": media.file_id}
+                for media in toy.media_items[:MAX_MEDIA_ITEMS]
+                if media.media_type in ("photo", "video")
+            ]
+        if toy.media_file_id and toy.media_type in ("image", "video"):
+            return [{"type": "photo" if toy.media_type == "image" else "video", "file_id": toy.media_file_id}]
+        return []
+    
+    @staticmethod
+    def build_input_media(media_json: str, caption: Optional[str] = None) -> List:
+        """
+        Turn a stored media spec into InputMedia objects
+        
+        Args:
+            media_json: DailyAdPlan.media_json
+            caption: Caption for the first item (HTML)
+        
+        Returns:
+            List of InputMediaPhoto/InputMediaVideo objects
+        """
+        from aiogram.types import InputMediaPhoto, InputMediaVideo
+        
+        media_group = []
+        for idx, item in enumerate(json.loads(media_json or "[]")):
+            media_class = InputMediaPhoto if item["type"] == "photo" else InputMediaVideo
+            if idx == 0 and caption:
+                media_group.append(media_class(media=item["file_id"], caption=caption, parse_mode="HTML"))
+            else:
+                media_group.append(media_class(media=item["file_id"]))
+        return media_group
+    
+    @staticmethod
+    async def build_plan(
+        db: AsyncSession,
+        plan_date: str,
+        slot_times: List[Tuple[int, int]]
+    ) -> List[DailyAdPlan]:
+        """
+        Build and store the plan for a day (no toy repeats within the day)
+        
+        Returns the existing plan unchanged if one was already built for
+        plan_date (e.g. after a restart).
+        
+        Args:
+            db: Database session
+            plan_date: Day in YYYY-MM-DD (AD_TIMEZONE)
+            slot_times: List of (hour, minute) tuples
+        
+        Returns:
+            List of planned slots
+        """
+        existing = await AdPlanService.get_plan(db, plan_date)
+        if existing:
+            return existing
+        
+        # Pick one toy per slot, random category first (same as live selection)
+        picks: List[int] = []
+        for _ in slot_times:
+            for _ in range(MAX_PICK_ATTEMPTS):
+                toy_id = await category_ad_index.pick(db)
+                if toy_id is None or toy_id not in picks:
+                    break
+            if toy_id is None or toy_id in picks:
+                break
+            picks.append(toy_id)
+        
+        if not picks:
+            logger.warning(f"No toys available for ad plan {plan_date}")
+            return []
+        
+        result = await db.execute(
+            select(Toy).options(selectinload(Toy.media_items)).where(Toy.id.in_(picks))
+        )
+        toys_by_id = {toy.id: toy for toy in result.scalars().all()}
+        
+        entries = []
+        for (hour, minute), toy_id in zip(slot_times, picks):
+            toy = toys_by_id.get(toy_id)
+            if not toy:
+                continue
+            entries.append(DailyAdPlan(
+                plan_date=plan_date,
+                slot_time=f"{hour:02d}:{minute:02d}",
+                toy_id=toy.id,
+                category_id=toy.category_id,
+                caption=AdsFormatter.format_ad_message(toy, toy.category),
+                media_json=json.dumps(AdPlanService.media_spec(toy)),
+                status="pending"
+            ))
+        
+        db.add_all(entries)
+        await db.flush()
+        logger.info(f"Ad plan for {plan_date} built: {len(entries)} slots")
+        return entries
+    
+    @staticmethod
+    async def claim(db: AsyncSession, plan_id: int) -> Optional[DailyAdPlan]:
+        """
+        Move a slot from pending to sending
+        
+        The caller must commit before sending, so a crash mid-send leaves the
+        slot in "sending" and it is never posted again.
+        
+        Returns:
+            The claimed slot, or None if it was already taken/finished
+        """
+        result = await db.execute(
+            update(DailyAdPlan)
+            .where(DailyAdPlan.id == plan_id, DailyAdPlan.status == "pending")
+            .values(status="sending")
+        )
+        if result.rowcount != 1:
+            return None
+        return await db.get(DailyAdPlan, plan_id, populate_existing=True)
+    
+    @staticmethod
+    async def finish(db: AsyncSession, plan_id: int, status: str) -> None:
+        """Set final status of a slot (posted, failed or skipped)"""
+        values = {"status": status}
+        if status == "posted":
+            values["posted_at"] = datetime.now()
+        await db.execute(update(DailyAdPlan).where(DailyAdPlan.id == plan_id).values(**values))
+    
+    @staticmethod
+    async def recover_interrupted(db: AsyncSession, plan_date: str) -> int:
+        """
+        Mark slots left in "sending" by a crash as failed
+        
+        It is unknown whether Telegram received them, so they are not retried.
+        """
+        result = await db.execute(
+            update(DailyAdPlan)
+            .where(DailyAdPlan.plan_date == plan_date, DailyAdPlan.status == "sending")
+            .values(status="failed")
+        )
+        if result.rowcount:
+            logger.warning(f"{result.rowcount} ad slots were interrupted mid-send, marked as failed")
+        return result.rowcount
+    
+    @staticmethod
+    async def skip_missed(db: AsyncSession, plan_date: str, before_time: str) -> int:
+        """Mark pending slots earlier than before_time (HH:MM) as skipped"""
+        result = await db.execute(
+            update(DailyAdPlan)
+            .where(
+                DailyAdPlan.plan_date == plan_date,
+                DailyAdPlan.status == "pending",
+                DailyAdPlan.slot_time < before_time
+            )
+            .values(status="skipped")
+        )
+        if result.rowcount:
+            logger.info(f"Skipped {result.rowcount} ad slots missed while the bot was down")
+        return result.rowcount
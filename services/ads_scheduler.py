@@ -3,9 +3,10 @@ Enhanced scheduler service for category-based daily advertisements
 """
 import logging
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
 from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -19,6 +20,9 @@ from services.ads_selector import AdsSelector
 from services.ads_formatter import AdsFormatter
 from services.media_service import MediaService
 from services.order_contact_service import OrderContactService
+from services.send_queue import send_priority, PRIORITY_BACKGROUND
+from services.ad_plan_service import AdPlanService
+from services.ad_index import category_ad_index
 from database.db import get_db_session
 
 logger = logging.getLogger(__name__)
@@ -42,6 +46,8 @@ class CategoryBasedAdScheduler:
         
         CRITICAL: ALL messages MUST be sent to GROUP_CHAT_ID, never to private chat.
         """
+        # Scheduled jobs run in their own task, so this only affects this ad
+        send_priority.set(PRIORITY_BACKGROUND)
         try:
             # CRITICAL: Validate GROUP_CHAT_ID before sending
             if GROUP_CHAT_ID == 0:
@@ -57,7 +63,7 @@ class CategoryBasedAdScheduler:
             db = get_db_session()
             try:
                 # Get random category and toy
-                result = AdsSelector.get_random_category_toy_pair(db, exclude_today=True)
+                result = await AdsSelector.get_random_category_toy_pair(db, exclude_today=True)
                 
                 if not result:
                     logger.info("No toys available for posting today")
@@ -65,12 +71,8 @@ class CategoryBasedAdScheduler:
                 
                 category, toy = result
                 
-                # Small delay to avoid flood control
-                import asyncio
-                await asyncio.sleep(1)
-                
                 # Check if toy has multiple media (media group)
-                toy_media = MediaService.get_toy_media(db, toy.id)
+                toy_media = await MediaService.get_toy_media(db, toy.id)
                 
                 if toy_media and len(toy_media) > 0:
                     # Format advertisement message (will be caption on first media)
@@ -146,7 +148,8 @@ class CategoryBasedAdScheduler:
                         logger.info(f"✅ Text message sent successfully to group {GROUP_CHAT_ID}")
                 
                 # Log the ad
-                AdsSelector.log_ad_posted(db, toy.id, category.id if category else None)
+                await AdsSelector.log_ad_posted(db, toy.id, category.id if category else None)
+                await db.commit()
                 
                 category_name = category.name if category else "Kategoriyasiz"
                 logger.info(f"Posted ad for toy ID {toy.id} ({toy.title}) from category {category_name} to group {GROUP_CHAT_ID}")
@@ -154,11 +157,112 @@ class CategoryBasedAdScheduler:
             except Exception as e:
                 logger.error(f"Error posting ad: {e}", exc_info=True)
             finally:
-                db.close()
+                await db.close()
                 
         except Exception as e:
             logger.error(f"Critical error in post_category_based_ad: {e}", exc_info=True)
     
+    async def post_planned_ad(self, plan_id: int):
+        """
+        Post one slot of today's precomputed plan (pure send, no selection)
+        
+        Falls back to a live pick if the planned toy was deactivated (or
+        posted manually) since the plan was built.
+        
+        CRITICAL: ALL messages MUST be sent to GROUP_CHAT_ID, never to private chat.
+        """
+        # Scheduled jobs run in their own task, so this only affects this ad
+        send_priority.set(PRIORITY_BACKGROUND)
+        if GROUP_CHAT_ID == 0:
+            logger.warning("GROUP_CHAT_ID not configured (set to 0), skipping ad post")
+            return
+        if GROUP_CHAT_ID > 0:
+            logger.error(f"❌ GROUP_CHAT_ID is positive ({GROUP_CHAT_ID}). Groups must have negative IDs. Skipping ad post.")
+            return
+        
+        db = get_db_session()
+        try:
+            # Claim the slot first; commit so a crash mid-send never re-posts it
+            entry = await AdPlanService.claim(db, plan_id)
+            await db.commit()
+            if not entry:
+                logger.info(f"Ad slot {plan_id} already handled, skipping")
+                return
+            
+            if not await category_ad_index.is_eligible(db, entry.toy_id):
+                await AdPlanService.finish(db, plan_id, "skipped")
+                await db.commit()
+                logger.info(f"Planned toy {entry.toy_id} is inactive or already posted today, posting a live pick instead")
+                await self.post_category_based_ad()
+                return
+            
+            try:
+                await self._send_planned_ad(entry)
+            except Exception as e:
+                logger.error(f"Error posting planned ad {plan_id} (toy {entry.toy_id}): {e}", exc_info=True)
+                await AdPlanService.finish(db, plan_id, "failed")
+                await db.commit()
+                return
+            
+            await AdPlanService.finish(db, plan_id, "posted")
+            await AdsSelector.log_ad_posted(db, entry.toy_id, entry.category_id)
+            await db.commit()
+            logger.info(f"Posted planned ad {entry.slot_time} for toy ID {entry.toy_id} to group {GROUP_CHAT_ID}")
+            
+        except Exception as e:
+            logger.error(f"Critical error in post_planned_ad: {e}", exc_info=True)
+        finally:
+            await db.close()
+    
+    async def _send_planned_ad(self, entry):
+        """Send a prerendered plan slot to GROUP_CHAT_ID"""
+        keyboard = AdsFormatter.get_ad_keyboard(entry.toy_id)
+        media_group = AdPlanService.build_input_media(entry.media_json, caption=entry.caption)
+        
+        if len(media_group) > 1:
+            sent_messages = await self.bot.send_media_group(
+                chat_id=GROUP_CHAT_ID,  # MUST be GROUP_CHAT_ID constant
+                media=media_group
+            )
+            # Edit first message to add keyboard
+            try:
+                await self.bot.edit_message_reply_markup(
+                    chat_id=GROUP_CHAT_ID,  # MUST be GROUP_CHAT_ID constant
+                    message_id=sent_messages[0].message_id,
+                    reply_markup=keyboard
+                )
+            except Exception as e:
+                # If editing fails, send keyboard as separate message
+                logger.warning(f"Could not edit media group message: {e}")
+                await self.bot.send_message(
+                    chat_id=GROUP_CHAT_ID,  # MUST be GROUP_CHAT_ID constant
+                    text="🔘",
+                    reply_markup=keyboard
+                )
+        elif media_group and media_group[0].type == "photo":
+            await self.bot.send_photo(
+                chat_id=GROUP_CHAT_ID,  # MUST be GROUP_CHAT_ID constant
+                photo=media_group[0].media,
+                caption=entry.caption,
+                parse_mode="HTML",
+                reply_markup=keyboard
+            )
+        elif media_group:
+            await self.bot.send_video(
+                chat_id=GROUP_CHAT_ID,  # MUST be GROUP_CHAT_ID constant
+                video=media_group[0].media,
+                caption=entry.caption,
+                parse_mode="HTML",
+                reply_markup=keyboard
+            )
+        else:
+            await self.bot.send_message(
+                chat_id=GROUP_CHAT_ID,  # MUST be GROUP_CHAT_ID constant
+                text=entry.caption,
+                parse_mode="HTML",
+                reply_markup=keyboard
+            )
+    
     def _generate_random_times(self, count: int) -> list:
         """
         Generate random times with intervals between AD_MIN_INTERVAL-AD_MAX_INTERVAL minutes
@@ -197,27 +301,12 @@ class CategoryBasedAdScheduler:
             logger.warning("Scheduler is already running")
             return
         
-        # Random ad count between min and max (10-15)
-        daily_count = random.randint(DAILY_AD_COUNT_MIN, DAILY_AD_COUNT_MAX)
-        logger.info(f"📊 Today's ad count: {daily_count} (range: {DAILY_AD_COUNT_MIN}-{DAILY_AD_COUNT_MAX})")
-        
-        # Generate random posting times
-        posting_times = self._generate_random_times(daily_count)
-        
-        if not posting_times:
-            logger.warning("No valid posting times generated")
-            return
-        
-        # Schedule ads at random times
-        for hour, minute in posting_times:
-            trigger = CronTrigger(hour=hour, minute=minute)
-            self.scheduler.add_job(
-                self.post_category_based_ad,
-                trigger=trigger,
-                id=f"cat_ad_post_{hour}_{minute}",
-                replace_existing=True
-            )
-            logger.info(f"Scheduled category-based ad post for {hour:02d}:{minute:02d}")
+        # Load today's plan (or build it if missing) as soon as the scheduler runs
+        self.scheduler.add_job(
+            self._prepare_day,
+            id="prepare_cat_ads",
+            replace_existing=True
+        )
         
         # Schedule daily rescheduling at midnight
         self.scheduler.add_job(
@@ -231,34 +320,63 @@ class CategoryBasedAdScheduler:
         self.is_running = True
         logger.info(f"✅ Category-based ad scheduler started (Timezone: {AD_TIMEZONE}, Hours: {AD_START_HOUR}:00-{AD_END_HOUR}:00)")
     
-    def _reschedule_daily_ads(self):
-        """Reschedule ads with new random times for the next day"""
+    async def _reschedule_daily_ads(self):
+        """Build the new day's ad plan at midnight and schedule its slots"""
+        await self._prepare_day()
+    
+    async def _prepare_day(self):
+        """
+        Load today's ad plan, building it first if it doesn't exist yet
+        
+        The plan is stored in daily_ad_plan, so a restart reuses it: slots
+        already posted are not posted again and slots whose time passed while
+        the bot was down are skipped.
+        """
+        now = datetime.now(self.tz)
+        plan_date = now.date().isoformat()
+        
+        db = get_db_session()
+        try:
+            await AdPlanService.recover_interrupted(db, plan_date)
+            entries = await AdPlanService.get_plan(db, plan_date)
+            
+            if not entries:
+                # Random ad count between min and max (10-15)
+                daily_count = random.randint(DAILY_AD_COUNT_MIN, DAILY_AD_COUNT_MAX)
+                logger.info(f"📊 Today's ad count: {daily_count} (range: {DAILY_AD_COUNT_MIN}-{DAILY_AD_COUNT_MAX})")
+                
+                posting_times = self._generate_random_times(daily_count)
+                if not posting_times:
+                    logger.warning("No valid posting times generated")
+                    return
+                entries = await AdPlanService.build_plan(db, plan_date, posting_times)
+            
+            await AdPlanService.skip_missed(db, plan_date, now.strftime("%H:%M"))
+            await db.commit()
+            
+            pending = [(entry.id, entry.slot_time) for entry in entries if entry.status == "pending"]
+        except Exception as e:
+            logger.error(f"Error preparing ad plan for {plan_date}: {e}", exc_info=True)
+            return
+        finally:
+            await db.close()
+        
         # Remove old ad jobs
         for job in self.scheduler.get_jobs():
             if job.id.startswith("cat_ad_post_"):
                 self.scheduler.remove_job(job.id)
         
-        # Random ad count between min and max (10-15)
-        daily_count = random.randint(DAILY_AD_COUNT_MIN, DAILY_AD_COUNT_MAX)
-        logger.info(f"📊 Tomorrow's ad count: {daily_count} (range: {DAILY_AD_COUNT_MIN}-{DAILY_AD_COUNT_MAX})")
-        
-        # Generate new random times
-        posting_times = self._generate_random_times(daily_count)
-        
-        if not posting_times:
-            logger.warning("No valid posting times generated for reschedule")
-            return
-        
-        # Schedule new ads
-        for hour, minute in posting_times:
-            trigger = CronTrigger(hour=hour, minute=minute)
+        for plan_id, slot_time in pending:
+            hour, minute = map(int, slot_time.split(":"))
+            run_date = self.tz.localize(datetime.combine(now.date(), time(hour, minute)))
             self.scheduler.add_job(
-                self.post_category_based_ad,
-                trigger=trigger,
-                id=f"cat_ad_post_{hour}_{minute}",
+                self.post_planned_ad,
+                trigger=DateTrigger(run_date=run_date),
+                args=[plan_id],
+                id=f"cat_ad_post_{plan_id}",
                 replace_existing=True
             )
-            logger.info(f"Rescheduled category-based ad post for {hour:02d}:{minute:02d}")
+            logger.info(f"Scheduled planned ad post for {slot_time}")
     
     def stop(self):
         """Stop the scheduler"""
@@ -297,21 +415,21 @@ class CategoryBasedAdScheduler:
             try:
                 if toy_id:
                     from services.catalog_service import CatalogService
-                    toy = CatalogService.get_toy_by_id(db, toy_id)
+                    toy = await CatalogService.get_toy_by_id(db, toy_id)
                     if not toy or not toy.is_active:
                         return False
                     
                     category = toy.category if toy.category else None
                     category_name = category.name if category else "Kategoriyasiz"
                 else:
-                    result = AdsSelector.get_random_category_toy_pair(db, exclude_today=False)
+                    result = await AdsSelector.get_random_category_toy_pair(db, exclude_today=False)
                     if not result:
                         return False
                     category, toy = result
                     category_name = category.name
                 
                 # Check if toy has multiple media (media group)
-                toy_media = MediaService.get_toy_media(db, toy.id)
+                toy_media = await MediaService.get_toy_media(db, toy.id)
                 
                 if toy_media and len(toy_media) > 0:
                     # Format advertisement message (will be caption on first media)
@@ -390,7 +508,8 @@ class CategoryBasedAdScheduler:
                 
                 # Log if not manual specific toy
                 if not toy_id:
-                    AdsSelector.log_ad_posted(db, toy.id, toy.category_id if toy.category else None)
+                    await AdsSelector.log_ad_posted(db, toy.id, toy.category_id if toy.category else None)
+                    await db.commit()
                 
                 logger.info(f"Manually posted ad for toy ID {toy.id} ({toy.title}) to group {GROUP_CHAT_ID}")
                 return True
@@ -399,7 +518,7 @@ class CategoryBasedAdScheduler:
                 logger.error(f"Error in manual ad post: {e}", exc_info=True)
                 return False
             finally:
-                db.close()
+                await db.close()
                 
         except Exception as e:
             logger.error(f"Critical error in post_manual_ad: {e}", exc_info=True)
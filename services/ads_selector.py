@@ -3,11 +3,16 @@ Service for selecting random toys by category for advertisements
 """
 import logging
 from typing import List, Optional, Tuple
-from datetime import date
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from database.models import Toy, Category, DailyAdsLog
+from services.ad_index import category_ad_index
+from utils.periods import local_today
+
+# Re-picks allowed when the index returns a toy that turned out inactive
+MAX_PICK_ATTEMPTS = 5
 
 logger = logging.getLogger(__name__)
 
@@ -16,19 +21,22 @@ class AdsSelector:
     """Service for selecting toys for advertisements"""
     
     @staticmethod
-    def get_active_categories(db: Session) -> List[Category]:
+    async def get_active_categories(db: AsyncSession) -> List[Category]:
         """Get all active categories"""
-        return db.query(Category).filter(Category.is_active == True).order_by(Category.name).all()
+        result = await db.execute(select(Category).where(Category.is_active == True).order_by(Category.name))
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_random_toy_from_category(
-        db: Session, 
+    async def get_random_toy_from_category(
+        db: AsyncSession, 
         category_id: int, 
         exclude_today: bool = True
     ) -> Optional[Toy]:
         """
         Get random active toy from specific category
         
+        Picks from the in-memory eligibility index and loads only that row.
+        
         Args:
             db: Database session
             category_id: Category ID
@@ -37,29 +45,29 @@ class AdsSelector:
         Returns:
             Random toy or None
         """
-        today = date.today().isoformat()
-        
-        # Build query
-        query = db.query(Toy).filter(
-            Toy.is_active == True,
-            Toy.category_id == category_id
-        )
-        
-        # Exclude toys posted today
-        if exclude_today:
-            posted_today_ids = db.query(DailyAdsLog.toy_id).filter(
-                DailyAdsLog.posted_date == today
-            ).subquery()
-            query = query.filter(~Toy.id.in_(db.query(posted_today_ids.c.toy_id)))
-        
-        # Get random toy
-        toy = query.order_by(func.random()).first()
+        for _ in range(MAX_PICK_ATTEMPTS):
+            toy_id = await category_ad_index.pick(db, category_id=category_id, exclude_today=exclude_today)
+            if toy_id is None:
+                return None
+            
+            toy = await AdsSelector._load_eligible_toy(db, toy_id)
+            if toy and toy.category_id == category_id:
+                return toy
         
-        return toy
+        return None
+    
+    @staticmethod
+    async def _load_eligible_toy(db: AsyncSession, toy_id: int) -> Optional[Toy]:
+        """Load picked toy (with category); drop it from the index if it is no longer active"""
+        toy = await db.get(Toy, toy_id, options=[joinedload(Toy.category)], populate_existing=True)
+        if toy and toy.is_active and toy.category and toy.category.is_active:
+            return toy
+        category_ad_index.discard(toy_id)
+        return None
     
     @staticmethod
-    def get_random_category_toy_pair(
-        db: Session,
+    async def get_random_category_toy_pair(
+        db: AsyncSession,
         exclude_today: bool = True
     ) -> Optional[Tuple[Category, Toy]]:
         """
@@ -72,35 +80,23 @@ class AdsSelector:
         Returns:
             Tuple of (Category, Toy) or None
         """
-        # Get all active categories
-        categories = AdsSelector.get_active_categories(db)
-        
-        if not categories:
-            logger.warning("No active categories found")
-            return None
-        
-        # Shuffle categories
-        import random
-        random.shuffle(categories)
-        
-        # Try each category until we find one with available toys
-        for category in categories:
-            toy = AdsSelector.get_random_toy_from_category(
-                db,
-                category_id=category.id,
-                exclude_today=exclude_today
-            )
+        # Random category among those with available toys, then a toy in it
+        for _ in range(MAX_PICK_ATTEMPTS):
+            toy_id = await category_ad_index.pick(db, exclude_today=exclude_today)
+            if toy_id is None:
+                break
             
+            toy = await AdsSelector._load_eligible_toy(db, toy_id)
             if toy:
-                return (category, toy)
+                return (toy.category, toy)
         
         # No toys available in any category
         logger.warning("No available toys found in any category")
         return None
     
     @staticmethod
-    def log_ad_posted(
-        db: Session,
+    async def log_ad_posted(
+        db: AsyncSession,
         toy_id: int,
         category_id: Optional[int] = None
     ) -> None:
@@ -112,17 +108,18 @@ class AdsSelector:
             toy_id: Toy ID that was posted
             category_id: Category ID (optional)
         """
-        today = date.today().isoformat()
+        today = local_today().isoformat()
         ad_log = DailyAdsLog(
             toy_id=toy_id,
             category_id=category_id,
             posted_date=today
         )
         db.add(ad_log)
-        db.commit()
+        await db.flush()
+        category_ad_index.mark_posted(toy_id)
     
     @staticmethod
-    def get_today_posted_count(db: Session) -> int:
+    async def get_today_posted_count(db: AsyncSession) -> int:
         """Get count of ads posted today"""
-        today = date.today().isoformat()
-        return db.query(DailyAdsLog).filter(DailyAdsLog.posted_date == today).count()
+        today = local_today().isoformat()
+        return await db.scalar(select(func.count(DailyAdsLog.id)).where(DailyAdsLog.posted_date == today))
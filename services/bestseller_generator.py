@@ -3,9 +3,8 @@ Service for generating and managing bestseller categories
 """
 import logging
 from typing import List, Optional, Tuple
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, and_
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import SalesLog, BestsellerCategory, Category
 from services.stats_service import StatsService
@@ -17,8 +16,8 @@ class BestsellerGenerator:
     """Service for bestseller category generation and management"""
     
     @staticmethod
-    def generate_auto_bestsellers(
-        db: Session,
+    async def generate_auto_bestsellers(
+        db: AsyncSession,
         period: str  # 'weekly', 'monthly', 'yearly'
     ) -> List[BestsellerCategory]:
         """
@@ -32,15 +31,17 @@ class BestsellerGenerator:
             List of created BestsellerCategory objects
         """
         # First, deactivate previous auto records for this period
-        db.query(BestsellerCategory).filter(
-            BestsellerCategory.period == period,
-            BestsellerCategory.source == "auto",
-            BestsellerCategory.is_active == True
-        ).update({BestsellerCategory.is_active: False})
-        db.commit()
+        await db.execute(
+            update(BestsellerCategory).where(
+                BestsellerCategory.period == period,
+                BestsellerCategory.source == "auto",
+                BestsellerCategory.is_active == True
+            ).values(is_active=False)
+        )
+        await db.flush()
         
         # Get category stats for the period
-        stats = StatsService.get_category_stats_by_time_range(db, period)
+        stats = await StatsService.get_category_stats_by_time_range(db, period)
         
         if not stats or len(stats) == 0:
             logger.warning(f"No stats available for {period} period")
@@ -53,18 +54,22 @@ class BestsellerGenerator:
         bestsellers = []
         for rank, (category_name, count) in enumerate(top_5, 1):
             # Get category by name
-            category = db.query(Category).filter(Category.name == category_name).first()
+            result = await db.execute(select(Category).where(Category.name == category_name).limit(1))
+            category = result.scalars().first()
             if not category:
                 logger.warning(f"Category '{category_name}' not found in database")
                 continue
             
             # Check if manual bestseller exists at this rank
-            existing_manual = db.query(BestsellerCategory).filter(
-                BestsellerCategory.period == period,
-                BestsellerCategory.rank == rank,
-                BestsellerCategory.source == "manual",
-                BestsellerCategory.is_active == True
-            ).first()
+            result = await db.execute(
+                select(BestsellerCategory).where(
+                    BestsellerCategory.period == period,
+                    BestsellerCategory.rank == rank,
+                    BestsellerCategory.source == "manual",
+                    BestsellerCategory.is_active == True
+                ).limit(1)
+            )
+            existing_manual = result.scalars().first()
             
             # Skip if manual exists at this rank
             if existing_manual:
@@ -82,13 +87,13 @@ class BestsellerGenerator:
             db.add(bestseller)
             bestsellers.append(bestseller)
         
-        db.commit()
+        await db.flush()
         logger.info(f"Generated {len(bestsellers)} auto bestsellers for {period} period")
         return bestsellers
     
     @staticmethod
-    def get_bestsellers(
-        db: Session,
+    async def get_bestsellers(
+        db: AsyncSession,
         period: str,
         limit: int = 5
     ) -> List[BestsellerCategory]:
@@ -104,16 +109,19 @@ class BestsellerGenerator:
             List of BestsellerCategory sorted by rank
         """
         # Get all active bestsellers for period
-        bestsellers = db.query(BestsellerCategory).filter(
-            BestsellerCategory.period == period,
-            BestsellerCategory.is_active == True
-        ).order_by(BestsellerCategory.rank).limit(limit).all()
+        result = await db.execute(
+            select(BestsellerCategory).where(
+                BestsellerCategory.period == period,
+                BestsellerCategory.is_active == True
+            ).order_by(BestsellerCategory.rank).limit(limit)
+        )
+        bestsellers = list(result.scalars().all())
         
         return bestsellers
     
     @staticmethod
-    def create_manual_bestseller(
-        db: Session,
+    async def create_manual_bestseller(
+        db: AsyncSession,
         category_id: int,
         period: str,
         rank: int
@@ -135,33 +143,38 @@ class BestsellerGenerator:
             return None
         
         # Get category
-        category = db.query(Category).filter(Category.id == category_id).first()
+        category = await db.get(Category, category_id)
         if not category:
             return None
         
         # Check if rank is already taken by manual
-        existing_manual = db.query(BestsellerCategory).filter(
-            BestsellerCategory.period == period,
-            BestsellerCategory.rank == rank,
-            BestsellerCategory.source == "manual",
-            BestsellerCategory.is_active == True
-        ).first()
+        result = await db.execute(
+            select(BestsellerCategory).where(
+                BestsellerCategory.period == period,
+                BestsellerCategory.rank == rank,
+                BestsellerCategory.source == "manual",
+                BestsellerCategory.is_active == True
+            ).limit(1)
+        )
+        existing_manual = result.scalars().first()
         
         if existing_manual:
             # Update existing
             existing_manual.category_id = category_id
             existing_manual.category_name = category.name
-            db.commit()
-            db.refresh(existing_manual)
+            await db.flush()
+            await db.refresh(existing_manual)
             return existing_manual
         
         # Deactivate auto bestseller at this rank
-        db.query(BestsellerCategory).filter(
-            BestsellerCategory.period == period,
-            BestsellerCategory.rank == rank,
-            BestsellerCategory.source == "auto",
-            BestsellerCategory.is_active == True
-        ).update({BestsellerCategory.is_active: False})
+        await db.execute(
+            update(BestsellerCategory).where(
+                BestsellerCategory.period == period,
+                BestsellerCategory.rank == rank,
+                BestsellerCategory.source == "auto",
+                BestsellerCategory.is_active == True
+            ).values(is_active=False)
+        )
         
         # Create new manual bestseller
         bestseller = BestsellerCategory(
@@ -173,14 +186,14 @@ class BestsellerGenerator:
             is_active=True
         )
         db.add(bestseller)
-        db.commit()
-        db.refresh(bestseller)
+        await db.flush()
+        await db.refresh(bestseller)
         
         return bestseller
     
     @staticmethod
-    def deactivate_bestseller(
-        db: Session,
+    async def deactivate_bestseller(
+        db: AsyncSession,
         bestseller_id: int
     ) -> bool:
         """
@@ -193,15 +206,13 @@ class BestsellerGenerator:
         Returns:
             True if successful
         """
-        bestseller = db.query(BestsellerCategory).filter(
-            BestsellerCategory.id == bestseller_id
-        ).first()
+        bestseller = await db.get(BestsellerCategory, bestseller_id)
         
         if not bestseller:
             return False
         
         bestseller.is_active = False
-        db.commit()
+        await db.flush()
         return True
     
     @staticmethod
@@ -2,11 +2,14 @@
 Scheduler for automatic bestseller generation
 """
 import logging
+from datetime import datetime
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from sqlalchemy.orm import Session
+from apscheduler.triggers.date import DateTrigger
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from services.bestseller_generator import BestsellerGenerator
+from services.sales_rollup_service import SalesRollupService
 from database.db import get_db_session
 
 logger = logging.getLogger(__name__)
@@ -19,38 +22,52 @@ class BestsellerScheduler:
         self.scheduler = AsyncIOScheduler()
         self.is_running = False
     
+    async def catch_up_sales_rollups(self):
+        """Fold sales logs not yet counted into the daily rollups (startup and 00:01)"""
+        db = get_db_session()
+        try:
+            await SalesRollupService.catch_up(db)
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Error catching up sales rollups: {e}", exc_info=True)
+        finally:
+            await db.close()
+    
     async def generate_weekly_bestsellers(self):
         """Generate weekly bestsellers (every Monday 00:05)"""
         db = get_db_session()
         try:
-            bestsellers = BestsellerGenerator.generate_auto_bestsellers(db, "weekly")
+            bestsellers = await BestsellerGenerator.generate_auto_bestsellers(db, "weekly")
+            await db.commit()
             logger.info(f"Generated {len(bestsellers)} weekly bestsellers")
         except Exception as e:
             logger.error(f"Error generating weekly bestsellers: {e}", exc_info=True)
         finally:
-            db.close()
+            await db.close()
     
     async def generate_monthly_bestsellers(self):
         """Generate monthly bestsellers (1st day of month)"""
         db = get_db_session()
         try:
-            bestsellers = BestsellerGenerator.generate_auto_bestsellers(db, "monthly")
+            bestsellers = await BestsellerGenerator.generate_auto_bestsellers(db, "monthly")
+            await db.commit()
             logger.info(f"Generated {len(bestsellers)} monthly bestsellers")
         except Exception as e:
             logger.error(f"Error generating monthly bestsellers: {e}", exc_info=True)
         finally:
-            db.close()
+            await db.close()
     
     async def generate_yearly_bestsellers(self):
         """Generate yearly bestsellers (January 1st)"""
         db = get_db_session()
         try:
-            bestsellers = BestsellerGenerator.generate_auto_bestsellers(db, "yearly")
+            bestsellers = await BestsellerGenerator.generate_auto_bestsellers(db, "yearly")
+            await db.commit()
             logger.info(f"Generated {len(bestsellers)} yearly bestsellers")
         except Exception as e:
             logger.error(f"Error generating yearly bestsellers: {e}", exc_info=True)
         finally:
-            db.close()
+            await db.close()
     
     def start(self):
         """Start the scheduler"""
@@ -58,6 +75,21 @@ class BestsellerScheduler:
             logger.warning("Bestseller scheduler is already running")
             return
         
+        # Sales rollups: once at startup (backfill), then daily at 00:01,
+        # before the bestseller jobs read them
+        self.scheduler.add_job(
+            self.catch_up_sales_rollups,
+            trigger=DateTrigger(run_date=datetime.now()),
+            id="catch_up_sales_rollups_startup",
+            replace_existing=True
+        )
+        self.scheduler.add_job(
+            self.catch_up_sales_rollups,
+            trigger=CronTrigger(hour=0, minute=1),
+            id="catch_up_sales_rollups",
+            replace_existing=True
+        )
+        
         # Weekly: Every Monday at 00:05
         self.scheduler.add_job(
             self.generate_weekly_bestsellers,
@@ -0,0 +1,144 @@
+"""
+In-process write-through cache of user carts
+"""
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import CART_CACHE_SIZE, CART_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Session.info key holding cart changes staged in the current transaction
+PENDING_KEY = "cart_pending"
+
+
+@dataclass(frozen=True)
+class CachedCartItem:
+    """
+    Read-only cart row
+    
+    Has the same attribute names as CartItem, so display code accepts either.
+    """
+    id: int
+    user_id: int
+    toy_id: int
+    toy_name: str
+    price: str
+    price_amount: Optional[int]
+    quantity: int
+    created_at: datetime
+
+
+# Staged change: ("upsert", item), ("remove", item_id) or ("clear", None)
+CartChange = Tuple[str, object]
+
+
+def apply_cart_changes(items: List[CachedCartItem], changes: List[CartChange]) -> List[CachedCartItem]:
+    """Return a copy of a cart with changes applied (upserts keep the line position)"""
+    items = list(items)
+    for kind, value in changes:
+        if kind == "upsert":
+            for idx, item in enumerate(items):
+                if item.id == value.id:
+                    items[idx] = value
+                    break
+            else:
+                items.append(value)
+        elif kind == "remove":
+            items = [item for item in items if item.id != value]
+        elif kind == "clear":
+            items = []
+    return items
+
+
+class CartCache:
+    """
+    Per-user carts, most recently used first, bounded by CART_CACHE_SIZE users
+    
+    Services stage every cart write on the session; the staged changes are
+    applied to the cached cart only when the transaction commits (and dropped
+    on rollback), so the cache never shows uncommitted rows. CART_CACHE_TTL
+    bounds staleness from writes made by other processes.
+    """
+    
+    def __init__(self, max_users: int = CART_CACHE_SIZE, ttl: int = CART_CACHE_TTL):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._carts: "OrderedDict[int, Tuple[float, List[CachedCartItem]]]" = OrderedDict()
+        self._generation = 0
+    
+    @property
+    def generation(self) -> int:
+        """Incremented on every committed cart write (read it before loading a cart)"""
+        return self._generation
+    
+    def get(self, user_id: int) -> Optional[List[CachedCartItem]]:
+        """Cached cart (oldest item first) or None on a miss"""
+        entry = self._carts.get(user_id)
+        if entry is None:
+            return None
+        loaded_at, items = entry
+        if time.monotonic() - loaded_at >= self.ttl:
+            del self._carts[user_id]
+            return None
+        self._carts.move_to_end(user_id)
+        return list(items)
+    
+    def put(self, user_id: int, items: List[CachedCartItem], generation: int) -> None:
+        """
+        Store a cart loaded from the database
+        
+        Skipped if any cart write committed since `generation` was read, as
+        the loaded rows may predate it.
+        """
+        if self.max_users <= 0 or self.ttl <= 0 or generation != self._generation:
+            return
+        self._carts[user_id] = (time.monotonic(), list(items))
+        self._carts.move_to_end(user_id)
+        while len(self._carts) > self.max_users:
+            self._carts.popitem(last=False)
+    
+    def apply(self, user_id: int, changes: List[CartChange]) -> None:
+        """Apply committed changes to a cached cart (no-op if it isn't cached)"""
+        self._generation += 1
+        entry = self._carts.get(user_id)
+        if entry is None:
+            return
+        loaded_at, items = entry
+        self._carts[user_id] = (loaded_at, apply_cart_changes(items, changes))
+    
+    def discard(self, user_id: int) -> None:
+        """Forget a user's cart (next read loads it from the database)"""
+        self._carts.pop(user_id, None)
+
+
+cart_cache = CartCache()
+
+
+def stage_cart_change(session: Session, user_id: int, kind: str, value: object = None) -> None:
+    """Record a cart write to apply to the cache when the session commits"""
+    pending: Dict[int, List[CartChange]] = session.info.setdefault(PENDING_KEY, {})
+    pending.setdefault(user_id, []).append((kind, value))
+
+
+def has_pending_changes(session: Session, user_id: int) -> bool:
+    """True if the session wrote this user's cart and hasn't committed yet"""
+    return user_id in session.info.get(PENDING_KEY, {})
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_on_commit(session):
+    for user_id, changes in session.info.pop(PENDING_KEY, {}).items():
+        cart_cache.apply(user_id, changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session, previous_transaction):
+    session.info.pop(PENDING_KEY, None)
@@ -2,43 +2,88 @@
 Service for managing shopping cart
 """
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import CartItem, Toy
+from services.cart_cache import CachedCartItem, cart_cache, has_pending_changes, stage_cart_change
+from utils.prices import format_amount, parse_price
+
+# Columns copied into CachedCartItem
+CART_COLUMNS = (
+    CartItem.id,
+    CartItem.user_id,
+    CartItem.toy_id,
+    CartItem.toy_name,
+    CartItem.price,
+    CartItem.price_amount,
+    CartItem.quantity,
+    CartItem.created_at
+)
 
 
 class CartService:
     """Service for cart operations"""
     
     @staticmethod
-    def get_user_cart(db: Session, user_id: int) -> List[CartItem]:
-        """Get all cart items for a user"""
-        return db.query(CartItem).filter(
-            CartItem.user_id == user_id
-        ).order_by(CartItem.created_at).all()
+    def _to_cached(row) -> CachedCartItem:
+        return CachedCartItem(
+            id=row.id,
+            user_id=row.user_id,
+            toy_id=row.toy_id,
+            toy_name=row.toy_name,
+            price=row.price,
+            price_amount=row.price_amount,
+            quantity=row.quantity,
+            created_at=row.created_at
+        )
     
     @staticmethod
-    def get_cart_item(db: Session, user_id: int, toy_id: int) -> Optional[CartItem]:
+    async def get_user_cart(db: AsyncSession, user_id: int) -> List[CachedCartItem]:
+        """Get all cart items for a user (served from the cart cache when possible)"""
+        if not has_pending_changes(db.sync_session, user_id):
+            cached = cart_cache.get(user_id)
+            if cached is not None:
+                return cached
+        
+        generation = cart_cache.generation
+        result = await db.execute(
+            select(*CART_COLUMNS).where(
+                CartItem.user_id == user_id
+            ).order_by(CartItem.created_at, CartItem.id)
+        )
+        items = [CartService._to_cached(row) for row in result.all()]
+        if not has_pending_changes(db.sync_session, user_id):
+            cart_cache.put(user_id, items, generation)
+        return items
+    
+    @staticmethod
+    async def get_cart_item(db: AsyncSession, user_id: int, toy_id: int) -> Optional[CartItem]:
         """Get specific cart item"""
-        return db.query(CartItem).filter(
-            and_(
-                CartItem.user_id == user_id,
-                CartItem.toy_id == toy_id
-            )
-        ).first()
+        result = await db.execute(
+            select(CartItem).where(
+                and_(
+                    CartItem.user_id == user_id,
+                    CartItem.toy_id == toy_id
+                )
+            ).limit(1)
+        )
+        return result.scalars().first()
     
     @staticmethod
-    def add_to_cart(
-        db: Session,
+    async def add_to_cart(
+        db: AsyncSession,
         user_id: int,
         toy_id: int,
         toy_name: str,
         price: str
-    ) -> CartItem:
+    ) -> CachedCartItem:
         """
         Add toy to cart or increase quantity if exists
         
+        One INSERT ... ON CONFLICT (user_id, toy_id) DO UPDATE ... RETURNING
+        statement, so concurrent taps can't create duplicate rows.
+        
         Args:
             db: Database session
             user_id: User ID
@@ -47,33 +92,94 @@ class CartService:
             price: Toy price (denormalized)
             
         Returns:
-            CartItem object
+            CachedCartItem with the new quantity
         """
-        # Check if item already exists
-        existing_item = CartService.get_cart_item(db, user_id, toy_id)
-        
-        if existing_item:
-            # Increase quantity
-            existing_item.quantity += 1
-            db.commit()
-            db.refresh(existing_item)
-            return existing_item
+        values = {
+            "user_id": user_id,
+            "toy_id": toy_id,
+            "toy_name": toy_name,
+            "price": price,
+            "price_amount": parse_price(price),
+            "quantity": 1
+        }
+        dialect = db.bind.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(CartItem).values(**values)
+            statement = statement.on_conflict_do_update(
+                index_elements=["user_id", "toy_id"],
+                set_={
+                    "quantity": CartItem.quantity + 1,
+                    "toy_name": statement.excluded.toy_name,
+                    "price": statement.excluded.price,
+                    "price_amount": statement.excluded.price_amount,
+                    "updated_at": func.now()
+                }
+            ).returning(*CART_COLUMNS)
+            item = CartService._to_cached((await db.execute(statement)).one())
         else:
-            # Create new cart item
-            cart_item = CartItem(
-                user_id=user_id,
-                toy_id=toy_id,
-                toy_name=toy_name,
-                price=price,
-                quantity=1
-            )
-            db.add(cart_item)
-            db.commit()
-            db.refresh(cart_item)
-            return cart_item
+            cart_item = await CartService.get_cart_item(db, user_id, toy_id)
+            if cart_item:
+                cart_item.quantity += 1
+                cart_item.toy_name = toy_name
+                cart_item.price = price
+            else:
+                cart_item = CartItem(**values)
+                db.add(cart_item)
+            await db.flush()
+            await db.refresh(cart_item)
+            item = CartService._to_cached(cart_item)
+        
+        stage_cart_change(db.sync_session, user_id, "upsert", item)
+        return item
+    
+    @staticmethod
+    async def change_quantity(
+        db: AsyncSession,
+        cart_item_id: int,
+        user_id: int,
+        delta: int
+    ) -> Optional[CachedCartItem]:
+        """
+        Change a line's quantity with one UPDATE ... RETURNING
+        
+        The quantity never drops below 1; remove the line instead.
+        
+        Args:
+            db: Database session
+            cart_item_id: Cart item ID
+            user_id: User ID (for security)
+            delta: Quantity change (+1 / -1)
+            
+        Returns:
+            Updated CachedCartItem, or None if the line doesn't exist or
+            would drop below 1
+        """
+        result = await db.execute(
+            update(CartItem).where(
+                and_(
+                    CartItem.id == cart_item_id,
+                    CartItem.user_id == user_id,
+                    CartItem.quantity + delta >= 1
+                )
+            ).values(
+                quantity=CartItem.quantity + delta,
+                updated_at=func.now()
+            ).returning(*CART_COLUMNS)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        
+        item = CartService._to_cached(row)
+        stage_cart_change(db.sync_session, user_id, "upsert", item)
+        return item
     
     @staticmethod
-    def remove_from_cart(db: Session, cart_item_id: int, user_id: int) -> bool:
+    async def remove_from_cart(db: AsyncSession, cart_item_id: int, user_id: int) -> bool:
         """
         Remove item from cart
         
@@ -85,22 +191,22 @@ class CartService:
         Returns:
             True if successful
         """
-        cart_item = db.query(CartItem).filter(
-            and_(
-                CartItem.id == cart_item_id,
-                CartItem.user_id == user_id
+        result = await db.execute(
+            delete(CartItem).where(
+                and_(
+                    CartItem.id == cart_item_id,
+                    CartItem.user_id == user_id
+                )
             )
-        ).first()
-        
-        if not cart_item:
+        )
+        if result.rowcount != 1:
             return False
         
-        db.delete(cart_item)
-        db.commit()
+        stage_cart_change(db.sync_session, user_id, "remove", cart_item_id)
         return True
     
     @staticmethod
-    def clear_cart(db: Session, user_id: int) -> int:
+    async def clear_cart(db: AsyncSession, user_id: int) -> int:
         """
         Clear all items from user's cart
         
@@ -111,42 +217,42 @@ class CartService:
         Returns:
             Number of items deleted
         """
-        count = db.query(CartItem).filter(
-            CartItem.user_id == user_id
-        ).delete()
-        db.commit()
-        return count
+        result = await db.execute(
+            delete(CartItem).where(
+                CartItem.user_id == user_id
+            )
+        )
+        await db.flush()
+        stage_cart_change(db.sync_session, user_id, "clear")
+        return result.rowcount
     
     @staticmethod
-    def calculate_total_price(cart_items: List[CartItem]) -> int:
+    def calculate_total_price(cart_items: List[CachedCartItem]) -> int:
         """
         Calculate total price of cart items
         
+        Uses the precomputed price_amount; items without a parseable price
+        (e.g. "kelishilgan") are left out of the total.
+        
         Args:
-            cart_items: List of CartItem objects
+            cart_items: List of cart items
             
         Returns:
             Total price in so'm (as integer)
         """
-        total = 0
-        for item in cart_items:
-            # Parse price string (remove "so'm", spaces, etc.)
-            price_str = item.price.replace("so'm", "").replace(" ", "").replace(",", "").strip()
-            try:
-                price = int(price_str)
-                total += price * item.quantity
-            except ValueError:
-                # If price can't be parsed, skip this item
-                continue
-        return total
+        return sum(
+            item.price_amount * item.quantity
+            for item in cart_items
+            if item.price_amount is not None
+        )
     
     @staticmethod
-    def format_cart_for_display(cart_items: List[CartItem]) -> str:
+    def format_cart_for_display(cart_items: List[CachedCartItem]) -> str:
         """
         Format cart items for display
         
         Args:
-            cart_items: List of CartItem objects
+            cart_items: List of cart items
             
         Returns:
             Formatted string in Uzbek
@@ -162,7 +268,7 @@ class CartService:
         
         # Calculate total
         total = CartService.calculate_total_price(cart_items)
-        total_formatted = f"{total:,}".replace(",", " ")
+        total_formatted = format_amount(total)
         
         text += "────────────────\n"
         text += f"💵 <b>Umumiy narx: {total_formatted} so'm</b>"
@@ -0,0 +1,257 @@
+"""
+In-process read-through cache for the user-facing catalog
+(categories, active toys per category and their media)
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, noload
+
+from config import CATALOG_CACHE_TTL
+from database.models import Category, Toy, ToyMedia
+
+logger = logging.getLogger(__name__)
+
+# Tables whose changes make the snapshot stale
+CATALOG_TABLES = {Category.__tablename__, Toy.__tablename__, ToyMedia.__tablename__}
+CATALOG_MODELS = (Category, Toy, ToyMedia)
+
+# Session.info key set when a catalog row was written in the current transaction
+DIRTY_FLAG = "catalog_dirty"
+
+
+@dataclass(frozen=True)
+class CachedCategory:
+    """Read-only category row"""
+    id: int
+    name: str
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class CachedMedia:
+    """Read-only toy media row"""
+    file_id: str
+    media_type: str
+    sort_order: int
+
+
+@dataclass(frozen=True)
+class CachedToy:
+    """
+    Read-only toy row with category and media attached
+    
+    Has the same attribute names as Toy, so display code accepts either.
+    """
+    id: int
+    title: str
+    price: str
+    price_amount: Optional[int]
+    description: str
+    media_type: Optional[str]
+    media_file_id: Optional[str]
+    category_id: Optional[int]
+    is_active: bool
+    created_at: datetime
+    category: Optional[CachedCategory]
+    media_items: Tuple[CachedMedia, ...]
+
+
+@dataclass
+class CatalogSnapshot:
+    """Immutable view of the catalog at a given cache version"""
+    version: int
+    built_at: float
+    categories_by_id: Dict[int, CachedCategory] = field(default_factory=dict)
+    categories_by_name: Dict[str, CachedCategory] = field(default_factory=dict)
+    active_categories: List[CachedCategory] = field(default_factory=list)
+    # Active toys per category, newest first (created_at desc)
+    toys_by_category: Dict[int, List[CachedToy]] = field(default_factory=dict)
+    # The same toys by ID
+    toys_by_id: Dict[int, CachedToy] = field(default_factory=dict)
+
+
+class CatalogCache:
+    """
+    Versioned catalog snapshot, rebuilt lazily on first read after invalidation
+    
+    Writes to categories/toys/toy_media mark the session dirty; the snapshot is
+    dropped only once that transaction commits, so readers never cache data
+    that could still be rolled back. A build started before an invalidation is
+    not stored (version check), and CATALOG_CACHE_TTL bounds staleness from
+    writes made outside this process.
+    """
+    
+    def __init__(self, ttl: int = CATALOG_CACHE_TTL):
+        self.ttl = ttl
+        self._version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = asyncio.Lock()
+    
+    @property
+    def version(self) -> int:
+        """Current cache version (incremented on every invalidation)"""
+        return self._version
+    
+    def invalidate(self) -> None:
+        """Drop the current snapshot; the next read rebuilds it"""
+        self._version += 1
+        self._snapshot = None
+        logger.debug(f"Catalog cache invalidated (version {self._version})")
+    
+    def _is_fresh(self, snapshot: Optional[CatalogSnapshot]) -> bool:
+        if snapshot is None or snapshot.version != self._version:
+            return False
+        return time.monotonic() - snapshot.built_at < self.ttl
+    
+    async def get(self, db: AsyncSession) -> CatalogSnapshot:
+        """
+        Get current catalog snapshot, loading it through `db` if needed
+        
+        Args:
+            db: Database session used only on a cache miss
+        
+        Returns:
+            CatalogSnapshot
+        """
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+        
+        if self.ttl <= 0:
+            # Cache disabled
+            return await self._build(db, self._version)
+        
+        async with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+            
+            version = self._version
+            snapshot = await self._build(db, version)
+            # Don't store a snapshot that an invalidation raced past
+            if version == self._version:
+                self._snapshot = snapshot
+            return snapshot
+    
+    @staticmethod
+    async def _build(db: AsyncSession, version: int) -> CatalogSnapshot:
+        """Load categories, active toys and their media in three queries"""
+        started = time.monotonic()
+        
+        result = await db.execute(select(Category).order_by(Category.name))
+        categories = {
+            c.id: CachedCategory(id=c.id, name=c.name, is_active=c.is_active)
+            for c in result.scalars().all()
+        }
+        
+        result = await db.execute(
+            select(ToyMedia.toy_id, ToyMedia.file_id, ToyMedia.media_type, ToyMedia.sort_order)
+            .join(Toy, Toy.id == ToyMedia.toy_id)
+            .where(Toy.is_active == True)
+            .order_by(ToyMedia.toy_id, ToyMedia.sort_order)
+        )
+        media_by_toy: Dict[int, List[CachedMedia]] = {}
+        for row in result.all():
+            media_by_toy.setdefault(row.toy_id, []).append(
+                CachedMedia(file_id=row.file_id, media_type=row.media_type, sort_order=row.sort_order)
+            )
+        
+        result = await db.execute(
+            select(Toy).options(noload(Toy.category)).where(
+                Toy.is_active == True
+            ).order_by(Toy.created_at.desc())
+        )
+        toys_by_category: Dict[int, List[CachedToy]] = {}
+        for t in result.scalars().all():
+            if t.category_id is None:
+                continue
+            toys_by_category.setdefault(t.category_id, []).append(CachedToy(
+                id=t.id,
+                title=t.title,
+                price=t.price,
+                price_amount=t.price_amount,
+                description=t.description,
+                media_type=t.media_type,
+                media_file_id=t.media_file_id,
+                category_id=t.category_id,
+                is_active=t.is_active,
+                created_at=t.created_at,
+                category=categories.get(t.category_id),
+                media_items=tuple(media_by_toy.get(t.id, ()))
+            ))
+        
+        snapshot = CatalogSnapshot(
+            version=version,
+            built_at=time.monotonic(),
+            categories_by_id=categories,
+            categories_by_name={c.name: c for c in categories.values()},
+            active_categories=[c for c in categories.values() if c.is_active],
+            toys_by_category=toys_by_category,
+            toys_by_id={toy.id: toy for toys in toys_by_category.values() for toy in toys}
+        )
+        logger.info(
+            f"Catalog cache built (version {version}): {len(categories)} categories, "
+            f"{sum(len(v) for v in toys_by_category.values())} toys in "
+            f"{(time.monotonic() - started) * 1000:.1f} ms"
+        )
+        return snapshot
+    
+    async def get_active_categories(self, db: AsyncSession) -> List[CachedCategory]:
+        """Get active categories ordered by name"""
+        return (await self.get(db)).active_categories
+    
+    async def get_category_by_id(self, db: AsyncSession, category_id: int) -> Optional[CachedCategory]:
+        """Get category by ID"""
+        return (await self.get(db)).categories_by_id.get(category_id)
+    
+    async def get_category_by_name(self, db: AsyncSession, name: str) -> Optional[CachedCategory]:
+        """Get category by name"""
+        return (await self.get(db)).categories_by_name.get(name)
+    
+    async def get_active_toys_by_category(self, db: AsyncSession, category_id: int) -> List[CachedToy]:
+        """Get all active toys in a category, newest first"""
+        return (await self.get(db)).toys_by_category.get(category_id, [])
+
+
+catalog_cache = CatalogCache()
+
+
+def mark_catalog_changed(session: Session) -> None:
+    """Flag the session so the cache is invalidated when it commits"""
+    session.info[DIRTY_FLAG] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _track_catalog_flush(session, flush_context):
+    """Catch ORM inserts/updates/deletes of catalog rows"""
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, CATALOG_MODELS):
+            mark_catalog_changed(session)
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_catalog_bulk_statements(orm_execute_state):
+    """Catch bulk update()/delete() statements on catalog tables"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and table.name in CATALOG_TABLES:
+            mark_catalog_changed(orm_execute_state.session)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop(DIRTY_FLAG, False):
+        catalog_cache.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session, previous_transaction):
+    session.info.pop(DIRTY_FLAG, None)
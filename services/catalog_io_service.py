@@ -0,0 +1,430 @@
+"""
+Bulk catalog import/export (CSV and JSONL files)
+"""
+import csv
+import html
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import selectinload
+
+from config import CATALOG_IMPORT_CHUNK_SIZE
+from database.db import get_db_session
+from database.models import Category, Toy, ToyMedia
+from services.catalog_cache import mark_catalog_changed
+from services.search_service import index_toys_fts
+from utils.prices import parse_price
+
+logger = logging.getLogger(__name__)
+
+# Export columns; import reads the same columns. Rows with an "id" update that toy
+# (an edited export round-trips), rows without one create a new toy.
+CATALOG_FIELDS = ("id", "title", "price", "description", "category", "media", "is_active")
+
+MEDIA_TYPES = ("photo", "video")
+MAX_MEDIA_PER_TOY = 10
+MAX_REPORTED_ERRORS = 20
+
+_TRUE_VALUES = {"", "1", "true", "yes", "ha", "faol"}
+_FALSE_VALUES = {"0", "false", "no", "yo'q", "nofaol"}
+
+
+@dataclass
+class ImportRow:
+    """One validated toy from an import file (toy_id set: update that toy)"""
+    toy_id: Optional[int]
+    title: str
+    price: str
+    description: str
+    category: Optional[str]
+    media: List[Tuple[str, str]]  # (file_id, media_type)
+    is_active: bool
+
+
+@dataclass
+class ImportReport:
+    """Result of a catalog import"""
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    categories_created: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)  # (line, message)
+
+
+def _parse_media(value) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+    """
+    Parse media file_ids: "photo:<file_id> video:<file_id>" (bare file_id = photo)
+    
+    JSONL rows may also give a list of such strings.
+    """
+    if value is None or value == "":
+        return [], None
+    tokens = value if isinstance(value, list) else str(value).replace(",", " ").replace("|", " ").split()
+    
+    media = []
+    for token in tokens:
+        token = str(token).strip()
+        if not token:
+            continue
+        media_type, separator, file_id = token.partition(":")
+        if not separator:
+            media_type, file_id = "photo", token
+        if media_type not in MEDIA_TYPES or not file_id:
+            return [], f"media noto'g'ri: {token[:40]}"
+        if len(file_id) > 255:
+            return [], "media file_id 255 belgidan uzun"
+        media.append((file_id, media_type))
+    
+    if len(media) > MAX_MEDIA_PER_TOY:
+        return [], f"media {MAX_MEDIA_PER_TOY} tadan ko'p"
+    return media, None
+
+
+def _parse_bool(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    text = "" if value is None else str(value).strip().lower()
+    if text in _TRUE_VALUES:
+        return True
+    if text in _FALSE_VALUES:
+        return False
+    return None
+
+
+class CatalogIOService:
+    """Service for bulk catalog import and export"""
+    
+    @staticmethod
+    def detect_format(file_name: Optional[str]) -> Optional[str]:
+        """File format by extension: "csv", "jsonl" or None if unsupported"""
+        extension = (file_name or "").rsplit(".", 1)[-1].lower()
+        if extension == "csv":
+            return "csv"
+        if extension in ("jsonl", "ndjson", "json"):
+            return "jsonl"
+        return None
+    
+    @staticmethod
+    def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+        """
+        Stream raw rows from an import file
+        
+        Yields:
+            Tuples of (line number, row dict or None, error or None)
+        """
+        if fmt == "csv":
+            reader = csv.DictReader(stream)
+            if reader.fieldnames:
+                reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+            if "title" not in (reader.fieldnames or []):
+                yield 1, None, "sarlavha qatorida title ustuni yo'q"
+                return
+            for row in reader:
+                yield reader.line_num, row, None
+            return
+        
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, None, f"JSON xato: {e.msg}"
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, "qator JSON obyekt emas"
+                continue
+            yield line_number, {str(key).lower(): value for key, value in row.items()}, None
+    
+    @staticmethod
+    def parse_row(row: dict) -> Tuple[Optional[ImportRow], Optional[str]]:
+        """
+        Validate a raw row
+        
+        Returns:
+            Tuple of (ImportRow, None) or (None, error message)
+        """
+        def text(key: str) -> str:
+            value = row.get(key)
+            return "" if value is None else str(value).strip()
+        
+        toy_id = None
+        if text("id"):
+            if not text("id").isdigit() or int(text("id")) <= 0:
+                return None, f"id noto'g'ri: {text('id')[:20]}"
+            toy_id = int(text("id"))
+        
+        title = text("title")
+        price = text("price")
+        category = text("category") or None
+        if not title:
+            return None, "title bo'sh"
+        if len(title) > 255:
+            return None, "title 255 belgidan uzun"
+        if not price:
+            return None, "price bo'sh"
+        if len(price) > 50:
+            return None, "price 50 belgidan uzun"
+        if category and len(category) > 100:
+            return None, "category 100 belgidan uzun"
+        if category and category.lower() == "kategoriyasiz":
+            category = None
+        
+        media, error = _parse_media(row.get("media"))
+        if error:
+            return None, error
+        
+        is_active = _parse_bool(row.get("is_active"))
+        if is_active is None:
+            return None, f"is_active noto'g'ri: {text('is_active')[:20]}"
+        
+        return ImportRow(
+            toy_id=toy_id,
+            title=title,
+            price=price,
+            description=text("description"),
+            category=category,
+            media=media,
+            is_active=is_active
+        ), None
+    
+    @staticmethod
+    async def import_catalog(stream: TextIO, fmt: str, chunk_size: int = CATALOG_IMPORT_CHUNK_SIZE) -> ImportReport:
+        """
+        Create or update toys (with ToyMedia) from a CSV/JSONL stream
+        
+        Rows without an id create toys; rows with the id of an existing toy
+        replace its fields and media, so an edited export is imported without
+        duplicating the catalog. An id that is not in the database is reported
+        as an error (clear it to create the toy instead).
+        
+        Rows are validated as they are read; valid rows are written in chunks,
+        one transaction per chunk, and missing categories are created on the
+        way. Invalid rows and chunks that fail to save are reported per line.
+        
+        Args:
+            stream: Text stream of the file
+            fmt: "csv" or "jsonl"
+            chunk_size: Toys per transaction
+        
+        Returns:
+            ImportReport
+        """
+        report = ImportReport()
+        categories: Dict[str, int] = {}
+        db = get_db_session()
+        try:
+            result = await db.execute(select(Category.name, Category.id))
+            categories.update(result.all())
+        finally:
+            await db.close()
+        
+        chunk: List[Tuple[int, ImportRow]] = []
+        for line_number, row, error in CatalogIOService.read_rows(stream, fmt):
+            report.rows += 1
+            item = None
+            if error is None:
+                item, error = CatalogIOService.parse_row(row)
+            if error:
+                report.errors.append((line_number, error))
+                continue
+            
+            chunk.append((line_number, item))
+            if len(chunk) >= chunk_size:
+                await CatalogIOService._import_chunk(chunk, categories, report)
+                chunk = []
+        
+        if chunk:
+            await CatalogIOService._import_chunk(chunk, categories, report)
+        report.errors.sort()
+        
+        logger.info(
+            f"Catalog import: {report.created} toys created, {report.updated} updated, "
+            f"{report.categories_created} categories created from {report.rows} rows, {len(report.errors)} errors"
+        )
+        return report
+    
+    @staticmethod
+    def _toy_values(item: ImportRow, category_ids: Dict[str, int]) -> dict:
+        """Toy column values of an import row"""
+        # Bulk statements bypass the Toy.price validator, so price_amount is set here
+        return {
+            "title": item.title,
+            "price": item.price,
+            "price_amount": parse_price(item.price),
+            "description": item.description,
+            "category_id": category_ids.get(item.category) if item.category else None,
+            # Deprecated single-media fields, kept for backward compatibility
+            "media_type": ("image" if item.media[0][1] == "photo" else "video") if item.media else None,
+            "media_file_id": item.media[0][0] if item.media else None,
+            "is_active": item.is_active
+        }
+    
+    @staticmethod
+    async def _import_chunk(chunk: List[Tuple[int, ImportRow]], categories: Dict[str, int], report: ImportReport) -> None:
+        """Write one chunk of toys in a single transaction (multi-row inserts and updates)"""
+        rejected: List[Tuple[int, str]] = []
+        # Rows with an id update that toy; the last row wins if an id repeats in the chunk
+        updates: Dict[int, Tuple[int, ImportRow]] = {}
+        for line_number, item in chunk:
+            if item.toy_id is not None:
+                if item.toy_id in updates:
+                    rejected.append((updates[item.toy_id][0], f"id={item.toy_id} keyingi qatorda takrorlangan"))
+                updates[item.toy_id] = (line_number, item)
+        new_rows = [(line_number, item) for line_number, item in chunk if item.toy_id is None]
+        saved_rows = new_rows + list(updates.values())
+        
+        db = get_db_session()
+        try:
+            if updates:
+                result = await db.execute(select(Toy.id).where(Toy.id.in_(updates)))
+                existing_ids = set(result.scalars().all())
+                for toy_id in [toy_id for toy_id in updates if toy_id not in existing_ids]:
+                    rejected.append((updates.pop(toy_id)[0], f"id={toy_id} o'yinchoq topilmadi"))
+                saved_rows = new_rows + list(updates.values())
+            if not saved_rows:
+                return
+            
+            new_names = sorted({item.category for _, item in saved_rows if item.category and item.category not in categories})
+            created_categories = {}
+            if new_names:
+                result = await db.execute(
+                    insert(Category).returning(Category.id, Category.name, sort_by_parameter_order=True),
+                    [{"name": name, "is_active": True} for name in new_names]
+                )
+                created_categories = {name: category_id for category_id, name in result.all()}
+            category_ids = {**categories, **created_categories}
+            
+            toy_ids = []
+            if new_rows:
+                result = await db.execute(
+                    insert(Toy).returning(Toy.id, sort_by_parameter_order=True),
+                    [CatalogIOService._toy_values(item, category_ids) for _, item in new_rows]
+                )
+                toy_ids = list(result.scalars().all())
+            if updates:
+                # Bulk UPDATE by primary key; the old media is replaced below
+                await db.execute(
+                    update(Toy),
+                    [{"id": toy_id, **CatalogIOService._toy_values(item, category_ids)} for toy_id, (_, item) in updates.items()]
+                )
+                await db.execute(delete(ToyMedia).where(ToyMedia.toy_id.in_(updates)))
+            
+            saved = list(zip(toy_ids, (item for _, item in new_rows))) + [(toy_id, item) for toy_id, (_, item) in updates.items()]
+            media_rows = [
+                {"toy_id": toy_id, "file_id": file_id, "media_type": media_type, "sort_order": idx}
+                for toy_id, item in saved
+                for idx, (file_id, media_type) in enumerate(item.media)
+            ]
+            if media_rows:
+                await db.execute(insert(ToyMedia), media_rows)
+            
+            # Bulk statements skip the ORM flush listener that keeps the search index in sync
+            await db.run_sync(lambda session: index_toys_fts(
+                session.connection(),
+                [(toy_id, item.title, item.description) for toy_id, item in saved]
+            ))
+            
+            mark_catalog_changed(db.sync_session)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error importing catalog chunk (lines {chunk[0][0]}-{chunk[-1][0]}): {e}", exc_info=True)
+            report.errors.extend((line_number, "saqlashda xatolik") for line_number, _ in saved_rows)
+            return
+        finally:
+            await db.close()
+            report.errors.extend(rejected)
+        
+        categories.update(created_categories)
+        report.created += len(toy_ids)
+        report.updated += len(updates)
+        report.categories_created += len(created_categories)
+    
+    @staticmethod
+    def export_row(toy: Toy) -> dict:
+        """Toy as an export row (media as "type:file_id" strings)"""
+        media = [f"{media.media_type}:{media.file_id}" for media in toy.media_items]
+        if not media and toy.media_file_id:
+            media = [f"{'photo' if toy.media_type == 'image' else 'video'}:{toy.media_file_id}"]
+        return {
+            "id": toy.id,
+            "title": toy.title,
+            "price": toy.price,
+            "description": toy.description,
+            "category": toy.category.name if toy.category else "",
+            "media": media,
+            "is_active": toy.is_active
+        }
+    
+    @staticmethod
+    async def export_catalog(out: TextIO, fmt: str, batch_size: int = 500) -> int:
+        """
+        Write all toys to a CSV/JSONL stream, in id order
+        
+        Toys are read in keyset batches (media loaded per batch), so memory
+        stays bounded however large the catalog is.
+        
+        Args:
+            out: Text stream to write to
+            fmt: "csv" or "jsonl"
+            batch_size: Toys loaded per query
+        
+        Returns:
+            Number of toys written
+        """
+        writer = None
+        if fmt == "csv":
+            writer = csv.DictWriter(out, fieldnames=CATALOG_FIELDS)
+            writer.writeheader()
+        
+        count = 0
+        last_id = 0
+        db = get_db_session()
+        try:
+            while True:
+                result = await db.execute(
+                    select(Toy)
+                    .where(Toy.id > last_id)
+                    .options(selectinload(Toy.media_items))
+                    .order_by(Toy.id)
+                    .limit(batch_size)
+                )
+                toys = list(result.scalars().all())
+                if not toys:
+                    break
+                
+                for toy in toys:
+                    row = CatalogIOService.export_row(toy)
+                    if writer:
+                        writer.writerow({**row, "media": " ".join(row["media"]), "is_active": int(row["is_active"])})
+                    else:
+                        out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                count += len(toys)
+                last_id = toys[-1].id
+                db.expunge_all()
+        finally:
+            await db.close()
+        
+        return count
+    
+    @staticmethod
+    def format_import_report(report: ImportReport) -> str:
+        """Format import result for admin"""
+        text = (
+            f"📥 <b>Import yakunlandi</b>\n\n"
+            f"📄 Qatorlar: {report.rows}\n"
+            f"✅ Qo'shilgan o'yinchoqlar: {report.created}\n"
+            f"✏️ Yangilangan o'yinchoqlar: {report.updated}\n"
+            f"📂 Yangi kategoriyalar: {report.categories_created}\n"
+            f"❌ Xatolar: {len(report.errors)}"
+        )
+        if report.errors:
+            lines = [f"• {line_number}-qator: {html.escape(error)}" for line_number, error in report.errors[:MAX_REPORTED_ERRORS]]
+            if len(report.errors) > MAX_REPORTED_ERRORS:
+                lines.append(f"... va yana {len(report.errors) - MAX_REPORTED_ERRORS} ta")
+            text += "\n\n" + "\n".join(lines)
+        return text
@@ -1,20 +1,23 @@
 """
 Catalog service for managing toys
 """
-from typing import List, Optional, Tuple
-from datetime import datetime, date
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from typing import List, Optional, Set, Tuple
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, func, select
 
 from database.models import Toy, DailyAd
 from config import ITEMS_PER_PAGE
+from services.catalog_cache import catalog_cache
+from services.ad_index import legacy_ad_index
+from utils.periods import local_today
 
 
 class CatalogService:
     """Service for catalog operations"""
     
     @staticmethod
-    def get_active_toys_by_category(db: Session, category_id: int, page: int = 0, page_size: int = 10) -> Tuple[List[Toy], int]:
+    async def get_active_toys_by_category(db: AsyncSession, category_id: int, page: int = 0, page_size: int = 10) -> Tuple[List[Toy], int]:
         """
         Get paginated list of active toys by category
         
@@ -33,24 +36,67 @@ class CatalogService:
         # Calculate offset
         offset = page * page_size
         
-        # Build base query
-        base_query = db.query(Toy).filter(
+        # Build base filter
+        conditions = and_(
             Toy.category_id == category_id,
             Toy.is_active == True
         )
         
         # Get total count (all active toys in category)
-        total_count = base_query.count()
+        total_count = await db.scalar(select(func.count(Toy.id)).where(conditions))
         
         # Get paginated toys - ALWAYS use .all() to return list
-        toys = base_query.order_by(
-            Toy.created_at.desc()  # Newest first
-        ).offset(offset).limit(page_size).all()  # CRITICAL: .all() returns all products on page
+        result = await db.execute(
+            select(Toy).where(conditions).order_by(
+                Toy.created_at.desc()  # Newest first
+            ).offset(offset).limit(page_size)
+        )
+        toys = list(result.scalars().all())  # CRITICAL: .all() returns all products on page
         
         return toys, total_count
     
     @staticmethod
-    def get_all_active_toys_by_category(db: Session, category_id: int) -> List[Toy]:
+    async def get_category_page(
+        db: AsyncSession,
+        category_id: int,
+        page: int = 0,
+        page_size: int = 10,
+        user_id: Optional[int] = None
+    ) -> Tuple[List[Toy], int, Set[int]]:
+        """
+        Get a page of active toys in a category, ready for display
+        
+        Toys are served from the in-memory catalog cache (read-only CachedToy
+        objects with category and media_items attached); only the user's
+        favorite flags are read from the database, in a single IN query.
+        
+        Args:
+            db: Database session
+            category_id: Category ID
+            page: Page number (0-indexed)
+            page_size: Number of items per page (default: 10)
+            user_id: User to resolve favorites for (optional)
+            
+        Returns:
+            Tuple of (toys list, total count, set of favorited toy IDs)
+        """
+        from services.favorites_service import FavoritesService
+        
+        offset = page * page_size
+        
+        # Active toys in category, newest first
+        all_toys = await catalog_cache.get_active_toys_by_category(db, category_id)
+        total_count = len(all_toys)
+        toys = all_toys[offset:offset + page_size]
+        
+        favorite_ids = set()
+        if user_id and toys:
+            favorite_ids = await FavoritesService.favorites_for(db, user_id, [toy.id for toy in toys])
+        
+        return toys, total_count, favorite_ids
+    
+    @staticmethod
+    async def get_all_active_toys_by_category(db: AsyncSession, category_id: int) -> List[Toy]:
         """
         Get ALL active toys by category (no pagination)
         
@@ -65,17 +111,20 @@ class CatalogService:
             List of all active toys in the category
         """
         # Build query - ensure we get ALL active toys
-        toys = db.query(Toy).filter(
-            Toy.category_id == category_id,
-            Toy.is_active == True
-        ).order_by(
-            Toy.created_at.desc()
-        ).all()  # CRITICAL: .all() returns all products, not just one
+        result = await db.execute(
+            select(Toy).where(
+                Toy.category_id == category_id,
+                Toy.is_active == True
+            ).order_by(
+                Toy.created_at.desc()
+            )
+        )
+        toys = list(result.scalars().all())  # CRITICAL: .all() returns all products, not just one
         
         return toys
     
     @staticmethod
-    def get_active_toys(db: Session, page: int = 1) -> Tuple[List[Toy], int]:
+    async def get_active_toys(db: AsyncSession, page: int = 1) -> Tuple[List[Toy], int]:
         """
         Get paginated list of active toys (all categories)
         
@@ -89,20 +138,23 @@ class CatalogService:
         offset = (page - 1) * ITEMS_PER_PAGE
         
         # Get total count
-        total_count = db.query(Toy).filter(Toy.is_active == True).count()
+        total_count = await db.scalar(select(func.count(Toy.id)).where(Toy.is_active == True))
         total_pages = (total_count + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE if total_count > 0 else 1
         
         # Get toys for current page
-        toys = db.query(Toy).filter(
-            Toy.is_active == True
-        ).order_by(
-            Toy.created_at.desc()
-        ).offset(offset).limit(ITEMS_PER_PAGE).all()
+        result = await db.execute(
+            select(Toy).where(
+                Toy.is_active == True
+            ).order_by(
+                Toy.created_at.desc()
+            ).offset(offset).limit(ITEMS_PER_PAGE)
+        )
+        toys = list(result.scalars().all())
         
         return toys, total_pages
     
     @staticmethod
-    def get_all_toys(db: Session, page: int = 1) -> Tuple[List[Toy], int]:
+    async def get_all_toys(db: AsyncSession, page: int = 1) -> Tuple[List[Toy], int]:
         """
         Get paginated list of all toys (including inactive)
         
@@ -116,24 +168,27 @@ class CatalogService:
         offset = (page - 1) * ITEMS_PER_PAGE
         
         # Get total count
-        total_count = db.query(Toy).count()
+        total_count = await db.scalar(select(func.count(Toy.id)))
         total_pages = (total_count + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE if total_count > 0 else 1
         
         # Get toys for current page
-        toys = db.query(Toy).order_by(
-            Toy.created_at.desc()
-        ).offset(offset).limit(ITEMS_PER_PAGE).all()
+        result = await db.execute(
+            select(Toy).order_by(
+                Toy.created_at.desc()
+            ).offset(offset).limit(ITEMS_PER_PAGE)
+        )
+        toys = list(result.scalars().all())
         
         return toys, total_pages
     
     @staticmethod
-    def get_toy_by_id(db: Session, toy_id: int) -> Optional[Toy]:
+    async def get_toy_by_id(db: AsyncSession, toy_id: int) -> Optional[Toy]:
         """Get toy by ID"""
-        return db.query(Toy).filter(Toy.id == toy_id).first()
+        return await db.get(Toy, toy_id)
     
     @staticmethod
-    def create_toy(
-        db: Session,
+    async def create_toy(
+        db: AsyncSession,
         title: str,
         price: str,
         description: str,
@@ -174,14 +229,14 @@ class CatalogService:
         
         # Add to session (this creates a new row)
         db.add(toy)
-        db.commit()
-        db.refresh(toy)
+        await db.flush()
+        await db.refresh(toy)
         
         return toy
     
     @staticmethod
-    def update_toy(
-        db: Session,
+    async def update_toy(
+        db: AsyncSession,
         toy_id: int,
         title: Optional[str] = None,
         price: Optional[str] = None,
@@ -191,7 +246,7 @@ class CatalogService:
         category_id: Optional[int] = None
     ) -> Optional[Toy]:
         """Update toy fields"""
-        toy = CatalogService.get_toy_by_id(db, toy_id)
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
         if not toy:
             return None
         
@@ -209,39 +264,39 @@ class CatalogService:
             toy.category_id = category_id
         
         toy.updated_at = datetime.now()
-        db.commit()
-        db.refresh(toy)
+        await db.flush()
+        await db.refresh(toy)
         return toy
     
     @staticmethod
-    def toggle_toy_active(db: Session, toy_id: int) -> Optional[Toy]:
+    async def toggle_toy_active(db: AsyncSession, toy_id: int) -> Optional[Toy]:
         """Toggle toy active status"""
-        toy = CatalogService.get_toy_by_id(db, toy_id)
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
         if not toy:
             return None
         
         toy.is_active = not toy.is_active
         toy.updated_at = datetime.now()
-        db.commit()
-        db.refresh(toy)
+        await db.flush()
+        await db.refresh(toy)
         return toy
     
     @staticmethod
-    def delete_toy(db: Session, toy_id: int) -> bool:
+    async def delete_toy(db: AsyncSession, toy_id: int) -> bool:
         """Delete a toy"""
-        toy = CatalogService.get_toy_by_id(db, toy_id)
+        toy = await CatalogService.get_toy_by_id(db, toy_id)
         if not toy:
             return False
         
-        db.delete(toy)
-        db.commit()
+        await db.delete(toy)
+        await db.flush()
         return True
     
     @staticmethod
-    def get_stats(db: Session) -> dict:
+    async def get_stats(db: AsyncSession) -> dict:
         """Get catalog statistics"""
-        total_toys = db.query(Toy).count()
-        active_toys = db.query(Toy).filter(Toy.is_active == True).count()
+        total_toys = await db.scalar(select(func.count(Toy.id)))
+        active_toys = await db.scalar(select(func.count(Toy.id)).where(Toy.is_active == True))
         inactive_toys = total_toys - active_toys
         
         return {
@@ -251,7 +306,7 @@ class CatalogService:
         }
     
     @staticmethod
-    def get_random_active_toys_for_ad(db: Session, count: int, exclude_today: bool = True) -> List[Toy]:
+    async def get_random_active_toys_for_ad(db: AsyncSession, count: int, exclude_today: bool = True) -> List[Toy]:
         """
         Get random active toys for advertisement
         
@@ -263,30 +318,32 @@ class CatalogService:
         Returns:
             List of random active toys
         """
-        today = date.today().isoformat()
-        
-        # Get active toys
-        query = db.query(Toy).filter(Toy.is_active == True)
+        # Sample IDs from the in-memory index, then load just those rows
+        toy_ids = await legacy_ad_index.pick_many(db, count, exclude_today=exclude_today)
+        if not toy_ids:
+            return []
         
-        # Exclude toys posted today
-        if exclude_today:
-            posted_today_ids = db.query(DailyAd.toy_id).filter(
-                DailyAd.posted_date == today
-            ).subquery()
-            query = query.filter(~Toy.id.in_(db.query(posted_today_ids.c.toy_id)))
+        result = await db.execute(select(Toy).where(Toy.id.in_(toy_ids)))
+        toys_by_id = {toy.id: toy for toy in result.scalars().all()}
         
-        # Get random toys
-        toys = query.order_by(func.random()).limit(count).all()
+        toys = []
+        for toy_id in toy_ids:
+            toy = toys_by_id.get(toy_id)
+            if toy and toy.is_active:
+                toys.append(toy)
+            else:
+                legacy_ad_index.discard(toy_id)
         
         return toys
     
     @staticmethod
-    def mark_toy_posted(db: Session, toy_id: int) -> None:
+    async def mark_toy_posted(db: AsyncSession, toy_id: int) -> None:
         """Mark a toy as posted today"""
-        today = date.today().isoformat()
+        today = local_today().isoformat()
         ad_record = DailyAd(
             toy_id=toy_id,
             posted_date=today
         )
         db.add(ad_record)
-        db.commit()
+        await db.flush()
+        legacy_ad_index.mark_posted(toy_id)
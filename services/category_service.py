@@ -3,7 +3,8 @@ Category service for managing toy categories
 """
 from typing import List, Optional
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import Category, Toy
 from config import ITEMS_PER_PAGE
@@ -13,38 +14,41 @@ class CategoryService:
     """Service for category operations"""
     
     @staticmethod
-    def get_active_categories(db: Session) -> List[Category]:
+    async def get_active_categories(db: AsyncSession) -> List[Category]:
         """Get all active categories"""
-        return db.query(Category).filter(Category.is_active == True).order_by(Category.name).all()
+        result = await db.execute(select(Category).where(Category.is_active == True).order_by(Category.name))
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_all_categories(db: Session) -> List[Category]:
+    async def get_all_categories(db: AsyncSession) -> List[Category]:
         """Get all categories (including inactive)"""
-        return db.query(Category).order_by(Category.name).all()
+        result = await db.execute(select(Category).order_by(Category.name))
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_category_by_id(db: Session, category_id: int) -> Optional[Category]:
+    async def get_category_by_id(db: AsyncSession, category_id: int) -> Optional[Category]:
         """Get category by ID"""
-        return db.query(Category).filter(Category.id == category_id).first()
+        return await db.get(Category, category_id)
     
     @staticmethod
-    def get_category_by_name(db: Session, name: str) -> Optional[Category]:
+    async def get_category_by_name(db: AsyncSession, name: str) -> Optional[Category]:
         """Get category by name"""
-        return db.query(Category).filter(Category.name == name).first()
+        result = await db.execute(select(Category).where(Category.name == name).limit(1))
+        return result.scalars().first()
     
     @staticmethod
-    def create_category(db: Session, name: str) -> Category:
+    async def create_category(db: AsyncSession, name: str) -> Category:
         """Create a new category"""
         category = Category(name=name, is_active=True)
         db.add(category)
-        db.commit()
-        db.refresh(category)
+        await db.flush()
+        await db.refresh(category)
         return category
     
     @staticmethod
-    def update_category(db: Session, category_id: int, name: Optional[str] = None) -> Optional[Category]:
+    async def update_category(db: AsyncSession, category_id: int, name: Optional[str] = None) -> Optional[Category]:
         """Update category"""
-        category = CategoryService.get_category_by_id(db, category_id)
+        category = await CategoryService.get_category_by_id(db, category_id)
         if not category:
             return None
         
@@ -52,42 +56,52 @@ class CategoryService:
             category.name = name
         
         category.updated_at = datetime.now()
-        db.commit()
-        db.refresh(category)
+        await db.flush()
+        await db.refresh(category)
         return category
     
     @staticmethod
-    def toggle_category_active(db: Session, category_id: int) -> Optional[Category]:
+    async def toggle_category_active(db: AsyncSession, category_id: int) -> Optional[Category]:
         """Toggle category active status"""
-        category = CategoryService.get_category_by_id(db, category_id)
+        category = await CategoryService.get_category_by_id(db, category_id)
         if not category:
             return None
         
         category.is_active = not category.is_active
         category.updated_at = datetime.now()
-        db.commit()
-        db.refresh(category)
+        await db.flush()
+        await db.refresh(category)
         return category
     
     @staticmethod
-    def delete_category(db: Session, category_id: int) -> bool:
+    async def delete_category(db: AsyncSession, category_id: int) -> bool:
         """Delete a category (toys will be set to category_id=None)"""
-        category = CategoryService.get_category_by_id(db, category_id)
+        category = await CategoryService.get_category_by_id(db, category_id)
         if not category:
             return False
         
         # Set toys' category_id to None
-        db.query(Toy).filter(Toy.category_id == category_id).update({Toy.category_id: None})
+        await db.execute(update(Toy).where(Toy.category_id == category_id).values(category_id=None))
         
-        db.delete(category)
-        db.commit()
+        await db.delete(category)
+        await db.flush()
         return True
     
     @staticmethod
-    def get_category_stats(db: Session) -> dict:
+    async def count_active_toys(db: AsyncSession, category_id: int) -> int:
+        """Count active toys in a category"""
+        return await db.scalar(
+            select(func.count(Toy.id)).where(
+                Toy.category_id == category_id,
+                Toy.is_active == True
+            )
+        )
+    
+    @staticmethod
+    async def get_category_stats(db: AsyncSession) -> dict:
         """Get category statistics"""
-        total_categories = db.query(Category).count()
-        active_categories = db.query(Category).filter(Category.is_active == True).count()
+        total_categories = await db.scalar(select(func.count(Category.id)))
+        active_categories = await db.scalar(select(func.count(Category.id)).where(Category.is_active == True))
         inactive_categories = total_categories - active_categories
         
         return {
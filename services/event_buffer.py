@@ -0,0 +1,211 @@
+"""
+Buffered, batched writer for analytics events (sale leads, etc.)
+"""
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, TextIO, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import EVENT_SPOOL_PATH, EVENT_BATCH_SIZE, EVENT_FLUSH_INTERVAL_MS
+from database.db import get_db_session
+
+logger = logging.getLogger(__name__)
+
+# Writer for one event kind: receives all buffered events of that kind
+EventWriter = Callable[[AsyncSession, List[dict]], Awaitable[None]]
+
+
+class EventBuffer:
+    """
+    Collects events in memory and writes them in batches
+    
+    emit() is synchronous: it appends the event to a local spool file
+    (JSON lines) and returns, so handlers never wait for the database. A
+    background task flushes every `batch_size` events or `flush_interval`
+    seconds: the spool file is rotated into a segment, every kind's writer
+    inserts its events in one statement, the batch is committed once and the
+    segment is deleted. Segments left by a crash or a failed flush are
+    written again on the next flush/start (at-least-once delivery).
+    """
+    
+    def __init__(self, spool_path: str, batch_size: int, flush_interval: float):
+        self.spool_path = spool_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._writers: Dict[str, EventWriter] = {}
+        self._events: List[dict] = []
+        self._pending: List[Tuple[str, List[dict]]] = []
+        self._spool: Optional[TextIO] = None
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    def register(self, kind: str, writer: EventWriter) -> None:
+        """Register the batch writer for an event kind"""
+        self._writers[kind] = writer
+    
+    def emit(self, kind: str, data: dict) -> None:
+        """
+        Queue an event (non-blocking, durable once this returns)
+        
+        Args:
+            kind: Event kind (must have a registered writer)
+            data: JSON-serializable payload
+        """
+        event = {"kind": kind, "ts": datetime.utcnow().isoformat(), "data": data}
+        try:
+            if self._spool is None:
+                self._spool = open(self.spool_path, "a", encoding="utf-8")
+            self._spool.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self._spool.flush()
+        except OSError as e:
+            # Still buffered in memory; only lost if the process dies before the flush
+            logger.error(f"Error writing event spool: {e}", exc_info=True)
+        self._events.append(event)
+        if len(self._events) >= self.batch_size:
+            self._wakeup.set()
+    
+    def _rotate(self) -> None:
+        """Move buffered events into a pending segment (fresh spool for new events)"""
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        if not self._events and not os.path.exists(self.spool_path):
+            return
+        
+        segment = f"{self.spool_path}.{time.time_ns()}"
+        if os.path.exists(self.spool_path):
+            os.replace(self.spool_path, segment)
+        else:
+            segment = ""
+        self._pending.append((segment, self._events))
+        self._events = []
+    
+    @staticmethod
+    def _read_segment(path: str) -> List[dict]:
+        """Read events from a spool file (a torn last line is skipped)"""
+        events = []
+        with open(path, encoding="utf-8") as spool:
+            for line_number, line in enumerate(spool, 1):
+                if not line.strip():
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt event at {path}:{line_number}")
+        return events
+    
+    async def _write(self, events: List[dict]) -> None:
+        """Write one batch through the registered writers in a single transaction"""
+        by_kind: Dict[str, List[dict]] = defaultdict(list)
+        for event in events:
+            by_kind[event["kind"]].append(event)
+        
+        db = get_db_session()
+        try:
+            for kind, items in by_kind.items():
+                writer = self._writers.get(kind)
+                if writer is None:
+                    logger.warning(f"No writer for {len(items)} '{kind}' events, dropping them")
+                    continue
+                await writer(db, items)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        finally:
+            await db.close()
+    
+    async def flush(self) -> int:
+        """
+        Write all buffered and pending events
+        
+        Returns:
+            Number of events written
+        
+        Raises:
+            Exception from the database; unwritten segments stay pending
+        """
+        async with self._flush_lock:
+            self._rotate()
+            written = 0
+            while self._pending:
+                segment, events = self._pending[0]
+                if events:
+                    await self._write(events)
+                    written += len(events)
+                if segment:
+                    os.remove(segment)
+                self._pending.pop(0)
+            return written
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            
+            try:
+                written = await self.flush()
+                if written:
+                    logger.debug(f"Flushed {written} buffered events")
+            except Exception as e:
+                logger.error(f"Error flushing buffered events: {e}", exc_info=True)
+    
+    async def start(self) -> None:
+        """Replay segments left by a previous run, then start the flush task"""
+        if self._task is not None:
+            return
+        
+        leftovers = sorted(
+            glob.glob(f"{glob.escape(self.spool_path)}.*"),
+            key=lambda path: int(path.rsplit(".", 1)[1]) if path.rsplit(".", 1)[1].isdigit() else 0
+        )
+        for segment in leftovers:
+            self._pending.append((segment, self._read_segment(segment)))
+        if os.path.exists(self.spool_path):
+            # The spool also holds anything emitted before start()
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+            self._events = self._read_segment(self.spool_path)
+        
+        replayed = sum(len(events) for _, events in self._pending) + len(self._events)
+        if replayed:
+            logger.info(f"Replaying {replayed} spooled events from previous run")
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error replaying spooled events: {e}", exc_info=True)
+        
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stop the flush task and write everything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing events on shutdown (kept in spool): {e}", exc_info=True)
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+
+event_buffer = EventBuffer(EVENT_SPOOL_PATH, EVENT_BATCH_SIZE, EVENT_FLUSH_INTERVAL_MS / 1000)
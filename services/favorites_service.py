@@ -1,43 +1,124 @@
 """
 Service for managing user favorites
 """
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from typing import Iterable, List, Optional, Set, Tuple
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from database.models import Favorite
+from database.models import Favorite, Toy
 
 
 class FavoritesService:
     """Service for favorites operations"""
     
     @staticmethod
-    def get_user_favorites(db: Session, user_id: int) -> List[Favorite]:
+    async def get_user_favorites(db: AsyncSession, user_id: int) -> List[Favorite]:
         """Get all favorites for a user"""
-        return db.query(Favorite).filter(
-            Favorite.user_id == user_id
-        ).order_by(Favorite.created_at.desc()).all()
+        result = await db.execute(
+            select(Favorite).where(
+                Favorite.user_id == user_id
+            ).order_by(Favorite.created_at.desc())
+        )
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_favorite(db: Session, user_id: int, toy_id: int) -> Optional[Favorite]:
+    async def get_favorites_page(
+        db: AsyncSession,
+        user_id: int,
+        page: int = 0,
+        page_size: int = 10
+    ) -> Tuple[List[Toy], int]:
+        """
+        Get a page of the user's favorite toys, ready for display
+        
+        Toys come from one query joined to favorites, with category and
+        media_items loaded eagerly; inactive toys are skipped in SQL.
+        
+        Args:
+            db: Database session
+            user_id: User ID
+            page: Page number (0-indexed)
+            page_size: Number of items per page (default: 10)
+            
+        Returns:
+            Tuple of (toys list, total count of active favorites), newest favorite first
+        """
+        conditions = and_(
+            Favorite.user_id == user_id,
+            Toy.is_active == True
+        )
+        
+        total_count = await db.scalar(
+            select(func.count(Favorite.id)).join(Toy, Toy.id == Favorite.toy_id).where(conditions)
+        )
+        if not total_count:
+            return [], 0
+        
+        result = await db.execute(
+            select(Toy)
+            .join(Favorite, Favorite.toy_id == Toy.id)
+            .where(conditions)
+            .options(joinedload(Toy.category), joinedload(Toy.media_items))
+            .order_by(Favorite.created_at.desc(), Favorite.id.desc())
+            .offset(page * page_size)
+            .limit(page_size)
+        )
+        return list(result.unique().scalars().all()), total_count
+    
+    @staticmethod
+    async def get_favorite(db: AsyncSession, user_id: int, toy_id: int) -> Optional[Favorite]:
         """Check if toy is in favorites"""
-        return db.query(Favorite).filter(
-            and_(
-                Favorite.user_id == user_id,
-                Favorite.toy_id == toy_id
+        result = await db.execute(
+            select(Favorite).where(
+                and_(
+                    Favorite.user_id == user_id,
+                    Favorite.toy_id == toy_id
+                )
+            ).limit(1)
+        )
+        return result.scalars().first()
+    
+    @staticmethod
+    async def favorites_for(db: AsyncSession, user_id: int, toy_ids: Iterable[int]) -> Set[int]:
+        """
+        Get which of the given toys are in user's favorites (single IN query)
+        
+        Args:
+            db: Database session
+            user_id: User ID
+            toy_ids: Toy IDs to check
+            
+        Returns:
+            Set of toy IDs that are favorited by the user
+        """
+        toy_ids = list(toy_ids)
+        if not toy_ids:
+            return set()
+        
+        result = await db.execute(
+            select(Favorite.toy_id).where(
+                and_(
+                    Favorite.user_id == user_id,
+                    Favorite.toy_id.in_(toy_ids)
+                )
             )
-        ).first()
+        )
+        return set(result.scalars().all())
     
     @staticmethod
-    def add_to_favorites(
-        db: Session,
+    async def add_to_favorites(
+        db: AsyncSession,
         user_id: int,
         toy_id: int,
         toy_name: str
-    ) -> tuple[Favorite, bool]:
+    ) -> bool:
         """
         Add toy to favorites
         
+        One INSERT ... ON CONFLICT (user_id, toy_id) DO NOTHING statement, so
+        double taps can't create duplicate rows.
+        
         Args:
             db: Database session
             user_id: User ID
@@ -45,27 +126,32 @@ class FavoritesService:
             toy_name: Toy name (denormalized)
             
         Returns:
-            Tuple of (Favorite object, is_new: bool)
+            True if the toy was added, False if it was already in favorites
         """
-        # Check if already exists
-        existing = FavoritesService.get_favorite(db, user_id, toy_id)
+        values = {
+            "user_id": user_id,
+            "toy_id": toy_id,
+            "toy_name": toy_name
+        }
+        dialect = db.bind.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(Favorite).values(**values).on_conflict_do_nothing(
+                index_elements=["user_id", "toy_id"]
+            ).returning(Favorite.id)
+            return (await db.execute(statement)).first() is not None
         
-        if existing:
-            return (existing, False)  # Already exists
-        
-        # Create new favorite
-        favorite = Favorite(
-            user_id=user_id,
-            toy_id=toy_id,
-            toy_name=toy_name
-        )
-        db.add(favorite)
-        db.commit()
-        db.refresh(favorite)
-        return (favorite, True)
+        if await FavoritesService.get_favorite(db, user_id, toy_id):
+            return False
+        db.add(Favorite(**values))
+        await db.flush()
+        return True
     
     @staticmethod
-    def remove_from_favorites(db: Session, user_id: int, toy_id: int) -> bool:
+    async def remove_from_favorites(db: AsyncSession, user_id: int, toy_id: int) -> bool:
         """
         Remove toy from favorites
         
@@ -75,13 +161,14 @@ class FavoritesService:
             toy_id: Toy ID
             
         Returns:
-            True if successful
+            True if the toy was in favorites
         """
-        favorite = FavoritesService.get_favorite(db, user_id, toy_id)
-        
-        if not favorite:
-            return False
-        
-        db.delete(favorite)
-        db.commit()
-        return True
+        result = await db.execute(
+            delete(Favorite).where(
+                and_(
+                    Favorite.user_id == user_id,
+                    Favorite.toy_id == toy_id
+                )
+            )
+        )
+        return result.rowcount > 0
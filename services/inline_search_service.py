@@ -0,0 +1,172 @@
+"""
+Inline mode (@bot query) results built from the catalog cache
+"""
+import logging
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from aiogram.types import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InlineQueryResultCachedPhoto,
+    InlineQueryResultCachedVideo,
+    InputTextMessageContent,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import INLINE_CACHE_SIZE
+from services.catalog_cache import CachedToy, CatalogSnapshot, catalog_cache
+from services.search_service import MAX_RESULTS, SearchService
+from utils.captions import fit_caption
+
+logger = logging.getLogger(__name__)
+
+# Bot API limit: results per answer
+INLINE_PAGE_SIZE = 50
+
+
+class InlineResultCache:
+    """
+    Ranked toys per normalized query, least recently used dropped first
+    
+    Entries belong to one catalog snapshot: once the catalog changes (or the
+    snapshot expires) the whole cache is dropped on the next read.
+    """
+    
+    def __init__(self, max_queries: int = INLINE_CACHE_SIZE):
+        self.max_queries = max_queries
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._results: "OrderedDict[str, List[CachedToy]]" = OrderedDict()
+    
+    def get(self, snapshot: CatalogSnapshot, key: str) -> Optional[List[CachedToy]]:
+        """Cached results of a query, or None"""
+        if snapshot is not self._snapshot:
+            self._snapshot = snapshot
+            self._results.clear()
+            return None
+        
+        toys = self._results.get(key)
+        if toys is not None:
+            self._results.move_to_end(key)
+        return toys
+    
+    def put(self, snapshot: CatalogSnapshot, key: str, toys: List[CachedToy]) -> None:
+        """Store results computed from `snapshot` (ignored if it is no longer current)"""
+        if self.max_queries <= 0 or snapshot is not self._snapshot:
+            return
+        
+        self._results[key] = toys
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_queries:
+            self._results.popitem(last=False)
+
+
+inline_cache = InlineResultCache()
+
+
+class InlineSearchService:
+    """Service for inline query answers"""
+    
+    @staticmethod
+    async def find(db: AsyncSession, query: str) -> List[CachedToy]:
+        """
+        Visible toys for an inline query, best match first
+        
+        An empty query lists the newest toys. Results are cached by normalized
+        query, so "Ayiq", "ayiq " and "Айиқ" share one entry.
+        """
+        tokens = SearchService.query_tokens(query)
+        key = " ".join(tokens)
+        snapshot = await catalog_cache.get(db)
+        
+        toys = inline_cache.get(snapshot, key)
+        if toys is not None:
+            return toys
+        
+        if tokens:
+            toys = await SearchService.search_all(db, tokens)
+        else:
+            toys = sorted(
+                (toy for category in snapshot.active_categories
+                 for toy in snapshot.toys_by_category.get(category.id, ())),
+                key=lambda toy: (toy.created_at, toy.id),
+                reverse=True
+            )[:MAX_RESULTS]
+        
+        inline_cache.put(snapshot, key, toys)
+        return toys
+    
+    @staticmethod
+    def format_caption(toy: CachedToy) -> str:
+        """Toy card text, with the description shortened to fit a caption"""
+        category_name = toy.category.name if toy.category else "Kategoriyasiz"
+        header = (
+            f"📦 <b>{toy.title}</b>\n"
+            f"🧸 Kategoriya: {category_name}\n\n"
+            f"💰 Narxi: {toy.price}\n\n"
+            f"📝 "
+        )
+        return fit_caption(header, toy.description or "")
+    
+    @staticmethod
+    def build_result(toy: CachedToy, bot_username: str):
+        """
+        Inline result for one toy: its first photo/video by file_id, or a
+        text card if it has no media
+        
+        The sent message carries an order button that opens the bot.
+        """
+        caption = InlineSearchService.format_caption(toy)
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(
+            text="🛒 Buyurtma berish",
+            url=f"https://t.me/{bot_username}?start=order_{toy.id}"
+        )]])
+        
+        if toy.media_items:
+            media_type, file_id = toy.media_items[0].media_type, toy.media_items[0].file_id
+        else:
+            # Legacy single media uses "image" for photos
+            media_type = "photo" if toy.media_type == "image" else toy.media_type
+            file_id = toy.media_file_id
+        
+        if file_id and media_type == "photo":
+            return InlineQueryResultCachedPhoto(
+                id=str(toy.id),
+                photo_file_id=file_id,
+                title=toy.title,
+                description=toy.price,
+                caption=caption,
+                parse_mode="HTML",
+                reply_markup=keyboard
+            )
+        if file_id and media_type == "video":
+            return InlineQueryResultCachedVideo(
+                id=str(toy.id),
+                video_file_id=file_id,
+                title=toy.title,
+                description=toy.price,
+                caption=caption,
+                parse_mode="HTML",
+                reply_markup=keyboard
+            )
+        return InlineQueryResultArticle(
+            id=str(toy.id),
+            title=toy.title,
+            description=toy.price,
+            input_message_content=InputTextMessageContent(message_text=caption, parse_mode="HTML"),
+            reply_markup=keyboard
+        )
+    
+    @staticmethod
+    def build_page(toys: List[CachedToy], offset: int, bot_username: str) -> Tuple[list, str]:
+        """
+        Results starting at `offset`
+        
+        Returns:
+            Tuple of (results, next_offset); next_offset is "" on the last page
+        """
+        page = toys[offset:offset + INLINE_PAGE_SIZE]
+        results = [InlineSearchService.build_result(toy, bot_username) for toy in page]
+        next_offset = str(offset + INLINE_PAGE_SIZE) if offset + INLINE_PAGE_SIZE < len(toys) else ""
+        return results, next_offset
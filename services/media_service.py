@@ -2,7 +2,8 @@
 Service for managing toy media (multiple images/videos)
 """
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import ToyMedia, Toy
 
@@ -11,15 +12,18 @@ class MediaService:
     """Service for toy media operations"""
     
     @staticmethod
-    def get_toy_media(db: Session, toy_id: int) -> List[ToyMedia]:
+    async def get_toy_media(db: AsyncSession, toy_id: int) -> List[ToyMedia]:
         """Get all media for a toy, ordered by sort_order"""
-        return db.query(ToyMedia).filter(
-            ToyMedia.toy_id == toy_id
-        ).order_by(ToyMedia.sort_order).all()
+        result = await db.execute(
+            select(ToyMedia).where(
+                ToyMedia.toy_id == toy_id
+            ).order_by(ToyMedia.sort_order)
+        )
+        return list(result.scalars().all())
     
     @staticmethod
-    def add_media(
-        db: Session,
+    async def add_media(
+        db: AsyncSession,
         toy_id: int,
         file_id: str,
         media_type: str,
@@ -45,13 +49,13 @@ class MediaService:
             sort_order=sort_order
         )
         db.add(media)
-        db.commit()
-        db.refresh(media)
+        await db.flush()
+        await db.refresh(media)
         return media
     
     @staticmethod
-    def add_multiple_media(
-        db: Session,
+    async def add_multiple_media(
+        db: AsyncSession,
         toy_id: int,
         media_list: List[tuple]  # List of (file_id, media_type) tuples
     ) -> List[ToyMedia]:
@@ -77,14 +81,14 @@ class MediaService:
             db.add(media)
             media_items.append(media)
         
-        db.commit()
+        await db.flush()
         for media in media_items:
-            db.refresh(media)
+            await db.refresh(media)
         
         return media_items
     
     @staticmethod
-    def delete_toy_media(db: Session, toy_id: int) -> int:
+    async def delete_toy_media(db: AsyncSession, toy_id: int) -> int:
         """
         Delete all media for a toy
         
@@ -95,9 +99,9 @@ class MediaService:
         Returns:
             Number of deleted media items
         """
-        count = db.query(ToyMedia).filter(ToyMedia.toy_id == toy_id).delete()
-        db.commit()
-        return count
+        result = await db.execute(delete(ToyMedia).where(ToyMedia.toy_id == toy_id))
+        await db.flush()
+        return result.rowcount
     
     @staticmethod
     def get_media_for_media_group(toy_media: List[ToyMedia], caption: str = None, parse_mode: str = None) -> List:
@@ -3,7 +3,8 @@ Service for managing order contacts
 """
 from typing import List, Optional
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import OrderContact
 
@@ -12,50 +13,55 @@ class OrderContactService:
     """Service for order contact operations"""
     
     @staticmethod
-    def get_active_contacts(db: Session) -> List[OrderContact]:
+    async def get_active_contacts(db: AsyncSession) -> List[OrderContact]:
         """Get all active contacts"""
-        return db.query(OrderContact).filter(
-            OrderContact.is_active == True
-        ).order_by(OrderContact.created_at).all()
+        result = await db.execute(
+            select(OrderContact).where(
+                OrderContact.is_active == True
+            ).order_by(OrderContact.created_at)
+        )
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_all_contacts(db: Session) -> List[OrderContact]:
+    async def get_all_contacts(db: AsyncSession) -> List[OrderContact]:
         """Get all contacts (including inactive)"""
-        return db.query(OrderContact).order_by(OrderContact.created_at).all()
+        result = await db.execute(select(OrderContact).order_by(OrderContact.created_at))
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_contact_by_id(db: Session, contact_id: int) -> Optional[OrderContact]:
+    async def get_contact_by_id(db: AsyncSession, contact_id: int) -> Optional[OrderContact]:
         """Get contact by ID"""
-        return db.query(OrderContact).filter(OrderContact.id == contact_id).first()
+        return await db.get(OrderContact, contact_id)
     
     @staticmethod
-    def get_contact_by_value(db: Session, contact_value: str) -> Optional[OrderContact]:
+    async def get_contact_by_value(db: AsyncSession, contact_value: str) -> Optional[OrderContact]:
         """Get contact by value"""
-        return db.query(OrderContact).filter(OrderContact.contact_value == contact_value).first()
+        result = await db.execute(select(OrderContact).where(OrderContact.contact_value == contact_value).limit(1))
+        return result.scalars().first()
     
     @staticmethod
-    def create_contact(db: Session, contact_value: str) -> OrderContact:
+    async def create_contact(db: AsyncSession, contact_value: str) -> OrderContact:
         """Create a new contact"""
         contact = OrderContact(
             contact_value=contact_value.strip(),
             is_active=True
         )
         db.add(contact)
-        db.commit()
-        db.refresh(contact)
+        await db.flush()
+        await db.refresh(contact)
         return contact
     
     @staticmethod
-    def deactivate_contact(db: Session, contact_id: int) -> Optional[OrderContact]:
+    async def deactivate_contact(db: AsyncSession, contact_id: int) -> Optional[OrderContact]:
         """Deactivate a contact (soft delete)"""
-        contact = OrderContactService.get_contact_by_id(db, contact_id)
+        contact = await OrderContactService.get_contact_by_id(db, contact_id)
         if not contact:
             return None
         
         contact.is_active = False
         contact.updated_at = datetime.now()
-        db.commit()
-        db.refresh(contact)
+        await db.flush()
+        await db.refresh(contact)
         return contact
     
     @staticmethod
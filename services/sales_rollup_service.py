@@ -0,0 +1,232 @@
+"""
+Service for daily sales rollups (per category and per toy)
+"""
+import logging
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import SalesLog, SalesDailyCategory, SalesDailyToy, SalesRollupState
+from utils.periods import local_day, local_today, utc_bounds
+
+logger = logging.getLogger(__name__)
+
+# Category key used for sales without a category
+NO_CATEGORY = 0
+
+
+class SalesRollupService:
+    """
+    Maintains sales_daily_category and sales_daily_toy
+    
+    log_sale_lead bumps today's rows directly (upsert). A catch-up job
+    recomputes every day touched by sales_logs rows past the watermark, so
+    rows written by other means (or before the rollups existed) are counted
+    too; recomputing a day is idempotent, so the two paths never double count.
+    """
+    
+    @staticmethod
+    async def _upsert_increment(
+        db: AsyncSession,
+        model,
+        values: dict,
+        key_columns: Tuple[str, ...],
+        name_column: str,
+        amount: int = 1
+    ) -> None:
+        """INSERT ... ON CONFLICT DO UPDATE count = count + amount (select/update fallback)"""
+        dialect = db.bind.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(model).values(count=amount, **values)
+            statement = statement.on_conflict_do_update(
+                index_elements=list(key_columns),
+                set_={
+                    "count": model.count + amount,
+                    name_column: statement.excluded[name_column]
+                }
+            )
+            await db.execute(statement)
+            return
+        
+        row = await db.get(model, tuple(values[c] for c in key_columns))
+        if row:
+            row.count += amount
+            setattr(row, name_column, values[name_column])
+        else:
+            db.add(model(count=amount, **values))
+        await db.flush()
+    
+    @staticmethod
+    async def record_sale(
+        db: AsyncSession,
+        toy_id: int,
+        toy_name: str,
+        category_id: Optional[int] = None,
+        category_name: Optional[str] = None,
+        when: Optional[datetime] = None
+    ) -> None:
+        """
+        Add one sale lead to the daily rollups
+        
+        Args:
+            db: Database session
+            toy_id: Toy ID
+            toy_name: Toy name (denormalized)
+            category_id: Category ID (optional)
+            category_name: Category name (optional, denormalized)
+            when: Sale time (default: now)
+        """
+        day = local_day(when) if when else local_today().isoformat()
+        
+        await SalesRollupService._upsert_increment(
+            db,
+            SalesDailyCategory,
+            {"day": day, "category_id": category_id or NO_CATEGORY, "category_name": category_name},
+            ("day", "category_id"),
+            "category_name"
+        )
+        await SalesRollupService._upsert_increment(
+            db,
+            SalesDailyToy,
+            {"day": day, "toy_id": toy_id, "toy_name": toy_name},
+            ("day", "toy_id"),
+            "toy_name"
+        )
+    
+    @staticmethod
+    async def record_sales(db: AsyncSession, sales: List[dict]) -> None:
+        """
+        Add a batch of sale leads to the daily rollups (one upsert per key)
+        
+        Args:
+            db: Database session
+            sales: sales_logs row dicts (toy_id, toy_name, category_id,
+                category_name, created_at in UTC)
+        """
+        category_counts: Counter = Counter()
+        toy_counts: Counter = Counter()
+        category_names: Dict[Tuple[str, int], Optional[str]] = {}
+        toy_names: Dict[Tuple[str, int], str] = {}
+        for sale in sales:
+            day = local_day(sale["created_at"])
+            category_key = (day, sale.get("category_id") or NO_CATEGORY)
+            category_counts[category_key] += 1
+            category_names[category_key] = sale.get("category_name")
+            toy_key = (day, sale["toy_id"])
+            toy_counts[toy_key] += 1
+            toy_names[toy_key] = sale["toy_name"]
+        
+        for (day, category_id), count in category_counts.items():
+            await SalesRollupService._upsert_increment(
+                db,
+                SalesDailyCategory,
+                {"day": day, "category_id": category_id, "category_name": category_names[(day, category_id)]},
+                ("day", "category_id"),
+                "category_name",
+                amount=count
+            )
+        for (day, toy_id), count in toy_counts.items():
+            await SalesRollupService._upsert_increment(
+                db,
+                SalesDailyToy,
+                {"day": day, "toy_id": toy_id, "toy_name": toy_names[(day, toy_id)]},
+                ("day", "toy_id"),
+                "toy_name",
+                amount=count
+            )
+    
+    @staticmethod
+    async def rebuild_days(db: AsyncSession, days: Iterable[str]) -> None:
+        """
+        Recompute rollup rows of the given local days from sales_logs
+        
+        Args:
+            db: Database session
+            days: Days in YYYY-MM-DD
+        """
+        days: Set[str] = set(days)
+        if not days:
+            return
+        
+        start, end = utc_bounds(date.fromisoformat(min(days)), date.fromisoformat(max(days)))
+        result = await db.execute(
+            select(
+                SalesLog.created_at,
+                SalesLog.category_id,
+                SalesLog.category_name,
+                SalesLog.toy_id,
+                SalesLog.toy_name
+            ).where(
+                SalesLog.created_at >= start,
+                SalesLog.created_at < end
+            ).order_by(SalesLog.id)
+        )
+        
+        category_counts: Counter = Counter()
+        toy_counts: Counter = Counter()
+        # Latest denormalized name wins, as with incremental updates
+        category_names: Dict[Tuple[str, int], Optional[str]] = {}
+        toy_names: Dict[Tuple[str, int], str] = {}
+        for row in result.all():
+            day = local_day(row.created_at)
+            if day not in days:
+                continue
+            category_key = (day, row.category_id or NO_CATEGORY)
+            category_counts[category_key] += 1
+            category_names[category_key] = row.category_name
+            toy_key = (day, row.toy_id)
+            toy_counts[toy_key] += 1
+            toy_names[toy_key] = row.toy_name
+        
+        await db.execute(delete(SalesDailyCategory).where(SalesDailyCategory.day.in_(days)))
+        await db.execute(delete(SalesDailyToy).where(SalesDailyToy.day.in_(days)))
+        db.add_all([
+            SalesDailyCategory(day=day, category_id=category_id, category_name=category_names[(day, category_id)], count=count)
+            for (day, category_id), count in category_counts.items()
+        ])
+        db.add_all([
+            SalesDailyToy(day=day, toy_id=toy_id, toy_name=toy_names[(day, toy_id)], count=count)
+            for (day, toy_id), count in toy_counts.items()
+        ])
+        await db.flush()
+    
+    @staticmethod
+    async def catch_up(db: AsyncSession) -> int:
+        """
+        Recompute days touched by sales_logs rows past the watermark
+        
+        On the first run this backfills the whole history.
+        
+        Returns:
+            Number of days recomputed
+        """
+        state = await db.get(SalesRollupState, 1)
+        if state is None:
+            state = SalesRollupState(id=1, last_sales_log_id=0)
+            db.add(state)
+            await db.flush()
+        
+        max_id = await db.scalar(select(func.max(SalesLog.id)))
+        if not max_id or max_id <= state.last_sales_log_id:
+            return 0
+        
+        result = await db.execute(
+            select(SalesLog.created_at).where(
+                SalesLog.id > state.last_sales_log_id,
+                SalesLog.id <= max_id
+            )
+        )
+        days = {local_day(created_at) for created_at in result.scalars().all()}
+        
+        await SalesRollupService.rebuild_days(db, days)
+        state.last_sales_log_id = max_id
+        await db.flush()
+        logger.info(f"Sales rollups caught up to sales log ID {max_id} ({len(days)} days recomputed)")
+        return len(days)
@@ -7,10 +7,11 @@ from datetime import datetime, time
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from aiogram import Bot
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import DAILY_AD_COUNT, AD_START_HOUR, AD_END_HOUR, GROUP_CHAT_ID
 from services.catalog_service import CatalogService
+from services.send_queue import send_priority, PRIORITY_BACKGROUND
 from database.db import get_db_session
 
 logger = logging.getLogger(__name__)
@@ -29,6 +30,8 @@ class AdScheduler:
         Post a random toy advertisement to the group
         This function is called by the scheduler
         """
+        # Scheduled jobs run in their own task, so this only affects this ad
+        send_priority.set(PRIORITY_BACKGROUND)
         try:
             if GROUP_CHAT_ID == 0:
                 logger.warning("GROUP_CHAT_ID not configured, skipping ad post")
@@ -37,7 +40,7 @@ class AdScheduler:
             db = get_db_session()
             try:
                 # Get random active toys (excluding today's posts)
-                toys = CatalogService.get_random_active_toys_for_ad(
+                toys = await CatalogService.get_random_active_toys_for_ad(
                     db, 
                     count=1, 
                     exclude_today=True
@@ -74,14 +77,15 @@ class AdScheduler:
                     )
                 
                 # Mark toy as posted today
-                CatalogService.mark_toy_posted(db, toy.id)
+                await CatalogService.mark_toy_posted(db, toy.id)
+                await db.commit()
                 
                 logger.info(f"Posted ad for toy ID {toy.id} ({toy.title})")
                 
             except Exception as e:
                 logger.error(f"Error posting ad: {e}", exc_info=True)
             finally:
-                db.close()
+                await db.close()
                 
         except Exception as e:
             logger.error(f"Critical error in post_random_ad: {e}", exc_info=True)
@@ -186,12 +190,12 @@ class AdScheduler:
             db = get_db_session()
             try:
                 if toy_id:
-                    toy = CatalogService.get_toy_by_id(db, toy_id)
+                    toy = await CatalogService.get_toy_by_id(db, toy_id)
                     if not toy or not toy.is_active:
                         return False
                     toys = [toy]
                 else:
-                    toys = CatalogService.get_random_active_toys_for_ad(
+                    toys = await CatalogService.get_random_active_toys_for_ad(
                         db, 
                         count=1, 
                         exclude_today=False  # Allow manual posts even if posted today
@@ -232,7 +236,7 @@ class AdScheduler:
                 logger.error(f"Error in manual ad post: {e}", exc_info=True)
                 return False
             finally:
-                db.close()
+                await db.close()
                 
         except Exception as e:
             logger.error(f"Critical error in post_manual_ad: {e}", exc_info=True)
@@ -0,0 +1,234 @@
+"""
+Product search over toy titles and descriptions
+
+Two interchangeable backends over the same normalized text (utils.search_text):
+- SQLite FTS5 table toys_fts (created by migration 7), kept in sync with Toy
+  writes by a flush listener and by the bulk catalog import
+- an in-process inverted index built from the catalog cache snapshot, used
+  when FTS5 is not available (PostgreSQL, SQLite built without FTS5)
+
+Either way results are resolved through the catalog cache, so only toys that
+are visible in the catalog (active, in an active category) are returned.
+"""
+import bisect
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event, literal_column, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database.models import Toy
+from services.catalog_cache import CachedToy, CatalogSnapshot, catalog_cache
+from utils.search_text import normalize_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "toys_fts"
+TITLE_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+# Query words beyond this are ignored; ranked IDs beyond MAX_RESULTS are dropped
+MAX_QUERY_TOKENS = 8
+MAX_RESULTS = 500
+
+_FTS_TABLE_EXISTS = (
+    select(literal_column("1"))
+    .select_from(text("sqlite_master"))
+    .where(text(f"type = 'table' AND name = '{FTS_TABLE}'"))
+)
+
+# Whether toys_fts exists (checked once per process)
+_fts_available: Optional[bool] = None
+
+
+def _fts_available_sync(conn: Connection) -> bool:
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = conn.dialect.name == "sqlite" and conn.execute(_FTS_TABLE_EXISTS).first() is not None
+    return _fts_available
+
+
+def index_toys_fts(conn: Connection, toys: Iterable[Tuple[int, str, Optional[str]]]) -> None:
+    """Insert or replace (toy_id, title, description) rows in toys_fts"""
+    rows = [
+        {"id": toy_id, "title": normalize_text(title), "description": normalize_text(description or "")}
+        for toy_id, title, description in toys
+    ]
+    if not rows or not _fts_available_sync(conn):
+        return
+    conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), [{"id": row["id"]} for row in rows])
+    conn.execute(text(f"INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (:id, :title, :description)"), rows)
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_fts_on_flush(session, flush_context):
+    """Reindex toys written through the ORM in the same transaction"""
+    changed = [obj for obj in (*session.new, *session.dirty) if isinstance(obj, Toy)]
+    deleted = [{"id": obj.id} for obj in session.deleted if isinstance(obj, Toy)]
+    if not changed and not deleted:
+        return
+    
+    conn = session.connection()
+    if not _fts_available_sync(conn):
+        return
+    if deleted:
+        conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), deleted)
+    index_toys_fts(conn, [(toy.id, toy.title, toy.description) for toy in changed])
+
+
+class SearchIndex:
+    """
+    Inverted index over a catalog snapshot
+    
+    Each token maps to {toy_id: weight} (title words weigh more than
+    description words); the sorted vocabulary gives prefix matches by bisect.
+    """
+    
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+        postings: Dict[str, Dict[int, float]] = {}
+        for toy in snapshot.toys_by_id.values():
+            for weight, field_text in ((TITLE_WEIGHT, toy.title), (DESCRIPTION_WEIGHT, toy.description)):
+                for token in tokenize(field_text):
+                    scores = postings.setdefault(token, {})
+                    scores[toy.id] = scores.get(toy.id, 0.0) + weight
+        self._postings = postings
+        self._terms = sorted(postings)
+    
+    def search(self, tokens: Sequence[str]) -> List[int]:
+        """Toy IDs matching every token (as a word prefix), best first"""
+        totals: Optional[Dict[int, float]] = None
+        for token in tokens:
+            matches: Dict[int, float] = {}
+            idx = bisect.bisect_left(self._terms, token)
+            while idx < len(self._terms) and self._terms[idx].startswith(token):
+                term = self._terms[idx]
+                # Whole-word matches rank above prefix matches
+                factor = 1.0 if term == token else 0.5
+                for toy_id, score in self._postings[term].items():
+                    matches[toy_id] = max(matches.get(toy_id, 0.0), score * factor)
+                idx += 1
+            
+            if totals is None:
+                totals = matches
+            else:
+                totals = {toy_id: totals[toy_id] + score for toy_id, score in matches.items() if toy_id in totals}
+            if not totals:
+                return []
+        
+        # Newer toys (higher IDs) first among equal scores
+        return sorted(totals, key=lambda toy_id: (-totals[toy_id], -toy_id))[:MAX_RESULTS]
+
+
+_index: Optional[SearchIndex] = None
+
+
+class SearchService:
+    """Service for product search"""
+    
+    @staticmethod
+    def query_tokens(query: str) -> List[str]:
+        """Normalized words of a search query"""
+        return tokenize(query)[:MAX_QUERY_TOKENS]
+    
+    @staticmethod
+    async def _fts_enabled(db: AsyncSession) -> bool:
+        if _fts_available is None:
+            if db.bind.dialect.name != "sqlite":
+                return False
+            await db.run_sync(lambda session: _fts_available_sync(session.connection(
+                bind_arguments={"clause": _FTS_TABLE_EXISTS}
+            )))
+        return _fts_available
+    
+    @staticmethod
+    async def _search_fts(db: AsyncSession, tokens: Sequence[str]) -> List[int]:
+        """Ranked toy IDs from toys_fts (bm25, title weighted)"""
+        match = " ".join(f'"{token}"*' for token in tokens)
+        result = await db.execute(
+            select(literal_column("rowid"))
+            .select_from(text(FTS_TABLE))
+            .where(text(f"{FTS_TABLE} MATCH :match").bindparams(match=match))
+            .order_by(text(f"bm25({FTS_TABLE}, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT})"), text("rowid DESC"))
+            .limit(MAX_RESULTS)
+        )
+        return list(result.scalars().all())
+    
+    @staticmethod
+    async def search_all(db: AsyncSession, tokens: Sequence[str]) -> List[CachedToy]:
+        """
+        All visible toys matching query tokens (at most MAX_RESULTS), best match first
+        
+        Every token must match the start of a word in the toy's title or
+        description (see query_tokens).
+        """
+        global _index
+        
+        if not tokens:
+            return []
+        
+        snapshot = await catalog_cache.get(db)
+        if await SearchService._fts_enabled(db):
+            toy_ids = await SearchService._search_fts(db, tokens)
+        else:
+            index = _index
+            if index is None or index.snapshot is not snapshot:
+                index = _index = SearchIndex(snapshot)
+            toy_ids = index.search(tokens)
+        
+        toys = []
+        for toy_id in toy_ids:
+            toy = snapshot.toys_by_id.get(toy_id)
+            if toy and toy.category and toy.category.is_active:
+                toys.append(toy)
+        return toys
+    
+    @staticmethod
+    async def search(
+        db: AsyncSession,
+        query: str,
+        page: int = 0,
+        page_size: int = 10
+    ) -> Tuple[List[CachedToy], int]:
+        """
+        Search visible toys by title and description
+        
+        Every query word must match the start of a word in the toy's title or
+        description; Latin/Cyrillic spelling and apostrophes don't matter.
+        
+        Args:
+            db: Database session
+            query: Search text as typed by the user
+            page: Page number (0-indexed)
+            page_size: Number of items per page (default: 10)
+        
+        Returns:
+            Tuple of (toys on the page, total number of results), best match first
+        """
+        toys = await SearchService.search_all(db, SearchService.query_tokens(query))
+        offset = page * page_size
+        return toys[offset:offset + page_size], len(toys)
+    
+    @staticmethod
+    def format_results(query: str, toys: List[CachedToy], page: int, page_size: int, total_count: int) -> str:
+        """Format one page of search results for display"""
+        if not toys:
+            return (
+                f"🔍 <b>{query}</b>\n\n"
+                "😔 Hech narsa topilmadi. Boshqa so'z bilan qidirib ko'ring."
+            )
+        
+        total_pages = (total_count + page_size - 1) // page_size
+        total_text = f"{total_count}+" if total_count >= MAX_RESULTS else str(total_count)
+        lines = [
+            f"🔍 <b>{query}</b> — {total_text} ta natija",
+            f"📄 Sahifa {page + 1} / {total_pages}",
+            ""
+        ]
+        for idx, toy in enumerate(toys, start=page * page_size + 1):
+            lines.append(f"{idx}. <b>{toy.title}</b> — {toy.price}")
+            lines.append(f"   🧸 {toy.category.name}")
+        lines.append("")
+        lines.append("👇 Ko'rish uchun raqamni bosing")
+        return "\n".join(lines)
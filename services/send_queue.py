@@ -0,0 +1,195 @@
+"""
+Outbound Telegram send scheduler (rate limiting, priorities, flood-wait retry)
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from config import (
+    SEND_GLOBAL_PER_SECOND, SEND_CHAT_PER_MINUTE, SEND_GROUP_PER_MINUTE,
+    SEND_CHAT_BURST, SEND_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# Priority of requests made from the current task (replies to users by default)
+send_priority: ContextVar[int] = ContextVar("send_priority", default=PRIORITY_INTERACTIVE)
+
+# Idle per-chat buckets are dropped once there are more than this many
+MAX_CHAT_BUCKETS = 10000
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations
+    
+    reserve() always takes a token, letting the balance go negative; the
+    returned delay is how long the caller has to wait for its turn. This keeps
+    callers of one bucket in FIFO order without a queue.
+    """
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+    
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+    
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+    
+    def reserve(self, now: float) -> float:
+        """Take a token and return how long to wait before using it"""
+        wait = self.delay(now)
+        self.tokens -= 1
+        return wait
+    
+    def block(self, seconds: float) -> None:
+        """Hold all requests for `seconds` (Telegram flood wait)"""
+        now = time.monotonic()
+        self._refill(now)
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = min(self.tokens, 0)
+    
+    def is_idle(self, now: float) -> bool:
+        """Bucket is full again and not blocked, so it can be forgotten"""
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+class SendQueueMiddleware(BaseRequestMiddleware):
+    """
+    Bot session middleware that paces every chat-bound request
+    
+    Each request waits for its chat's bucket (private and group chats have
+    separate rates), then for a slot in the global bucket. Global slots are
+    granted by priority, so users' replies overtake queued ads. On
+    TelegramRetryAfter the chat (or whole bot) is paused for the requested time
+    and the request is retried up to SEND_MAX_RETRIES times.
+    """
+    
+    def __init__(
+        self,
+        global_per_second: int = SEND_GLOBAL_PER_SECOND,
+        chat_per_minute: int = SEND_CHAT_PER_MINUTE,
+        group_per_minute: int = SEND_GROUP_PER_MINUTE,
+        chat_burst: int = SEND_CHAT_BURST,
+        max_retries: int = SEND_MAX_RETRIES
+    ):
+        self.global_bucket = TokenBucket(max(1, global_per_second), max(1, global_per_second))
+        self.chat_rate = max(1, chat_per_minute) / 60
+        self.group_rate = max(1, group_per_minute) / 60
+        self.chat_burst = max(1, chat_burst)
+        self.max_retries = max(0, max_retries)
+        self._chat_buckets: Dict[Union[int, str], TokenBucket] = {}
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._pump_task: Optional[asyncio.Task] = None
+    
+    @staticmethod
+    def _is_group(chat_id: Union[int, str]) -> bool:
+        # Groups/channels have negative IDs or @usernames
+        return isinstance(chat_id, str) or chat_id < 0
+    
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= MAX_CHAT_BUCKETS:
+                self._prune_buckets()
+            if self._is_group(chat_id):
+                bucket = TokenBucket(self.group_rate, min(self.chat_burst, 3))
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+    
+    def _prune_buckets(self) -> None:
+        now = time.monotonic()
+        for chat_id in [c for c, b in self._chat_buckets.items() if b.is_idle(now)]:
+            del self._chat_buckets[chat_id]
+    
+    async def _acquire_global(self, priority: int) -> None:
+        """Wait for a global slot; lower priority values are served first"""
+        if not self._waiters and self.global_bucket.delay(time.monotonic()) == 0:
+            self.global_bucket.tokens -= 1
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        await future
+    
+    async def _pump(self) -> None:
+        """Grant global slots to waiters in priority order"""
+        while self._waiters:
+            wait = self.global_bucket.delay(time.monotonic())
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Caller was cancelled while waiting
+                continue
+            self.global_bucket.tokens -= 1
+            future.set_result(None)
+    
+    async def _acquire(self, chat_id: Union[int, str], priority: int) -> None:
+        wait = self._chat_bucket(chat_id).reserve(time.monotonic())
+        if wait > 0:
+            await asyncio.sleep(wait)
+        await self._acquire_global(priority)
+    
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        priority = send_priority.get()
+        
+        attempt = 0
+        while True:
+            if chat_id is not None:
+                await self._acquire(chat_id, priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt >= self.max_retries:
+                    logger.error(f"Flood wait on {type(method).__name__} to chat {chat_id}, giving up after {attempt} retries")
+                    raise
+                attempt += 1
+                logger.warning(
+                    f"Flood wait {e.retry_after}s on {type(method).__name__} to chat {chat_id} "
+                    f"(retry {attempt}/{self.max_retries})"
+                )
+                if chat_id is not None:
+                    self._chat_bucket(chat_id).block(e.retry_after)
+                else:
+                    self.global_bucket.block(e.retry_after)
+                    await asyncio.sleep(e.retry_after)
@@ -3,11 +3,14 @@ Service for sales statistics and analytics
 """
 import logging
 from typing import List, Dict, Tuple
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, extract
+from datetime import datetime
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.models import SalesLog
+from database.models import SalesLog, SalesDailyCategory, SalesDailyToy
+from services.event_buffer import event_buffer
+from services.sales_rollup_service import SalesRollupService
+from utils.periods import period_days
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +19,8 @@ class StatsService:
     """Service for sales statistics"""
     
     @staticmethod
-    def log_sale_lead(
-        db: Session,
+    async def log_sale_lead(
+        db: AsyncSession,
         user_id: int,
         toy_id: int,
         toy_name: str,
@@ -43,16 +46,69 @@ class StatsService:
             category_name=category_name
         )
         db.add(sales_log)
-        db.commit()
+        await db.flush()
+        
+        await SalesRollupService.record_sale(
+            db,
+            toy_id=toy_id,
+            toy_name=toy_name,
+            category_id=category_id,
+            category_name=category_name
+        )
+    
+    @staticmethod
+    def queue_sale_lead(
+        user_id: int,
+        toy_id: int,
+        toy_name: str,
+        category_id: int = None,
+        category_name: str = None
+    ) -> None:
+        """
+        Queue a sale lead for the next batched write (does not touch the database)
+        
+        Args:
+            user_id: Telegram user ID
+            toy_id: Toy ID
+            toy_name: Toy name (denormalized)
+            category_id: Category ID (optional)
+            category_name: Category name (optional, denormalized)
+        """
+        event_buffer.emit("sale_lead", {
+            "user_id": user_id,
+            "toy_id": toy_id,
+            "toy_name": toy_name,
+            "category_id": category_id,
+            "category_name": category_name
+        })
+    
+    @staticmethod
+    async def write_sale_leads(db: AsyncSession, events: List[dict]) -> None:
+        """
+        Insert buffered sale lead events with one multi-row INSERT
+        
+        Args:
+            db: Database session
+            events: Events queued by queue_sale_lead
+        """
+        rows = [
+            {**event["data"], "created_at": datetime.fromisoformat(event["ts"])}
+            for event in events
+        ]
+        await db.execute(insert(SalesLog), rows)
+        await SalesRollupService.record_sales(db, rows)
     
     @staticmethod
-    def get_category_stats_by_time_range(
-        db: Session,
+    async def get_category_stats_by_time_range(
+        db: AsyncSession,
         time_range: str  # 'weekly', 'monthly', 'yearly'
     ) -> List[Tuple[str, int]]:
         """
         Get category statistics for a time range
         
+        Sums the daily rollup rows of the local [first_day, end_day) range
+        (at most 366 days per category).
+        
         Args:
             db: Database session
             time_range: 'weekly', 'monthly', or 'yearly'
@@ -60,66 +116,39 @@ class StatsService:
         Returns:
             List of tuples (category_name, count) sorted by count descending
         """
-        now = datetime.now()
-        
-        if time_range == 'weekly':
-            # Last 7 days
-            start_date = now - timedelta(days=7)
-            query = db.query(
-                SalesLog.category_name,
-                func.count(SalesLog.id).label('count')
-            ).filter(
-                SalesLog.created_at >= start_date,
-                SalesLog.category_name.isnot(None)
-            ).group_by(
-                SalesLog.category_name
-            ).order_by(
-                func.count(SalesLog.id).desc()
-            )
-        
-        elif time_range == 'monthly':
-            # Current month
-            query = db.query(
-                SalesLog.category_name,
-                func.count(SalesLog.id).label('count')
-            ).filter(
-                extract('year', SalesLog.created_at) == now.year,
-                extract('month', SalesLog.created_at) == now.month,
-                SalesLog.category_name.isnot(None)
-            ).group_by(
-                SalesLog.category_name
-            ).order_by(
-                func.count(SalesLog.id).desc()
-            )
-        
-        elif time_range == 'yearly':
-            # Current year
-            query = db.query(
-                SalesLog.category_name,
-                func.count(SalesLog.id).label('count')
-            ).filter(
-                extract('year', SalesLog.created_at) == now.year,
-                SalesLog.category_name.isnot(None)
+        days = period_days(time_range)
+        if days is None:
+            return []
+        first_day, end_day = (day.isoformat() for day in days)
+        
+        total = func.sum(SalesDailyCategory.count).label('count')
+        result = await db.execute(
+            select(
+                SalesDailyCategory.category_name,
+                total
+            ).where(
+                SalesDailyCategory.day >= first_day,
+                SalesDailyCategory.day < end_day,
+                SalesDailyCategory.category_name.isnot(None)
             ).group_by(
-                SalesLog.category_name
+                SalesDailyCategory.category_name
             ).order_by(
-                func.count(SalesLog.id).desc()
+                total.desc()
             )
-        
-        else:
-            return []
-        
-        results = query.all()
-        return [(row.category_name, row.count) for row in results]
+        )
+        return [(row.category_name, row.count) for row in result.all()]
     
     @staticmethod
-    def get_toy_stats_by_time_range(
-        db: Session,
+    async def get_toy_stats_by_time_range(
+        db: AsyncSession,
         time_range: str  # 'weekly', 'monthly', 'yearly'
     ) -> List[Tuple[str, int]]:
         """
         Get toy statistics for a time range
         
+        Sums the daily rollup rows of the local [first_day, end_day) range
+        (at most 366 days per toy).
+        
         Args:
             db: Database session
             time_range: 'weekly', 'monthly', or 'yearly'
@@ -127,54 +156,26 @@ class StatsService:
         Returns:
             List of tuples (toy_name, count) sorted by count descending
         """
-        now = datetime.now()
-        
-        if time_range == 'weekly':
-            # Last 7 days
-            start_date = now - timedelta(days=7)
-            query = db.query(
-                SalesLog.toy_name,
-                func.count(SalesLog.id).label('count')
-            ).filter(
-                SalesLog.created_at >= start_date
-            ).group_by(
-                SalesLog.toy_name
-            ).order_by(
-                func.count(SalesLog.id).desc()
-            )
-        
-        elif time_range == 'monthly':
-            # Current month
-            query = db.query(
-                SalesLog.toy_name,
-                func.count(SalesLog.id).label('count')
-            ).filter(
-                extract('year', SalesLog.created_at) == now.year,
-                extract('month', SalesLog.created_at) == now.month
-            ).group_by(
-                SalesLog.toy_name
-            ).order_by(
-                func.count(SalesLog.id).desc()
-            )
-        
-        elif time_range == 'yearly':
-            # Current year
-            query = db.query(
-                SalesLog.toy_name,
-                func.count(SalesLog.id).label('count')
-            ).filter(
-                extract('year', SalesLog.created_at) == now.year
+        days = period_days(time_range)
+        if days is None:
+            return []
+        first_day, end_day = (day.isoformat() for day in days)
+        
+        total = func.sum(SalesDailyToy.count).label('count')
+        result = await db.execute(
+            select(
+                SalesDailyToy.toy_name,
+                total
+            ).where(
+                SalesDailyToy.day >= first_day,
+                SalesDailyToy.day < end_day
             ).group_by(
-                SalesLog.toy_name
+                SalesDailyToy.toy_name
             ).order_by(
-                func.count(SalesLog.id).desc()
+                total.desc()
             )
-        
-        else:
-            return []
-        
-        results = query.all()
-        return [(row.toy_name, row.count) for row in results]
+        )
+        return [(row.toy_name, row.count) for row in result.all()]
     
     @staticmethod
     def format_category_stats(stats: List[Tuple[str, int]], time_range: str) -> str:
@@ -232,3 +233,6 @@ class StatsService:
             text += f"{idx}️⃣ {toy_name} — {count} ta\n"
         
         return text
+
+
+event_buffer.register("sale_lead", StatsService.write_sale_leads)
@@ -2,7 +2,8 @@
 Service for managing store locations
 """
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import StoreLocation
 
@@ -11,30 +12,35 @@ class StoreLocationService:
     """Service for store location operations"""
     
     @staticmethod
-    def get_active_locations(db: Session) -> List[StoreLocation]:
+    async def get_active_locations(db: AsyncSession) -> List[StoreLocation]:
         """Get all active store locations"""
-        return db.query(StoreLocation).filter(
-            StoreLocation.is_active == True
-        ).order_by(StoreLocation.created_at).all()
+        result = await db.execute(
+            select(StoreLocation).where(
+                StoreLocation.is_active == True
+            ).order_by(StoreLocation.created_at)
+        )
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_all_locations(db: Session) -> List[StoreLocation]:
+    async def get_all_locations(db: AsyncSession) -> List[StoreLocation]:
         """Get all store locations (including inactive)"""
-        return db.query(StoreLocation).order_by(StoreLocation.created_at).all()
+        result = await db.execute(select(StoreLocation).order_by(StoreLocation.created_at))
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_location_by_id(db: Session, location_id: int) -> Optional[StoreLocation]:
+    async def get_location_by_id(db: AsyncSession, location_id: int) -> Optional[StoreLocation]:
         """Get location by ID"""
-        return db.query(StoreLocation).filter(StoreLocation.id == location_id).first()
+        return await db.get(StoreLocation, location_id)
     
     @staticmethod
-    def get_location_by_name(db: Session, name: str) -> Optional[StoreLocation]:
+    async def get_location_by_name(db: AsyncSession, name: str) -> Optional[StoreLocation]:
         """Get location by name"""
-        return db.query(StoreLocation).filter(StoreLocation.name == name).first()
+        result = await db.execute(select(StoreLocation).where(StoreLocation.name == name).limit(1))
+        return result.scalars().first()
     
     @staticmethod
-    def create_location(
-        db: Session,
+    async def create_location(
+        db: AsyncSession,
         name: str,
         address_text: str,
         latitude: str,
@@ -49,18 +55,18 @@ class StoreLocationService:
             is_active=True
         )
         db.add(location)
-        db.commit()
-        db.refresh(location)
+        await db.flush()
+        await db.refresh(location)
         return location
     
     @staticmethod
-    def deactivate_location(db: Session, location_id: int) -> Optional[StoreLocation]:
+    async def deactivate_location(db: AsyncSession, location_id: int) -> Optional[StoreLocation]:
         """Deactivate a location (soft delete)"""
-        location = StoreLocationService.get_location_by_id(db, location_id)
+        location = await StoreLocationService.get_location_by_id(db, location_id)
         if not location:
             return None
         
         location.is_active = False
-        db.commit()
-        db.refresh(location)
+        await db.flush()
+        await db.refresh(location)
         return location
@@ -0,0 +1,164 @@
+"""
+Webhook server (aiohttp) - alternative to long polling
+"""
+import asyncio
+import hmac
+import logging
+from typing import List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from config import (
+    WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT,
+    WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """
+    Receives updates over HTTP and processes them with a bounded worker pool
+    
+    Updates are sharded by user/chat ID onto WEBHOOK_WORKERS queues, so one
+    user's updates are handled in order while different users run concurrently.
+    When a shard queue is full the request gets 503 and Telegram redelivers it
+    later, which keeps memory bounded during spikes.
+    """
+    
+    def __init__(self, bot: Bot, dispatcher: Dispatcher):
+        self.bot = bot
+        self.dispatcher = dispatcher
+        # Every replica and the test client must agree on the secret, so it is never generated
+        if not WEBHOOK_SECRET:
+            raise ValueError("WEBHOOK_SECRET is required in webhook mode")
+        self.secret = WEBHOOK_SECRET
+        
+        self.workers_count = max(1, WEBHOOK_WORKERS)
+        queue_size = max(1, WEBHOOK_QUEUE_SIZE // self.workers_count)
+        self.queues: List[asyncio.Queue] = [
+            asyncio.Queue(maxsize=queue_size) for _ in range(self.workers_count)
+        ]
+        self.workers: List[asyncio.Task] = []
+        self.runner: Optional[web.AppRunner] = None
+        self._stop_event = asyncio.Event()
+    
+    def build_app(self) -> web.Application:
+        """Create aiohttp application"""
+        app = web.Application()
+        app.router.add_post(WEBHOOK_PATH, self.handle_update)
+        app.router.add_get("/healthz", self.handle_health)
+        return app
+    
+    @staticmethod
+    def _shard_key(update: Update) -> int:
+        """Pick a stable key so a user's updates always land on the same worker"""
+        event = update.event
+        user = getattr(event, "from_user", None)
+        if user:
+            return user.id
+        chat = getattr(event, "chat", None)
+        if chat:
+            return chat.id
+        return update.update_id
+    
+    async def handle_update(self, request: web.Request) -> web.Response:
+        """Validate secret token and enqueue the update"""
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token, self.secret):
+            logger.warning(f"Rejected webhook request with invalid secret from {request.remote}")
+            return web.Response(status=401)
+        
+        try:
+            payload = await request.json()
+            update = Update.model_validate(payload, context={"bot": self.bot})
+        except Exception as e:
+            logger.warning(f"Invalid update payload: {e}")
+            return web.Response(status=400)
+        
+        queue = self.queues[self._shard_key(update) % self.workers_count]
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            # Telegram retries non-2xx responses, so the update is not lost
+            logger.warning(f"Update queue full, asking Telegram to retry update {update.update_id}")
+            return web.Response(status=503)
+        
+        return web.Response(status=200)
+    
+    async def handle_health(self, request: web.Request) -> web.Response:
+        """Health check with queue depth"""
+        return web.json_response({
+            "status": "ok",
+            "queued": sum(q.qsize() for q in self.queues)
+        })
+    
+    async def _worker(self, queue: asyncio.Queue, index: int):
+        """Process updates from one shard queue"""
+        while True:
+            update = await queue.get()
+            try:
+                await self.dispatcher.feed_update(self.bot, update)
+            except Exception as e:
+                logger.error(f"Error processing update {update.update_id} in worker {index}: {e}", exc_info=True)
+            finally:
+                queue.task_done()
+    
+    async def start(self):
+        """Start workers, HTTP server and register the webhook with Telegram"""
+        for index, queue in enumerate(self.queues):
+            self.workers.append(asyncio.create_task(self._worker(queue, index)))
+        
+        self.runner = web.AppRunner(self.build_app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, WEBHOOK_HOST, WEBHOOK_PORT)
+        await site.start()
+        logger.info(
+            f"Webhook server listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH} "
+            f"({self.workers_count} workers, queue size {WEBHOOK_QUEUE_SIZE})"
+        )
+        
+        if WEBHOOK_URL:
+            await self.bot.set_webhook(
+                url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+                secret_token=self.secret,
+                allowed_updates=self.dispatcher.resolve_used_update_types(),
+                max_connections=min(100, self.workers_count * 5)
+            )
+            logger.info(f"✅ Webhook registered: {WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}")
+        else:
+            logger.warning("WEBHOOK_URL not set, webhook not registered with Telegram (local mode)")
+    
+    async def run(self):
+        """Start and block until stop() is called"""
+        await self.dispatcher.emit_startup(bot=self.bot, dispatcher=self.dispatcher)
+        await self.start()
+        await self._stop_event.wait()
+    
+    async def stop(self, drain_timeout: float = 10.0):
+        """Stop accepting updates, finish queued ones and stop workers"""
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+        
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(q.join() for q in self.queues)),
+                timeout=drain_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Timed out waiting for queued updates to finish")
+        
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        
+        if not self._stop_event.is_set():
+            self._stop_event.set()
+            await self.dispatcher.emit_shutdown(bot=self.bot, dispatcher=self.dispatcher)
+        logger.info("Webhook server stopped")
@@ -0,0 +1,9 @@
+"""
+FSM states for bulk catalog import
+"""
+from aiogram.fsm.state import State, StatesGroup
+
+
+class CatalogImportStates(StatesGroup):
+    """FSM states for importing a catalog file"""
+    waiting_file = State()
@@ -0,0 +1,9 @@
+"""
+FSM states for product search
+"""
+from aiogram.fsm.state import State, StatesGroup
+
+
+class SearchStates(StatesGroup):
+    """FSM states for search"""
+    waiting_query = State()
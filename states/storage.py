@@ -0,0 +1,184 @@
+"""
+FSM storage backends (memory, SQLite file, Redis protocol)
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Mapping, Optional
+
+import aiosqlite
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config import FSM_STORAGE, FSM_STORAGE_URL, FSM_STATE_TTL
+
+logger = logging.getLogger(__name__)
+
+# How often (seconds) expired rows are swept from the SQLite table
+PURGE_INTERVAL = 600
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM storage kept in a local SQLite file
+    
+    State and data live in one row per key. Every write pushes the row's
+    expiry `state_ttl` seconds ahead; rows past their expiry read as empty and
+    are purged in the background of later writes. WAL mode lets several bot
+    processes on the same host share one file.
+    """
+    
+    def __init__(self, path: str, state_ttl: Optional[int] = None):
+        self.path = path
+        self.state_ttl = state_ttl if state_ttl and state_ttl > 0 else None
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._conn_lock = asyncio.Lock()
+        self._last_purge = 0.0
+    
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        """Build row key from StorageKey"""
+        parts = [str(key.bot_id), str(key.chat_id), str(key.user_id)]
+        if key.thread_id:
+            parts.append(str(key.thread_id))
+        business_connection_id = getattr(key, "business_connection_id", None)
+        if business_connection_id:
+            parts.append(str(business_connection_id))
+        parts.append(key.destiny)
+        return ":".join(parts)
+    
+    def _expires_at(self, now: float) -> Optional[float]:
+        return now + self.state_ttl if self.state_ttl else None
+    
+    async def _get_conn(self) -> aiosqlite.Connection:
+        """Open connection and create table on first use"""
+        if self._conn is not None:
+            return self._conn
+        
+        async with self._conn_lock:
+            if self._conn is None:
+                conn = await aiosqlite.connect(self.path)
+                await conn.execute("PRAGMA journal_mode=WAL")
+                await conn.execute("PRAGMA busy_timeout=5000")
+                await conn.execute(
+                    "CREATE TABLE IF NOT EXISTS fsm_storage ("
+                    "key TEXT PRIMARY KEY, "
+                    "state TEXT, "
+                    "data TEXT NOT NULL DEFAULT '{}', "
+                    "expires_at REAL)"
+                )
+                await conn.commit()
+                self._conn = conn
+                logger.info(f"SQLite FSM storage opened: {self.path}")
+        return self._conn
+    
+    async def _maybe_purge(self, conn: aiosqlite.Connection, now: float) -> None:
+        """Delete expired rows at most once per PURGE_INTERVAL"""
+        if not self.state_ttl or now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        cursor = await conn.execute(
+            "DELETE FROM fsm_storage WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (now,)
+        )
+        if cursor.rowcount:
+            logger.info(f"Purged {cursor.rowcount} expired FSM states")
+    
+    async def _read(self, key: StorageKey) -> Optional[tuple]:
+        conn = await self._get_conn()
+        now = time.time()
+        async with conn.execute(
+            "SELECT state, data FROM fsm_storage "
+            "WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (self._key(key), now)
+        ) as cursor:
+            return await cursor.fetchone()
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """Set state for key (data of an expired row is dropped)"""
+        if isinstance(state, State):
+            state = state.state
+        conn = await self._get_conn()
+        now = time.time()
+        await conn.execute(
+            "INSERT INTO fsm_storage (key, state, data, expires_at) VALUES (?, ?, '{}', ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "state = excluded.state, "
+            "data = CASE WHEN fsm_storage.expires_at IS NOT NULL AND fsm_storage.expires_at <= ? "
+            "THEN '{}' ELSE fsm_storage.data END, "
+            "expires_at = excluded.expires_at",
+            (self._key(key), state, self._expires_at(now), now)
+        )
+        await self._maybe_purge(conn, now)
+        await conn.commit()
+    
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """Get state for key"""
+        row = await self._read(key)
+        return row[0] if row else None
+    
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        """Replace data for key (state of an expired row is dropped)"""
+        if not isinstance(data, dict):
+            raise ValueError(f"Data must be a dict, got {type(data).__name__}")
+        conn = await self._get_conn()
+        now = time.time()
+        await conn.execute(
+            "INSERT INTO fsm_storage (key, state, data, expires_at) VALUES (?, NULL, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "state = CASE WHEN fsm_storage.expires_at IS NOT NULL AND fsm_storage.expires_at <= ? "
+            "THEN NULL ELSE fsm_storage.state END, "
+            "data = excluded.data, "
+            "expires_at = excluded.expires_at",
+            (self._key(key), json.dumps(data, ensure_ascii=False), self._expires_at(now), now)
+        )
+        await self._maybe_purge(conn, now)
+        await conn.commit()
+    
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        """Get data for key"""
+        row = await self._read(key)
+        return json.loads(row[1]) if row and row[1] else {}
+    
+    async def close(self) -> None:
+        """Close database connection"""
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+
+def create_fsm_storage() -> BaseStorage:
+    """
+    Build FSM storage selected by FSM_STORAGE
+    
+    - memory: in-process (lost on restart, single process only)
+    - sqlite: local file at FSM_STORAGE_URL (default fsm_states.db)
+    - redis:  any Redis-protocol server at FSM_STORAGE_URL (redis://...)
+    
+    FSM_STATE_TTL (seconds, 0 = no expiry) drops abandoned states.
+    """
+    backend = FSM_STORAGE.lower()
+    ttl = FSM_STATE_TTL if FSM_STATE_TTL > 0 else None
+    
+    if backend == "sqlite":
+        path = FSM_STORAGE_URL or "fsm_states.db"
+        if path.startswith("sqlite:///"):
+            path = path[len("sqlite:///"):]
+        logger.info(f"Using SQLite FSM storage ({path}, TTL: {ttl or 'none'})")
+        return SQLiteStorage(path, state_ttl=ttl)
+    
+    if backend == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError as e:
+            raise RuntimeError("FSM_STORAGE=redis requires the 'redis' package (pip install redis)") from e
+        url = FSM_STORAGE_URL or "redis://localhost:6379/0"
+        logger.info(f"Using Redis FSM storage ({url.split('@')[-1]}, TTL: {ttl or 'none'})")
+        return RedisStorage.from_url(url, state_ttl=ttl, data_ttl=ttl)
+    
+    if backend != "memory":
+        logger.warning(f"Unknown FSM_STORAGE '{FSM_STORAGE}', falling back to memory")
+    logger.info("Using in-memory FSM storage (states are lost on restart)")
+    return MemoryStorage()
@@ -0,0 +1,48 @@
+"""
+Test settings and database fixtures
+
+Environment is set before any project module reads config, so tests use the
+shared in-memory database of database/db.py and a fixed timezone.
+"""
+import os
+
+import pytest
+import pytest_asyncio
+
+# Shared in-memory database (database/db.py) instead of the toymix.db file
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["AD_TIMEZONE"] = "Asia/Tashkent"
+os.environ.setdefault("BOT_TOKEN", "123456:TEST")
+
+
+@pytest.fixture(scope="session")
+def migrated_db():
+    """Apply all migrations to the in-memory database once"""
+    from database.db import engine
+    from database.migrate import run_migrations
+    run_migrations(engine)
+    return engine
+
+
+@pytest_asyncio.fixture
+async def db(migrated_db):
+    """
+    Async session on an empty, migrated database
+    
+    Rows are deleted afterwards, and the async engine is disposed because its
+    connection belongs to this test's event loop.
+    """
+    from sqlalchemy import text
+    from database.db import AsyncSessionLocal, async_engine
+    from database.models import Base
+    
+    session = AsyncSessionLocal()
+    try:
+        yield session
+    finally:
+        await session.close()
+        await async_engine.dispose()
+        with migrated_db.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+            conn.execute(text("DELETE FROM toys_fts"))
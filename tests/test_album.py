@@ -0,0 +1,73 @@
+"""
+Tests for middlewares/album.py
+"""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from aiogram.types import Chat, Message, Update
+
+from handlers.admin import AddToyStates
+from middlewares.album import AlbumMiddleware
+
+WAITING_MEDIA = AddToyStates.waiting_media.state
+
+
+def _update(message_id: int, media_group_id=None) -> Update:
+    return Update(update_id=message_id, message=Message(
+        message_id=message_id,
+        date=datetime(2024, 3, 1),
+        chat=Chat(id=42, type="private"),
+        media_group_id=media_group_id
+    ))
+
+
+async def _feed(middleware, handler, updates, raw_state=WAITING_MEDIA):
+    results = [await middleware(handler, update, {"raw_state": raw_state}) for update in updates]
+    await asyncio.gather(*middleware._tasks)
+    return results
+
+
+@pytest.mark.asyncio
+async def test_album_parts_are_handled_once_in_order():
+    middleware = AlbumMiddleware(states=[AddToyStates.waiting_media], latency_ms=20)
+    handler = AsyncMock(return_value="handled")
+    
+    results = await _feed(middleware, handler, [_update(3, "g1"), _update(1, "g1"), _update(2, "g1")])
+    
+    assert results == [None, None, None]
+    handler.assert_awaited_once()
+    event, data = handler.await_args.args
+    assert event.message.message_id == 3
+    assert [part.message_id for part in data["album"]] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_other_updates_pass_through_unchanged():
+    middleware = AlbumMiddleware(states=[AddToyStates.waiting_media], latency_ms=20)
+    handler = AsyncMock(return_value="handled")
+    
+    # Not an album
+    assert await _feed(middleware, handler, [_update(1)]) == ["handled"]
+    # An album outside the media step
+    assert await _feed(middleware, handler, [_update(2, "g2"), _update(3, "g2")], raw_state=None) == ["handled"] * 2
+    
+    assert handler.await_count == 3
+    assert all("album" not in call.args[1] for call in handler.await_args_list)
+
+
+@pytest.mark.asyncio
+async def test_album_error_is_reported_to_chat():
+    middleware = AlbumMiddleware(states=[WAITING_MEDIA], latency_ms=20)
+    handler = AsyncMock(side_effect=RuntimeError("boom"))
+    bot = SimpleNamespace(send_message=AsyncMock())
+    
+    for update in (_update(1, "g3"), _update(2, "g3")):
+        await middleware(handler, update, {"raw_state": WAITING_MEDIA, "bot": bot})
+    await asyncio.gather(*middleware._tasks)
+    
+    handler.assert_awaited_once()
+    bot.send_message.assert_awaited_once()
+    assert bot.send_message.await_args.args[0] == 42
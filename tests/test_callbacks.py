@@ -0,0 +1,48 @@
+"""
+Tests for keyboards/callbacks.py
+"""
+import pytest
+
+from keyboards.callbacks import (
+    AddToCartCallback,
+    AdminToyCallback,
+    AdminToyCategoryCallback,
+    AdminToyFieldCallback,
+    AdminToyPageCallback,
+    BackToCategoryCallback,
+    CartCallback,
+    CategoryDeleteCallback,
+    FavoriteCallback,
+    OrderCallback,
+    ToyPageCallback,
+    upgrade_legacy_callback,
+)
+
+
+@pytest.mark.parametrize("legacy, callback_class, fields", [
+    ("add_to_cart_12", AddToCartCallback, {"toy_id": 12}),
+    ("toy_page_3_2", ToyPageCallback, {"category_id": 3, "page": 2}),
+    ("back_to_category_7", BackToCategoryCallback, {"category_id": 7}),
+    ("order_5", OrderCallback, {"action": "start", "toy_id": 5}),
+    ("order_from_ad_5", OrderCallback, {"action": "ad", "toy_id": 5}),
+    ("cancel_order", OrderCallback, {"action": "cancel"}),
+    ("cart_dec_40", CartCallback, {"action": "dec", "item_id": 40}),
+    ("clear_cart", CartCallback, {"action": "clear"}),
+    ("remove_from_favorites_9", FavoriteCallback, {"action": "remove", "toy_id": 9}),
+    ("admin_toy_page_4_2", AdminToyPageCallback, {"category_id": 4, "page": 2}),
+    ("admin_toy_page_all_3", AdminToyPageCallback, {"category_id": None, "page": 3}),
+    ("admin_confirm_delete_8", AdminToyCallback, {"action": "confirm_delete", "toy_id": 8}),
+    ("edit_category_5_6", AdminToyCategoryCallback, {"toy_id": 5, "category_id": 6}),
+    ("edit_field_5_media", AdminToyFieldCallback, {"toy_id": 5, "field": "media"}),
+    ("confirm_delete_cat_2", CategoryDeleteCallback, {"action": "confirm", "category_id": 2}),
+    ("cancel_delete_cat", CategoryDeleteCallback, {"action": "cancel"}),
+])
+def test_upgrade_legacy_callback(legacy, callback_class, fields):
+    upgraded = upgrade_legacy_callback(legacy)
+    callback_data = callback_class.unpack(upgraded)
+    assert {name: getattr(callback_data, name) for name in fields} == fields
+
+
+@pytest.mark.parametrize("data", ["", "unknown", "add_to_cart", "edit_field_5_color", "cart:inc:5"])
+def test_upgrade_legacy_callback_ignores_unknown_strings(data):
+    assert upgrade_legacy_callback(data) is None
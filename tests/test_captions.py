@@ -0,0 +1,30 @@
+"""
+Tests for utils/captions.py and the carousel card caption
+"""
+from types import SimpleNamespace
+
+from handlers.user import build_carousel_view
+from utils.captions import CAPTION_LIMIT, fit_caption
+
+
+def test_fit_caption_keeps_short_text():
+    assert fit_caption("A: ", "short", " (1/2)") == "A: short (1/2)"
+
+
+def test_fit_caption_shortens_description_and_keeps_footer():
+    caption = fit_caption("A: ", "x" * 5000, "\n\n📄 1 / 2")
+    assert len(caption) == CAPTION_LIMIT
+    assert caption.endswith("…\n\n📄 1 / 2")
+
+
+def test_carousel_caption_fits_with_long_description():
+    toy = SimpleNamespace(
+        id=1, title="Ayiq", price="120 000", description="uzun " * 1000,
+        category=SimpleNamespace(name="Yumshoq"), category_id=3,
+        media_items=[SimpleNamespace(file_id="PHOTO", media_type="photo")],
+        media_file_id=None, media_type=None
+    )
+    caption, media, _ = build_carousel_view(toy, category_id=3, index=0, total_count=5)
+    assert len(caption) <= CAPTION_LIMIT
+    assert caption.endswith("📄 1 / 5")
+    assert media.caption == caption
@@ -0,0 +1,62 @@
+"""
+Tests for keyboards/cart_kb.py
+"""
+from types import SimpleNamespace
+
+from keyboards.callbacks import CartCallback, CartPageCallback
+from keyboards.cart_kb import CART_PAGE_SIZE, cart_page_of, get_cart_actions_keyboard
+
+
+def _cart(count: int):
+    return [SimpleNamespace(id=100 + idx, quantity=1) for idx in range(count)]
+
+
+def _line_ids(markup):
+    return [
+        CartCallback.unpack(row[0].callback_data).item_id
+        for row in markup.inline_keyboard
+        if row[0].callback_data.startswith("cart:dec:")
+    ]
+
+
+def test_cart_keyboard_single_page_has_no_navigation():
+    markup = get_cart_actions_keyboard(_cart(3))
+    assert _line_ids(markup) == [100, 101, 102]
+    assert not any(
+        button.callback_data.startswith("cartpage:")
+        for row in markup.inline_keyboard for button in row
+    )
+
+
+def test_cart_keyboard_pages_reach_every_line():
+    cart = _cart(CART_PAGE_SIZE * 2 + 5)
+    seen = []
+    page = 0
+    while True:
+        markup = get_cart_actions_keyboard(cart, page)
+        seen += _line_ids(markup)
+        next_pages = [
+            CartPageCallback.unpack(button.callback_data).page
+            for row in markup.inline_keyboard for button in row
+            if button.text.startswith("Keyingi")
+        ]
+        if not next_pages:
+            break
+        page = next_pages[0]
+    
+    assert seen == [item.id for item in cart]
+    assert page == 2
+    # Every keyboard stays within Telegram's 100-button limit
+    assert sum(len(row) for row in get_cart_actions_keyboard(cart, 1).inline_keyboard) <= 100
+
+
+def test_cart_keyboard_clamps_page_after_last_line_removed():
+    cart = _cart(CART_PAGE_SIZE)
+    assert _line_ids(get_cart_actions_keyboard(cart, 1)) == [item.id for item in cart]
+
+
+def test_cart_page_of():
+    cart = _cart(CART_PAGE_SIZE + 1)
+    assert cart_page_of(cart, cart[0].id) == 0
+    assert cart_page_of(cart, cart[-1].id) == 1
+    assert cart_page_of(cart, 999) == 0
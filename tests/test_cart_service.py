@@ -0,0 +1,103 @@
+"""
+Tests for services/cart_service.py and the cart cache
+"""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import func, select
+
+from database.models import CartItem, Toy
+from services.cart_cache import cart_cache
+from services.cart_service import CartService
+
+USER_ID = 1001
+
+
+@pytest.fixture(autouse=True)
+def empty_cart_cache():
+    cart_cache.discard(USER_ID)
+    yield
+    cart_cache.discard(USER_ID)
+
+
+async def _toy(db) -> Toy:
+    toy = Toy(title="Ayiq", price="120 000 so'm", description="Yumshoq ayiq")
+    db.add(toy)
+    await db.flush()
+    return toy
+
+
+@pytest.mark.asyncio
+async def test_adding_same_toy_twice_gives_quantity_two(db):
+    toy = await _toy(db)
+    
+    await CartService.add_to_cart(db, USER_ID, toy.id, toy.title, toy.price)
+    item = await CartService.add_to_cart(db, USER_ID, toy.id, toy.title, toy.price)
+    await db.commit()
+    
+    assert item.quantity == 2
+    assert item.price_amount == 120000
+    assert await db.scalar(select(func.count()).select_from(CartItem)) == 1
+    assert [line.quantity for line in await CartService.get_user_cart(db, USER_ID)] == [2]
+
+
+@pytest.mark.asyncio
+async def test_cart_cache_changes_only_after_commit(db):
+    toy = await _toy(db)
+    await db.commit()
+    
+    # Cache the empty cart
+    assert await CartService.get_user_cart(db, USER_ID) == []
+    generation = cart_cache.generation
+    
+    item = await CartService.add_to_cart(db, USER_ID, toy.id, toy.title, toy.price)
+    assert cart_cache.generation == generation
+    assert cart_cache.get(USER_ID) == []
+    # The writing session reads its own uncommitted line from the database
+    assert await CartService.get_user_cart(db, USER_ID) == [item]
+    
+    await db.commit()
+    assert cart_cache.generation == generation + 1
+    assert cart_cache.get(USER_ID) == [item]
+
+
+@pytest.mark.asyncio
+async def test_cart_cache_drops_changes_on_rollback(db):
+    toy = await _toy(db)
+    await db.commit()
+    assert await CartService.get_user_cart(db, USER_ID) == []
+    generation = cart_cache.generation
+    
+    await CartService.add_to_cart(db, USER_ID, toy.id, toy.title, toy.price)
+    await db.rollback()
+    
+    assert cart_cache.generation == generation
+    assert await CartService.get_user_cart(db, USER_ID) == []
+
+
+@pytest.mark.asyncio
+async def test_decrease_at_quantity_one_removes_line_in_handler(db):
+    from handlers.user_cart import change_cart_quantity
+    from keyboards.callbacks import CartCallback
+    
+    toy = await _toy(db)
+    item = await CartService.add_to_cart(db, USER_ID, toy.id, toy.title, toy.price)
+    await db.commit()
+    
+    # The service refuses to go below 1...
+    assert await CartService.change_quantity(db, item.id, USER_ID, -1) is None
+    assert await db.scalar(select(CartItem.quantity).where(CartItem.id == item.id)) == 1
+    
+    # ...and the ➖ handler removes the line instead
+    callback = SimpleNamespace(
+        from_user=SimpleNamespace(id=USER_ID),
+        message=SimpleNamespace(edit_text=AsyncMock()),
+        answer=AsyncMock()
+    )
+    await change_cart_quantity(callback, CartCallback(action="dec", item_id=item.id), db)
+    
+    assert await db.scalar(select(func.count()).select_from(CartItem)) == 0
+    assert await CartService.get_user_cart(db, USER_ID) == []
+    callback.message.edit_text.assert_awaited_once()
+    callback.answer.assert_awaited_once_with()
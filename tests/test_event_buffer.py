@@ -0,0 +1,77 @@
+"""
+Tests for services/event_buffer.py
+"""
+import json
+import os
+
+import pytest
+from sqlalchemy import func, select
+
+from database.models import SalesLog
+from services.event_buffer import EventBuffer
+from services.stats_service import StatsService
+
+
+def _write_spool(path, toy_ids):
+    with open(path, "w", encoding="utf-8") as spool:
+        for toy_id in toy_ids:
+            spool.write(json.dumps({
+                "kind": "sale_lead",
+                "ts": "2024-03-01T10:00:00",
+                "data": {"user_id": 1, "toy_id": toy_id, "toy_name": f"Toy {toy_id}",
+                         "category_id": None, "category_name": None}
+            }) + "\n")
+
+
+async def _logged_toy_ids(db):
+    return sorted((await db.execute(select(SalesLog.toy_id))).scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_start_replays_unflushed_segment_and_spool(db, tmp_path):
+    spool_path = str(tmp_path / "events.jsonl")
+    # A segment rotated but not written before a crash, and events still in the spool
+    _write_spool(f"{spool_path}.1700000000000000000", [1, 2])
+    _write_spool(spool_path, [3])
+    with open(spool_path, "a", encoding="utf-8") as spool:
+        spool.write('{"kind": "sale_lead", "ts": ')  # torn last line
+    
+    buffer = EventBuffer(spool_path, batch_size=50, flush_interval=3600)
+    buffer.register("sale_lead", StatsService.write_sale_leads)
+    await buffer.start()
+    await buffer.stop()
+    
+    assert await _logged_toy_ids(db) == [1, 2, 3]
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_events_until_next_flush(db, tmp_path):
+    spool_path = str(tmp_path / "events.jsonl")
+    calls = []
+    
+    async def flaky_writer(session, events):
+        calls.append(len(events))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        await StatsService.write_sale_leads(session, events)
+    
+    buffer = EventBuffer(spool_path, batch_size=50, flush_interval=3600)
+    buffer.register("sale_lead", flaky_writer)
+    for toy_id in (4, 5):
+        buffer.emit("sale_lead", {"user_id": 1, "toy_id": toy_id, "toy_name": "Toy",
+                                  "category_id": None, "category_name": None})
+    
+    with pytest.raises(RuntimeError):
+        await buffer.flush()
+    assert await _logged_toy_ids(db) == []
+    # The segment is still on disk, so a restart would replay it
+    assert len(os.listdir(tmp_path)) == 1
+    
+    buffer.emit("sale_lead", {"user_id": 1, "toy_id": 6, "toy_name": "Toy",
+                              "category_id": None, "category_name": None})
+    assert await buffer.flush() == 3
+    await buffer.stop()
+    
+    assert await _logged_toy_ids(db) == [4, 5, 6]
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,113 @@
+"""
+Tests for database/migrate.py on SQLite files
+"""
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from database.migrate import LATEST_VERSION, MIGRATIONS, _create_tables, get_schema_version, run_migrations
+from database.models import Base, CartItem, Category, Toy
+
+# First-release schema: no schema_version, toys without category_id,
+# no price_amount and no unique (user_id, toy_id) on carts and favorites
+LEGACY_SCHEMA = [
+    "CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL UNIQUE, "
+    "is_active BOOLEAN NOT NULL DEFAULT 1, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)",
+    "CREATE TABLE toys (id INTEGER PRIMARY KEY, title VARCHAR(255) NOT NULL, price VARCHAR(50) NOT NULL, "
+    "description TEXT NOT NULL, media_type VARCHAR(10), media_file_id VARCHAR(255), "
+    "is_active BOOLEAN NOT NULL DEFAULT 1, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)",
+    "CREATE TABLE cart_items (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, toy_id INTEGER NOT NULL, "
+    "toy_name VARCHAR(255) NOT NULL, price VARCHAR(50) NOT NULL, quantity INTEGER NOT NULL, "
+    "created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)",
+    "CREATE TABLE favorites (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, toy_id INTEGER NOT NULL, "
+    "toy_name VARCHAR(255) NOT NULL, created_at DATETIME NOT NULL)",
+]
+
+LEGACY_ROWS = [
+    "INSERT INTO toys VALUES (1, 'Ayiq', '99.99', '', NULL, NULL, 1, '2024-01-01', '2024-01-01')",
+    "INSERT INTO toys VALUES (2, 'Mashina', '120 000 so''m', '', NULL, NULL, 1, '2024-01-01', '2024-01-01')",
+    # Duplicate cart lines of user 1 for toy 1 (quantities 2 + 3)
+    "INSERT INTO cart_items VALUES (1, 1, 1, 'Ayiq', '99.99', 2, '2024-01-01', '2024-01-01')",
+    "INSERT INTO cart_items VALUES (2, 2, 2, 'Mashina', '120 000 so''m', 1, '2024-01-01', '2024-01-01')",
+    "INSERT INTO cart_items VALUES (3, 1, 1, 'Ayiq', '99.99', 3, '2024-01-02', '2024-01-02')",
+    # Duplicate favorite of user 1 for toy 1
+    "INSERT INTO favorites VALUES (1, 1, 1, 'Ayiq', '2024-01-01')",
+    "INSERT INTO favorites VALUES (2, 1, 1, 'Ayiq', '2024-01-02')",
+    "INSERT INTO favorites VALUES (3, 1, 2, 'Mashina', '2024-01-03')",
+]
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA + LEGACY_ROWS:
+            conn.execute(text(statement))
+    yield engine
+    engine.dispose()
+
+
+def _snapshot(conn):
+    return {
+        table: conn.execute(text(f"SELECT * FROM {table} ORDER BY id")).all()
+        for table in ("toys", "cart_items", "favorites")
+    }
+
+
+def _unique_indexes(engine, table_name):
+    return {index["name"] for index in inspect(engine).get_indexes(table_name) if index["unique"]}
+
+
+def test_migrates_legacy_database_and_is_noop_on_second_run(legacy_engine):
+    assert run_migrations(legacy_engine) == LATEST_VERSION
+    
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text(
+            "SELECT user_id, toy_id, quantity, price_amount FROM cart_items ORDER BY id"
+        )).all() == [(1, 1, 5, 100), (2, 2, 1, 120000)]
+        assert conn.execute(text("SELECT id FROM cart_items ORDER BY id")).scalars().all() == [1, 2]
+        assert conn.execute(text("SELECT id FROM favorites ORDER BY id")).scalars().all() == [1, 3]
+        assert conn.execute(text("SELECT id, price_amount FROM toys ORDER BY id")).all() == [(1, 100), (2, 120000)]
+        assert conn.execute(text("SELECT version FROM schema_version ORDER BY version")).scalars().all() == [
+            version for version, _, _ in MIGRATIONS
+        ]
+        assert get_schema_version(conn) == LATEST_VERSION
+        before = _snapshot(conn)
+    
+    assert "category_id" in {column["name"] for column in inspect(legacy_engine).get_columns("toys")}
+    assert "uq_cart_items_user_toy" in _unique_indexes(legacy_engine, "cart_items")
+    assert "uq_favorites_user_toy" in _unique_indexes(legacy_engine, "favorites")
+    
+    # Second run: nothing applied, nothing changed
+    assert run_migrations(legacy_engine) == LATEST_VERSION
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM schema_version")).scalar() == len(MIGRATIONS)
+        assert _snapshot(conn) == before
+    
+    with pytest.raises(IntegrityError):
+        with legacy_engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO cart_items (user_id, toy_id, toy_name, price, quantity, created_at, updated_at) "
+                "VALUES (1, 1, 'Ayiq', '99.99', 1, '2024-01-03', '2024-01-03')"
+            ))
+
+
+def test_create_tables_on_partially_upgraded_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'partial.db'}")
+    try:
+        # An older release created some current tables (with price_amount and the
+        # unique cart index) and recorded step 1 only
+        Base.metadata.create_all(engine, tables=[Category.__table__, Toy.__table__, CartItem.__table__])
+        with engine.begin() as conn:
+            get_schema_version(conn)
+            conn.execute(text("INSERT INTO schema_version VALUES (1, 'toys.category_id (legacy schema)', '2024-01-01')"))
+        
+        assert run_migrations(engine) == LATEST_VERSION
+        assert set(Base.metadata.tables) <= set(inspect(engine).get_table_names())
+        
+        # Running the step again changes nothing
+        with engine.begin() as conn:
+            _create_tables(conn)
+        assert run_migrations(engine) == LATEST_VERSION
+    finally:
+        engine.dispose()
@@ -0,0 +1,45 @@
+"""
+Tests for utils/periods.py (AD_TIMEZONE=Asia/Tashkent, UTC+5, set in conftest)
+"""
+from datetime import date, datetime
+
+import pytest
+
+from utils import periods
+
+
+@pytest.fixture
+def just_after_local_midnight(monkeypatch):
+    """Local time 2024-03-01 00:30, still 2024-02-29 19:30 in UTC"""
+    now = periods.LOCAL_TZ.localize(datetime(2024, 3, 1, 0, 30))
+    monkeypatch.setattr(periods, "local_now", lambda: now)
+
+
+def test_local_day_switches_at_local_midnight():
+    assert periods.local_day(datetime(2024, 2, 29, 18, 59, 59)) == "2024-02-29"
+    assert periods.local_day(datetime(2024, 2, 29, 19, 0)) == "2024-03-01"
+
+
+def test_utc_bounds_are_half_open_local_days():
+    assert periods.utc_bounds(date(2024, 3, 1), date(2024, 3, 1)) == (
+        datetime(2024, 2, 29, 19, 0),
+        datetime(2024, 3, 1, 19, 0),
+    )
+
+
+def test_local_today_uses_local_date(just_after_local_midnight):
+    assert periods.local_today() == date(2024, 3, 1)
+
+
+@pytest.mark.parametrize("time_range, start", [
+    ("weekly", datetime(2024, 2, 23, 19, 0)),   # local 2024-02-24 00:00 (7 days with today)
+    ("monthly", datetime(2024, 2, 29, 19, 0)),  # local 2024-03-01 00:00
+    ("yearly", datetime(2023, 12, 31, 19, 0)),  # local 2024-01-01 00:00
+])
+def test_period_bounds_around_local_midnight(just_after_local_midnight, time_range, start):
+    # Periods end with the local today, which has already started in UTC terms
+    assert periods.period_bounds(time_range) == (start, datetime(2024, 3, 1, 19, 0))
+
+
+def test_period_bounds_unknown_range():
+    assert periods.period_bounds("daily") is None
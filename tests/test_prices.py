@@ -0,0 +1,46 @@
+"""
+Tests for utils/prices.py
+"""
+import pytest
+
+from utils.prices import format_amount, parse_price
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("120 000 so'm", 120000),
+    ("85,000", 85000),
+    ("1.234.567", 1234567),
+    ("120'000", 120000),
+    ("Narxi: 45 000 so'm", 45000),
+    ("150 ming", 150000),
+    ("1.5 mln", 1500000),
+    ("2,5 ming", 2500),
+    ("5 тысяч", 5000),
+    ("3 тыс. сум", 3000),
+    ("2 миллиона", 2000000),
+    ("5 kg", 5),
+    ("100 000, 120 000", 100000),
+    ("100 000 - 120 000 so'm", 100000),
+])
+def test_parse_price_thousands_and_multipliers(text, expected):
+    assert parse_price(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("12 500.50 so'm", 12501),
+    ("99.99", 100),
+    ("99.49", 99),
+    ("12.345,67", 12346),
+    ("120 000.", 120000),
+])
+def test_parse_price_rounds_decimal_fraction(text, expected):
+    assert parse_price(text) == expected
+
+
+@pytest.mark.parametrize("text", [None, "", "kelishiladi", "12.5.2024", "1 23 45", "12345 678"])
+def test_parse_price_returns_none_without_clear_number(text):
+    assert parse_price(text) is None
+
+
+def test_format_amount():
+    assert format_amount(1250000) == "1 250 000"
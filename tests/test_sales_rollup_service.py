@@ -0,0 +1,67 @@
+"""
+Tests for services/sales_rollup_service.py
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select
+
+from database.models import SalesDailyCategory, SalesDailyToy, SalesLog
+from services.sales_rollup_service import NO_CATEGORY, SalesRollupService
+from services.stats_service import StatsService
+
+
+def _lead(toy_id, toy_name, category_id, category_name, ts):
+    return {
+        "kind": "sale_lead",
+        "ts": ts,
+        "data": {"user_id": 1, "toy_id": toy_id, "toy_name": toy_name,
+                 "category_id": category_id, "category_name": category_name}
+    }
+
+
+async def _rollups(db):
+    categories = (await db.execute(
+        select(SalesDailyCategory.day, SalesDailyCategory.category_id, SalesDailyCategory.count)
+    )).all()
+    toys = (await db.execute(
+        select(SalesDailyToy.day, SalesDailyToy.toy_id, SalesDailyToy.count)
+    )).all()
+    return sorted(categories), sorted(toys)
+
+
+@pytest.mark.asyncio
+async def test_record_sales_and_catch_up_match_rebuild(db):
+    # Rows from before the rollups existed: backfilled by the first catch_up
+    await db.execute(insert(SalesLog), [
+        {"user_id": 1, "toy_id": 10, "toy_name": "Ayiq", "category_id": 1, "category_name": "Yumshoq",
+         "created_at": datetime(2024, 2, 29, 18, 59)},  # 23:59 local, 2024-02-29
+        {"user_id": 2, "toy_id": 11, "toy_name": "Mashina", "category_id": None, "category_name": None,
+         "created_at": datetime(2024, 2, 29, 19, 0)},   # 00:00 local, 2024-03-01
+    ])
+    assert await SalesRollupService.catch_up(db) == 2
+    
+    # Batched writes update the rollups directly...
+    await StatsService.write_sale_leads(db, [
+        _lead(10, "Ayiq", 1, "Yumshoq", "2024-02-29T19:30:00"),
+        _lead(10, "Ayiq", 1, "Yumshoq", "2024-03-01T05:00:00"),
+        _lead(11, "Mashina", None, None, "2024-03-01T20:00:00"),  # 01:00 local, 2024-03-02
+    ])
+    incremental = await _rollups(db)
+    
+    # ...and the next catch_up recomputes the same days without double counting
+    assert await SalesRollupService.catch_up(db) == 2
+    assert await _rollups(db) == incremental
+    
+    await SalesRollupService.rebuild_days(db, ["2024-02-29", "2024-03-01", "2024-03-02"])
+    assert await _rollups(db) == incremental
+    assert incremental == (
+        [("2024-02-29", 1, 1), ("2024-03-01", NO_CATEGORY, 1), ("2024-03-01", 1, 2), ("2024-03-02", NO_CATEGORY, 1)],
+        [("2024-02-29", 10, 1), ("2024-03-01", 10, 2), ("2024-03-01", 11, 1), ("2024-03-02", 11, 1)],
+    )
+
+
+@pytest.mark.asyncio
+async def test_catch_up_without_new_rows_does_nothing(db):
+    assert await SalesRollupService.catch_up(db) == 0
+    assert await _rollups(db) == ([], [])
@@ -0,0 +1,35 @@
+"""
+Tests for keyboards/search_kb.py
+"""
+from keyboards.callbacks import SearchPageCallback
+from keyboards.search_kb import CALLBACK_DATA_LIMIT, search_callback_query
+
+
+def _fits(query: str) -> bool:
+    return len(SearchPageCallback(page=999, query=query).pack().encode()) <= CALLBACK_DATA_LIMIT
+
+
+def test_search_callback_query_keeps_short_query():
+    assert search_callback_query(["katta", "ayiq"]) == "katta ayiq"
+
+
+def test_search_callback_query_drops_words_that_do_not_fit():
+    query = search_callback_query(["ayiq"] + ["yumshoq"] * 20)
+    assert query.startswith("ayiq yumshoq")
+    assert _fits(query)
+    assert len(query.split()) < 21
+
+
+def test_search_callback_query_truncates_single_long_word():
+    word = "o" * 200
+    query = search_callback_query([word])
+    assert query
+    assert word.startswith(query)
+    # Cut to the full room, not shorter
+    assert len(SearchPageCallback(page=999, query=query).pack()) == CALLBACK_DATA_LIMIT
+
+
+def test_search_callback_query_truncates_long_first_word_and_drops_the_rest():
+    query = search_callback_query(["a" * 200, "ayiq"])
+    assert query == "a" * len(query)
+    assert _fits(query)
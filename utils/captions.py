@@ -0,0 +1,18 @@
+"""
+Telegram caption length limit for toy cards
+"""
+
+# Bot API limit for photo/video captions (text messages allow 4096)
+CAPTION_LIMIT = 1024
+
+
+def fit_caption(header: str, description: str, footer: str = "", limit: int = CAPTION_LIMIT) -> str:
+    """
+    header + description + footer, with the description shortened ("…") to fit `limit`
+    
+    Length is counted with HTML tags, so the visible caption is never longer.
+    """
+    room = limit - len(header) - len(footer)
+    if len(description) > room:
+        description = description[:max(0, room - 1)].rstrip() + "…"
+    return header + description + footer
@@ -0,0 +1,151 @@
+"""
+Fake Telegram for local webhook testing
+
+Two parts:
+- a minimal Bot API stand-in that answers every method with a canned
+  success result (point TELEGRAM_API_URL at it)
+- a client that posts synthetic updates to the webhook and reports latency
+
+Usage:
+    python -m utils.fake_telegram api --port 8081
+    TELEGRAM_API_URL=http://127.0.0.1:8081 BOT_MODE=webhook WEBHOOK_SECRET=test python bot.py
+    python -m utils.fake_telegram send --url http://127.0.0.1:8080/webhook \
+        --secret test --count 200 --users 20
+
+--secret must match the bot's WEBHOOK_SECRET (required in webhook mode),
+otherwise every update is rejected with 401.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from typing import List
+
+from aiohttp import ClientSession, web
+
+FAKE_BOT_USER = {
+    "id": 100000001,
+    "is_bot": True,
+    "first_name": "Fake Toymix",
+    "username": "fake_toymix_bot"
+}
+
+_message_ids = itertools.count(1)
+
+
+def _fake_message(chat_id, text: str = "") -> dict:
+    return {
+        "message_id": next(_message_ids),
+        "date": int(time.time()),
+        "chat": {"id": int(chat_id or 0), "type": "private"},
+        "from": FAKE_BOT_USER,
+        "text": text or "ok"
+    }
+
+
+async def _handle_method(request: web.Request) -> web.Response:
+    """Answer any Bot API method with a plausible result"""
+    method = request.match_info["method"]
+    params = dict(request.query)
+    if request.can_read_body:
+        try:
+            if request.content_type == "application/json":
+                params.update(await request.json())
+            else:
+                params.update(await request.post())
+        except Exception:
+            pass
+    
+    lower = method.lower()
+    if lower == "getme":
+        result = FAKE_BOT_USER
+    elif lower == "sendmediagroup":
+        result = [_fake_message(params.get("chat_id"))]
+    elif lower.startswith("send") or lower.startswith("edit") or lower.startswith("forward"):
+        result = _fake_message(params.get("chat_id"), str(params.get("text", "")))
+    else:
+        result = True
+    return web.json_response({"ok": True, "result": result})
+
+
+async def run_fake_api(host: str, port: int):
+    """Serve the fake Bot API until interrupted"""
+    app = web.Application()
+    app.router.add_route("*", "/bot{token}/{method}", _handle_method)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Fake Bot API listening on http://{host}:{port}")
+    await asyncio.Event().wait()
+
+
+def build_message_update(update_id: int, user_id: int, text: str) -> dict:
+    """Build a private-chat text message update"""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": f"User{user_id}"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+            "text": text
+        }
+    }
+
+
+async def send_updates(url: str, secret: str, count: int, users: int, concurrency: int, text: str):
+    """Post `count` updates from `users` distinct users and print latency stats"""
+    latencies: List[float] = []
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async with ClientSession() as session:
+        async def post(update_id: int):
+            update = build_message_update(update_id, 500000 + update_id % users, text)
+            async with semaphore:
+                started = time.perf_counter()
+                async with session.post(
+                    url,
+                    json=update,
+                    headers={"X-Telegram-Bot-Api-Secret-Token": secret}
+                ) as response:
+                    await response.read()
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    statuses[response.status] = statuses.get(response.status, 0) + 1
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(post(i) for i in range(1, count + 1)))
+        elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"Sent {count} updates in {elapsed:.2f}s ({count / elapsed:.0f}/s), statuses: {statuses}")
+    print(f"Webhook response latency: p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Telegram for local webhook testing")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    api = sub.add_parser("api", help="Run fake Bot API server")
+    api.add_argument("--host", default="127.0.0.1")
+    api.add_argument("--port", type=int, default=8081)
+    
+    send = sub.add_parser("send", help="Post synthetic updates to the webhook")
+    send.add_argument("--url", default="http://127.0.0.1:8080/webhook")
+    send.add_argument("--secret", required=True, help="WEBHOOK_SECRET of the bot")
+    send.add_argument("--count", type=int, default=100)
+    send.add_argument("--users", type=int, default=10)
+    send.add_argument("--concurrency", type=int, default=20)
+    send.add_argument("--text", default="📦 Katalog")
+    
+    args = parser.parse_args()
+    if args.command == "api":
+        asyncio.run(run_fake_api(args.host, args.port))
+    else:
+        asyncio.run(send_updates(args.url, args.secret, args.count, args.users, args.concurrency, args.text))
+
+
+if __name__ == "__main__":
+    main()
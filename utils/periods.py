@@ -0,0 +1,74 @@
+"""
+Local-day and report period helpers (AD_TIMEZONE)
+
+Timestamps are stored as naive UTC; day strings (posted_date, rollup days)
+are local dates in AD_TIMEZONE. Periods are half-open [start, end) ranges so
+they map to index range scans.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple
+
+import pytz
+
+from config import AD_TIMEZONE
+
+LOCAL_TZ = pytz.timezone(AD_TIMEZONE)
+
+
+def local_now() -> datetime:
+    """Current time in AD_TIMEZONE"""
+    return datetime.now(LOCAL_TZ)
+
+
+def local_today() -> date:
+    """Today's date in AD_TIMEZONE"""
+    return local_now().date()
+
+
+def local_day(created_at: datetime) -> str:
+    """Local day (YYYY-MM-DD) of a stored UTC timestamp"""
+    if created_at.tzinfo is None:
+        created_at = pytz.utc.localize(created_at)
+    return created_at.astimezone(LOCAL_TZ).date().isoformat()
+
+
+def utc_bounds(first_day: date, last_day: date) -> Tuple[datetime, datetime]:
+    """Naive UTC [start, end) covering local days first_day..last_day"""
+    start = LOCAL_TZ.localize(datetime.combine(first_day, time.min))
+    end = LOCAL_TZ.localize(datetime.combine(last_day + timedelta(days=1), time.min))
+    return (
+        start.astimezone(pytz.utc).replace(tzinfo=None),
+        end.astimezone(pytz.utc).replace(tzinfo=None)
+    )
+
+
+def period_days(time_range: str) -> Optional[Tuple[date, date]]:
+    """
+    Local [first_day, end_day) of a report period, ending with today
+    
+    Args:
+        time_range: 'weekly' (last 7 days), 'monthly' (current month) or
+            'yearly' (current year)
+    
+    Returns:
+        Tuple of dates, or None for an unknown period
+    """
+    today = local_today()
+    end_day = today + timedelta(days=1)
+    
+    if time_range == 'weekly':
+        return today - timedelta(days=6), end_day
+    elif time_range == 'monthly':
+        return today.replace(day=1), end_day
+    elif time_range == 'yearly':
+        return today.replace(month=1, day=1), end_day
+    return None
+
+
+def period_bounds(time_range: str) -> Optional[Tuple[datetime, datetime]]:
+    """Naive UTC [start, end) timestamps of a report period (see period_days)"""
+    days = period_days(time_range)
+    if days is None:
+        return None
+    first_day, end_day = days
+    return utc_bounds(first_day, end_day - timedelta(days=1))
@@ -0,0 +1,90 @@
+"""
+Price parsing for free-form price strings ("120 000 so'm", "85,000", "150 ming")
+"""
+import re
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional
+
+# First number in the text: digit groups joined by one thousand separator each
+# (whitespace, dot, comma, apostrophe), so "100 000, 120 000" stops after the first amount
+_NUMBER_RE = re.compile(r"\d+(?:(?:\s+|[.,'’])\d+)*")
+# Integer part, then an optional decimal fraction of one or two digits ("99.99", "12 500,5")
+_FRACTION_RE = re.compile(r"(.+?)[.,](\d{1,2})")
+_GROUP_SPLIT_RE = re.compile(r"[\s.,'’]+")
+
+# Word multipliers admins use in prices
+_MULTIPLIERS = {
+    "ming": 1_000,
+    "тыс": 1_000,
+    "тысяч": 1_000,
+    "тысячи": 1_000,
+    "тысяча": 1_000,
+    "k": 1_000,
+    "mln": 1_000_000,
+    "million": 1_000_000,
+    "млн": 1_000_000,
+    "миллион": 1_000_000,
+    "миллиона": 1_000_000,
+    "миллионов": 1_000_000,
+}
+# Whole words only ("5 тысяч", not "5 kg"); longer forms are tried first
+_MULTIPLIER_RE = re.compile(
+    r"^\s*(" + "|".join(map(re.escape, sorted(_MULTIPLIERS, key=len, reverse=True))) + r")\b",
+    re.IGNORECASE
+)
+
+
+def _parse_number(number: str) -> Optional[Decimal]:
+    """
+    Value of a number with thousand separators and an optional short fraction
+    
+    "120 000", "85,000" and "1.500" are thousands; a trailing ".5"/",50" is a
+    decimal fraction. Groups after the first separator must have three digits,
+    otherwise the number is ambiguous ("12.5.2024", "1 23 45") and None is returned.
+    """
+    fraction = "0"
+    match = _FRACTION_RE.fullmatch(number)
+    if match:
+        number, fraction = match.group(1), match.group(2)
+    
+    groups = _GROUP_SPLIT_RE.split(number)
+    if len(groups) > 1 and (len(groups[0]) > 3 or any(len(group) != 3 for group in groups[1:])):
+        return None
+    return Decimal("".join(groups)) + Decimal(f"0.{fraction}")
+
+
+def parse_price(text: Optional[str]) -> Optional[int]:
+    """
+    Parse a price string into whole so'm
+    
+    Thousand separators inside the number are ignored, a decimal fraction
+    ("99.99", "1.5 mln") is kept and the result is rounded to whole so'm, and a
+    following "ming"/"mln"/"тысяч" multiplies it. Only the first amount is
+    read ("100 000, 120 000" is 100 000).
+    
+    Args:
+        text: Price as entered by the admin
+    
+    Returns:
+        Amount in so'm, or None if the text holds no number or an ambiguous one
+    """
+    if not text:
+        return None
+    
+    match = _NUMBER_RE.search(text)
+    if not match:
+        return None
+    
+    value = _parse_number(match.group())
+    if value is None:
+        return None
+    
+    multiplier = _MULTIPLIER_RE.match(text[match.end():])
+    if multiplier:
+        value *= _MULTIPLIERS[multiplier.group(1).lower()]
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def format_amount(amount: int) -> str:
+    """Format whole so'm with space thousand separators (120 000)"""
+    return f"{amount:,}".replace(",", " ")
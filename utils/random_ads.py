@@ -1,14 +1,15 @@
 """
 Utility functions for random advertisement selection
 """
-from datetime import date
 from typing import List
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import Toy, DailyAd
+from utils.periods import local_today
 
 
-def get_today_posted_toy_ids(db: Session) -> List[int]:
+async def get_today_posted_toy_ids(db: AsyncSession) -> List[int]:
     """
     Get list of toy IDs that were posted today
     
@@ -18,14 +19,16 @@ def get_today_posted_toy_ids(db: Session) -> List[int]:
     Returns:
         List of toy IDs
     """
-    today = date.today().isoformat()
-    posted_ids = db.query(DailyAd.toy_id).filter(
-        DailyAd.posted_date == today
-    ).all()
-    return [toy_id[0] for toy_id in posted_ids]
+    today = local_today().isoformat()
+    result = await db.execute(
+        select(DailyAd.toy_id).where(
+            DailyAd.posted_date == today
+        )
+    )
+    return [toy_id[0] for toy_id in result.all()]
 
 
-def clear_old_daily_ads(db: Session, days_to_keep: int = 7):
+async def clear_old_daily_ads(db: AsyncSession, days_to_keep: int = 7):
     """
     Clean up old daily ad records (keep only last N days)
     
@@ -35,9 +38,11 @@ def clear_old_daily_ads(db: Session, days_to_keep: int = 7):
     """
     from datetime import timedelta
     
-    cutoff_date = (date.today() - timedelta(days=days_to_keep)).isoformat()
-    deleted = db.query(DailyAd).filter(
-        DailyAd.posted_date < cutoff_date
-    ).delete()
-    db.commit()
-    return deleted
+    cutoff_date = (local_today() - timedelta(days=days_to_keep)).isoformat()
+    result = await db.execute(
+        delete(DailyAd).where(
+            DailyAd.posted_date < cutoff_date
+        )
+    )
+    await db.flush()
+    return result.rowcount
@@ -0,0 +1,42 @@
+"""
+Text normalization for search (Uzbek Latin and Cyrillic)
+"""
+import re
+import unicodedata
+from typing import List
+
+# Uzbek (and Russian) Cyrillic to Uzbek Latin
+_CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "ғ": "g'", "д": "d", "е": "e",
+    "ё": "yo", "ж": "j", "з": "z", "и": "i", "й": "y", "к": "k", "қ": "q",
+    "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r", "с": "s",
+    "т": "t", "у": "u", "ў": "o'", "ф": "f", "х": "x", "ҳ": "h", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "'", "ы": "i", "ь": "", "э": "e",
+    "ю": "yu", "я": "ya",
+}
+_TRANSLITERATION = str.maketrans(_CYRILLIC_TO_LATIN)
+
+# Apostrophe variants used in o', g' and the tutuq belgisi; dropped entirely
+_APOSTROPHES_RE = re.compile(r"['‘’ʻʼ`´]")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Fold text to lowercase ASCII Latin for matching
+    
+    Cyrillic is transliterated and apostrophes are removed, so "Ўйинчоқ",
+    "o'yinchoq" and "o‘yinchoq" all become "oyinchoq".
+    """
+    if not text:
+        return ""
+    text = text.lower().translate(_TRANSLITERATION)
+    text = _APOSTROPHES_RE.sub("", text)
+    # Strip remaining accents (é -> e)
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized search tokens of a text"""
+    return _TOKEN_RE.findall(normalize_text(text))